@@ -4,7 +4,9 @@ Asignador de turnos de sábados y festivos desde JSON para 'horarioUnificado_pro
 Descripción general:
 - Entrada JSON agrupada por turno, con elementos: { "fecha": <str>, "trabajador": <str> }.
 - Encabezados de columnas esperados en la fila 1 del Excel: "DOW-DD" (por ejemplo, "THU-07", "SUN-10").
-- Mapeo de fecha → columna por coincidencia exacta del encabezado "DOW-DD" (día de semana y día del mes).
+- Mapeo de fecha → columna por fecha completa: el primer día del horizonte (fecha_inicio, o inferido de
+  las fechas del JSON y validado contra todos los encabezados "DOW-DD") más el desplazamiento de la
+  columna. Así un horizonte de varios meses, con encabezados repetidos, no mezcla meses.
 - Algoritmo de asignación: primero intenta asignación directa; si no es posible, realiza un matching 1:1
   entre trabajadores y fechas del mismo turno (intercambios) en dos pasadas: sin violaciones blandas, y
   luego permitiéndolas en caso necesario.
@@ -17,6 +19,9 @@ Descripción general:
 - La validación de restricciones se hace contra:
   * El valor real que ya existe en la hoja en la columna del día siguiente.
   * El propio plan del JSON para BLPTD/BANTD en la columna del día siguiente.
+- Las aristas del matching no se evalúan pedido × slot × columna: por turno se calculan una vez, por
+  trabajador, los días viables (bits "fuertes" y "blandos") y, por día, los slots que pueden caer en él;
+  las aristas de cada pedido salen de unir/intersecar esos bits.
     - Salida: guarda el Excel resultante como 'horario_procesado_con_sabados_domingos.xlsx' y un reporte tabulado en
   'reporte_asignador_sabados_festivos.txt' con el detalle de asignaciones (directas, intercambios, blandas) y no asignados.
 - Formatos de fecha aceptados en el JSON: YYYY-MM-DD, DD/MM/YYYY, DD-MM-YYYY.
@@ -25,11 +30,22 @@ Descripción general:
 import json
 import os
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Set
-
-import openpyxl
-from openpyxl.styles import PatternFill, Font
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple, Set
+
+from cargador_horarios import abrir_horario
+from contador_operativos import ETIQUETA_OPERATIVOS, ETIQUETA_TORRE, buscar_filas_etiqueta, contador_compartido
+from emparejamiento import (
+    LIBRE,
+    asignacion_costo_minimo,
+    emparejamiento_dos_fases,
+    validar_modo_emparejamiento,
+)
+from estadisticas_horario import EscritorEstadisticas
+from estilos_horario import estilos_compartidos
+from grilla_horario import GrillaHorario
+from motor_restricciones import MotorRestricciones
 
 # ------------------------------------------------------------
 # Utilidades de fechas y encabezados DOW-DD
@@ -100,14 +116,22 @@ class AsignadorSabadosFestivos:
     Carga un plan de turnos de sábados y festivos desde un archivo JSON y lo aplica sobre 'horarioUnificado_procesado.xlsx'.
 
     Parámetros del constructor:
-    - excel_in: ruta del Excel base (por defecto 'horarioUnificado_procesado.xlsx').
+    - excel_in: ruta del Excel base (por defecto 'horarioUnificado_procesado.xlsx') o de una instantánea .hsnap.
     - json_path: ruta del JSON de entrada (por defecto 'cuentas1y2sabadosDomingo_asignado.json').
     - excel_out: ruta del Excel de salida (por defecto 'horario_procesado_con_sabados_domingos.xlsx').
     - modo_simulacion: si es True, no escribe en el Excel (solo genera reporte en memoria).
+    - wb / grid: libro y grilla ya cargados (pipeline en un solo proceso); si se omiten se lee 'excel_in'.
+    - modo_emparejamiento: "dos_fases" (por defecto) o "ponderado" (asignación de costo mínimo que
+      penaliza las blandas y la distancia en días a la fecha pedida; ver paso 3).
+    - fecha_inicio: fecha del primer día del horizonte; si se omite se infiere de las fechas del JSON.
 
     Encabezados y fechas:
     - La fila 1 contiene encabezados de tipo 'DOW-DD' (p. ej., 'THU-07').
-    - Las fechas del JSON se mapean a columnas por coincidencia exacta de 'DOW-DD'.
+    - Con el primer día anclado (fecha_inicio o inferido: el que ubica más fechas del JSON y hace
+      coincidir todos los encabezados con días consecutivos), cada fecha va a la columna
+      col_inicio + (fecha − primer día); las fechas fuera del horizonte no tienen columna.
+    - Sin ancla se usa la coincidencia exacta de 'DOW-DD', solo si ningún encabezado se repite
+      (si se repite, p. ej. un horizonte de más de un mes, se rechaza con ValueError).
 
     Proceso de asignación por turno:
     1) Cargar pedidos y precomputar el plan de BLPTD/BANTD del JSON para el día siguiente.
@@ -115,7 +139,9 @@ class AsignadorSabadosFestivos:
        - 'fuertes' (no violan restricción blanda) y
        - 'blandas' (violan la restricción blanda, pero no la dura).
     3) Hallar un matching máximo en dos pasadas: primero con aristas fuertes; luego, si quedan pendientes,
-       permitir aristas blandas.
+       permitir aristas blandas. En modo "ponderado" se resuelve en su lugar una sola asignación óptima
+       (máximo de pedidos asignados y, entre esas, mínimo de PENALIZACION_BLANDA por blanda + días de
+       distancia entre la fecha pedida y la asignada).
     4) Escribir al Excel respetando las restricciones y priorizando evitar las blandas.
         5) Garantizar unicidad por día: un mismo turno no se asigna a más de un trabajador en la misma columna.
 
@@ -124,8 +150,8 @@ class AsignadorSabadosFestivos:
       * NLPR/NANR/NLPRD/NANRD/6R/6RT: no pueden tener BLPTD/BANTD al día siguiente
       * BLPTD/BANTD: no pueden tener BLPTD/BANTD al día anterior ni al día siguiente
     - Blanda: NLPT/NANT/NLPTD/NANTD/TASTD/6T/3/6TT deben evitar BLPTD/BANTD al día siguiente
-    - Si no existe 'día siguiente' (última columna), no aplica la validación.
-    - Si no existe 'día anterior' (primera columna), no aplica la validación.
+    - En la primera / última columna el día anterior / siguiente es el contexto del mes vecino
+      (GrillaHorario.fijar_contexto); sin contexto no aplica la validación.
 
     Formato visual:
     - Las celdas con violaciones blandas se colorean de azul clarito (#87CEEB) para facilitar su identificación.
@@ -136,67 +162,77 @@ class AsignadorSabadosFestivos:
     - El reporte 'reporte_asignador_sabados_festivos.txt' detalla para cada pedido si fue 'directa', 'intercambio', 'blanda'
       o 'no_asignado', junto con la columna destino y el encabezado 'DOW-DD'.
     """
+    # Costo de una arista blanda en modo ponderado, en "días de distancia" (supera cualquier distancia en un año)
+    PENALIZACION_BLANDA = 1000
+
     def __init__(
         self,
         excel_in: str = "horarioUnificado_procesado.xlsx",
         json_path: str = "cuentas1y2sabadosDomingo_asignado.json",
         excel_out: str = "horario_procesado_con_sabados_domingos.xlsx",
         modo_simulacion: bool = True,
+        wb=None,
+        grid: Optional[GrillaHorario] = None,
+        modo_emparejamiento: str = "dos_fases",
+        fecha_inicio: Optional[date] = None,
     ) -> None:
         self.excel_in = excel_in
         self.json_path = json_path
         self.excel_out = excel_out
         self.modo_simulacion = modo_simulacion
+        self.modo_emparejamiento = validar_modo_emparejamiento(modo_emparejamiento)
 
-        if not os.path.exists(self.excel_in):
+        if wb is None and not os.path.exists(self.excel_in):
             raise FileNotFoundError(f"No se encontró el archivo Excel: {self.excel_in}")
         if not os.path.exists(self.json_path):
             raise FileNotFoundError(f"No se encontró el archivo JSON: {self.json_path}")
 
-        self.wb = openpyxl.load_workbook(self.excel_in)
+        # El pipeline puede pasar el libro y la grilla ya cargados (sin releer el xlsx)
+        if wb is None:
+            # Ejecución suelta: xlsx o instantánea .hsnap (aplicada sobre el xlsx de plantilla)
+            wb, grid = abrir_horario(self.excel_in)
+        self.wb = wb
         self.ws = self.wb.active
+        # Grilla en memoria: se lee una vez y se vuelca a la hoja al guardar
+        self.grid = grid if grid is not None else GrillaHorario.desde_hoja(self.ws)
+        self.estilos = estilos_compartidos(self.ws)
 
-        # Mapeos clave
-        self.sigla_to_row: Dict[str, int] = {}
+        # Mapeos clave (SIGLA → fila vive en el índice de la grilla: self.grid.fila_trabajador)
         self.header_map: Dict[Tuple[str, str], List[int]] = {}
         self.col_to_header_tuple: Dict[int, Tuple[str, str]] = {}
+        # Fecha completa → columna, una vez anclado el primer día (_anclar_fechas)
+        self.fecha_inicio: Optional[date] = fecha_inicio.date() if isinstance(fecha_inicio, datetime) else fecha_inicio
+        self.columna_por_fecha: Dict[date, int] = {}
 
-        # Conjuntos de reglas
-        self.hard_source_turns: Set[str] = {"NLPR", "NANR", "NLPRD", "NANRD", "6R", "6RT", "BLPTD", "BANTD"}
-        self.soft_source_turns: Set[str] = {"NLPT", "NANT", "NLPTD", "NANTD", "TASTD", "6T", "3", "6TT"}
-        self.blocked_next_day_turns: Set[str] = {"BLPTD", "BANTD"}
+        # Restricciones de adyacencia compartidas (reglas_restricciones.json), duras antes que blandas
+        self.reglas = MotorRestricciones(self.grid)
+        self.reglas_sabados = sorted(
+            (r for r in self.reglas.reglas_de("sabados") if r.tipo in {"dura", "blanda"}),
+            key=lambda r: r.tipo != "dura",
+        )
 
         # Plan del propio JSON para BLPTD/BANTD por (trabajador, col)
         self.plan_blpt_bant_por_celda: Set[Tuple[str, int]] = set()
+        # El mismo plan como bits por trabajador (bit k = día col_inicio + k)
+        self.plan_blpt_bant_bits: Dict[str, int] = {}
 
         # Color para violaciones blandas
-        self.color_violacion_blanda = PatternFill(start_color="87CEEB", end_color="87CEEB", fill_type="solid")  # Azul clarito
+        self.color_violacion_blanda = "87CEEB"  # Azul clarito
 
         # Reporte
         self.resultados: List[ResultadoAsignacion] = []
 
         # Color para violaciones duras (fucsia)
-        self.color_violacion_dura = PatternFill(start_color="FF00FF", end_color="FF00FF", fill_type="solid")
+        self.color_violacion_dura = "FF00FF"
 
-        self._mapear_trabajadores()
         self._mapear_encabezados()
 
     # --------------------------------------------------------
     # Mapeos de hoja
     # --------------------------------------------------------
-    def _mapear_trabajadores(self) -> None:
-        for fila in range(2, 26):
-            val = self.ws.cell(row=fila, column=1).value
-            if not val:
-                continue
-            sigla = str(val).strip().upper()
-            if sigla:
-                self.sigla_to_row[sigla] = fila
-
     def _mapear_encabezados(self) -> None:
-        max_col = self.ws.max_column
-        for col in range(2, max_col + 1):
-            header = parse_header_cell(self.ws.cell(row=1, column=col).value)
+        for col in self.grid.columnas():
+            header = parse_header_cell(self.grid.encabezado(col))
             if not header:
                 continue
             self.col_to_header_tuple[col] = header
@@ -205,16 +241,59 @@ class AsignadorSabadosFestivos:
     # --------------------------------------------------------
     # Utilidades de mapeo fecha → columna
     # --------------------------------------------------------
+    def _encabezados_coinciden(self, inicio: date) -> bool:
+        """True si, empezando en 'inicio', cada encabezado DOW-DD es el de su día."""
+        return all(
+            date_to_header_tuple(inicio + timedelta(days=col - self.grid.col_inicio)) == header
+            for col, header in self.col_to_header_tuple.items()
+        )
+
+    def _inferir_fecha_inicio(self, fechas: Iterable[datetime]) -> Optional[date]:
+        """Primer día que ubica más fechas del JSON con encabezados coherentes (None si ninguno)."""
+        votos: Counter = Counter()
+        for dt in fechas:
+            for col in self.header_map.get(date_to_header_tuple(dt), []):
+                votos[dt.date() - timedelta(days=col - self.grid.col_inicio)] += 1
+        for inicio, _ in votos.most_common():
+            if self._encabezados_coinciden(inicio):
+                return inicio
+        return None
+
+    def _anclar_fechas(self, pedidos_por_turno: Dict[str, List[PedidoAsignacion]]) -> None:
+        """Fija el primer día del horizonte y el mapa fecha completa → columna."""
+        if self.fecha_inicio is not None:
+            if not self._encabezados_coinciden(self.fecha_inicio):
+                raise ValueError(f"Los encabezados DOW-DD no corresponden a días consecutivos desde {self.fecha_inicio}")
+        else:
+            fechas = [p.fecha_dt for lst in pedidos_por_turno.values() for p in lst]
+            self.fecha_inicio = self._inferir_fecha_inicio(fechas)
+        if self.fecha_inicio is None:
+            repetidos = sorted(f"{h[0]}-{h[1]}" for h, cols in self.header_map.items() if len(cols) > 1)
+            if repetidos:
+                raise ValueError(
+                    f"Encabezados repetidos ({', '.join(repetidos)}) y sin fecha de inicio: "
+                    "no se pueden ubicar las fechas del JSON; indique fecha_inicio"
+                )
+            return
+        self.columna_por_fecha = {
+            self.fecha_inicio + timedelta(days=col - self.grid.col_inicio): col for col in self.grid.columnas()
+        }
+
     def _columna_para_fecha_preferida(self, dt: datetime) -> Optional[int]:
+        if self.columna_por_fecha:
+            return self.columna_por_fecha.get(dt.date())
         dow, dd = date_to_header_tuple(dt)
         key = (dow, dd)
         cols = self.header_map.get(key, [])
         if not cols:
             return None
-        # Si hay múltiples columnas con el mismo encabezado (caso raro), usar la primera
+        # Sin ancla solo se llega aquí con encabezados únicos (_anclar_fechas rechaza los repetidos)
         return cols[0]
 
     def _todas_columnas_para_fecha(self, dt: datetime) -> List[int]:
+        if self.columna_por_fecha:
+            col = self.columna_por_fecha.get(dt.date())
+            return [col] if col is not None else []
         dow, dd = date_to_header_tuple(dt)
         return list(self.header_map.get((dow, dd), []))
 
@@ -254,30 +333,18 @@ class AsignadorSabadosFestivos:
                 col = self._columna_para_fecha_preferida(p.fecha_dt)
                 if col is not None:
                     self.plan_blpt_bant_por_celda.add((p.trabajador, col))
+                    bit = 1 << (col - self.grid.col_inicio)
+                    self.plan_blpt_bant_bits[p.trabajador] = self.plan_blpt_bant_bits.get(p.trabajador, 0) | bit
 
     # --------------------------------------------------------
     # Validaciones de celda y restricciones
     # --------------------------------------------------------
     def _celda_vacia(self, fila: int, col: int) -> bool:
-        val = self.ws.cell(row=fila, column=col).value
-        return val is None or str(val).strip() == ""
-
-    def _valor_en(self, fila: int, col: int) -> Optional[str]:
-        val = self.ws.cell(row=fila, column=col).value
-        if val is None:
-            return None
-        return str(val).strip().upper()
+        return self.grid.esta_vacia(fila, col)
 
     def _existe_turno_en_columna(self, col_dia: int, turno: str) -> bool:
-        """True si en ese día (columna) ya existe el turno indicado en cualquier trabajador (filas 2-25)."""
-        turno_u = turno.strip().upper()
-        for fila in range(2, 26):
-            val = self.ws.cell(row=fila, column=col_dia).value
-            if val is None:
-                continue
-            if str(val).strip().upper() == turno_u:
-                return True
-        return False
+        """True si en ese día (columna) ya existe el turno indicado en cualquier trabajador."""
+        return self.grid.existe_en_dia(col_dia, turno)
 
     def _chequear_restricciones(self, trabajador: str, col_actual: int, turno_actual: str) -> Tuple[bool, bool, Optional[str]]:
         """
@@ -286,57 +353,86 @@ class AsignadorSabadosFestivos:
         Retorna:
         - (violacion_dura, violacion_blanda, motivo)
 
-        Reglas:
+        Reglas (por defecto; se definen en reglas_restricciones.json con prefijo 'sabados.'):
         - Dura: 
           * NLPR/NANR/NLPRD/NANRD/6R/6RT: no pueden tener BLPTD/BANTD al día siguiente
           * BLPTD/BANTD: no pueden tener BLPTD/BANTD al día anterior ni al día siguiente
         - Blanda: NLPT/NANT/NLPTD/NANTD/TASTD/6T/3/6TT deben evitar BLPTD/BANTD al día siguiente
 
-        Si 'col_actual + 1' excede el número de columnas, no se valida restricción de día siguiente.
-        Si 'col_actual - 1' es menor a 2, no se valida restricción de día anterior.
+        En el primer y el último día el vecino es el contexto del mes anterior / siguiente
+        (GrillaHorario.fijar_contexto); sin contexto no hay restricción en el borde.
         """
         # Retorna (violacion_dura, violacion_blanda, motivo)
         turno_u = turno_actual.strip().upper()
-        fila = self.sigla_to_row.get(trabajador)
+        fila = self.grid.fila_trabajador(trabajador)
         if not fila:
             return False, False, None
 
-        # Día siguiente
-        next_col = col_actual + 1
-        max_col = self.ws.max_column
-        next_val = None
-        en_plan_blpt_bant_next = False
-        if next_col <= max_col:
-            next_val = self._valor_en(fila, next_col)
-            en_plan_blpt_bant_next = (trabajador, next_col) in self.plan_blpt_bant_por_celda
-
-        # Día anterior
-        prev_col = col_actual - 1
-        prev_val = None
-        en_plan_blpt_bant_prev = False
-        if prev_col >= 2:
-            prev_val = self._valor_en(fila, prev_col)
-            en_plan_blpt_bant_prev = (trabajador, prev_col) in self.plan_blpt_bant_por_celda
-
-        # Restricciones duras
-        if turno_u in self.hard_source_turns:
-            # Para BLPTD/BANTD: verificar día anterior y siguiente
-            if turno_u in {"BLPTD", "BANTD"}:
-                if ((prev_val in self.blocked_next_day_turns) or en_plan_blpt_bant_prev or
-                    (next_val in self.blocked_next_day_turns) or en_plan_blpt_bant_next):
-                    return True, False, f"Restricción dura: {turno_u} con BLPTD/BANTD en día anterior o siguiente"
-            # Para otros turnos duros: solo verificar día siguiente
-            else:
-                if (next_val in self.blocked_next_day_turns) or en_plan_blpt_bant_next:
-                    return True, False, f"Restricción dura: {turno_u} con BLPTD/BANTD al día siguiente"
-
-        # Restricciones blandas: solo verificar día siguiente
-        if turno_u in self.soft_source_turns:
-            if (next_val in self.blocked_next_day_turns) or en_plan_blpt_bant_next:
-                return False, True, f"Restricción blanda: {turno_u} con BLPTD/BANTD al día siguiente"
+        # Reglas 'sabados.*' que aplican a este turno: primero las duras, luego las blandas
+        for regla in self.reglas_sabados:
+            if turno_u not in regla.aplica_a:
+                continue
+            col_vecina = col_actual + regla.vecino
+            # Valor real en la hoja o BLPTD/BANTD planificado por el propio JSON
+            if self.reglas.viola(regla.nombre, fila, col_actual) or (trabajador, col_vecina) in self.plan_blpt_bant_por_celda:
+                etiqueta = "Restricción dura" if regla.tipo == "dura" else "Restricción blanda"
+                return regla.tipo == "dura", regla.tipo == "blanda", f"{etiqueta}: {turno_u} {regla.descripcion}"
 
         return False, False, None
 
+    # --------------------------------------------------------
+    # Viabilidad precomputada (bits por día) para construir las aristas
+    # --------------------------------------------------------
+    @staticmethod
+    def _desplazar_bits(bits: int, vecino: int, limite: int) -> int:
+        """Bit k del resultado = bit (k + vecino) de 'bits': el día k mira a su vecino."""
+        return (bits >> vecino if vecino > 0 else bits << -vecino) & limite
+
+    def _bits_por_trabajador(self, turno_u: str, trabajadores: Set[str]) -> Dict[str, Tuple[int, int]]:
+        """
+        Por trabajador, días (bits) donde el turno se puede poner: (fuertes, blandos).
+
+        Reproduce celda a celda _celda_vacia + _chequear_restricciones, pero evaluando
+        cada regla 'sabados.*' en toda la grilla de una vez (MotorRestricciones.mascara_filas)
+        y sumando el plan BLPTD/BANTD del JSON desplazado al día vecino:
+        - fuerte = vacía y sin violación dura ni blanda;
+        - blando = vacía, sin violación dura y con alguna blanda.
+        """
+        limite = (1 << self.grid.n_cols) - 1
+        reglas = [r for r in self.reglas_sabados if turno_u in r.aplica_a]
+        mascaras = {r.nombre: self.reglas.mascara_filas(r.nombre) for r in reglas}
+
+        resultado: Dict[str, Tuple[int, int]] = {}
+        for trabajador in trabajadores:
+            fila = self.grid.fila_trabajador(trabajador)
+            if not fila:
+                continue
+            vacias = 0
+            for k, idx in enumerate(self.grid.ids_fila(fila)):
+                if idx == 0:
+                    vacias |= 1 << k
+            plan = self.plan_blpt_bant_bits.get(trabajador, 0)
+            duras = blandas = 0
+            for regla in reglas:
+                bits = mascaras[regla.nombre][fila] | self._desplazar_bits(plan, regla.vecino, limite)
+                if regla.tipo == "dura":
+                    duras |= bits
+                else:
+                    blandas |= bits
+            permitidas = vacias & ~duras
+            resultado[trabajador] = (permitidas & ~blandas, permitidas & blandas)
+        return resultado
+
+    @staticmethod
+    def _indices_de_bits(bits: int) -> List[int]:
+        """Posiciones de los bits encendidos, de menor a mayor."""
+        indices = []
+        while bits:
+            bajo = bits & -bits
+            indices.append(bajo.bit_length() - 1)
+            bits ^= bajo
+        return indices
+
     # --------------------------------------------------------
     # Matching por turno (1:1 entre pedidos y fechas del JSON)
     # --------------------------------------------------------
@@ -354,77 +450,63 @@ class AsignadorSabadosFestivos:
         hard_edges: Dict[int, List[int]] = {i: [] for i in range(n)}
         soft_edges: Dict[int, List[int]] = {i: [] for i in range(n)}
 
-        # Precomputar columnas por slot
-        slot_col_preferida: List[Optional[int]] = [self._columna_para_fecha_preferida(dt) for dt in slots_fechas]
+        # Slots por día: bit j de slots_por_dia[k] = el slot j puede caer en la columna col_inicio + k
+        # (la columna preferida de su fecha o, si no hay mapeo directo, cualquiera de ese DOW-MM)
+        slots_por_dia: Dict[int, int] = {}
+        for j, dt in enumerate(slots_fechas):
+            col = self._columna_para_fecha_preferida(dt)
+            posibles = [col] if col is not None else self._todas_columnas_para_fecha(dt)
+            for c in posibles:
+                k = c - self.grid.col_inicio
+                slots_por_dia[k] = slots_por_dia.get(k, 0) | (1 << j)
+
+        # Un slot es fuerte si alguna de sus columnas lo es; blando si no es fuerte y alguna es blanda.
+        # Se calcula una vez por trabajador y se reutiliza en todos sus pedidos.
+        aristas_por_trabajador: Dict[str, Tuple[List[int], List[int]]] = {}
+        bits_trabajador = self._bits_por_trabajador(turno_u, {p.trabajador for p in pedidos})
+        for trabajador, (dias_fuertes, dias_blandos) in bits_trabajador.items():
+            slots_fuertes = slots_blandos = 0
+            for k in self._indices_de_bits(dias_fuertes):
+                slots_fuertes |= slots_por_dia.get(k, 0)
+            for k in self._indices_de_bits(dias_blandos):
+                slots_blandos |= slots_por_dia.get(k, 0)
+            aristas_por_trabajador[trabajador] = (
+                self._indices_de_bits(slots_fuertes),
+                self._indices_de_bits(slots_blandos & ~slots_fuertes),
+            )
 
         for i, pedido in enumerate(pedidos):
-            fila = self.sigla_to_row.get(pedido.trabajador)
-            if not fila:
-                continue
-
-            for j, dt in enumerate(slots_fechas):
-                col = slot_col_preferida[j]
-                if col is None:
-                    # Si no hay mapeo directo, intentar cualquier columna de ese DOW-MM
-                    posibles = self._todas_columnas_para_fecha(dt)
-                else:
-                    posibles = [col]
-
-                # Este slot j es viable si existe alguna columna posible
-                viable_fuerte = False
-                viable_blando = False
-                for c in posibles:
-                    if not self._celda_vacia(fila, c):
-                        continue
-                    violacion_dura, violacion_blanda, _ = self._chequear_restricciones(pedido.trabajador, c, turno_u)
-                    if violacion_dura:
-                        continue
-                    if violacion_blanda:
-                        viable_blando = True
-                    else:
-                        viable_fuerte = True
-                        break  # preferimos fuerte
-                if viable_fuerte:
-                    hard_edges[i].append(j)
-                elif viable_blando:
-                    soft_edges[i].append(j)
-
-        # Matching máximo con dos pasadas: primero solo aristas duras, luego agregando blandas
-        match_r: Dict[int, int] = {}  # slot j -> pedido i
-
-        def try_kuhn(i: int, seen: Set[int], use_soft: bool) -> bool:
-            # intenta asignar pedido i a algún slot disponible con DFS de aumento
-            for j in hard_edges.get(i, []):
-                if j in seen:
-                    continue
-                seen.add(j)
-                if j not in match_r or try_kuhn(match_r[j], seen, use_soft):
-                    match_r[j] = i
-                    return True
-            if use_soft:
-                for j in soft_edges.get(i, []):
-                    if j in seen:
-                        continue
-                    seen.add(j)
-                    if j not in match_r or try_kuhn(match_r[j], seen, use_soft):
-                        match_r[j] = i
-                        return True
-            return False
-
-        # Pasada 1: solo duras
-        for i in range(n):
-            try_kuhn(i, set(), use_soft=False)
-        # Pasada 2: permitir blandas
-        for i in range(n):
-            if i not in match_r.values():
-                try_kuhn(i, set(), use_soft=True)
+            if pedido.trabajador in aristas_por_trabajador:
+                fuertes, blandas = aristas_por_trabajador[pedido.trabajador]
+                hard_edges[i] = list(fuertes)
+                soft_edges[i] = list(blandas)
+
+        if self.modo_emparejamiento == "ponderado":
+            # Una sola asignación óptima: costo = días de distancia a la fecha pedida (+ penalización si es blanda)
+            def distancia(i: int, j: int) -> int:
+                return abs((slots_fechas[j] - pedidos[i].fecha_dt).days)
+
+            costos = [
+                [(j, distancia(i, j)) for j in hard_edges[i]]
+                + [(j, self.PENALIZACION_BLANDA + distancia(i, j)) for j in soft_edges[i]]
+                for i in range(n)
+            ]
+            pareja = asignacion_costo_minimo(n, m, costos)
+        else:
+            # Matching máximo con dos pasadas: primero solo aristas duras, luego agregando blandas
+            # (Hopcroft–Karp iterativo; los pedidos emparejados en la fase 1 siguen emparejados)
+            pareja = emparejamiento_dos_fases(
+                n, m,
+                [hard_edges[i] for i in range(n)],
+                [soft_edges[i] for i in range(n)],
+            )
 
         # Escribir resultados
-        # Invertimos match_r: pedido i -> slot j
-        pedido_to_slot: Dict[int, int] = {i: j for j, i in match_r.items()}
+        # pedido i -> slot j
+        pedido_to_slot: Dict[int, int] = {i: j for i, j in enumerate(pareja) if j != LIBRE}
 
         for i, pedido in enumerate(pedidos):
-            fila = self.sigla_to_row.get(pedido.trabajador)
+            fila = self.grid.fila_trabajador(pedido.trabajador)
             if not fila:
                 self.resultados.append(
                     ResultadoAsignacion(
@@ -442,7 +524,7 @@ class AsignadorSabadosFestivos:
             j = pedido_to_slot.get(i)
             if j is None:
                 # Intento forzado: buscar cualquier columna viable (ocupando aunque viole restricción dura)
-                fila = self.sigla_to_row.get(pedido.trabajador)
+                fila = self.grid.fila_trabajador(pedido.trabajador)
                 col_forzada = None
                 motivo = "Sin fecha viable (ocupado o restricciones)"
                 # Buscar primero por la columna preferida del slot original
@@ -465,8 +547,8 @@ class AsignadorSabadosFestivos:
                         motivo = "Asignado forzado con violación dura"
                         break
                 if col_forzada is not None and not self.modo_simulacion:
-                    celda = self.ws.cell(row=fila, column=col_forzada, value=turno)
-                    celda.fill = self.color_violacion_dura
+                    self.grid.asignar(fila, col_forzada, turno)
+                    self.estilos.pintar(fila, col_forzada, self.color_violacion_dura)
                     dow_mm = self.col_to_header_tuple.get(col_forzada)
                     fecha_final_str = f"{dow_mm[0]}-{dow_mm[1]}" if dow_mm else None
                     self.resultados.append(
@@ -552,12 +634,10 @@ class AsignadorSabadosFestivos:
 
             # Escribir en la hoja
             if not self.modo_simulacion:
-                celda = self.ws.cell(row=fila, column=col_final, value=turno)
+                self.grid.asignar(fila, col_final, turno)
                 # Colorear solo si hay violación; de lo contrario, limpiar relleno
-                if tipo_asig == "blanda":
-                    celda.fill = self.color_violacion_blanda
-                else:
-                    celda.fill = PatternFill(fill_type=None)
+                color = self.color_violacion_blanda if tipo_asig == "blanda" else None
+                self.estilos.pintar(fila, col_final, color)
 
             # Fecha final para reporte: reconstruida desde encabezado
             dow_mm = self.col_to_header_tuple.get(col_final)
@@ -602,89 +682,11 @@ class AsignadorSabadosFestivos:
     # --------------------------------------------------------
     def _actualizar_hoja_estadisticas_sd(self) -> None:
         """
-        Agrega/actualiza columnas en la hoja 'Estadísticas':
-        - 1D: BANTD + BLPTD
-        - 3D: 3D
-        - 6D: NLPTD + NLPRD + NANTD + NANRD
-        Conserva el resto de columnas existentes y solo escribe las necesarias.
+        Columnas 1D, 3D y 6D de la hoja 'Estadísticas' (sábados y festivos, ponderadas por horas).
+        Conserva el resto de columnas existentes y solo escribe las celdas que cambian.
         """
-        nombre_stats = "Estadísticas"
-        if nombre_stats in self.wb.sheetnames:
-            ws_stats = self.wb[nombre_stats]
-        else:
-            ws_stats = self.wb.create_sheet(nombre_stats)
-
-        # Crear mapa de encabezados existentes (mayúsculas)
-        encabezados = {}
-        max_col_stats = ws_stats.max_column or 0
-        for c in range(1, max_col_stats + 1):
-            v = ws_stats.cell(row=1, column=c).value
-            if v is None:
-                continue
-            encabezados[str(v).strip().upper()] = c
-
-        def asegurar_columna(nombre: str) -> int:
-            nombre_u = nombre.strip().upper()
-            if nombre_u in encabezados:
-                return encabezados[nombre_u]
-            col_nueva = (ws_stats.max_column or 0) + 1
-            ws_stats.cell(row=1, column=col_nueva, value=nombre)
-            # Estilo encabezado
-            header_fill = PatternFill(start_color="E6E6E6", end_color="E6E6E6", fill_type="solid")
-            header_font = Font(bold=True)
-            cell = ws_stats.cell(row=1, column=col_nueva)
-            cell.fill = header_fill
-            cell.font = header_font
-            encabezados[nombre_u] = col_nueva
-            return col_nueva
-
-        # Asegurar SIGLA y columnas pedidas
-        col_sigla = asegurar_columna("SIGLA")
-        col_1d = asegurar_columna("1D")
-        col_3d = asegurar_columna("3D")
-        col_6d = asegurar_columna("6D")
-
-        # Anchos de columnas
-        try:
-            ws_stats.column_dimensions['A'].width = max(ws_stats.column_dimensions['A'].width or 0, 10)
-        except Exception:
-            pass
-
-        # Nombre de hoja principal y rango B..AC
-        hoja = self.ws.title
-
-        # Escribir filas
-        fila_destino = 2
-        for fila in range(2, 26):
-            trabajador = self.ws.cell(row=fila, column=1).value
-            if not trabajador:
-                continue
-            ws_stats.cell(row=fila_destino, column=col_sigla, value=trabajador)
-
-            # Fórmulas dinámicas
-            # 1D = BANTD + BLPTD
-            formula_1d = (
-                f'=COUNTIF({hoja}!B{fila}:AE{fila},"BANTD")'
-                f'+COUNTIF({hoja}!B{fila}:AE{fila},"BLPTD")'
-            )
-            ws_stats.cell(row=fila_destino, column=col_1d, value=formula_1d)
-
-            # 3D = 3D
-            formula_3d = (
-                f'=COUNTIF({hoja}!B{fila}:AE{fila},"3D")'
-            )
-            ws_stats.cell(row=fila_destino, column=col_3d, value=formula_3d)
-
-            # 6D = NLPTD + NLPRD + NANTD + NANRD
-            formula_6d = (
-                f'=COUNTIF({hoja}!B{fila}:AE{fila},"NLPTD")'
-                f'+COUNTIF({hoja}!B{fila}:AE{fila},"NLPRD")'
-                f'+COUNTIF({hoja}!B{fila}:AE{fila},"NANTD")'
-                f'+COUNTIF({hoja}!B{fila}:AE{fila},"NANRD")'
-            )
-            ws_stats.cell(row=fila_destino, column=col_6d, value=formula_6d)
-
-            fila_destino += 1
+        escritor = EscritorEstadisticas(self.wb, self.grid, self.ws.title)
+        escritor.escribir(("1D", "3D", "6D"))
 
     def _recalcular_estaticos_operativos_y_torre(self) -> None:
         """
@@ -693,42 +695,13 @@ class AsignadorSabadosFestivos:
         - 'Torre'
         Usando la misma lógica de conteo que en procesador_horarios.py
         """
-        # Definir turnos no operativos (copiado de procesador_horarios.py)
-        turnos_no_operativos = {
-            # Turnos básicos
-            "DESC", "TROP",
-            # Turnos completos
-            "VACA", "COME", "COMT", "COMS",
-            # Turnos adicionales originales
-            "SIND", "CMED", "CERT","LICR",
-            # Formación, instrucción y entrenamiento
-            "CAPA", "MCAE", "TCAE", "MCHC", "TCHC", "NCHC", "ACHC",
-            "MENT", "TENT", "NENT", "AENT",
-            "MINS", "TINS", "NINS", "AINS",
-            # Gestión, oficinas y grupos de trabajo
-            "MCOR", "TCOR", "MSMS", "TSMS", "MDBM", "TDBM",
-            "MDOC", "TDOC", "MPRO", "TPRO", "MATF", "TATF",
-            "MGST", "TGST", "MOFI", "TOFI",
-            # Operativos y asignaciones especiales
-            "CET", "ATC", "KATC", "XATC", "YATC", "ZATC", "X"
-        }
-
         ws = self.ws
         max_row = ws.max_row
-        max_col = ws.max_column
 
         # Buscar/crear filas destino
-        fila_conteo = None
-        fila_torre = None
-        for r in range(1, max_row + 1):
-            v = ws.cell(row=r, column=1).value
-            if not v:
-                continue
-            val = str(v).strip().upper()
-            if val == "TURNOS OPERATIVOS":
-                fila_conteo = r
-            elif val == "TORRE":
-                fila_torre = r
+        filas = buscar_filas_etiqueta(ws, [ETIQUETA_OPERATIVOS, ETIQUETA_TORRE])
+        fila_conteo = filas[ETIQUETA_OPERATIVOS]
+        fila_torre = filas[ETIQUETA_TORRE]
         # Si no existen, crearlas al final conservando el orden (conteo antes que torre)
         cursor = max_row + 1
         if fila_conteo is None:
@@ -739,43 +712,11 @@ class AsignadorSabadosFestivos:
             fila_torre = cursor
             ws.cell(row=fila_torre, column=1, value="Torre")
 
-        # Mapa sigla -> fila (2-25)
-        sigla_a_fila = {}
-        for r in range(2, min(26, max_row + 1)):
-            sig = ws.cell(row=r, column=1).value
-            if isinstance(sig, str):
-                s = sig.strip().upper()
-                if s:
-                    sigla_a_fila[s] = r
-
-        # Filas objetivo para Torre
-        siglas_torre = {"YIS", "MAQ", "DJO", "AFG", "JLF", "JMV"}
-        filas_objetivo = [sigla_a_fila[s] for s in siglas_torre if s in sigla_a_fila]
-
-        # Recalcular conteos por columna
-        for col in range(2, max_col + 1):
-            # Operativos
-            conteo_operativos = 0
-            for r in range(2, 26):
-                cell_value = ws.cell(row=r, column=col).value
-                if cell_value is None or str(cell_value).strip() == "":
-                    conteo_operativos += 1
-                else:
-                    valor_limpio = str(cell_value).strip().upper()
-                    if valor_limpio not in turnos_no_operativos:
-                        conteo_operativos += 1
-            ws.cell(row=fila_conteo, column=col, value=conteo_operativos)
-
-            # Torre
-            conteo_torre = 0
-            for r in filas_objetivo:
-                v = ws.cell(row=r, column=col).value
-                if v is None or str(v).strip() == "":
-                    conteo_torre += 1
-                else:
-                    if str(v).strip().upper() not in turnos_no_operativos:
-                        conteo_torre += 1
-            ws.cell(row=fila_torre, column=col, value=conteo_torre)
+        # Conteos vivos de todos los días (celda vacía cuenta como operativa)
+        contador = contador_compartido(self.grid)
+        for col in self.grid.columnas():
+            ws.cell(row=fila_conteo, column=col, value=contador.operativos(col))
+            ws.cell(row=fila_torre, column=col, value=contador.torre(col))
 
         # Asegurar etiquetas
         ws.cell(row=fila_conteo, column=1, value="TURNOS OPERATIVOS")
@@ -784,15 +725,17 @@ class AsignadorSabadosFestivos:
     # --------------------------------------------------------
     # Orquestador
     # --------------------------------------------------------
-    def asignar(self) -> None:
+    def asignar(self, guardar: bool = True) -> None:
         """
         Ejecuta el flujo completo de asignación:
         - Carga y normaliza el JSON de pedidos.
         - Precomputa el plan de BLPTdom/BANTdom para el día siguiente.
         - Resuelve por turno el matching 1:1 con dos pasadas (evitando primero violaciones blandas).
         - Escribe en el Excel (salvo 'modo_simulacion=True') y genera el reporte en disco.
+        - Con 'guardar=False' deja el libro actualizado en memoria sin escribir el xlsx.
         """
         pedidos_por_turno = self._cargar_json()
+        self._anclar_fechas(pedidos_por_turno)
         # Precompute plan de BLPT/BANT en el siguiente día
         self._precomputar_plan_blpt_bant(pedidos_por_turno)
 
@@ -810,14 +753,17 @@ class AsignadorSabadosFestivos:
 
         # Guardar archivos
         if not self.modo_simulacion:
-            try:
-                self.wb.save(self.excel_out)
-                print(f"Archivo guardado como: {self.excel_out}")
-            except PermissionError:
-                base, ext = os.path.splitext(self.excel_out)
-                alternativo = f"{base}_{datetime.now().strftime('%H%M%S')}{ext}"
-                self.wb.save(alternativo)
-                print(f"Archivo en uso. Guardado como: {alternativo}")
+            self.grid.volcar_en_hoja(self.ws)
+            if guardar:
+                self.estilos.aplicar()
+                try:
+                    self.wb.save(self.excel_out)
+                    print(f"Archivo guardado como: {self.excel_out}")
+                except PermissionError:
+                    base, ext = os.path.splitext(self.excel_out)
+                    alternativo = f"{base}_{datetime.now().strftime('%H%M%S')}{ext}"
+                    self.wb.save(alternativo)
+                    print(f"Archivo en uso. Guardado como: {alternativo}")
 
         self._guardar_reporte()
         print("Reporte escrito en 'reporte_asignador_sabados_festivos.txt'")
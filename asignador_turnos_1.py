@@ -1,10 +1,18 @@
-import openpyxl
 import random
-from collections import defaultdict
-from openpyxl.styles import PatternFill, Font
 from typing import List, Optional, Dict, Tuple, Set
 import os
 
+from balanceo_flujo import BalanceadorFlujo, Movimiento, validar_modo_balanceo
+from cargador_horarios import abrir_horario
+from catalogo_turnos import color_turno
+from estadisticas_horario import EscritorEstadisticas
+from estilos_horario import estilos_compartidos
+from grilla_horario import GrillaHorario
+from selector_equitativo import ContadorEquitativo
+from motor_restricciones import MotorRestricciones
+from dominios_dias import recorrer_dias, validar_orden_dias
+from optimizador_local import Cambio, OptimizadorLocal, PresupuestoBusqueda
+
 
 class AsignadorTurnos1:
     """
@@ -28,7 +36,10 @@ class AsignadorTurnos1:
         'JBV', 'GMT', 'BRS', 'HZG', 'JIS', 'CDT', 'WGG', 'GCE'
     ]
 
-    def __init__(self, archivo_entrada: Optional[str] = None) -> None:
+    def __init__(self, archivo_entrada: Optional[str] = None, wb=None,
+                 grid: Optional[GrillaHorario] = None, modo_balanceo: str = "iterativo",
+                 semilla: Optional[int] = None, optimizacion: Optional[PresupuestoBusqueda] = None,
+                 orden_dias: str = "calendario") -> None:
         # Resolver archivo de entrada, priorizando el solicitado
         candidatos = [
             archivo_entrada,
@@ -47,8 +58,24 @@ class AsignadorTurnos1:
             elegido = "horarioUnificado_con_6tt.xlsx"
         self.archivo_entrada = elegido
 
-        self.wb = openpyxl.load_workbook(self.archivo_entrada)
+        # El pipeline puede pasar el libro y la grilla ya cargados (sin releer el xlsx)
+        if wb is None:
+            # Ejecución suelta: xlsx o instantánea .hsnap (aplicada sobre el xlsx de plantilla)
+            wb, grid = abrir_horario(self.archivo_entrada)
+        self.wb = wb
         self.ws = self._obtener_hoja_horario()
+        # Grilla en memoria: se lee una vez y se vuelca a la hoja al guardar
+        self.grid = grid if grid is not None else GrillaHorario.desde_hoja(self.ws)
+        self.estilos = estilos_compartidos(self.ws)
+        # Rebalanceo final: "iterativo" (un movimiento por vuelta) o "flujo" (balanceo_flujo.py)
+        self.modo_balanceo = validar_modo_balanceo(modo_balanceo)
+        # Post-optimización local tras el rebalanceo (None = no se ejecuta)
+        self.optimizacion = optimizacion
+        self.semilla = semilla
+        # Orden de los días: "calendario" o "restringido" (más restringido primero, dominios_dias.py)
+        self.orden_dias = validar_orden_dias(orden_dias)
+        # Restricciones de adyacencia compartidas (reglas_restricciones.json)
+        self.reglas = MotorRestricciones(self.grid)
 
         # Snapshot del estado original para no tocar asignaciones preexistentes
         self.original_nonempty: Set[Tuple[int, int]] = set()
@@ -56,19 +83,17 @@ class AsignadorTurnos1:
         self._snapshot_estado_original()
 
         # Contadores de equidad (1T + 7 + 1)
-        self.contador_grupo_1t: Dict[str, int] = defaultdict(int)
+        self.contador_grupo_1t: ContadorEquitativo = ContadorEquitativo()
 
-        random.seed()
+        random.seed(semilla)
         self._inicializar_contadores_desde_hoja()
 
     def _snapshot_estado_original(self) -> None:
-        max_col = self.ws.max_column
-        for fila in range(2, 26):
-            for col in range(2, max_col + 1):
-                valor = self.ws.cell(row=fila, column=col).value
-                if valor is None or str(valor).strip() == "":
+        for fila in self.grid.filas():
+            for col in self.grid.columnas():
+                val = self.grid.valor(fila, col)
+                if not val:
                     continue
-                val = str(valor).strip().upper()
                 self.original_nonempty.add((fila, col))
                 if val == "1":
                     self.original_1.add((fila, col))
@@ -89,55 +114,31 @@ class AsignadorTurnos1:
         return self.ws.title
 
     def _obtener_fila_trabajador(self, trabajador: str) -> Optional[int]:
-        for fila in range(2, 26):
-            valor = self.ws.cell(row=fila, column=1).value
-            if valor and str(valor).strip().upper() == trabajador.upper():
-                return fila
-        return None
+        return self.grid.fila_trabajador(trabajador)
 
     def _tiene_prioridad_dia_anterior(self, trabajador: str, col_dia: int) -> bool:
-        if col_dia <= 2:
-            return False
         fila = self._obtener_fila_trabajador(trabajador)
         if not fila:
             return False
-        valor = self.ws.cell(row=fila, column=col_dia - 1).value
-        if valor is None:
-            return False
-        return str(valor).strip().upper() in {"DESC", "TROP", "SIND"}
+        return self.reglas.viola("1.prioridad_ayer", fila, col_dia)
 
     def _tuvo_restriccion_dura_ayer(self, trabajador: str, col_dia: int) -> bool:
-        if col_dia <= 2:
-            return False
         fila = self._obtener_fila_trabajador(trabajador)
         if not fila:
             return False
-        valor = self.ws.cell(row=fila, column=col_dia - 1).value
-        if valor is None:
-            return False
-        return str(valor).strip().upper() in {"BANTD", "BLPTD", "NLPRD", "NANRD", "6RT", "1T", "7", "1"}
+        return self.reglas.viola("1.dura_ayer", fila, col_dia)
 
     def _tiene_restriccion_dura_manana(self, trabajador: str, col_dia: int) -> bool:
         fila = self._obtener_fila_trabajador(trabajador)
         if not fila:
             return False
-        if col_dia + 1 > self.ws.max_column:
-            return False
-        valor = self.ws.cell(row=fila, column=col_dia + 1).value
-        if valor is None:
-            return False
-        return str(valor).strip().upper() in {"BANTD", "BLPTD", "1T", "7", "1"}
+        return self.reglas.viola("1.dura_manana", fila, col_dia)
 
     def _tuvo_restriccion_blanda_ayer(self, trabajador: str, col_dia: int) -> bool:
-        if col_dia <= 2:
-            return False
         fila = self._obtener_fila_trabajador(trabajador)
         if not fila:
             return False
-        valor = self.ws.cell(row=fila, column=col_dia - 1).value
-        if valor is None:
-            return False
-        return str(valor).strip().upper() in {"NANTD", "NLPTD", "6TT"}
+        return self.reglas.viola("1.blanda_ayer", fila, col_dia)
 
     def _obtener_trabajadores_disponibles(self, col_dia: int) -> List[str]:
         disponibles = []
@@ -145,49 +146,37 @@ class AsignadorTurnos1:
             fila = self._obtener_fila_trabajador(trabajador)
             if not fila:
                 continue
-            celda = self.ws.cell(row=fila, column=col_dia)
             if (
-                (celda.value is None or str(celda.value).strip() == "")
+                self.grid.esta_vacia(fila, col_dia)
                 and self._es_celda_originalmente_vacia(fila, col_dia)
             ):
                 disponibles.append(trabajador)
         return disponibles
 
     def _existe_turno_1_o_blptd_en_dia(self, col_dia: int) -> bool:
-        for fila in range(2, 26):
-            valor = self.ws.cell(row=fila, column=col_dia).value
-            if valor is None:
-                continue
-            val = str(valor).strip().upper()
-            if val in {"1", "BLPTD"}:
-                return True
-        return False
+        return self.grid.existe_en_dia(col_dia, {"1", "BLPTD"})
 
     def _seleccionar_equitativo(self, candidatos: List[str]) -> Optional[str]:
         if not candidatos:
             return None
-        min_val = min(self.contador_grupo_1t[c] for c in candidatos)
-        empatados = [c for c in candidatos if self.contador_grupo_1t[c] == min_val]
-        return random.choice(empatados)
+        return self.contador_grupo_1t.seleccionar(candidatos)
 
     def _actualizar_contadores(self, trabajador: str) -> None:
         self.contador_grupo_1t[trabajador] += 1
 
     def _inicializar_contadores_desde_hoja(self) -> None:
-        max_col = self.ws.max_column
         for trabajador in self.TRABAJADORES_ELEGIBLES:
             fila = self._obtener_fila_trabajador(trabajador)
             if not fila:
                 continue
-            for col in range(2, max_col + 1):
-                valor = self.ws.cell(row=fila, column=col).value
-                if valor is None:
-                    continue
-                val = str(valor).strip().upper()
+            for val in self.grid.valores_fila(fila):
                 if val in {"1T", "7", "1"}:
                     self.contador_grupo_1t[trabajador] += 1
 
     def _rebalancear_para_paridad(self) -> None:
+        if self.modo_balanceo == "flujo":
+            self._rebalancear_por_flujo()
+            return
         while True:
             conteos_actuales: Dict[str, int] = {}
             for t in self.TRABAJADORES_ELEGIBLES:
@@ -207,14 +196,11 @@ class AsignadorTurnos1:
                 break
 
             columna_candidata = None
-            for col in range(2, self.ws.max_column + 1):
-                valor_max = self.ws.cell(row=fila_max, column=col).value
-                valor_min = self.ws.cell(row=fila_min, column=col).value
+            for col in self.grid.columnas():
                 if (
-                    valor_max is not None
-                    and str(valor_max).strip().upper() == "1"
+                    self.grid.valor(fila_max, col) == "1"
                     and not self._es_celda_original_1(fila_max, col)
-                    and (valor_min is None or str(valor_min).strip() == "")
+                    and self.grid.esta_vacia(fila_min, col)
                     and self._es_celda_originalmente_vacia(fila_min, col)
                     and not self._existe_turno_1_o_blptd_en_dia(col)
                     and not self._tuvo_restriccion_dura_ayer(trabajador_min, col)
@@ -227,16 +213,79 @@ class AsignadorTurnos1:
                 break
 
             # Mover "1" de trabajador_max a trabajador_min
-            self.ws.cell(row=fila_max, column=columna_candidata, value=None)
-            celda_original = self.ws.cell(row=fila_max, column=columna_candidata)
-            celda_original.fill = PatternFill(fill_type=None)
-
-            self.ws.cell(row=fila_min, column=columna_candidata, value="1")
-            celda_nueva = self.ws.cell(row=fila_min, column=columna_candidata)
-            celda_nueva.fill = PatternFill(start_color="FFA500", end_color="FFA500", fill_type="solid")
-
-            self.contador_grupo_1t[trabajador_max] -= 1
-            self.contador_grupo_1t[trabajador_min] += 1
+            self._mover_turno(Movimiento(trabajador_max, trabajador_min, columna_candidata, "1"))
+
+    def _mover_turno(self, mov: Movimiento) -> None:
+        fila_origen = self._obtener_fila_trabajador(mov.origen)
+        fila_destino = self._obtener_fila_trabajador(mov.destino)
+        self.grid.vaciar(fila_origen, mov.col)
+        self.estilos.pintar(fila_origen, mov.col, None)
+
+        self.grid.asignar(fila_destino, mov.col, mov.turno)
+        self.estilos.pintar(fila_destino, mov.col, color_turno("1"))
+
+        self.contador_grupo_1t[mov.origen] -= 1
+        self.contador_grupo_1t[mov.destino] += 1
+
+    def _rebalancear_por_flujo(self) -> None:
+        """Paridad ±1 del grupo 1T resolviendo de una vez el reparto de los "1" movibles (flujo de costo mínimo)."""
+        balanceador = BalanceadorFlujo(
+            self.grid,
+            self.TRABAJADORES_ELEGIBLES,
+            self.contador_grupo_1t,
+            {"1"},
+            es_movible=lambda fila, col: not self._es_celda_original_1(fila, col),
+            destino_valido=lambda t, fila, col, turno: (
+                self.grid.esta_vacia(fila, col)
+                and self._es_celda_originalmente_vacia(fila, col)
+                and not self._existe_turno_1_o_blptd_en_dia(col)
+                and not self._tuvo_restriccion_dura_ayer(t, col)
+                and not self._tiene_restriccion_dura_manana(t, col)
+            ),
+        )
+        movimientos = balanceador.ejecutar(self._mover_turno)
+        print(f"⚖️  Rebalanceo por flujo: {movimientos} movimientos, diferencia final {balanceador.diferencia()}")
+
+    def _optimizar_localmente(self) -> None:
+        """Recocido simulado sobre los "1" movibles (optimizador_local.py): cubre días sin "1" y reduce blandas."""
+        optimizador = OptimizadorLocal(
+            self.grid,
+            self.reglas,
+            "1",
+            self.TRABAJADORES_ELEGIBLES,
+            self.contador_grupo_1t,
+            {"1"},
+            es_movible=lambda fila, col: not self._es_celda_original_1(fila, col),
+            destino_valido=lambda t, fila, col, turno: (
+                self.grid.esta_vacia(fila, col)
+                and self._es_celda_originalmente_vacia(fila, col)
+                and not self._existe_turno_1_o_blptd_en_dia(col)
+                and not self._tuvo_restriccion_dura_ayer(t, col)
+                and not self._tiene_restriccion_dura_manana(t, col)
+            ),
+            turno_para_dia=lambda col: None if self._existe_turno_1_o_blptd_en_dia(col) else "1",
+            semilla=self.semilla,
+        )
+        resultado = optimizador.ejecutar(self.optimizacion, aplicar=self._aplicar_cambio_optimizado)
+        print(f"🔧 Optimización local: {resultado.resumen()}")
+
+    def _aplicar_cambio_optimizado(self, cambio: Cambio) -> None:
+        trabajador = self.grid.sigla(cambio.fila)
+        if cambio.antes == "1":
+            self.contador_grupo_1t[trabajador] -= 1
+        if cambio.despues == "1":
+            self.contador_grupo_1t[trabajador] += 1
+        self.estilos.pintar(cambio.fila, cambio.col, color_turno("1") if cambio.despues else None)
+
+    def _candidatos_del_dia(self, col_dia: int) -> List[str]:
+        """Quienes pueden recibir "1" en el día según la hoja actual (filtros duros de asignar_turno_1_en_dia)."""
+        if self._existe_turno_1_o_blptd_en_dia(col_dia):
+            return []
+        return [
+            t for t in self._obtener_trabajadores_disponibles(col_dia)
+            if not self._tuvo_restriccion_dura_ayer(t, col_dia)
+            and not self._tiene_restriccion_dura_manana(t, col_dia)
+        ]
 
     def asignar_turno_1_en_dia(self, col_dia: int) -> Optional[str]:
         if self._existe_turno_1_o_blptd_en_dia(col_dia):
@@ -283,25 +332,28 @@ class AsignadorTurnos1:
                 # Confirmar que la celda de destino fue originalmente vacía
                 if not self._es_celda_originalmente_vacia(fila, col_dia):
                     return None
-                self.ws.cell(row=fila, column=col_dia, value="1")
-                celda = self.ws.cell(row=fila, column=col_dia)
-                celda.fill = PatternFill(start_color="FFA500", end_color="FFA500", fill_type="solid")
+                self.grid.asignar(fila, col_dia, "1")
+                self.estilos.pintar(fila, col_dia, color_turno("1"))
                 self._actualizar_contadores(elegido)
                 return elegido
 
         return None
 
-    def procesar_todos_los_dias(self) -> None:
-        max_col = self.ws.max_column
-        for col in range(2, max_col + 1):
-            self.asignar_turno_1_en_dia(col)
+    def procesar_todos_los_dias(self, guardar: bool = True) -> None:
+        recorrer_dias(self.grid.columnas(), self.asignar_turno_1_en_dia, self.orden_dias, self._candidatos_del_dia)
 
         # Balancear para paridad ±1 del grupo 1T (1T+7+1)
         self._rebalancear_para_paridad()
+        if self.optimizacion is not None:
+            self._optimizar_localmente()
 
         self._actualizar_hoja_estadisticas()
 
         salida = "horarioUnificado_con_1.xlsx"
+        self.grid.volcar_en_hoja(self.ws)
+        if not guardar:
+            return
+        self.estilos.aplicar()
         try:
             self.wb.save(salida)
             print(f"Archivo guardado como: {salida}")
@@ -312,73 +364,9 @@ class AsignadorTurnos1:
             print(f"Archivo por defecto en uso. Guardado como: {alternativo}")
 
     def _actualizar_hoja_estadisticas(self) -> None:
-        nombre_stats = "Estadísticas"
-        if nombre_stats in self.wb.sheetnames:
-            ws_stats = self.wb[nombre_stats]
-        else:
-            ws_stats = self.wb.create_sheet(nombre_stats)
-
-        # Limpiar hoja
-        for fila in ws_stats.iter_rows():
-            for celda in fila:
-                celda.value = None
-                celda.fill = PatternFill(fill_type=None)
-
-        # Encabezados
-        ws_stats.cell(row=1, column=1, value="SIGLA")
-        ws_stats.cell(row=1, column=2, value="DESC")
-        ws_stats.cell(row=1, column=3, value="1T")   # 1T + 7 + 1
-        ws_stats.cell(row=1, column=4, value="6RT")  # 6RT + 7
-        ws_stats.cell(row=1, column=5, value="6T")   # solo 6TT
-
-        header_fill = PatternFill(start_color="E6E6E6", end_color="E6E6E6", fill_type="solid")
-        header_font = Font(bold=True)
-        for col in range(1, 6):
-            c = ws_stats.cell(row=1, column=col)
-            c.fill = header_fill
-            c.font = header_font
-
-        hoja = self._nombre_hoja_horario()
-        fila_destino = 2
-        for fila in range(2, 26):
-            trabajador = self.ws.cell(row=fila, column=1).value
-            if not trabajador:
-                continue
-            ws_stats.cell(row=fila_destino, column=1, value=trabajador)
-
-            # DESC + TROP
-            formula_desc = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"DESC")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"TROP")'
-            )
-            ws_stats.cell(row=fila_destino, column=2, value=formula_desc)
-
-            # 1T = 1T + 7 + 1
-            formula_1t = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"1T")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"7")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"1")'
-            )
-            ws_stats.cell(row=fila_destino, column=3, value=formula_1t)
-
-            # 6RT = 6RT + 7
-            formula_6rt = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"6RT")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"7")'
-            )
-            ws_stats.cell(row=fila_destino, column=4, value=formula_6rt)
-
-            # 6T = solo 6TT
-            formula_6t = f'=COUNTIF({hoja}!B{fila}:AF{fila},"6TT")'
-            ws_stats.cell(row=fila_destino, column=5, value=formula_6t)
-
-            fila_destino += 1
-
-        ws_stats.column_dimensions['A'].width = 10
-        ws_stats.column_dimensions['B'].width = 8
-        ws_stats.column_dimensions['C'].width = 8
-        ws_stats.column_dimensions['D'].width = 8
-        ws_stats.column_dimensions['E'].width = 8
+        """Columna 1T de la hoja 'Estadísticas' (1T + 7 + 1)."""
+        escritor = EscritorEstadisticas(self.wb, self.grid, self._nombre_hoja_horario())
+        escritor.escribir(("1T",))
 
 
 if __name__ == "__main__":
@@ -1,11 +1,22 @@
 import openpyxl
 import random
 from collections import defaultdict
-from openpyxl.styles import PatternFill, Font
 from typing import List, Optional, Dict, Tuple
 import os
 from openpyxl.comments import Comment
 
+from cargador_horarios import abrir_horario
+from catalogo_turnos import color_turno
+from contador_operativos import contador_compartido
+from estadisticas_horario import EscritorEstadisticas
+from estilos_horario import estilos_compartidos
+from grilla_horario import GrillaHorario
+from selector_equitativo import ContadorEquitativo
+from motor_restricciones import MotorRestricciones
+from optimizador_local import Cambio, OptimizadorLocal, PresupuestoBusqueda
+from dominios_dias import recorrer_dias, validar_orden_dias
+from recorrido_anticipado import PlanAnticipado, validar_modo_recorrido
+
 
 class AsignadorTurnos:
     """
@@ -33,19 +44,51 @@ class AsignadorTurnos:
 
     TRABAJADORES_ELEGIBLES = ['GCE', 'YIS', 'MAQ', 'DJO', 'AFG', 'JLF', 'JMV']
 
-    def __init__(self, archivo_procesado: Optional[str] = None) -> None:
+    def __init__(self, archivo_procesado: Optional[str] = None, wb=None,
+                 grid: Optional[GrillaHorario] = None,
+                 semilla: Optional[int] = None, optimizacion: Optional[PresupuestoBusqueda] = None,
+                 modo_recorrido: str = "voraz", orden_dias: str = "calendario") -> None:
         self.archivo_procesado = self._resolver_archivo_entrada(archivo_procesado)
-        self.wb = openpyxl.load_workbook(self.archivo_procesado)
+        # El pipeline puede pasar el libro y la grilla ya cargados (sin releer el xlsx)
+        self.leido_de_archivo = wb is None  # el resumen solo nombra el archivo si se leyó
+        if wb is None:
+            # Ejecución suelta: xlsx o instantánea .hsnap (aplicada sobre el xlsx de plantilla)
+            wb, grid = abrir_horario(self.archivo_procesado)
+        self.wb = wb
         self.ws = self._obtener_hoja_horario()
-        self.contador_grupo_1t: Dict[str, int] = defaultdict(int)
-        self.contador_grupo_6rt: Dict[str, int] = defaultdict(int)
+        # Grilla en memoria: se lee una vez y se vuelca a la hoja al guardar
+        self.grid = grid if grid is not None else GrillaHorario.desde_hoja(self.ws)
+        self.estilos = estilos_compartidos(self.ws)
+        # Restricciones de adyacencia compartidas (reglas_restricciones.json)
+        self.reglas = MotorRestricciones(self.grid)
+        # Conteo vivo de personal operativo / Torre (compartido entre etapas)
+        self.contador_operativos = contador_compartido(self.grid)
+        self.contador_grupo_1t: ContadorEquitativo = ContadorEquitativo()
+        self.contador_grupo_6rt: ContadorEquitativo = ContadorEquitativo()
         # Inicializar contadores a partir de asignaciones ya existentes
         self._inicializar_contadores_desde_hoja()
         # Lista para almacenar información de días no asignados
         self.dias_no_asignados: List[Dict] = []
-        # Crear el patrón de relleno naranja claro para turnos 1T/7
-        self.fill_naranja_claro = PatternFill(start_color="FFE6CC", end_color="FFE6CC", fill_type="solid")
-        random.seed()
+        # Color naranja claro para turnos 1T/7 (se pinta en diferido, ver estilos_horario.py)
+        self.color_naranja_claro = color_turno("1T")
+        # Recorrido por días: "voraz" (izquierda a derecha) o "anticipado" (recorrido_anticipado.py)
+        self.modo_recorrido = validar_modo_recorrido(modo_recorrido)
+        self._plan: Optional[PlanAnticipado] = None
+        # Orden de los días: "calendario" o "restringido" (más restringido primero, dominios_dias.py)
+        self.orden_dias = validar_orden_dias(orden_dias)
+        if self.modo_recorrido == "anticipado" and self.orden_dias == "restringido":
+            # El plan anticipado decide cada día según quién recibió el turno el día anterior
+            print("⚠️  modo_recorrido='anticipado' recorre en orden de calendario: se ignora orden_dias='restringido'")
+            self.orden_dias = "calendario"
+        # Post-optimización local tras el recorrido por días (None = no se ejecuta)
+        self.optimizacion = optimizacion
+        self.semilla = semilla
+        # 1T/7 que ya venían en la hoja: la optimización local no los mueve
+        self.originales_1t_7 = {
+            (fila, col) for fila in self.grid.filas() for col in self.grid.columnas()
+            if self.grid.valor(fila, col) in {"1T", "7"}
+        }
+        random.seed(semilla)
 
     def _resolver_archivo_entrada(self, preferido: Optional[str]) -> str:
         candidatos = [
@@ -74,98 +117,67 @@ class AsignadorTurnos:
 
     def _obtener_fila_trabajador(self, trabajador: str) -> Optional[int]:
         """Devuelve la fila (int) donde está el trabajador en la columna A, o None si no se encuentra."""
-        for fila in range(2, 26):
-            valor = self.ws.cell(row=fila, column=1).value
-            if valor and str(valor).strip().upper() == trabajador.upper():
-                return fila
-        return None
+        return self.grid.fila_trabajador(trabajador)
 
     def _obtener_nombre_dia(self, col_dia: int) -> str:
         """Obtiene el nombre del día desde el encabezado de la columna."""
-        header = self.ws.cell(row=1, column=col_dia).value
+        header = self.grid.encabezado(col_dia)
         if header:
             return str(header)
         return f"Columna {col_dia}"
 
     def _obtener_valor_dia_anterior(self, trabajador: str, col_dia: int) -> str:
-        """Obtiene el valor del día anterior para un trabajador."""
-        if col_dia <= 2:
-            return "N/A"
-        fila = self._obtener_fila_trabajador(trabajador)
-        if not fila:
-            return "N/A"
-        valor = self.ws.cell(row=fila, column=col_dia - 1).value
-        return str(valor) if valor is not None else "Vacío"
+        """Obtiene el valor del día anterior para un trabajador (en el primer día, el contexto del mes anterior)."""
+        return self._valor_vecino(trabajador, col_dia - 1)
 
     def _obtener_valor_dia_siguiente(self, trabajador: str, col_dia: int) -> str:
-        """Obtiene el valor del día siguiente para un trabajador."""
+        """Obtiene el valor del día siguiente para un trabajador (en el último día, el contexto del mes siguiente)."""
+        return self._valor_vecino(trabajador, col_dia + 1)
+
+    def _valor_vecino(self, trabajador: str, col: int) -> str:
+        """Valor de la grilla en 'col' (o el contexto de borde, GrillaHorario.fijar_contexto); "N/A" sin dato."""
         fila = self._obtener_fila_trabajador(trabajador)
         if not fila:
             return "N/A"
-        if col_dia + 1 > self.ws.max_column:
-            return "N/A"
-        valor = self.ws.cell(row=fila, column=col_dia + 1).value
-        return str(valor) if valor is not None else "Vacío"
+        valor = self.grid.valor(fila, col)
+        if valor:
+            return valor
+        return "Vacío" if self.grid.contiene(fila, col) else "N/A"
 
     def _tiene_prioridad_dia_anterior(self, trabajador: str, col_dia: int) -> bool:
         """True si el día anterior el trabajador tiene DESC, TROP o SIND."""
-        if col_dia <= 2:
-            return False
         fila = self._obtener_fila_trabajador(trabajador)
         if not fila:
             return False
-        valor = self.ws.cell(row=fila, column=col_dia - 1).value
-        if valor is None:
-            return False
-        return str(valor).strip().upper() in {"DESC", "TROP", "SIND"}
+        return self.reglas.viola("1t.prioridad_ayer", fila, col_dia)
 
     def _tuvo_extra_dia_anterior(self, trabajador: str, col_dia: int) -> bool:
         """True si el día anterior el trabajador tuvo 1T o 7."""
-        if col_dia <= 2:
-            return False
         fila = self._obtener_fila_trabajador(trabajador)
         if not fila:
             return False
-        valor = self.ws.cell(row=fila, column=col_dia - 1).value
-        if valor is None:
-            return False
-        return str(valor).strip().upper() in {"1T", "7"}
+        return self.reglas.viola("1t.extra_ayer", fila, col_dia)
 
     def _tuvo_restriccion_dura_ayer(self, trabajador: str, col_dia: int) -> bool:
         """True si ayer tuvo BANTD, BLPTD, NLPRD, NANRD, 1T o 7."""
-        if col_dia <= 2:
-            return False
         fila = self._obtener_fila_trabajador(trabajador)
         if not fila:
             return False
-        valor = self.ws.cell(row=fila, column=col_dia - 1).value
-        if valor is None:
-            return False
-        return str(valor).strip().upper() in {"BANTD", "BLPTD", "NLPRD", "NANRD", "1T", "7"}
+        return self.reglas.viola("1t.dura_ayer", fila, col_dia)
 
     def _tiene_restriccion_dura_manana(self, trabajador: str, col_dia: int) -> bool:
         """True si mañana tiene BANTD, BLPTD, 1T o 7."""
         fila = self._obtener_fila_trabajador(trabajador)
         if not fila:
             return False
-        if col_dia + 1 > self.ws.max_column:
-            return False
-        valor = self.ws.cell(row=fila, column=col_dia + 1).value
-        if valor is None:
-            return False
-        return str(valor).strip().upper() in {"BANTD", "BLPTD", "1T", "7"}
+        return self.reglas.viola("1t.dura_manana", fila, col_dia)
 
     def _tuvo_restriccion_blanda_ayer(self, trabajador: str, col_dia: int) -> bool:
         """True si ayer tuvo NANTD o NLPTD (evitar si es posible)."""
-        if col_dia <= 2:
-            return False
         fila = self._obtener_fila_trabajador(trabajador)
         if not fila:
             return False
-        valor = self.ws.cell(row=fila, column=col_dia - 1).value
-        if valor is None:
-            return False
-        return str(valor).strip().upper() in {"NANTD", "NLPTD"}
+        return self.reglas.viola("1t.blanda_ayer", fila, col_dia)
 
     def _obtener_trabajadores_disponibles(self, col_dia: int) -> List[str]:
         """Devuelve los trabajadores elegibles cuya celda del día está vacía."""
@@ -174,34 +186,17 @@ class AsignadorTurnos:
             fila = self._obtener_fila_trabajador(trabajador)
             if not fila:
                 continue
-            celda = self.ws.cell(row=fila, column=col_dia)
-            if celda.value is None or str(celda.value).strip() == "":
+            if self.grid.esta_vacia(fila, col_dia):
                 disponibles.append(trabajador)
         return disponibles
 
     def _obtener_conteo_operativos(self, col_dia: int) -> Optional[int]:
-        """Busca la fila con etiqueta 'TURNOS OPERATIVOS' en la columna A y devuelve el entero de esa columna del día."""
-        for fila in range(1, self.ws.max_row + 1):
-            etiqueta = self.ws.cell(row=fila, column=1).value
-            if etiqueta and str(etiqueta).strip().upper() == "TURNOS OPERATIVOS":
-                valor = self.ws.cell(row=fila, column=col_dia).value
-                try:
-                    return int(valor)
-                except Exception:
-                    return None
-        return None
+        """Personal operativo del día (conteo vivo: refleja también lo asignado en etapas anteriores)."""
+        return self.contador_operativos.operativos(col_dia)
 
     def _obtener_conteo_torre(self, col_dia: int) -> Optional[int]:
-        """Busca la fila con etiqueta 'Torre' (columna A) y devuelve el entero de esa columna del día."""
-        for fila in range(1, self.ws.max_row + 1):
-            etiqueta = self.ws.cell(row=fila, column=1).value
-            if etiqueta and str(etiqueta).strip().upper() == "TORRE":
-                valor = self.ws.cell(row=fila, column=col_dia).value
-                try:
-                    return int(valor)
-                except Exception:
-                    return None
-        return None
+        """Conteo operativo de las siglas de Torre en el día (conteo vivo)."""
+        return self.contador_operativos.torre(col_dia)
 
     def _determinar_turno_por_personal(self, col_dia: int) -> Optional[str]:
         """
@@ -219,36 +214,17 @@ class AsignadorTurnos:
         return "1T"
 
     def _existe_turno_1t_o_7_en_dia(self, col_dia: int) -> bool:
-        """True si en ese día ya existe un 1T, 7, BLPTD o BANTD en cualquier trabajador (filas 2-25)."""
-        for fila in range(2, 26):
-            valor = self.ws.cell(row=fila, column=col_dia).value
-            if valor is None:
-                continue
-            val = str(valor).strip().upper()
-            if val in {"1T", "7", "BLPTD", "BANTD"}:
-                return True
-        return False
+        """True si en ese día ya existe un 1T, 7, BLPTD o BANTD en cualquier trabajador."""
+        return self.grid.existe_en_dia(col_dia, {"1T", "7", "BLPTD", "BANTD"})
 
     def _seleccionar_equitativo(self, candidatos: List[str], turno: str) -> Optional[str]:
         """
         Para turno "1T": usar contador_grupo_1t.
         Para turno "7": usar contador_grupo_1t y, como desempate, contador_grupo_6rt.
         """
-        if not candidatos:
-            return None
-
         # Contador principal siempre es el de 1T (porque 7 también suma al grupo 1T)
-        principal = self.contador_grupo_1t
-        min_principal = min(principal[c] for c in candidatos)
-        candidatos_min = [c for c in candidatos if principal[c] == min_principal]
-
-        if turno == "7" and len(candidatos_min) > 1:
-            # Desempate con grupo 6RT
-            secundaria = self.contador_grupo_6rt
-            min_sec = min(secundaria[c] for c in candidatos_min)
-            candidatos_min = [c for c in candidatos_min if secundaria[c] == min_sec]
-
-        return random.choice(candidatos_min)
+        desempate = (self.contador_grupo_6rt,) if turno == "7" else ()
+        return self.contador_grupo_1t.seleccionar(candidatos, desempate=desempate)
 
     def _actualizar_contadores(self, trabajador: str, turno: str) -> None:
         if turno == "1T":
@@ -259,16 +235,11 @@ class AsignadorTurnos:
 
     def _inicializar_contadores_desde_hoja(self) -> None:
         """Inicializa los contadores 1T (1T+7) y 6RT (solo 7) leyendo asignaciones ya presentes."""
-        max_col = self.ws.max_column
         for trabajador in self.TRABAJADORES_ELEGIBLES:
             fila = self._obtener_fila_trabajador(trabajador)
             if not fila:
                 continue
-            for col in range(2, max_col + 1):
-                valor = self.ws.cell(row=fila, column=col).value
-                if valor is None:
-                    continue
-                val = str(valor).strip().upper()
+            for val in self.grid.valores_fila(fila):
                 if val == "1T":
                     self.contador_grupo_1t[trabajador] += 1
                 elif val == "7":
@@ -298,21 +269,21 @@ class AsignadorTurnos:
                 continue
             
             # Verificar si la celda está ocupada
-            celda = self.ws.cell(row=fila, column=col_dia)
-            if celda.value is not None and str(celda.value).strip() != "":
-                razones_trabajador.append(f"Celda ocupada: '{celda.value}'")
+            valor_celda = self.grid.valor(fila, col_dia)
+            if valor_celda:
+                razones_trabajador.append(f"Celda ocupada: '{valor_celda}'")
                 razones[trabajador] = razones_trabajador
                 continue
             
             # Verificar restricción dura del día anterior
             if self._tuvo_restriccion_dura_ayer(trabajador, col_dia):
                 valor_ayer = self._obtener_valor_dia_anterior(trabajador, col_dia)
-                razones_trabajador.append(f"Restricción dura ayer: '{valor_ayer}' (BANTD/BLPTD/NLPRD/NANRD/1T/7)")
+                razones_trabajador.append(f"Restricción dura ayer: '{valor_ayer}' ({self.reglas.describir('1t.dura_ayer')})")
             
             # Verificar restricción dura del día siguiente
             if self._tiene_restriccion_dura_manana(trabajador, col_dia):
                 valor_manana = self._obtener_valor_dia_siguiente(trabajador, col_dia)
-                razones_trabajador.append(f"Restricción dura mañana: '{valor_manana}' (BANTD/BLPTD/1T/7)")
+                razones_trabajador.append(f"Restricción dura mañana: '{valor_manana}' ({self.reglas.describir('1t.dura_manana')})")
             
             # Verificar restricción Torre para GCE
             if trabajador == "GCE" and turno_objetivo == "1T":
@@ -323,12 +294,12 @@ class AsignadorTurnos:
             # Verificar restricción blanda del día anterior
             if self._tuvo_restriccion_blanda_ayer(trabajador, col_dia):
                 valor_ayer = self._obtener_valor_dia_anterior(trabajador, col_dia)
-                razones_trabajador.append(f"Restricción blanda ayer: '{valor_ayer}' (NANTD/NLPTD)")
+                razones_trabajador.append(f"Restricción blanda ayer: '{valor_ayer}' ({self.reglas.describir('1t.blanda_ayer')})")
             
             # Verificar si tuvo extra ayer
             if self._tuvo_extra_dia_anterior(trabajador, col_dia):
                 valor_ayer = self._obtener_valor_dia_anterior(trabajador, col_dia)
-                razones_trabajador.append(f"Tuvo extra ayer: '{valor_ayer}' (1T/7)")
+                razones_trabajador.append(f"Tuvo extra ayer: '{valor_ayer}' ({self.reglas.describir('1t.extra_ayer')})")
             
             # Si no hay razones, el trabajador está disponible
             if not razones_trabajador:
@@ -377,6 +348,40 @@ class AsignadorTurnos:
             'razones': razones
         })
 
+    def _candidatos_del_dia(self, col_dia: int) -> List[str]:
+        """Quienes pueden recibir 1T/7 en el día según la hoja actual (mismos filtros duros que asignar_turno_en_dia)."""
+        turno = self._determinar_turno_por_personal(col_dia)
+        if turno is None or self._existe_turno_1t_o_7_en_dia(col_dia):
+            return []
+        candidatos = [
+            t for t in self._obtener_trabajadores_disponibles(col_dia)
+            if not self._tuvo_restriccion_dura_ayer(t, col_dia)
+            and not self._tiene_restriccion_dura_manana(t, col_dia)
+        ]
+        if turno == "1T":
+            torre = self._obtener_conteo_torre(col_dia)
+            if torre is not None and torre > 3:
+                candidatos = [t for t in candidatos if t != "GCE"]
+        return candidatos
+
+    def _planificar_recorrido(self) -> None:
+        """Cobertura máxima del horizonte antes de asignar (programación dinámica sobre el trabajador de ayer)."""
+        columnas = list(self.grid.columnas())
+        candidatos = {col: self._candidatos_del_dia(col) for col in columnas}
+        self._plan = PlanAnticipado(columnas, candidatos)
+        con_candidatos = sum(1 for c in candidatos.values() if c)
+        print(f"🧭 Recorrido anticipado: cobertura máxima {self._plan.cobertura_maxima()} "
+              f"de {con_candidatos} días con candidatos")
+
+    def _opciones_del_plan(self, col_dia: int) -> set:
+        """Opciones del día que conservan la cobertura máxima, según a quién se le asignó ayer."""
+        ayer = None
+        for t in self._plan.candidatos_de(col_dia - 1):
+            if self.grid.valor(self._obtener_fila_trabajador(t), col_dia - 1) in {"1T", "7"}:
+                ayer = t
+                break
+        return self._plan.opciones(col_dia, ayer)
+
     def asignar_turno_en_dia(self, col_dia: int) -> Optional[str]:
         """Intenta asignar "1T" o "7" en el día (columna) indicado, retornando el trabajador o None."""
         turno = self._determinar_turno_por_personal(col_dia)
@@ -412,7 +417,7 @@ class AsignadorTurnos:
         disponibles = [t for t in disponibles if not self._tuvo_restriccion_dura_ayer(t, col_dia)]
         if not disponibles:
             if tenia_disponibles:
-                self._marcar_alerta_restriccion_dura(col_dia, "Bloqueado por restricción dura (ayer: BANTD/BLPTD/NLPRD/NANRD/1T/7)")
+                self._marcar_alerta_restriccion_dura(col_dia, f"Bloqueado por restricción dura (ayer: {self.reglas.describir('1t.dura_ayer')})")
                 # Analizar razones detalladas
                 razones = self._analizar_razones_no_asignacion(col_dia, turno)
                 self._mostrar_alerta_dia_no_asignado(col_dia, turno, razones)
@@ -422,7 +427,7 @@ class AsignadorTurnos:
         disponibles = [t for t in disponibles if not self._tiene_restriccion_dura_manana(t, col_dia)]
         if not disponibles:
             if tenia_disponibles:
-                self._marcar_alerta_restriccion_dura(col_dia, "Bloqueado por restricción dura (mañana: BANTD/BLPTD/1T/7)")
+                self._marcar_alerta_restriccion_dura(col_dia, f"Bloqueado por restricción dura (mañana: {self.reglas.describir('1t.dura_manana')})")
                 # Analizar razones detalladas
                 razones = self._analizar_razones_no_asignacion(col_dia, turno)
                 self._mostrar_alerta_dia_no_asignado(col_dia, turno, razones)
@@ -439,6 +444,18 @@ class AsignadorTurnos:
                     self._mostrar_alerta_dia_no_asignado(col_dia, turno, razones)
                     return None
 
+        # Recorrido anticipado: solo quienes conservan la cobertura máxima del horizonte
+        if self._plan is not None:
+            opciones = self._opciones_del_plan(col_dia)
+            reservados = [t for t in disponibles if t not in opciones]
+            disponibles = [t for t in disponibles if t in opciones]
+            if not disponibles:
+                razones = self._analizar_razones_no_asignacion(col_dia, turno)
+                for t in reservados:
+                    razones[t] = ["Reservado para cubrir días siguientes (recorrido anticipado)"]
+                self._mostrar_alerta_dia_no_asignado(col_dia, turno, razones)
+                return None
+
         # Prioridades con restricciones (blandas y prioridad DESC/TROP/SIND de ayer)
         nivel1 = []
         nivel2 = []
@@ -467,7 +484,7 @@ class AsignadorTurnos:
                 if not fila:
                     return None
                 # Asignar el turno y aplicar formato naranja claro
-                self.ws.cell(row=fila, column=col_dia, value=turno)
+                self.grid.asignar(fila, col_dia, turno)
                 self._aplicar_formato_turno(fila, col_dia, turno)
                 self._actualizar_contadores(elegido, turno)
                 nombre_dia = self._obtener_nombre_dia(col_dia)
@@ -479,24 +496,67 @@ class AsignadorTurnos:
         self._mostrar_alerta_dia_no_asignado(col_dia, turno, razones)
         return None
 
+    def _optimizar_localmente(self) -> int:
+        """
+        Recocido simulado sobre los 1T/7 asignados (optimizador_local.py).
+
+        Devuelve cuántos días que habían quedado sin 1T/7 quedaron cubiertos.
+        """
+        optimizador = OptimizadorLocal(
+            self.grid,
+            self.reglas,
+            "1t",
+            self.TRABAJADORES_ELEGIBLES,
+            self.contador_grupo_1t,
+            {"1T", "7"},
+            es_movible=lambda fila, col: (fila, col) not in self.originales_1t_7,
+            destino_valido=lambda t, fila, col, turno: (
+                self.grid.esta_vacia(fila, col)
+                and not self._existe_turno_1t_o_7_en_dia(col)
+                and not self._tuvo_restriccion_dura_ayer(t, col)
+                and not self._tiene_restriccion_dura_manana(t, col)
+                and not (t == "GCE" and turno == "1T" and (self._obtener_conteo_torre(col) or 0) > 3)
+            ),
+            turno_para_dia=lambda col: (
+                None if self._existe_turno_1t_o_7_en_dia(col) else self._determinar_turno_por_personal(col)
+            ),
+            semilla=self.semilla,
+        )
+        resultado = optimizador.ejecutar(self.optimizacion, aplicar=self._aplicar_cambio_optimizado)
+        print(f"🔧 Optimización local: {resultado.resumen()}")
+        # Los días que la optimización cubrió ya no van al resumen de no asignados
+        self.dias_no_asignados = [
+            dia for dia in self.dias_no_asignados
+            if dia['ya_existe_turno'] or not self.grid.existe_en_dia(dia['columna'], {"1T", "7"})
+        ]
+        return resultado.dias_sin_turno_inicial - resultado.dias_sin_turno_final
+
+    def _aplicar_cambio_optimizado(self, cambio: Cambio) -> None:
+        trabajador = self.grid.sigla(cambio.fila)
+        if cambio.antes in {"1T", "7"}:
+            self.contador_grupo_1t[trabajador] -= 1
+            if cambio.antes == "7":
+                self.contador_grupo_6rt[trabajador] -= 1
+        if cambio.despues in {"1T", "7"}:
+            self._actualizar_contadores(trabajador, cambio.despues)
+            self._aplicar_formato_turno(cambio.fila, cambio.col, cambio.despues)
+        else:
+            self.estilos.pintar(cambio.fila, cambio.col, None)
+
     def _aplicar_formato_turno(self, fila: int, col_dia: int, turno: str) -> None:
         """Aplica formato naranja claro a la celda asignada con turno 1T o 7."""
-        celda = self.ws.cell(row=fila, column=col_dia)
-        celda.fill = self.fill_naranja_claro
+        self.estilos.pintar(fila, col_dia, self.color_naranja_claro)
 
     def _formatear_turnos_existentes(self) -> None:
         """Aplica formato naranja claro a todos los turnos 1T y 7 ya existentes en la hoja."""
-        max_col = self.ws.max_column
         for trabajador in self.TRABAJADORES_ELEGIBLES:
             fila = self._obtener_fila_trabajador(trabajador)
             if not fila:
                 continue
-            for col in range(2, max_col + 1):
-                valor = self.ws.cell(row=fila, column=col).value
-                if valor is not None:
-                    val = str(valor).strip().upper()
-                    if val in {"1T", "7"}:
-                        self._aplicar_formato_turno(fila, col, val)
+            for col in self.grid.columnas():
+                val = self.grid.valor(fila, col)
+                if val in {"1T", "7"}:
+                    self._aplicar_formato_turno(fila, col, val)
 
     def _mostrar_resumen_final(self) -> None:
         """Muestra un resumen final de todos los días no asignados."""
@@ -524,120 +584,43 @@ class AsignadorTurnos:
             for dia in dias:
                 print(f"   • {dia['dia']} (Col {dia['columna']}) - Objetivo: {dia['turno_objetivo']}")
 
-    def procesar_todos_los_dias(self) -> None:
+    def procesar_todos_los_dias(self, guardar: bool = True) -> None:
         print(f"🚀 Iniciando asignación de turnos 1T/7...")
-        print(f"📁 Archivo: {self.archivo_procesado}")
+        if self.leido_de_archivo:
+            print(f"📁 Archivo: {self.archivo_procesado}")
         
         # Formatear turnos 1T/7 ya existentes antes de procesar
         print(f"🎨 Aplicando formato naranja claro a turnos 1T/7 existentes...")
         self._formatear_turnos_existentes()
         
-        max_col = self.ws.max_column
-        asignaciones_exitosas = 0
+        max_col = self.grid.max_col
+        if self.modo_recorrido == "anticipado":
+            self._planificar_recorrido()
         
-        for col in range(2, max_col + 1):
-            resultado = self.asignar_turno_en_dia(col)
-            if resultado:
-                asignaciones_exitosas += 1
+        resultados = recorrer_dias(self.grid.columnas(), self.asignar_turno_en_dia,
+                                   self.orden_dias, self._candidatos_del_dia)
+        asignaciones_exitosas = sum(1 for resultado in resultados if resultado)
+        # En orden restringido los días sin asignar se registran fuera de orden
+        self.dias_no_asignados.sort(key=lambda dia: dia['columna'])
+        if self.optimizacion is not None:
+            asignaciones_exitosas += self._optimizar_localmente()
 
         self._actualizar_hoja_estadisticas()
         self._mostrar_resumen_final()
 
         salida = "horarioUnificado_con_1t.xlsx"
-        self.wb.save(salida)
-        print(f"\n💾 Archivo guardado como: {salida}")
+        self.grid.volcar_en_hoja(self.ws)
+        if guardar:
+            self.estilos.aplicar()
+            self.wb.save(salida)
+            print(f"\n💾 Archivo guardado como: {salida}")
         print(f"📈 Asignaciones exitosas: {asignaciones_exitosas}/{max_col-1} días")
         print(f"🎨 Celdas con turnos 1T/7 formateadas con color naranja claro")
 
     def _actualizar_hoja_estadisticas(self) -> None:
-        nombre_stats = "Estadísticas"
-        if nombre_stats in self.wb.sheetnames:
-            ws_stats = self.wb[nombre_stats]
-        else:
-            ws_stats = self.wb.create_sheet(nombre_stats)
-
-        # Limpiar hoja
-        for fila in ws_stats.iter_rows():
-            for celda in fila:
-                celda.value = None
-                celda.fill = PatternFill(fill_type=None)
-
-        # Encabezados
-        ws_stats.cell(row=1, column=1, value="SIGLA")
-        ws_stats.cell(row=1, column=2, value="DESC")
-        ws_stats.cell(row=1, column=3, value="1T")   # 1T + 7
-        ws_stats.cell(row=1, column=4, value="6RT")  # Solo 7
-        ws_stats.cell(row=1, column=5, value="1D")   # BANTD + BLPTD
-        ws_stats.cell(row=1, column=6, value="3D")   # 3 + 3D
-        ws_stats.cell(row=1, column=7, value="6D")   # NLPTD + NLPRD + NANTD + NANRD
-
-        header_fill = PatternFill(start_color="E6E6E6", end_color="E6E6E6", fill_type="solid")
-        header_font = Font(bold=True)
-        for col in range(1, 8):
-            c = ws_stats.cell(row=1, column=col)
-            c.fill = header_fill
-            c.font = header_font
-
-        # Filas de trabajadores desde la hoja principal
-        hoja = self._nombre_hoja_horario()
-        fila_destino = 2
-        for fila in range(2, 26):
-            trabajador = self.ws.cell(row=fila, column=1).value
-            if not trabajador:
-                continue
-            ws_stats.cell(row=fila_destino, column=1, value=trabajador)
-
-            # DESC + TROP (fórmula dinámica)
-            formula_desc = (
-                f'=COUNTIF({hoja}!B{fila}:AE{fila},"DESC")'
-                f'+COUNTIF({hoja}!B{fila}:AE{fila},"TROP")'
-            )
-            ws_stats.cell(row=fila_destino, column=2, value=formula_desc)
-
-            # 1T = 1T + 7 (fórmula dinámica)
-            formula_1t = (
-                f'=COUNTIF({hoja}!B{fila}:AE{fila},"1T")'
-                f'+COUNTIF({hoja}!B{fila}:AE{fila},"7")'
-            )
-            ws_stats.cell(row=fila_destino, column=3, value=formula_1t)
-
-            # 6RT = solo 7 (fórmula dinámica)
-            formula_6rt = f'=COUNTIF({hoja}!B{fila}:AE{fila},"7")'
-            ws_stats.cell(row=fila_destino, column=4, value=formula_6rt)
-
-            # 1D = BANTD + BLPTD
-            formula_1d = (
-                f'=COUNTIF({hoja}!B{fila}:AE{fila},"BANTD")'
-                f'+COUNTIF({hoja}!B{fila}:AE{fila},"BLPTD")'
-            )
-            ws_stats.cell(row=fila_destino, column=5, value=formula_1d)
-
-            # 3D = 3 + 3D
-            formula_3d = (
-                f'=COUNTIF({hoja}!B{fila}:AE{fila},"3")'
-                f'+COUNTIF({hoja}!B{fila}:AE{fila},"3D")'
-            )
-            ws_stats.cell(row=fila_destino, column=6, value=formula_3d)
-
-            # 6D = NLPTD + NLPRD + NANTD + NANRD
-            formula_6d = (
-                f'=COUNTIF({hoja}!B{fila}:AE{fila},"NLPTD")'
-                f'+COUNTIF({hoja}!B{fila}:AE{fila},"NLPRD")'
-                f'+COUNTIF({hoja}!B{fila}:AE{fila},"NANTD")'
-                f'+COUNTIF({hoja}!B{fila}:AE{fila},"NANRD")'
-            )
-            ws_stats.cell(row=fila_destino, column=7, value=formula_6d)
-
-            fila_destino += 1
-
-        # Anchos de columna
-        ws_stats.column_dimensions['A'].width = 10
-        ws_stats.column_dimensions['B'].width = 8
-        ws_stats.column_dimensions['C'].width = 8
-        ws_stats.column_dimensions['D'].width = 8
-        ws_stats.column_dimensions['E'].width = 8
-        ws_stats.column_dimensions['F'].width = 8
-        ws_stats.column_dimensions['G'].width = 8
+        """Columnas 1T y 6RT de la hoja 'Estadísticas' (los "7" cuentan en las dos)."""
+        escritor = EscritorEstadisticas(self.wb, self.grid, self._nombre_hoja_horario())
+        escritor.escribir(("1T", "6RT"))
 
 
 if __name__ == "__main__":
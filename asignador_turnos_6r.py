@@ -1,10 +1,18 @@
-import openpyxl
 import random
-from collections import defaultdict
-from openpyxl.styles import PatternFill, Font
 from typing import List, Optional, Dict, Tuple, Set
 import os
 
+from balanceo_flujo import BalanceadorFlujo, Movimiento, validar_modo_balanceo
+from cargador_horarios import abrir_horario
+from catalogo_turnos import color_turno
+from estadisticas_horario import EscritorEstadisticas
+from estilos_horario import estilos_compartidos
+from grilla_horario import GrillaHorario
+from selector_equitativo import ContadorEquitativo
+from motor_restricciones import MotorRestricciones
+from dominios_dias import recorrer_dias, validar_orden_dias
+from optimizador_local import Cambio, OptimizadorLocal, PresupuestoBusqueda
+
 
 class AsignadorTurnos6R:
     """
@@ -32,9 +40,12 @@ class AsignadorTurnos6R:
         'JBV', 'GMT', 'BRS', 'HZG', 'JIS', 'CDT', 'WGG', 'GCE'
     ]
 
-    COLOR_6R = "4169E1"  # Azul medio oscuro (RoyalBlue)
+    COLOR_6R = color_turno("6R")  # Azul medio oscuro (RoyalBlue)
 
-    def __init__(self, archivo_entrada: Optional[str] = None) -> None:
+    def __init__(self, archivo_entrada: Optional[str] = None, wb=None,
+                 grid: Optional[GrillaHorario] = None, modo_balanceo: str = "iterativo",
+                 semilla: Optional[int] = None, optimizacion: Optional[PresupuestoBusqueda] = None,
+                 orden_dias: str = "calendario") -> None:
         candidatos = [
             archivo_entrada,
             "horarioUnificado_con_1.xlsx",
@@ -52,8 +63,24 @@ class AsignadorTurnos6R:
             elegido = "horarioUnificado_con_1.xlsx"
         self.archivo_entrada = elegido
 
-        self.wb = openpyxl.load_workbook(self.archivo_entrada)
+        # El pipeline puede pasar el libro y la grilla ya cargados (sin releer el xlsx)
+        if wb is None:
+            # Ejecución suelta: xlsx o instantánea .hsnap (aplicada sobre el xlsx de plantilla)
+            wb, grid = abrir_horario(self.archivo_entrada)
+        self.wb = wb
         self.ws = self._obtener_hoja_horario()
+        # Grilla en memoria: se lee una vez y se vuelca a la hoja al guardar
+        self.grid = grid if grid is not None else GrillaHorario.desde_hoja(self.ws)
+        self.estilos = estilos_compartidos(self.ws)
+        # Rebalanceo final: "iterativo" (un movimiento por vuelta) o "flujo" (balanceo_flujo.py)
+        self.modo_balanceo = validar_modo_balanceo(modo_balanceo)
+        # Post-optimización local tras el rebalanceo (None = no se ejecuta)
+        self.optimizacion = optimizacion
+        self.semilla = semilla
+        # Orden de los días: "calendario" o "restringido" (más restringido primero, dominios_dias.py)
+        self.orden_dias = validar_orden_dias(orden_dias)
+        # Restricciones de adyacencia compartidas (reglas_restricciones.json)
+        self.reglas = MotorRestricciones(self.grid)
 
         # Snapshot del estado original para respetar asignaciones preexistentes
         self.original_nonempty: Set[Tuple[int, int]] = set()
@@ -61,9 +88,9 @@ class AsignadorTurnos6R:
         self._snapshot_estado_original()
 
         # Contador de equidad para el grupo 6R+6RT+7
-        self.contador_grupo_6rt: Dict[str, int] = defaultdict(int)
+        self.contador_grupo_6rt: ContadorEquitativo = ContadorEquitativo()
 
-        random.seed()
+        random.seed(semilla)
         self._inicializar_contadores_desde_hoja()
 
     def _obtener_hoja_horario(self):
@@ -76,13 +103,11 @@ class AsignadorTurnos6R:
         return self.ws.title
 
     def _snapshot_estado_original(self) -> None:
-        max_col = self.ws.max_column
-        for fila in range(2, 26):
-            for col in range(2, max_col + 1):
-                valor = self.ws.cell(row=fila, column=col).value
-                if valor is None or str(valor).strip() == "":
+        for fila in self.grid.filas():
+            for col in self.grid.columnas():
+                val = self.grid.valor(fila, col)
+                if not val:
                     continue
-                val = str(valor).strip().upper()
                 self.original_nonempty.add((fila, col))
                 if val == "6R":
                     self.original_6r.add((fila, col))
@@ -94,44 +119,25 @@ class AsignadorTurnos6R:
         return (fila, col) in self.original_6r
 
     def _obtener_fila_trabajador(self, trabajador: str) -> Optional[int]:
-        for fila in range(2, 26):
-            valor = self.ws.cell(row=fila, column=1).value
-            if valor and str(valor).strip().upper() == trabajador.upper():
-                return fila
-        return None
+        return self.grid.fila_trabajador(trabajador)
 
     def _tiene_prioridad_manana(self, trabajador: str, col_dia: int) -> bool:
         fila = self._obtener_fila_trabajador(trabajador)
         if not fila:
             return False
-        if col_dia + 1 > self.ws.max_column:
-            return False
-        valor = self.ws.cell(row=fila, column=col_dia + 1).value
-        if valor is None:
-            return False
-        return str(valor).strip().upper() in {"DESC", "TROP", "SIND"}
+        return self.reglas.viola("6r.prioridad_manana", fila, col_dia)
 
     def _tiene_extra_manana(self, trabajador: str, col_dia: int) -> bool:
         fila = self._obtener_fila_trabajador(trabajador)
         if not fila:
             return False
-        if col_dia + 1 > self.ws.max_column:
-            return False
-        valor = self.ws.cell(row=fila, column=col_dia + 1).value
-        if valor is None:
-            return False
-        return str(valor).strip().upper() in {"1T", "T1", "1", "7"}
+        return self.reglas.viola("6r.extra_manana", fila, col_dia)
 
     def _tiene_restriccion_dura_manana(self, trabajador: str, col_dia: int) -> bool:
         fila = self._obtener_fila_trabajador(trabajador)
         if not fila:
             return False
-        if col_dia + 1 > self.ws.max_column:
-            return False
-        valor = self.ws.cell(row=fila, column=col_dia + 1).value
-        if valor is None:
-            return False
-        return str(valor).strip().upper() in {"1T", "1", "7", "BLPTD", "BANTD"}
+        return self.reglas.viola("6r.dura_manana", fila, col_dia)
 
     def _obtener_trabajadores_disponibles(self, col_dia: int) -> List[str]:
         disponibles: List[str] = []
@@ -139,56 +145,45 @@ class AsignadorTurnos6R:
             fila = self._obtener_fila_trabajador(trabajador)
             if not fila:
                 continue
-            celda = self.ws.cell(row=fila, column=col_dia)
             if (
-                (celda.value is None or str(celda.value).strip() == "")
+                self.grid.esta_vacia(fila, col_dia)
                 and self._es_celda_originalmente_vacia(fila, col_dia)
             ):
                 disponibles.append(trabajador)
         return disponibles
 
     def _existe_6r_en_dia(self, col_dia: int) -> bool:
-        for fila in range(2, 26):
-            valor = self.ws.cell(row=fila, column=col_dia).value
-            if valor is None:
-                continue
-            if str(valor).strip().upper() == "6R":
-                return True
-        return False
+        return self.grid.existe_en_dia(col_dia, "6R")
 
     def _existe_nanrd_en_dia(self, col_dia: int) -> bool:
-        for fila in range(2, 26):
-            valor = self.ws.cell(row=fila, column=col_dia).value
-            if valor is None:
-                continue
-            if str(valor).strip().upper() == "NANRD":
-                return True
-        return False
+        return self.grid.existe_en_dia(col_dia, "NANRD")
 
     def _seleccionar_equitativo(self, candidatos: List[str]) -> Optional[str]:
         if not candidatos:
             return None
-        min_val = min(self.contador_grupo_6rt[c] for c in candidatos)
-        empatados = [c for c in candidatos if self.contador_grupo_6rt[c] == min_val]
-        return random.choice(empatados)
+        return self.contador_grupo_6rt.seleccionar(candidatos)
 
     def _inicializar_contadores_desde_hoja(self) -> None:
-        max_col = self.ws.max_column
         for trabajador in self.TRABAJADORES_ELEGIBLES:
             fila = self._obtener_fila_trabajador(trabajador)
             if not fila:
                 continue
-            for col in range(2, max_col + 1):
-                valor = self.ws.cell(row=fila, column=col).value
-                if valor is None:
-                    continue
-                val = str(valor).strip().upper()
+            for val in self.grid.valores_fila(fila):
                 if val in {"6RT", "7", "6R"}:
                     self.contador_grupo_6rt[trabajador] += 1
 
     def _actualizar_contadores(self, trabajador: str) -> None:
         self.contador_grupo_6rt[trabajador] += 1
 
+    def _candidatos_del_dia(self, col_dia: int) -> List[str]:
+        """Quienes pueden recibir 6R en el día según la hoja actual (filtros duros de asignar_6r_en_dia)."""
+        if self._existe_6r_en_dia(col_dia) or self._existe_nanrd_en_dia(col_dia):
+            return []
+        return [
+            t for t in self._obtener_trabajadores_disponibles(col_dia)
+            if not self._tiene_restriccion_dura_manana(t, col_dia)
+        ]
+
     def asignar_6r_en_dia(self, col_dia: int) -> Optional[str]:
         # No duplicar 6R en el día
         if self._existe_6r_en_dia(col_dia):
@@ -231,15 +226,17 @@ class AsignadorTurnos6R:
                 # Confirmar que la celda fue originalmente vacía
                 if not self._es_celda_originalmente_vacia(fila, col_dia):
                     return None
-                self.ws.cell(row=fila, column=col_dia, value="6R")
-                celda = self.ws.cell(row=fila, column=col_dia)
-                celda.fill = PatternFill(start_color=self.COLOR_6R, end_color=self.COLOR_6R, fill_type="solid")
+                self.grid.asignar(fila, col_dia, "6R")
+                self.estilos.pintar(fila, col_dia, self.COLOR_6R)
                 self._actualizar_contadores(elegido)
                 return elegido
 
         return None
 
     def _rebalancear_para_paridad(self) -> None:
+        if self.modo_balanceo == "flujo":
+            self._rebalancear_por_flujo()
+            return
         # Rebalancear hasta lograr diferencia <= 1 entre el máximo y el mínimo
         while True:
             conteos_actuales: Dict[str, int] = {}
@@ -260,14 +257,11 @@ class AsignadorTurnos6R:
                 break
 
             columna_candidata = None
-            for col in range(2, self.ws.max_column + 1):
-                valor_max = self.ws.cell(row=fila_max, column=col).value
-                valor_min = self.ws.cell(row=fila_min, column=col).value
+            for col in self.grid.columnas():
                 if (
-                    valor_max is not None
-                    and str(valor_max).strip().upper() == "6R"
+                    self.grid.valor(fila_max, col) == "6R"
                     and not self._es_celda_original_6r(fila_max, col)
-                    and (valor_min is None or str(valor_min).strip() == "")
+                    and self.grid.esta_vacia(fila_min, col)
                     and self._es_celda_originalmente_vacia(fila_min, col)
                     and not self._tiene_restriccion_dura_manana(trabajador_min, col)
                     and not self._existe_nanrd_en_dia(col)
@@ -279,99 +273,90 @@ class AsignadorTurnos6R:
                 break
 
             # Mover 6R de trabajador_max a trabajador_min en la misma columna
-            self.ws.cell(row=fila_max, column=columna_candidata, value=None)
-            celda_original = self.ws.cell(row=fila_max, column=columna_candidata)
-            celda_original.fill = PatternFill(fill_type=None)
+            self._mover_turno(Movimiento(trabajador_max, trabajador_min, columna_candidata, "6R"))
+
+    def _mover_turno(self, mov: Movimiento) -> None:
+        fila_origen = self._obtener_fila_trabajador(mov.origen)
+        fila_destino = self._obtener_fila_trabajador(mov.destino)
+        self.grid.vaciar(fila_origen, mov.col)
+        self.estilos.pintar(fila_origen, mov.col, None)
+
+        self.grid.asignar(fila_destino, mov.col, mov.turno)
+        self.estilos.pintar(fila_destino, mov.col, self.COLOR_6R)
+
+        self.contador_grupo_6rt[mov.origen] -= 1
+        self.contador_grupo_6rt[mov.destino] += 1
+
+    def _rebalancear_por_flujo(self) -> None:
+        """Paridad ±1 del grupo 6RT resolviendo de una vez el reparto de los 6R movibles (flujo de costo mínimo)."""
+        balanceador = BalanceadorFlujo(
+            self.grid,
+            self.TRABAJADORES_ELEGIBLES,
+            self.contador_grupo_6rt,
+            {"6R"},
+            es_movible=lambda fila, col: not self._es_celda_original_6r(fila, col),
+            destino_valido=lambda t, fila, col, turno: (
+                self.grid.esta_vacia(fila, col)
+                and self._es_celda_originalmente_vacia(fila, col)
+                and not self._tiene_restriccion_dura_manana(t, col)
+                and not self._existe_nanrd_en_dia(col)
+            ),
+        )
+        movimientos = balanceador.ejecutar(self._mover_turno)
+        print(f"⚖️  Rebalanceo por flujo: {movimientos} movimientos, diferencia final {balanceador.diferencia()}")
+
+    def _optimizar_localmente(self) -> None:
+        """Recocido simulado sobre los 6R movibles (optimizador_local.py): cubre días sin 6R y reduce blandas."""
+        optimizador = OptimizadorLocal(
+            self.grid,
+            self.reglas,
+            "6r",
+            self.TRABAJADORES_ELEGIBLES,
+            self.contador_grupo_6rt,
+            {"6R"},
+            es_movible=lambda fila, col: not self._es_celda_original_6r(fila, col),
+            destino_valido=lambda t, fila, col, turno: (
+                self.grid.esta_vacia(fila, col)
+                and self._es_celda_originalmente_vacia(fila, col)
+                and not self._tiene_restriccion_dura_manana(t, col)
+                and not self._existe_nanrd_en_dia(col)
+            ),
+            turno_para_dia=lambda col: None if self._existe_6r_en_dia(col) or self._existe_nanrd_en_dia(col) else "6R",
+            semilla=self.semilla,
+        )
+        resultado = optimizador.ejecutar(self.optimizacion, aplicar=self._aplicar_cambio_optimizado)
+        print(f"🔧 Optimización local: {resultado.resumen()}")
+
+    def _aplicar_cambio_optimizado(self, cambio: Cambio) -> None:
+        trabajador = self.grid.sigla(cambio.fila)
+        if cambio.antes == "6R":
+            self.contador_grupo_6rt[trabajador] -= 1
+        if cambio.despues == "6R":
+            self.contador_grupo_6rt[trabajador] += 1
+        self.estilos.pintar(cambio.fila, cambio.col, self.COLOR_6R if cambio.despues else None)
 
-            self.ws.cell(row=fila_min, column=columna_candidata, value="6R")
-            celda_nueva = self.ws.cell(row=fila_min, column=columna_candidata)
-            celda_nueva.fill = PatternFill(start_color=self.COLOR_6R, end_color=self.COLOR_6R, fill_type="solid")
+    def _actualizar_hoja_estadisticas(self) -> None:
+        """Columna 6RT de la hoja 'Estadísticas' (6RT + 7 + 6R)."""
+        escritor = EscritorEstadisticas(self.wb, self.grid, self._nombre_hoja_horario())
+        escritor.escribir(("6RT",))
 
-            self.contador_grupo_6rt[trabajador_max] -= 1
-            self.contador_grupo_6rt[trabajador_min] += 1
 
-    def _actualizar_hoja_estadisticas(self) -> None:
-        nombre_stats = "Estadísticas"
-        if nombre_stats in self.wb.sheetnames:
-            ws_stats = self.wb[nombre_stats]
-        else:
-            ws_stats = self.wb.create_sheet(nombre_stats)
-
-        # Limpiar hoja
-        for fila in ws_stats.iter_rows():
-            for celda in fila:
-                celda.value = None
-                celda.fill = PatternFill(fill_type=None)
-
-        # Encabezados
-        ws_stats.cell(row=1, column=1, value="SIGLA")
-        ws_stats.cell(row=1, column=2, value="DESC")
-        ws_stats.cell(row=1, column=3, value="1T")   # 1T + 7 + 1
-        ws_stats.cell(row=1, column=4, value="6RT")  # 6RT + 7 + 6R
-        ws_stats.cell(row=1, column=5, value="6T")   # solo 6TT
-
-        header_fill = PatternFill(start_color="E6E6E6", end_color="E6E6E6", fill_type="solid")
-        header_font = Font(bold=True)
-        for col in range(1, 6):
-            c = ws_stats.cell(row=1, column=col)
-            c.fill = header_fill
-            c.font = header_font
-
-        hoja = self._nombre_hoja_horario()
-        fila_destino = 2
-        for fila in range(2, 26):
-            trabajador = self.ws.cell(row=fila, column=1).value
-            if not trabajador:
-                continue
-            ws_stats.cell(row=fila_destino, column=1, value=trabajador)
-
-            # DESC + TROP
-            formula_desc = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"DESC")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"TROP")'
-            )
-            ws_stats.cell(row=fila_destino, column=2, value=formula_desc)
-
-            # 1T = 1T + 7 + 1
-            formula_1t = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"1T")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"7")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"1")'
-            )
-            ws_stats.cell(row=fila_destino, column=3, value=formula_1t)
-
-            # 6RT = 6RT + 7 + 6R
-            formula_6rt = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"6RT")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"7")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"6R")'
-            )
-            ws_stats.cell(row=fila_destino, column=4, value=formula_6rt)
-
-            # 6T = solo 6TT
-            formula_6t = f'=COUNTIF({hoja}!B{fila}:AF{fila},"6TT")'
-            ws_stats.cell(row=fila_destino, column=5, value=formula_6t)
-
-            fila_destino += 1
-
-        ws_stats.column_dimensions['A'].width = 10
-        ws_stats.column_dimensions['B'].width = 8
-        ws_stats.column_dimensions['C'].width = 8
-        ws_stats.column_dimensions['D'].width = 8
-        ws_stats.column_dimensions['E'].width = 8
-
-    def procesar_todos_los_dias(self) -> None:
-        max_col = self.ws.max_column
-        for col in range(2, max_col + 1):
-            self.asignar_6r_en_dia(col)
+    def procesar_todos_los_dias(self, guardar: bool = True) -> None:
+        recorrer_dias(self.grid.columnas(), self.asignar_6r_en_dia, self.orden_dias, self._candidatos_del_dia)
 
         # Re-balanceo para paridad del grupo 6R+6RT+7
         self._rebalancear_para_paridad()
+        if self.optimizacion is not None:
+            self._optimizar_localmente()
 
         # Actualizar estadísticas y guardar
         self._actualizar_hoja_estadisticas()
 
         salida = "horarioUnificado_con_6r.xlsx"
+        self.grid.volcar_en_hoja(self.ws)
+        if not guardar:
+            return
+        self.estilos.aplicar()
         try:
             self.wb.save(salida)
             print(f"Archivo guardado como: {salida}")
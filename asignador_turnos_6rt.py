@@ -1,10 +1,19 @@
-import openpyxl
 import random
-from collections import defaultdict
-from openpyxl.styles import PatternFill, Font
-from typing import List, Optional, Dict, Tuple, Set
+from typing import List, Optional, Tuple, Set
 import os
 
+from cargador_horarios import abrir_horario
+from catalogo_turnos import color_turno
+from contador_operativos import contador_compartido
+from balanceo_flujo import BalanceadorFlujo, Movimiento, validar_modo_balanceo
+from estadisticas_horario import EscritorEstadisticas
+from estilos_horario import estilos_compartidos
+from grilla_horario import GrillaHorario
+from selector_equitativo import ContadorEquitativo
+from motor_restricciones import MotorRestricciones
+from dominios_dias import recorrer_dias, validar_orden_dias
+from optimizador_local import Cambio, OptimizadorLocal, PresupuestoBusqueda
+
 
 class AsignadorTurnos6RT:
     """
@@ -28,7 +37,10 @@ class AsignadorTurnos6RT:
     TRABAJADORES_ELEGIBLES = ['YIS', 'MAQ', 'DJO', 'AFG', 'JLF', 'JMV']
     TRABAJADORES_RESPALDO = ['FCE', 'JBV', 'HZG']
 
-    def __init__(self, archivo_entrada: Optional[str] = None) -> None:
+    def __init__(self, archivo_entrada: Optional[str] = None, wb=None,
+                 grid: Optional[GrillaHorario] = None, modo_balanceo: str = "iterativo",
+                 semilla: Optional[int] = None, optimizacion: Optional[PresupuestoBusqueda] = None,
+                 orden_dias: str = "calendario") -> None:
         # Elegir el archivo de entrada más reciente disponible
         candidatos = [
             archivo_entrada,
@@ -46,8 +58,26 @@ class AsignadorTurnos6RT:
             elegido = "horarioUnificado_procesado.xlsx"
         self.archivo_entrada = elegido
 
-        self.wb = openpyxl.load_workbook(self.archivo_entrada)
+        # El pipeline puede pasar el libro y la grilla ya cargados (sin releer el xlsx)
+        if wb is None:
+            # Ejecución suelta: xlsx o instantánea .hsnap (aplicada sobre el xlsx de plantilla)
+            wb, grid = abrir_horario(self.archivo_entrada)
+        self.wb = wb
         self.ws = self._obtener_hoja_horario()
+        # Grilla en memoria: se lee una vez y se vuelca a la hoja al guardar
+        self.grid = grid if grid is not None else GrillaHorario.desde_hoja(self.ws)
+        self.estilos = estilos_compartidos(self.ws)
+        # Rebalanceo final: "iterativo" (un movimiento por vuelta) o "flujo" (balanceo_flujo.py)
+        self.modo_balanceo = validar_modo_balanceo(modo_balanceo)
+        # Post-optimización local tras el rebalanceo (None = no se ejecuta)
+        self.optimizacion = optimizacion
+        self.semilla = semilla
+        # Orden de los días: "calendario" o "restringido" (más restringido primero, dominios_dias.py)
+        self.orden_dias = validar_orden_dias(orden_dias)
+        # Restricciones de adyacencia compartidas (reglas_restricciones.json)
+        self.reglas = MotorRestricciones(self.grid)
+        # Conteo vivo de personal operativo / Torre (compartido entre etapas)
+        self.contador_operativos = contador_compartido(self.grid)
 
         # Snapshot del estado original para no tocar asignaciones preexistentes
         self.original_nonempty: Set[Tuple[int, int]] = set()
@@ -56,25 +86,22 @@ class AsignadorTurnos6RT:
         self._snapshot_estado_original()
 
         # Contadores
-        self.contador_grupo_6rt: Dict[str, int] = defaultdict(int)  # 6RT + 7
-        self.contador_6tt: Dict[str, int] = defaultdict(int)        # solo 6TT
-        random.seed()
+        self.contador_grupo_6rt: ContadorEquitativo = ContadorEquitativo()  # 6RT + 7
+        self.contador_6tt: ContadorEquitativo = ContadorEquitativo()        # solo 6TT
+        random.seed(semilla)
         self._inicializar_contadores_desde_hoja()
 
     def _snapshot_estado_original(self) -> None:
-        max_col = self.ws.max_column
-        for fila in range(2, 26):
-            for col in range(2, max_col + 1):
-                valor = self.ws.cell(row=fila, column=col).value
-                if valor is None or str(valor).strip() == "":
+        for fila in self.grid.filas():
+            for col in self.grid.columnas():
+                val = self.grid.valor(fila, col)
+                if not val:
                     continue
-                val = str(valor).strip().upper()
                 self.original_nonempty.add((fila, col))
                 if val == "6RT":
                     self.original_6rt.add((fila, col))
                     # Colorear celdas 6RT existentes de morado claro
-                    celda = self.ws.cell(row=fila, column=col)
-                    celda.fill = PatternFill(start_color="E6E6FA", end_color="E6E6FA", fill_type="solid")
+                    self.estilos.pintar(fila, col, color_turno("6RT"))
                 elif val == "7":
                     self.original_7.add((fila, col))
 
@@ -94,36 +121,21 @@ class AsignadorTurnos6RT:
         return self.ws.title
 
     def _obtener_fila_trabajador(self, trabajador: str) -> Optional[int]:
-        for fila in range(2, 26):
-            valor = self.ws.cell(row=fila, column=1).value
-            if valor and str(valor).strip().upper() == trabajador.upper():
-                return fila
-        return None
+        return self.grid.fila_trabajador(trabajador)
 
     def _tiene_prioridad_manana(self, trabajador: str, col_dia: int) -> bool:
         """True si mañana tiene DESC, TROP o SIND."""
         fila = self._obtener_fila_trabajador(trabajador)
         if not fila:
             return False
-        if col_dia + 1 > self.ws.max_column:
-            return False
-        valor = self.ws.cell(row=fila, column=col_dia + 1).value
-        if valor is None:
-            return False
-        return str(valor).strip().upper() in {"DESC", "TROP", "SIND"}
+        return self.reglas.viola("6rt.prioridad_manana", fila, col_dia)
 
     def _tiene_extra_manana(self, trabajador: str, col_dia: int) -> bool:
         """True si mañana tiene 1T/T1/1 o 7."""
         fila = self._obtener_fila_trabajador(trabajador)
         if not fila:
             return False
-        if col_dia + 1 > self.ws.max_column:
-            return False
-        valor = self.ws.cell(row=fila, column=col_dia + 1).value
-        if valor is None:
-            return False
-        val = str(valor).strip().upper()
-        return val in {"1T", "T1", "1", "7"}
+        return self.reglas.viola("6rt.extra_manana", fila, col_dia)
 
     def _obtener_trabajadores_disponibles(self, col_dia: int, pool: Optional[List[str]] = None) -> List[str]:
         candidatos = pool if pool is not None else self.TRABAJADORES_ELEGIBLES
@@ -132,9 +144,8 @@ class AsignadorTurnos6RT:
             fila = self._obtener_fila_trabajador(trabajador)
             if not fila:
                 continue
-            celda = self.ws.cell(row=fila, column=col_dia)
             if (
-                (celda.value is None or str(celda.value).strip() == "")
+                self.grid.esta_vacia(fila, col_dia)
                 and self._es_celda_originalmente_vacia(fila, col_dia)
             ):
                 disponibles.append(trabajador)
@@ -142,16 +153,8 @@ class AsignadorTurnos6RT:
 
     # Nuevo: obtener conteo de turnos operativos exclusivamente desde la fila con etiqueta
     def _obtener_conteo_operativos(self, col_dia: int) -> Optional[int]:
-        for fila in range(1, self.ws.max_row + 1):
-            etiqueta = self.ws.cell(row=fila, column=1).value
-            if etiqueta and str(etiqueta).strip().upper() == "TURNOS OPERATIVOS":
-                valor = self.ws.cell(row=fila, column=col_dia).value
-                try:
-                    return int(valor)
-                except Exception:
-                    return None
-        # Si no se encuentra la etiqueta, no devolver conteo
-        return None
+        """Personal operativo del día (conteo vivo: refleja también lo asignado en etapas anteriores)."""
+        return self.contador_operativos.operativos(col_dia)
 
     def _determinar_asignacion_por_personal(self, col_dia: int) -> bool:
         """Devuelve True si se debe asignar 6RT (conteo operativos entre 10 y 15 inclusive)."""
@@ -161,48 +164,25 @@ class AsignadorTurnos6RT:
         return 10 <= disponible <= 15
 
     def _existe_6rt_o_7_en_dia(self, col_dia: int) -> bool:
-        for fila in range(2, 26):
-            valor = self.ws.cell(row=fila, column=col_dia).value
-            if valor is None:
-                continue
-            val = str(valor).strip().upper()
-            if val in {"6RT", "7"}:
-                return True
-        return False
+        return self.grid.existe_en_dia(col_dia, {"6RT", "7"})
 
     # Nuevo: detectar si hay "7" en el día (columna)
     def _existe_7_en_dia(self, col_dia: int) -> bool:
-        for fila in range(2, 26):
-            valor = self.ws.cell(row=fila, column=col_dia).value
-            if valor is None:
-                continue
-            if str(valor).strip().upper() == "7":
-                return True
-        return False
+        return self.grid.existe_en_dia(col_dia, "7")
 
     # Nuevo: detectar si hay "6TT" en el día (columna)
     def _existe_6tt_en_dia(self, col_dia: int) -> bool:
-        for fila in range(2, 26):
-            valor = self.ws.cell(row=fila, column=col_dia).value
-            if valor is None:
-                continue
-            if str(valor).strip().upper() == "6TT":
-                return True
-        return False
+        return self.grid.existe_en_dia(col_dia, "6TT")
 
     def _seleccionar_equitativo(self, candidatos: List[str]) -> Optional[str]:
         if not candidatos:
             return None
-        min_val = min(self.contador_grupo_6rt[c] for c in candidatos)
-        empatados = [c for c in candidatos if self.contador_grupo_6rt[c] == min_val]
-        return random.choice(empatados)
+        return self.contador_grupo_6rt.seleccionar(candidatos)
 
     def _seleccionar_equitativo_6tt(self, candidatos: List[str]) -> Optional[str]:
         if not candidatos:
             return None
-        min_val = min(self.contador_6tt[c] for c in candidatos)
-        empatados = [c for c in candidatos if self.contador_6tt[c] == min_val]
-        return random.choice(empatados)
+        return self.contador_6tt.seleccionar(candidatos)
 
     def _actualizar_contadores(self, trabajador: str, turno: str) -> None:
         if turno == "6RT":
@@ -213,16 +193,11 @@ class AsignadorTurnos6RT:
             self.contador_6tt[trabajador] += 1
 
     def _inicializar_contadores_desde_hoja(self) -> None:
-        max_col = self.ws.max_column
         for trabajador in self.TRABAJADORES_ELEGIBLES + self.TRABAJADORES_RESPALDO:
             fila = self._obtener_fila_trabajador(trabajador)
             if not fila:
                 continue
-            for col in range(2, max_col + 1):
-                valor = self.ws.cell(row=fila, column=col).value
-                if valor is None:
-                    continue
-                val = str(valor).strip().upper()
+            for val in self.grid.valores_fila(fila):
                 if val in {"6RT", "7"}:
                     self.contador_grupo_6rt[trabajador] += 1
                 elif val == "6TT":
@@ -230,6 +205,9 @@ class AsignadorTurnos6RT:
 
     # Nuevo: re-balanceo para asegurar paridad ±1 en 6RT+7 entre elegibles
     def _rebalancear_para_paridad(self) -> None:
+        if self.modo_balanceo == "flujo":
+            self._rebalancear_por_flujo()
+            return
         while True:
             # Construir conteos actuales solo para quienes existen en la hoja
             conteos_actuales = {}
@@ -250,13 +228,10 @@ class AsignadorTurnos6RT:
                 break
 
             columna_candidata = None
-            for col in range(2, self.ws.max_column + 1):
-                valor_max = self.ws.cell(row=fila_max, column=col).value
-                valor_min = self.ws.cell(row=fila_min, column=col).value
+            for col in self.grid.columnas():
                 if (
-                    valor_max is not None
-                    and str(valor_max).strip().upper() == "6RT"
-                    and (valor_min is None or str(valor_min).strip() == "")
+                    self.grid.valor(fila_max, col) == "6RT"
+                    and self.grid.esta_vacia(fila_min, col)
                     and self._es_celda_originalmente_vacia(fila_min, col)
                     and not self._es_celda_original_6rt(fila_max, col)
                     and not self._existe_6rt_o_7_en_dia(col)
@@ -272,18 +247,70 @@ class AsignadorTurnos6RT:
                 break
 
             # Reasignar 6RT
-            self.ws.cell(row=fila_max, column=columna_candidata, value=None)
-            # Limpiar color de la celda original
-            celda_original = self.ws.cell(row=fila_max, column=columna_candidata)
-            celda_original.fill = PatternFill(fill_type=None)
-            
-            self.ws.cell(row=fila_min, column=columna_candidata, value="6RT")
-            # Colorear celda de morado claro
-            celda_nueva = self.ws.cell(row=fila_min, column=columna_candidata)
-            celda_nueva.fill = PatternFill(start_color="E6E6FA", end_color="E6E6FA", fill_type="solid")
-            
-            self.contador_grupo_6rt[trabajador_max] -= 1
-            self.contador_grupo_6rt[trabajador_min] += 1
+            self._mover_turno(Movimiento(trabajador_max, trabajador_min, columna_candidata, "6RT"))
+
+    def _mover_turno(self, mov: Movimiento) -> None:
+        fila_origen = self._obtener_fila_trabajador(mov.origen)
+        fila_destino = self._obtener_fila_trabajador(mov.destino)
+        self.grid.vaciar(fila_origen, mov.col)
+        # Limpiar color de la celda original
+        self.estilos.pintar(fila_origen, mov.col, None)
+
+        self.grid.asignar(fila_destino, mov.col, mov.turno)
+        # Colorear celda de morado claro
+        self.estilos.pintar(fila_destino, mov.col, color_turno("6RT"))
+
+        self.contador_grupo_6rt[mov.origen] -= 1
+        self.contador_grupo_6rt[mov.destino] += 1
+
+    def _rebalancear_por_flujo(self) -> None:
+        """Paridad ±1 del grupo 6RT resolviendo de una vez el reparto de los 6RT movibles (flujo de costo mínimo)."""
+        balanceador = BalanceadorFlujo(
+            self.grid,
+            self.TRABAJADORES_ELEGIBLES,
+            self.contador_grupo_6rt,
+            {"6RT"},
+            es_movible=lambda fila, col: not self._es_celda_original_6rt(fila, col),
+            destino_valido=lambda t, fila, col, turno: (
+                self.grid.esta_vacia(fila, col)
+                and self._es_celda_originalmente_vacia(fila, col)
+                and not self._existe_6rt_o_7_en_dia(col)
+                and self._determinar_asignacion_por_personal(col)
+                and not self._tiene_extra_manana(t, col)
+            ),
+        )
+        movimientos = balanceador.ejecutar(self._mover_turno)
+        print(f"⚖️  Rebalanceo por flujo: {movimientos} movimientos, diferencia final {balanceador.diferencia()}")
+
+    def _optimizar_localmente(self) -> None:
+        """Recocido simulado sobre los 6RT movibles (optimizador_local.py): cubre días sin 6RT y evita extras mañana."""
+        optimizador = OptimizadorLocal(
+            self.grid,
+            self.reglas,
+            "6rt",
+            self.TRABAJADORES_ELEGIBLES,
+            self.contador_grupo_6rt,
+            {"6RT"},
+            es_movible=lambda fila, col: not self._es_celda_original_6rt(fila, col),
+            destino_valido=lambda t, fila, col, turno: (
+                self.grid.esta_vacia(fila, col)
+                and self._es_celda_originalmente_vacia(fila, col)
+                and not self._existe_6rt_o_7_en_dia(col)
+                and self._determinar_asignacion_por_personal(col)
+            ),
+            turno_para_dia=lambda col: "6RT" if self._determinar_asignacion_por_personal(col) and not self._existe_6rt_o_7_en_dia(col) else None,
+            semilla=self.semilla,
+        )
+        resultado = optimizador.ejecutar(self.optimizacion, aplicar=self._aplicar_cambio_optimizado)
+        print(f"🔧 Optimización local: {resultado.resumen()}")
+
+    def _aplicar_cambio_optimizado(self, cambio: Cambio) -> None:
+        trabajador = self.grid.sigla(cambio.fila)
+        if cambio.antes == "6RT":
+            self.contador_grupo_6rt[trabajador] -= 1
+        if cambio.despues == "6RT":
+            self.contador_grupo_6rt[trabajador] += 1
+        self.estilos.pintar(cambio.fila, cambio.col, color_turno("6RT") if cambio.despues else None)
 
     def asignar_6rt_en_dia(self, col_dia: int) -> Optional[str]:
         # Decisión por personal (10-15 operativos)
@@ -325,10 +352,9 @@ class AsignadorTurnos6RT:
                 # Confirmar que la celda de destino fue originalmente vacía
                 if not self._es_celda_originalmente_vacia(fila, col_dia):
                     return None
-                self.ws.cell(row=fila, column=col_dia, value="6RT")
+                self.grid.asignar(fila, col_dia, "6RT")
                 # Colorear celda de morado claro
-                celda = self.ws.cell(row=fila, column=col_dia)
-                celda.fill = PatternFill(start_color="E6E6FA", end_color="E6E6FA", fill_type="solid")
+                self.estilos.pintar(fila, col_dia, color_turno("6RT"))
                 self._actualizar_contadores(elegido, "6RT")
                 return elegido
 
@@ -363,31 +389,50 @@ class AsignadorTurnos6RT:
                     return None
                 if not self._es_celda_originalmente_vacia(fila, col_dia):
                     return None
-                self.ws.cell(row=fila, column=col_dia, value="6TT")
+                self.grid.asignar(fila, col_dia, "6TT")
                 self._actualizar_contadores(elegido, "6TT")
                 return elegido
         return None
 
-    def procesar_todos_los_dias(self) -> None:
-        max_col = self.ws.max_column
-        for col in range(2, max_col + 1):
-            conteo = self._obtener_conteo_operativos(col)
-            if conteo is None:
-                continue
-            if conteo <= 9:
-                self.asignar_6tt_en_dia(col)
-            elif 10 <= conteo <= 15:
-                self.asignar_6rt_en_dia(col)
-            else:
-                # ≥16 no asignar
-                pass
+    def _candidatos_del_dia(self, col_dia: int) -> List[str]:
+        """Candidatos de 6TT (≤9 operativos) o 6RT (10-15) según la hoja actual; respaldo si no hay elegibles."""
+        conteo = self._obtener_conteo_operativos(col_dia)
+        if conteo is None or conteo >= 16:
+            return []
+        if conteo <= 9:
+            if self._existe_6tt_en_dia(col_dia):
+                return []
+        elif not self._determinar_asignacion_por_personal(col_dia) or self._existe_6rt_o_7_en_dia(col_dia):
+            return []
+        return (self._obtener_trabajadores_disponibles(col_dia)
+                or self._obtener_trabajadores_disponibles(col_dia, self.TRABAJADORES_RESPALDO))
+
+    def _asignar_segun_personal(self, col_dia: int) -> Optional[str]:
+        conteo = self._obtener_conteo_operativos(col_dia)
+        if conteo is None:
+            return None
+        if conteo <= 9:
+            return self.asignar_6tt_en_dia(col_dia)
+        if 10 <= conteo <= 15:
+            return self.asignar_6rt_en_dia(col_dia)
+        # ≥16 no asignar
+        return None
+
+    def procesar_todos_los_dias(self, guardar: bool = True) -> None:
+        recorrer_dias(self.grid.columnas(), self._asignar_segun_personal, self.orden_dias, self._candidatos_del_dia)
 
         # Forzar paridad ±1 en 6RT+7 cuando sea posible moviendo 6RT
         self._rebalancear_para_paridad()
+        if self.optimizacion is not None:
+            self._optimizar_localmente()
 
         self._actualizar_hoja_estadisticas()
 
         salida = "horarioUnificado_con_6rt.xlsx"
+        self.grid.volcar_en_hoja(self.ws)
+        if not guardar:
+            return
+        self.estilos.aplicar()
         try:
             self.wb.save(salida)
             print(f"Archivo guardado como: {salida}")
@@ -398,66 +443,9 @@ class AsignadorTurnos6RT:
             print(f"Archivo por defecto en uso. Guardado como: {alternativo}")
 
     def _actualizar_hoja_estadisticas(self) -> None:
-        nombre_stats = "Estadísticas"
-        if nombre_stats in self.wb.sheetnames:
-            ws_stats = self.wb[nombre_stats]
-        else:
-            ws_stats = self.wb.create_sheet(nombre_stats)
-
-        # Limpiar hoja
-        for fila in ws_stats.iter_rows():
-            for celda in fila:
-                celda.value = None
-                celda.fill = PatternFill(fill_type=None)
-
-        # Encabezados
-        ws_stats.cell(row=1, column=1, value="SIGLA")
-        ws_stats.cell(row=1, column=2, value="DESC")
-        ws_stats.cell(row=1, column=3, value="1T")   # 1T + 7
-        ws_stats.cell(row=1, column=4, value="6RT")  # 6RT + 7
-
-        header_fill = PatternFill(start_color="E6E6E6", end_color="E6E6E6", fill_type="solid")
-        header_font = Font(bold=True)
-        for col in range(1, 5):
-            c = ws_stats.cell(row=1, column=col)
-            c.fill = header_fill
-            c.font = header_font
-
-        hoja = self._nombre_hoja_horario()
-        fila_destino = 2
-        for fila in range(2, 26):
-            trabajador = self.ws.cell(row=fila, column=1).value
-            if not trabajador:
-                continue
-            ws_stats.cell(row=fila_destino, column=1, value=trabajador)
-
-            # DESC + TROP
-            formula_desc = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"DESC")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"TROP")'
-            )
-            ws_stats.cell(row=fila_destino, column=2, value=formula_desc)
-
-            # 1T = 1T + 7
-            formula_1t = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"1T")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"7")'
-            )
-            ws_stats.cell(row=fila_destino, column=3, value=formula_1t)
-
-            # 6RT = 6RT + 7
-            formula_6rt = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"6RT")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"7")'
-            )
-            ws_stats.cell(row=fila_destino, column=4, value=formula_6rt)
-
-            fila_destino += 1
-
-        ws_stats.column_dimensions['A'].width = 10
-        ws_stats.column_dimensions['B'].width = 8
-        ws_stats.column_dimensions['C'].width = 8
-        ws_stats.column_dimensions['D'].width = 8
+        """Columna 6RT de la hoja 'Estadísticas'."""
+        escritor = EscritorEstadisticas(self.wb, self.grid, self._nombre_hoja_horario())
+        escritor.escribir(("6RT",))
 
 
 if __name__ == "__main__":
@@ -1,10 +1,18 @@
-import openpyxl
 import random
-from collections import defaultdict
-from openpyxl.styles import PatternFill, Font
 from typing import List, Optional, Dict, Tuple, Set
 import os
 
+from balanceo_flujo import BalanceadorFlujo, Movimiento, validar_modo_balanceo
+from cargador_horarios import abrir_horario
+from catalogo_turnos import color_turno
+from estadisticas_horario import EscritorEstadisticas
+from estilos_horario import estilos_compartidos
+from grilla_horario import GrillaHorario
+from selector_equitativo import ContadorEquitativo
+from motor_restricciones import MotorRestricciones
+from dominios_dias import recorrer_dias, validar_orden_dias
+from optimizador_local import Cambio, OptimizadorLocal, PresupuestoBusqueda
+
 
 class AsignadorTurnos6T:
     """
@@ -30,9 +38,12 @@ class AsignadorTurnos6T:
         'JBV', 'GMT', 'BRS', 'HZG', 'JIS', 'CDT', 'WGG', 'GCE'
     ]
 
-    COLOR_6T = "008B8B"  # DarkCyan (aguamarina oscura)
+    COLOR_6T = color_turno("6T")  # DarkCyan (aguamarina oscura)
 
-    def __init__(self, archivo_entrada: Optional[str] = None) -> None:
+    def __init__(self, archivo_entrada: Optional[str] = None, wb=None,
+                 grid: Optional[GrillaHorario] = None, modo_balanceo: str = "iterativo",
+                 semilla: Optional[int] = None, optimizacion: Optional[PresupuestoBusqueda] = None,
+                 orden_dias: str = "calendario") -> None:
         candidatos = [
             archivo_entrada,
             "horarioUnificado_con_6r.xlsx",
@@ -51,8 +62,24 @@ class AsignadorTurnos6T:
             elegido = "horarioUnificado_con_6r.xlsx"
         self.archivo_entrada = elegido
 
-        self.wb = openpyxl.load_workbook(self.archivo_entrada)
+        # El pipeline puede pasar el libro y la grilla ya cargados (sin releer el xlsx)
+        if wb is None:
+            # Ejecución suelta: xlsx o instantánea .hsnap (aplicada sobre el xlsx de plantilla)
+            wb, grid = abrir_horario(self.archivo_entrada)
+        self.wb = wb
         self.ws = self._obtener_hoja_horario()
+        # Grilla en memoria: se lee una vez y se vuelca a la hoja al guardar
+        self.grid = grid if grid is not None else GrillaHorario.desde_hoja(self.ws)
+        self.estilos = estilos_compartidos(self.ws)
+        # Rebalanceo final: "iterativo" (un movimiento por vuelta) o "flujo" (balanceo_flujo.py)
+        self.modo_balanceo = validar_modo_balanceo(modo_balanceo)
+        # Post-optimización local tras el rebalanceo (None = no se ejecuta)
+        self.optimizacion = optimizacion
+        self.semilla = semilla
+        # Orden de los días: "calendario" o "restringido" (más restringido primero, dominios_dias.py)
+        self.orden_dias = validar_orden_dias(orden_dias)
+        # Restricciones de adyacencia compartidas (reglas_restricciones.json)
+        self.reglas = MotorRestricciones(self.grid)
 
         # Snapshot del estado original
         self.original_nonempty: Set[Tuple[int, int]] = set()
@@ -60,9 +87,9 @@ class AsignadorTurnos6T:
         self._snapshot_estado_original()
 
         # Contador de equidad para grupo 6R+6RT+7+6TT+6T
-        self.contador_grupo_6: Dict[str, int] = defaultdict(int)
+        self.contador_grupo_6: ContadorEquitativo = ContadorEquitativo()
 
-        random.seed()
+        random.seed(semilla)
         self._inicializar_contadores_desde_hoja()
 
     def _obtener_hoja_horario(self):
@@ -75,13 +102,11 @@ class AsignadorTurnos6T:
         return self.ws.title
 
     def _snapshot_estado_original(self) -> None:
-        max_col = self.ws.max_column
-        for fila in range(2, 26):
-            for col in range(2, max_col + 1):
-                valor = self.ws.cell(row=fila, column=col).value
-                if valor is None or str(valor).strip() == "":
+        for fila in self.grid.filas():
+            for col in self.grid.columnas():
+                val = self.grid.valor(fila, col)
+                if not val:
                     continue
-                val = str(valor).strip().upper()
                 self.original_nonempty.add((fila, col))
                 if val == "6T":
                     self.original_6t.add((fila, col))
@@ -93,40 +118,19 @@ class AsignadorTurnos6T:
         return (fila, col) in self.original_6t
 
     def _obtener_fila_trabajador(self, trabajador: str) -> Optional[int]:
-        for fila in range(2, 26):
-            valor = self.ws.cell(row=fila, column=1).value
-            if valor and str(valor).strip().upper() == trabajador.upper():
-                return fila
-        return None
+        return self.grid.fila_trabajador(trabajador)
 
     def _tiene_restriccion_dura_manana(self, trabajador: str, col_dia: int) -> bool:
         fila = self._obtener_fila_trabajador(trabajador)
         if not fila:
             return False
-        if col_dia + 1 > self.ws.max_column:
-            return False
-        val = self.ws.cell(row=fila, column=col_dia + 1).value
-        if val is None:
-            return False
-        return str(val).strip().upper() in {"1T", "1", "7", "BLPTD", "BANTD"}
+        return self.reglas.viola("6t.dura_manana", fila, col_dia)
 
     def _existe_nanrd_en_dia(self, col_dia: int) -> bool:
-        for fila in range(2, 26):
-            v = self.ws.cell(row=fila, column=col_dia).value
-            if v is None:
-                continue
-            if str(v).strip().upper() == "NANRD":
-                return True
-        return False
+        return self.grid.existe_en_dia(col_dia, "NANRD")
 
     def _existe_6t_en_dia(self, col_dia: int) -> bool:
-        for fila in range(2, 26):
-            v = self.ws.cell(row=fila, column=col_dia).value
-            if v is None:
-                continue
-            if str(v).strip().upper() == "6T":
-                return True
-        return False
+        return self.grid.existe_en_dia(col_dia, "6T")
 
     def _obtener_trabajadores_disponibles(self, col_dia: int) -> List[str]:
         disponibles: List[str] = []
@@ -134,26 +138,16 @@ class AsignadorTurnos6T:
             fila = self._obtener_fila_trabajador(trabajador)
             if not fila:
                 continue
-            celda = self.ws.cell(row=fila, column=col_dia)
             if (
-                (celda.value is None or str(celda.value).strip() == "")
+                self.grid.esta_vacia(fila, col_dia)
                 and self._es_celda_originalmente_vacia(fila, col_dia)
             ):
                 disponibles.append(trabajador)
         return disponibles
 
     def _inicializar_contadores_desde_hoja(self) -> None:
-        max_col = self.ws.max_column
-        for fila in range(2, 26):
-            trabajador = self.ws.cell(row=fila, column=1).value
-            if not trabajador:
-                continue
-            trabajador = str(trabajador).strip().upper()
-            for col in range(2, max_col + 1):
-                valor = self.ws.cell(row=fila, column=col).value
-                if valor is None:
-                    continue
-                val = str(valor).strip().upper()
+        for fila, trabajador in self.grid.trabajadores():
+            for val in self.grid.valores_fila(fila):
                 if val in {"6RT", "7", "6R", "6TT", "6T"}:
                     self.contador_grupo_6[trabajador] += 1
 
@@ -161,13 +155,17 @@ class AsignadorTurnos6T:
         if not candidatos:
             return None
         # Equidad por menor conteo del grupo 6R+6RT+7+6TT+6T
-        min_val = min(self.contador_grupo_6[c] for c in candidatos)
-        empatados = [c for c in candidatos if self.contador_grupo_6[c] == min_val]
-        return random.choice(empatados)
+        return self.contador_grupo_6.seleccionar(candidatos)
 
     def _actualizar_contadores(self, trabajador: str, delta: int = 1) -> None:
         self.contador_grupo_6[trabajador] += delta
 
+    def _candidatos_del_dia(self, col_dia: int) -> List[str]:
+        """Quienes pueden recibir 6T en el día (la mañana con 1T/1/7 es blanda y no recorta)."""
+        if self._existe_6t_en_dia(col_dia) or self._existe_nanrd_en_dia(col_dia):
+            return []
+        return self._obtener_trabajadores_disponibles(col_dia)
+
     def asignar_6t_en_dia(self, col_dia: int) -> Optional[str]:
         # No duplicar ni NANRD
         if self._existe_6t_en_dia(col_dia) or self._existe_nanrd_en_dia(col_dia):
@@ -189,15 +187,17 @@ class AsignadorTurnos6T:
                     return None
                 if not self._es_celda_originalmente_vacia(fila, col_dia):
                     return None
-                self.ws.cell(row=fila, column=col_dia, value="6T")
-                celda = self.ws.cell(row=fila, column=col_dia)
-                celda.fill = PatternFill(start_color=self.COLOR_6T, end_color=self.COLOR_6T, fill_type="solid")
+                self.grid.asignar(fila, col_dia, "6T")
+                self.estilos.pintar(fila, col_dia, self.COLOR_6T)
                 self._actualizar_contadores(elegido, 1)
                 return elegido
 
         return None
 
     def _rebalancear_para_paridad(self) -> None:
+        if self.modo_balanceo == "flujo":
+            self._rebalancear_por_flujo()
+            return
         # Rebalanceo moviendo solo "6T" mientras diferencia > 1
         while True:
             conteos_actuales: Dict[str, int] = {}
@@ -218,14 +218,11 @@ class AsignadorTurnos6T:
                 break
 
             columna_candidata = None
-            for col in range(2, self.ws.max_column + 1):
-                valor_max = self.ws.cell(row=fila_max, column=col).value
-                valor_min = self.ws.cell(row=fila_min, column=col).value
+            for col in self.grid.columnas():
                 if (
-                    valor_max is not None
-                    and str(valor_max).strip().upper() == "6T"
+                    self.grid.valor(fila_max, col) == "6T"
                     and not self._es_celda_original_6t(fila_max, col)
-                    and (valor_min is None or str(valor_min).strip() == "")
+                    and self.grid.esta_vacia(fila_min, col)
                     and self._es_celda_originalmente_vacia(fila_min, col)
                     and not self._existe_nanrd_en_dia(col)
                 ):
@@ -236,100 +233,86 @@ class AsignadorTurnos6T:
                 break
 
             # Mover 6T
-            self.ws.cell(row=fila_max, column=columna_candidata, value=None)
-            celda_original = self.ws.cell(row=fila_max, column=columna_candidata)
-            celda_original.fill = PatternFill(fill_type=None)
+            self._mover_turno(Movimiento(trabajador_max, trabajador_min, columna_candidata, "6T"))
+
+    def _mover_turno(self, mov: Movimiento) -> None:
+        fila_origen = self._obtener_fila_trabajador(mov.origen)
+        fila_destino = self._obtener_fila_trabajador(mov.destino)
+        self.grid.vaciar(fila_origen, mov.col)
+        self.estilos.pintar(fila_origen, mov.col, None)
+
+        self.grid.asignar(fila_destino, mov.col, mov.turno)
+        self.estilos.pintar(fila_destino, mov.col, self.COLOR_6T)
+
+        self._actualizar_contadores(mov.origen, -1)
+        self._actualizar_contadores(mov.destino, +1)
+
+    def _rebalancear_por_flujo(self) -> None:
+        """Paridad ±1 del grupo 6 resolviendo de una vez el reparto de los 6T movibles (flujo de costo mínimo)."""
+        balanceador = BalanceadorFlujo(
+            self.grid,
+            self.TRABAJADORES_ELEGIBLES,
+            self.contador_grupo_6,
+            {"6T"},
+            es_movible=lambda fila, col: not self._es_celda_original_6t(fila, col),
+            destino_valido=lambda t, fila, col, turno: (
+                self.grid.esta_vacia(fila, col)
+                and self._es_celda_originalmente_vacia(fila, col)
+                and not self._existe_nanrd_en_dia(col)
+            ),
+        )
+        movimientos = balanceador.ejecutar(self._mover_turno)
+        print(f"⚖️  Rebalanceo por flujo: {movimientos} movimientos, diferencia final {balanceador.diferencia()}")
+
+    def _optimizar_localmente(self) -> None:
+        """Recocido simulado sobre los 6T movibles (optimizador_local.py): cubre días sin 6T y evita 1T/1/7/BLPTD/BANTD mañana."""
+        optimizador = OptimizadorLocal(
+            self.grid,
+            self.reglas,
+            "6t",
+            self.TRABAJADORES_ELEGIBLES,
+            self.contador_grupo_6,
+            {"6T"},
+            es_movible=lambda fila, col: not self._es_celda_original_6t(fila, col),
+            destino_valido=lambda t, fila, col, turno: (
+                self.grid.esta_vacia(fila, col)
+                and self._es_celda_originalmente_vacia(fila, col)
+                and not self._existe_nanrd_en_dia(col)
+            ),
+            turno_para_dia=lambda col: None if self._existe_6t_en_dia(col) or self._existe_nanrd_en_dia(col) else "6T",
+            semilla=self.semilla,
+        )
+        resultado = optimizador.ejecutar(self.optimizacion, aplicar=self._aplicar_cambio_optimizado)
+        print(f"🔧 Optimización local: {resultado.resumen()}")
+
+    def _aplicar_cambio_optimizado(self, cambio: Cambio) -> None:
+        trabajador = self.grid.sigla(cambio.fila)
+        if cambio.antes == "6T":
+            self._actualizar_contadores(trabajador, -1)
+        if cambio.despues == "6T":
+            self._actualizar_contadores(trabajador, 1)
+        self.estilos.pintar(cambio.fila, cambio.col, self.COLOR_6T if cambio.despues else None)
 
-            self.ws.cell(row=fila_min, column=columna_candidata, value="6T")
-            celda_nueva = self.ws.cell(row=fila_min, column=columna_candidata)
-            celda_nueva.fill = PatternFill(start_color=self.COLOR_6T, end_color=self.COLOR_6T, fill_type="solid")
+    def _actualizar_hoja_estadisticas(self) -> None:
+        """Columna 6T de la hoja 'Estadísticas' (6TT + 6T)."""
+        escritor = EscritorEstadisticas(self.wb, self.grid, self._nombre_hoja_horario())
+        escritor.escribir(("6T",))
 
-            self._actualizar_contadores(trabajador_max, -1)
-            self._actualizar_contadores(trabajador_min, +1)
 
-    def _actualizar_hoja_estadisticas(self) -> None:
-        nombre_stats = "Estadísticas"
-        if nombre_stats in self.wb.sheetnames:
-            ws_stats = self.wb[nombre_stats]
-        else:
-            ws_stats = self.wb.create_sheet(nombre_stats)
-
-        # Limpiar hoja
-        for fila in ws_stats.iter_rows():
-            for celda in fila:
-                celda.value = None
-                celda.fill = PatternFill(fill_type=None)
-
-        # Encabezados
-        ws_stats.cell(row=1, column=1, value="SIGLA")
-        ws_stats.cell(row=1, column=2, value="DESC")
-        ws_stats.cell(row=1, column=3, value="1T")   # 1T + 7 + 1
-        ws_stats.cell(row=1, column=4, value="6RT")  # 6RT + 7 + 6R
-        ws_stats.cell(row=1, column=5, value="6T")   # 6TT + 6T
-
-        header_fill = PatternFill(start_color="E6E6E6", end_color="E6E6E6", fill_type="solid")
-        header_font = Font(bold=True)
-        for col in range(1, 6):
-            c = ws_stats.cell(row=1, column=col)
-            c.fill = header_fill
-            c.font = header_font
-
-        hoja = self._nombre_hoja_horario()
-        fila_destino = 2
-        for fila in range(2, 26):
-            trabajador = self.ws.cell(row=fila, column=1).value
-            if not trabajador:
-                continue
-            ws_stats.cell(row=fila_destino, column=1, value=trabajador)
-
-            # DESC + TROP
-            formula_desc = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"DESC")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"TROP")'
-            )
-            ws_stats.cell(row=fila_destino, column=2, value=formula_desc)
-
-            # 1T = 1T + 7 + 1
-            formula_1t = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"1T")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"7")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"1")'
-            )
-            ws_stats.cell(row=fila_destino, column=3, value=formula_1t)
-
-            # 6RT = 6RT + 7 + 6R
-            formula_6rt = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"6RT")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"7")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"6R")'
-            )
-            ws_stats.cell(row=fila_destino, column=4, value=formula_6rt)
-
-            # 6T = 6TT + 6T
-            formula_6t = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"6TT")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"6T")'
-            )
-            ws_stats.cell(row=fila_destino, column=5, value=formula_6t)
-
-            fila_destino += 1
-
-        ws_stats.column_dimensions['A'].width = 10
-        ws_stats.column_dimensions['B'].width = 8
-        ws_stats.column_dimensions['C'].width = 8
-        ws_stats.column_dimensions['D'].width = 8
-        ws_stats.column_dimensions['E'].width = 8
-
-    def procesar_todos_los_dias(self) -> None:
-        max_col = self.ws.max_column
-        for col in range(2, max_col + 1):
-            self.asignar_6t_en_dia(col)
+    def procesar_todos_los_dias(self, guardar: bool = True) -> None:
+        recorrer_dias(self.grid.columnas(), self.asignar_6t_en_dia, self.orden_dias, self._candidatos_del_dia)
 
         self._rebalancear_para_paridad()
+        if self.optimizacion is not None:
+            self._optimizar_localmente()
 
         self._actualizar_hoja_estadisticas()
 
         salida = "horarioUnificado_con_6t.xlsx"
+        self.grid.volcar_en_hoja(self.ws)
+        if not guardar:
+            return
+        self.estilos.aplicar()
         try:
             self.wb.save(salida)
             print(f"Archivo guardado como: {salida}")
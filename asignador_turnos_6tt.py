@@ -1,10 +1,17 @@
-import openpyxl
 import random
-from collections import defaultdict
-from openpyxl.styles import PatternFill, Font
-from typing import List, Optional, Dict
+from typing import List, Optional
 import os
 
+from cargador_horarios import abrir_horario
+from catalogo_turnos import color_turno
+from contador_operativos import contador_compartido
+from estadisticas_horario import EscritorEstadisticas
+from estilos_horario import estilos_compartidos
+from grilla_horario import GrillaHorario
+from selector_equitativo import ContadorEquitativo
+from motor_restricciones import MotorRestricciones
+from dominios_dias import recorrer_dias, validar_orden_dias
+
 
 class AsignadorTurnos6TT:
     """
@@ -25,7 +32,9 @@ class AsignadorTurnos6TT:
     TRABAJADORES_ELEGIBLES = [ 'YIS', 'MAQ', 'DJO', 'AFG', 'JLF', 'JMV']
     TRABAJADORES_RESPALDO = ['FCE', 'JBV', 'HZG']
 
-    def __init__(self, archivo_entrada: Optional[str] = None) -> None:
+    def __init__(self, archivo_entrada: Optional[str] = None, wb=None,
+                 grid: Optional[GrillaHorario] = None,
+                 semilla: Optional[int] = None, orden_dias: str = "calendario") -> None:
         # Elegir el archivo de entrada más reciente disponible
         candidatos = [
             archivo_entrada,
@@ -43,10 +52,23 @@ class AsignadorTurnos6TT:
             elegido = "horarioUnificado_procesado.xlsx"
         self.archivo_entrada = elegido
 
-        self.wb = openpyxl.load_workbook(self.archivo_entrada)
+        # El pipeline puede pasar el libro y la grilla ya cargados (sin releer el xlsx)
+        if wb is None:
+            # Ejecución suelta: xlsx o instantánea .hsnap (aplicada sobre el xlsx de plantilla)
+            wb, grid = abrir_horario(self.archivo_entrada)
+        self.wb = wb
         self.ws = self._obtener_hoja_horario()
-        self.contador_6tt: Dict[str, int] = defaultdict(int)
-        random.seed()
+        # Grilla en memoria: se lee una vez y se vuelca a la hoja al guardar
+        self.grid = grid if grid is not None else GrillaHorario.desde_hoja(self.ws)
+        self.estilos = estilos_compartidos(self.ws)
+        # Restricciones de adyacencia compartidas (reglas_restricciones.json)
+        self.reglas = MotorRestricciones(self.grid)
+        # Conteo vivo de personal operativo / Torre (compartido entre etapas)
+        self.contador_operativos = contador_compartido(self.grid)
+        self.contador_6tt: ContadorEquitativo = ContadorEquitativo()
+        random.seed(semilla)
+        # Orden de los días: "calendario" o "restringido" (más restringido primero, dominios_dias.py)
+        self.orden_dias = validar_orden_dias(orden_dias)
         self._inicializar_contadores_desde_hoja()
 
     def _obtener_hoja_horario(self):
@@ -59,26 +81,11 @@ class AsignadorTurnos6TT:
         return self.ws.title
 
     def _obtener_fila_trabajador(self, trabajador: str) -> Optional[int]:
-        for fila in range(2, 26):
-            valor = self.ws.cell(row=fila, column=1).value
-            if valor and str(valor).strip().upper() == trabajador.upper():
-                return fila
-        return None
+        return self.grid.fila_trabajador(trabajador)
 
     def _obtener_conteo_operativos(self, col_dia: int) -> Optional[int]:
-        # Buscar etiqueta explícita de conteo
-        for fila in range(1, self.ws.max_row + 1):
-            etiqueta = self.ws.cell(row=fila, column=1).value
-            if etiqueta and str(etiqueta).strip().upper() == "TURNOS OPERATIVOS":
-                try:
-                    return int(self.ws.cell(row=fila, column=col_dia).value)
-                except Exception:
-                    return None
-        # Fallback: última fila
-        try:
-            return int(self.ws.cell(row=self.ws.max_row, column=col_dia).value)
-        except Exception:
-            return None
+        """Personal operativo del día (conteo vivo: refleja también lo asignado en etapas anteriores)."""
+        return self.contador_operativos.operativos(col_dia)
 
     def _debe_asignar_en_dia(self, col_dia: int) -> bool:
         disponible = self._obtener_conteo_operativos(col_dia)
@@ -87,24 +94,13 @@ class AsignadorTurnos6TT:
         return disponible <= 13
 
     def _existe_6tt_en_dia(self, col_dia: int) -> bool:
-        for fila in range(2, 26):
-            val = self.ws.cell(row=fila, column=col_dia).value
-            if val is None:
-                continue
-            if str(val).strip().upper() == "6TT":
-                return True
-        return False
+        return self.grid.existe_en_dia(col_dia, "6TT")
 
     def _tiene_extra_manana(self, trabajador: str, col_dia: int) -> bool:
         fila = self._obtener_fila_trabajador(trabajador)
         if not fila:
             return False
-        if col_dia + 1 > self.ws.max_column:
-            return False
-        val = self.ws.cell(row=fila, column=col_dia + 1).value
-        if val is None:
-            return False
-        return str(val).strip().upper() in {"1T", "1", "7"}
+        return self.reglas.viola("6tt.extra_manana", fila, col_dia)
 
     def _obtener_disponibles_lista(self, lista: List[str], col_dia: int) -> List[str]:
         disponibles: List[str] = []
@@ -112,29 +108,27 @@ class AsignadorTurnos6TT:
             fila = self._obtener_fila_trabajador(trabajador)
             if not fila:
                 continue
-            celda = self.ws.cell(row=fila, column=col_dia)
-            if celda.value is None or str(celda.value).strip() == "":
+            if self.grid.esta_vacia(fila, col_dia):
                 disponibles.append(trabajador)
         return disponibles
 
     def _seleccionar_equitativo(self, candidatos: List[str]) -> Optional[str]:
         if not candidatos:
             return None
-        min_val = min(self.contador_6tt[c] for c in candidatos)
-        empatados = [c for c in candidatos if self.contador_6tt[c] == min_val]
-        return random.choice(empatados)
+        return self.contador_6tt.seleccionar(candidatos)
 
     def _inicializar_contadores_desde_hoja(self) -> None:
-        for fila in range(2, 26):
-            trabajador = self.ws.cell(row=fila, column=1).value
-            if not trabajador:
-                continue
-            for col in range(2, self.ws.max_column + 1):
-                val = self.ws.cell(row=fila, column=col).value
-                if val is None:
-                    continue
-                if str(val).strip().upper() == "6TT":
-                    self.contador_6tt[str(trabajador).strip().upper()] += 1
+        for fila, trabajador in self.grid.trabajadores():
+            for val in self.grid.valores_fila(fila):
+                if val == "6TT":
+                    self.contador_6tt[trabajador] += 1
+
+    def _candidatos_del_dia(self, col_dia: int) -> List[str]:
+        """Candidatos de 6TT en el día según la hoja actual (respaldo si no hay elegibles)."""
+        if not self._debe_asignar_en_dia(col_dia) or self._existe_6tt_en_dia(col_dia):
+            return []
+        return (self._obtener_disponibles_lista(self.TRABAJADORES_ELEGIBLES, col_dia)
+                or self._obtener_disponibles_lista(self.TRABAJADORES_RESPALDO, col_dia))
 
     def asignar_6tt_en_dia(self, col_dia: int) -> Optional[str]:
         # Reglas de decisión por personal
@@ -162,21 +156,24 @@ class AsignadorTurnos6TT:
                 fila = self._obtener_fila_trabajador(elegido)
                 if not fila:
                     return None
-                celda = self.ws.cell(row=fila, column=col_dia, value="6TT")
+                self.grid.asignar(fila, col_dia, "6TT")
                 # Colorear la celda de morado medio
-                celda.fill = PatternFill(start_color="9370DB", end_color="9370DB", fill_type="solid")
+                self.estilos.pintar(fila, col_dia, color_turno("6TT"))
                 self.contador_6tt[elegido] += 1
                 return elegido
 
         return None
 
-    def procesar_todos_los_dias(self) -> None:
-        for col in range(2, self.ws.max_column + 1):
-            self.asignar_6tt_en_dia(col)
+    def procesar_todos_los_dias(self, guardar: bool = True) -> None:
+        recorrer_dias(self.grid.columnas(), self.asignar_6tt_en_dia, self.orden_dias, self._candidatos_del_dia)
 
         self._actualizar_hoja_estadisticas()
 
         salida = "horarioUnificado_con_6tt.xlsx"
+        self.grid.volcar_en_hoja(self.ws)
+        if not guardar:
+            return
+        self.estilos.aplicar()
         try:
             self.wb.save(salida)
             print(f"Archivo guardado como: {salida}")
@@ -187,72 +184,9 @@ class AsignadorTurnos6TT:
             print(f"Archivo por defecto en uso. Guardado como: {alternativo}")
 
     def _actualizar_hoja_estadisticas(self) -> None:
-        nombre_stats = "Estadísticas"
-        if nombre_stats in self.wb.sheetnames:
-            ws_stats = self.wb[nombre_stats]
-        else:
-            ws_stats = self.wb.create_sheet(nombre_stats)
-
-        # Limpiar hoja
-        for fila in ws_stats.iter_rows():
-            for celda in fila:
-                celda.value = None
-                celda.fill = PatternFill(fill_type=None)
-
-        # Encabezados
-        ws_stats.cell(row=1, column=1, value="SIGLA")
-        ws_stats.cell(row=1, column=2, value="DESC")
-        ws_stats.cell(row=1, column=3, value="1T")   # 1T + 7
-        ws_stats.cell(row=1, column=4, value="6RT")  # 6RT + 7
-        ws_stats.cell(row=1, column=5, value="6T")   # solo 6TT
-
-        header_fill = PatternFill(start_color="E6E6E6", end_color="E6E6E6", fill_type="solid")
-        header_font = Font(bold=True)
-        for col in range(1, 6):
-            c = ws_stats.cell(row=1, column=col)
-            c.fill = header_fill
-            c.font = header_font
-
-        hoja = self._nombre_hoja_horario()
-        fila_destino = 2
-        for fila in range(2, 26):
-            trabajador = self.ws.cell(row=fila, column=1).value
-            if not trabajador:
-                continue
-            ws_stats.cell(row=fila_destino, column=1, value=trabajador)
-
-            # DESC + TROP
-            formula_desc = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"DESC")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"TROP")'
-            )
-            ws_stats.cell(row=fila_destino, column=2, value=formula_desc)
-
-            # 1T = 1T + 7
-            formula_1t = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"1T")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"7")'
-            )
-            ws_stats.cell(row=fila_destino, column=3, value=formula_1t)
-
-            # 6RT = 6RT + 7
-            formula_6rt = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"6RT")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"7")'
-            )
-            ws_stats.cell(row=fila_destino, column=4, value=formula_6rt)
-
-            # 6T = solo 6TT
-            formula_6t = f'=COUNTIF({hoja}!B{fila}:AF{fila},"6TT")'
-            ws_stats.cell(row=fila_destino, column=5, value=formula_6t)
-
-            fila_destino += 1
-
-        ws_stats.column_dimensions['A'].width = 10
-        ws_stats.column_dimensions['B'].width = 8
-        ws_stats.column_dimensions['C'].width = 8
-        ws_stats.column_dimensions['D'].width = 8
-        ws_stats.column_dimensions['E'].width = 8
+        """Columna 6T de la hoja 'Estadísticas' (6TT + 6T)."""
+        escritor = EscritorEstadisticas(self.wb, self.grid, self._nombre_hoja_horario())
+        escritor.escribir(("6T",))
 
 
 if __name__ == "__main__":
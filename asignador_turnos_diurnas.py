@@ -1,10 +1,17 @@
-import openpyxl
 import random
-from collections import defaultdict
-from openpyxl.styles import PatternFill, Font
 from typing import List, Optional, Dict, Tuple, Set
 import os
 
+from cargador_horarios import abrir_horario
+from catalogo_turnos import color_turno
+from contador_operativos import ETIQUETA_OPERATIVOS, buscar_filas_etiqueta, contador_compartido
+from balanceo_flujo import BalanceadorFlujo, Movimiento, validar_modo_balanceo
+from dominios_dias import recorrer_dias, validar_orden_dias
+from estadisticas_horario import EscritorEstadisticas
+from estilos_horario import estilo_conteo_operativos, estilos_compartidos
+from grilla_horario import GrillaHorario
+from selector_equitativo import ContadorEquitativo
+
 
 class AsignadorTurnosDiurnas:
     """
@@ -22,6 +29,7 @@ class AsignadorTurnosDiurnas:
     - Colores: rojo oscuro para 6S, rojo medio para 6N
     - Archivo de entrada: "horarioUnificado_con_3.xlsx"
     - Archivo de salida: "horarioUnificado_con_diurnas.xlsx"
+    - orden_dias="restringido" (dominios_dias.py): procesa primero los días con menos candidatos
     
     IMPORTANTE: Este módulo actualiza la fila de conteo operativo estático usando la misma
     lógica que procesador_horarios.py antes de realizar las asignaciones, asegurando que
@@ -33,10 +41,12 @@ class AsignadorTurnosDiurnas:
         'JBV', 'GMT', 'BRS', 'HZG', 'JIS', 'CDT', 'WGG', 'GCE'
     ]
 
-    COLOR_6S = "8B0000"  # Rojo oscuro (DarkRed)
-    COLOR_6N = "DC143C"  # Rojo medio (Crimson)
+    COLOR_6S = color_turno("6S")  # Rojo oscuro (DarkRed)
+    COLOR_6N = color_turno("6N")  # Rojo medio (Crimson)
 
-    def __init__(self, archivo_entrada: Optional[str] = None) -> None:
+    def __init__(self, archivo_entrada: Optional[str] = None, wb=None,
+                 grid: Optional[GrillaHorario] = None, modo_balanceo: str = "iterativo",
+                 semilla: Optional[int] = None, orden_dias: str = "calendario") -> None:
         candidatos = [
             archivo_entrada,
             "horarioUnificado_con_3.xlsx",
@@ -53,8 +63,22 @@ class AsignadorTurnosDiurnas:
             elegido = "horarioUnificado_con_3.xlsx"
         self.archivo_entrada = elegido
 
-        self.wb = openpyxl.load_workbook(self.archivo_entrada)
+        # El pipeline puede pasar el libro y la grilla ya cargados (sin releer el xlsx)
+        if wb is None:
+            # Ejecución suelta: xlsx o instantánea .hsnap (aplicada sobre el xlsx de plantilla)
+            wb, grid = abrir_horario(self.archivo_entrada)
+        self.wb = wb
         self.ws = self._obtener_hoja_horario()
+        # Grilla en memoria: se lee una vez y se vuelca a la hoja al guardar
+        self.grid = grid if grid is not None else GrillaHorario.desde_hoja(self.ws)
+        # Rebalanceo final: "iterativo" (un movimiento por vuelta) o "flujo" (balanceo_flujo.py)
+        self.modo_balanceo = validar_modo_balanceo(modo_balanceo)
+        # Orden de los días: "calendario" o "restringido" (más restringido primero, dominios_dias.py)
+        self.orden_dias = validar_orden_dias(orden_dias)
+        # Conteo vivo de personal operativo por día (compartido entre etapas)
+        self.contador_operativos = contador_compartido(self.grid)
+        # Rellenos de la hoja: se anotan al asignar y se aplican una vez al guardar
+        self.estilos = estilos_compartidos(self.ws)
 
         # Snapshot del estado original
         self.original_nonempty: Set[Tuple[int, int]] = set()
@@ -63,11 +87,11 @@ class AsignadorTurnosDiurnas:
         self._snapshot_estado_original()
 
         # Contadores de equidad
-        self.contador_6s: Dict[str, int] = defaultdict(int)
-        self.contador_6n: Dict[str, int] = defaultdict(int)
-        self.contador_diurna: Dict[str, int] = defaultdict(int)  # 6S + 6N
+        self.contador_6s: ContadorEquitativo = ContadorEquitativo()
+        self.contador_6n: ContadorEquitativo = ContadorEquitativo()
+        self.contador_diurna: ContadorEquitativo = ContadorEquitativo()  # 6S + 6N
 
-        random.seed()
+        random.seed(semilla)
         self._inicializar_contadores_desde_hoja()
 
     def _obtener_hoja_horario(self):
@@ -80,13 +104,11 @@ class AsignadorTurnosDiurnas:
         return self.ws.title
 
     def _snapshot_estado_original(self) -> None:
-        max_col = self.ws.max_column
-        for fila in range(2, 26):
-            for col in range(2, max_col + 1):
-                valor = self.ws.cell(row=fila, column=col).value
-                if valor is None or str(valor).strip() == "":
+        for fila in self.grid.filas():
+            for col in self.grid.columnas():
+                val = self.grid.valor(fila, col)
+                if not val:
                     continue
-                val = str(valor).strip().upper()
                 self.original_nonempty.add((fila, col))
                 if val == "6S":
                     self.original_6s.add((fila, col))
@@ -97,58 +119,15 @@ class AsignadorTurnosDiurnas:
         return (fila, col) not in self.original_nonempty
 
     def _obtener_fila_trabajador(self, trabajador: str) -> Optional[int]:
-        for fila in range(2, 26):
-            valor = self.ws.cell(row=fila, column=1).value
-            if valor and str(valor).strip().upper() == trabajador.upper():
-                return fila
-        return None
+        return self.grid.fila_trabajador(trabajador)
 
     def _contar_personal_operativo(self, col_dia: int) -> int:
         """Cuenta el personal operativo usando la misma lógica que procesador_horarios.py"""
-        # Definir turnos no operativos (misma lista que procesador_horarios.py)
-        turnos_no_operativos = {
-            # Turnos básicos
-            "DESC", "TROP",
-            # Turnos completos
-            "VACA", "COME", "COMT", "COMS",
-            # Turnos adicionales originales
-            "SIND", "CMED", "CERT",  "LICR",
-            # Formación, instrucción y entrenamiento
-            "CAPA", "MCAE", "TCAE", "MCHC", "TCHC", "NCHC", "ACHC",
-            "MENT", "TENT", "NENT", "AENT",
-            "MINS", "TINS", "NINS", "AINS",
-            # Gestión, oficinas y grupos de trabajo
-            "MCOR", "TCOR", "MSMS", "TSMS", "MDBM", "TDBM",
-            "MDOC", "TDOC", "MPRO", "TPRO", "MATF", "TATF",
-            "MGST", "TGST", "MOFI", "TOFI",
-            # Operativos y asignaciones especiales
-            "CET", "ATC", "KATC", "XATC", "YATC", "ZATC", "X"
-        }
-        
-        count = 0
-        for fila in range(2, 26):  # Filas 2-25
-            cell_value = self.ws.cell(row=fila, column=col_dia).value
-            if cell_value is None or str(cell_value).strip() == "":
-                count += 1  # Celda vacía = operativo
-            else:
-                valor_limpio = str(cell_value).strip().upper()
-                if valor_limpio not in turnos_no_operativos:
-                    count += 1  # No está en lista de no operativos = operativo
-                else:
-                    print("asdfadsfadsfasdfasdfasdfasdf") 
-
-        return count
+        return self.contador_operativos.operativos(col_dia)
 
     def _existe_turno_conflictivo_en_dia(self, col_dia: int) -> bool:
         """Verifica si ya existe 6S, 6N, BLPTD o NANRD en el día"""
-        for fila in range(2, 26):
-            v = self.ws.cell(row=fila, column=col_dia).value
-            if v is None:
-                continue
-            val = str(v).strip().upper()
-            if val in {"6S", "6N", "BLPTD", "NANRD"}:
-                return True
-        return False
+        return self.grid.existe_en_dia(col_dia, {"6S", "6N", "BLPTD", "NANRD"})
 
     def _obtener_trabajadores_disponibles(self, col_dia: int) -> List[str]:
         disponibles: List[str] = []
@@ -156,26 +135,16 @@ class AsignadorTurnosDiurnas:
             fila = self._obtener_fila_trabajador(trabajador)
             if not fila:
                 continue
-            celda = self.ws.cell(row=fila, column=col_dia)
             if (
-                (celda.value is None or str(celda.value).strip() == "")
+                self.grid.esta_vacia(fila, col_dia)
                 and self._es_celda_originalmente_vacia(fila, col_dia)
             ):
                 disponibles.append(trabajador)
         return disponibles
 
     def _inicializar_contadores_desde_hoja(self) -> None:
-        max_col = self.ws.max_column
-        for fila in range(2, 26):
-            trabajador = self.ws.cell(row=fila, column=1).value
-            if not trabajador:
-                continue
-            trabajador = str(trabajador).strip().upper()
-            for col in range(2, max_col + 1):
-                valor = self.ws.cell(row=fila, column=col).value
-                if valor is None:
-                    continue
-                val = str(valor).strip().upper()
+        for fila, trabajador in self.grid.trabajadores():
+            for val in self.grid.valores_fila(fila):
                 if val == "6S":
                     self.contador_6s[trabajador] += 1
                     self.contador_diurna[trabajador] += 1
@@ -187,17 +156,13 @@ class AsignadorTurnosDiurnas:
         if not candidatos:
             return None
         # Equidad por menor conteo de 6S
-        min_val = min(self.contador_6s[c] for c in candidatos)
-        empatados = [c for c in candidatos if self.contador_6s[c] == min_val]
-        return random.choice(empatados)
+        return self.contador_6s.seleccionar(candidatos)
 
     def _seleccionar_equitativo_6n(self, candidatos: List[str]) -> Optional[str]:
         if not candidatos:
             return None
         # Equidad por menor conteo de 6N
-        min_val = min(self.contador_6n[c] for c in candidatos)
-        empatados = [c for c in candidatos if self.contador_6n[c] == min_val]
-        return random.choice(empatados)
+        return self.contador_6n.seleccionar(candidatos)
 
     def _actualizar_contadores(self, trabajador: str, tipo_turno: str, delta: int = 1) -> None:
         if tipo_turno == "6S":
@@ -209,77 +174,23 @@ class AsignadorTurnosDiurnas:
 
     def _actualizar_fila_conteo_operativo(self) -> None:
         """Actualiza la fila de conteo operativo estático usando la misma lógica que procesador_horarios.py"""
-        # Definir turnos no operativos (misma lista que procesador_horarios.py)
-        turnos_no_operativos = {
-            # Turnos básicos
-            "DESC", "TROP",
-            # Turnos completos
-            "VACA", "COME", "COMT", "COMS",
-            # Turnos adicionales originales
-            "SIND", "CMED", "CERT", "LICR"
-            # Formación, instrucción y entrenamiento
-            "CAPA", "MCAE", "TCAE", "MCHC", "TCHC", "NCHC", "ACHC",
-            "MENT", "TENT", "NENT", "AENT",
-            "MINS", "TINS", "NINS", "AINS",
-            # Gestión, oficinas y grupos de trabajo
-            "MCOR", "TCOR", "MSMS", "TSMS", "MDBM", "TDBM",
-            "MDOC", "TDOC", "MPRO", "TPRO", "MATF", "TATF",
-            "MGST", "TGST", "MOFI", "TOFI",
-            # Operativos y asignaciones especiales
-            "CET", "ATC", "KATC", "XATC", "YATC", "ZATC", "X"
-        }
-        
-        # Buscar la fila de conteo operativo estático
-        fila_conteo = None
-        for fila in range(1, self.ws.max_row + 1):
-            valor = self.ws.cell(row=fila, column=1).value
-            if valor and str(valor).strip() == "TURNOS OPERATIVOS":
-                fila_conteo = fila
-                break
+        # Buscar la fila de conteo operativo estático (una sola pasada por la columna A)
+        fila_conteo = buscar_filas_etiqueta(self.ws, [ETIQUETA_OPERATIVOS])[ETIQUETA_OPERATIVOS]
         
         if fila_conteo is None:
             print("⚠️  No se encontró la fila 'TURNOS OPERATIVOS' para actualizar")
             return
         
-        # Actualizar conteos para cada columna
-        for col in range(2, self.ws.max_column + 1):
-            conteo_operativos = 0
-            # Contar turnos operativos según la lógica correcta
-            for row in range(2, 26):  # Filas 2-25
-                cell_value = self.ws.cell(row=row, column=col).value
-                if cell_value is None or str(cell_value).strip() == "":
-                    conteo_operativos += 1
-                else:
-                    valor_limpio = str(cell_value).strip().upper()
-                    if valor_limpio not in turnos_no_operativos:
-                        conteo_operativos += 1
+        # Actualizar conteos para cada columna (conteo vivo, sin recorrer la hoja)
+        for col in self.grid.columnas():
+            conteo_operativos = self.contador_operativos.operativos(col)
             
             # Escribir el conteo actualizado
-            celda_conteo = self.ws.cell(row=fila_conteo, column=col)
-            celda_conteo.value = conteo_operativos
+            self.ws.cell(row=fila_conteo, column=col).value = conteo_operativos
             
-            # Aplicar colores según el conteo (misma lógica que procesador_horarios.py)
-            rojo_intenso = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
-            rojo_medio = PatternFill(start_color="FF6666", end_color="FF6666", fill_type="solid")
-            azul_clarito = PatternFill(start_color="99CCFF", end_color="99CCFF", fill_type="solid")
-            verde_clarito = PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid")
-            verde_intenso = PatternFill(start_color="008000", end_color="008000", fill_type="solid")
-            sin_relleno = PatternFill(fill_type=None)
-            fuente_blanca = Font(color="FFFFFF")
-            
-            if conteo_operativos <= 8:
-                celda_conteo.fill = rojo_intenso
-                celda_conteo.font = fuente_blanca
-            elif conteo_operativos == 9:
-                celda_conteo.fill = rojo_medio
-            elif conteo_operativos == 10:
-                celda_conteo.fill = azul_clarito
-            elif conteo_operativos == 11:
-                celda_conteo.fill = verde_clarito
-            elif conteo_operativos == 12:
-                celda_conteo.fill = verde_intenso
-            else:
-                celda_conteo.fill = sin_relleno
+            # Colores según el conteo (misma escala que procesador_horarios.py)
+            color, fuente_celda = estilo_conteo_operativos(conteo_operativos)
+            self.estilos.pintar(fila_conteo, col, color, fuente_celda)
         
         print("✅ Fila de conteo operativo estático actualizada")
 
@@ -291,13 +202,12 @@ class AsignadorTurnosDiurnas:
         if not self._es_celda_originalmente_vacia(fila, col_dia):
             return False
         
-        self.ws.cell(row=fila, column=col_dia, value=tipo_turno)
-        celda = self.ws.cell(row=fila, column=col_dia)
+        self.grid.asignar(fila, col_dia, tipo_turno)
         
         if tipo_turno == "6S":
-            celda.fill = PatternFill(start_color=self.COLOR_6S, end_color=self.COLOR_6S, fill_type="solid")
+            self.estilos.pintar(fila, col_dia, self.COLOR_6S)
         elif tipo_turno == "6N":
-            celda.fill = PatternFill(start_color=self.COLOR_6N, end_color=self.COLOR_6N, fill_type="solid")
+            self.estilos.pintar(fila, col_dia, self.COLOR_6N)
         
         self._actualizar_contadores(trabajador, tipo_turno, 1)
         return True
@@ -362,6 +272,9 @@ class AsignadorTurnosDiurnas:
 
     def _rebalancear_para_paridad(self) -> None:
         """Rebalanceo moviendo turnos 6S y 6N para que DIURNA tenga diferencia ≤1"""
+        if self.modo_balanceo == "flujo":
+            self._rebalancear_por_flujo()
+            return
         max_iteraciones = 50
         iteracion = 0
         
@@ -390,171 +303,90 @@ class AsignadorTurnosDiurnas:
 
             # Buscar una columna donde mover un turno
             movimiento_realizado = False
-            for col in range(2, self.ws.max_column + 1):
-                valor_max = self.ws.cell(row=fila_max, column=col).value
-                valor_min = self.ws.cell(row=fila_min, column=col).value
+            for col in self.grid.columnas():
+                valor_max = self.grid.valor(fila_max, col)
                 
                 if (
-                    valor_max is not None
-                    and str(valor_max).strip().upper() in {"6S", "6N"}
-                    and (valor_min is None or str(valor_min).strip() == "")
+                    valor_max in {"6S", "6N"}
+                    and self.grid.esta_vacia(fila_min, col)
                     and self._es_celda_originalmente_vacia(fila_min, col)
                     and not self._existe_turno_conflictivo_en_dia(col)
                 ):
-                    tipo_turno = str(valor_max).strip().upper()
-                    
-                    # Remover del trabajador_max
-                    self.ws.cell(row=fila_max, column=col, value=None)
-                    celda_original = self.ws.cell(row=fila_max, column=col)
-                    celda_original.fill = PatternFill(fill_type=None)
-                    self._actualizar_contadores(trabajador_max, tipo_turno, -1)
-
-                    # Asignar al trabajador_min
-                    self.ws.cell(row=fila_min, column=col, value=tipo_turno)
-                    celda_nueva = self.ws.cell(row=fila_min, column=col)
-                    color = self.COLOR_6S if tipo_turno == "6S" else self.COLOR_6N
-                    celda_nueva.fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
-                    self._actualizar_contadores(trabajador_min, tipo_turno, 1)
-
+                    self._mover_turno(Movimiento(trabajador_max, trabajador_min, col, valor_max))
                     movimiento_realizado = True
                     break
 
             if not movimiento_realizado:
                 break
 
+    def _mover_turno(self, mov: Movimiento) -> None:
+        fila_origen = self._obtener_fila_trabajador(mov.origen)
+        fila_destino = self._obtener_fila_trabajador(mov.destino)
+
+        # Remover del trabajador de origen
+        self.grid.vaciar(fila_origen, mov.col)
+        self.estilos.pintar(fila_origen, mov.col, None)
+        self._actualizar_contadores(mov.origen, mov.turno, -1)
+
+        # Asignar al trabajador de destino
+        self.grid.asignar(fila_destino, mov.col, mov.turno)
+        color = self.COLOR_6S if mov.turno == "6S" else self.COLOR_6N
+        self.estilos.pintar(fila_destino, mov.col, color)
+        self._actualizar_contadores(mov.destino, mov.turno, 1)
+
+    def _rebalancear_por_flujo(self) -> None:
+        """Paridad ±1 de DIURNA (6S + 6N) resolviendo de una vez el reparto de los movibles (flujo de costo mínimo)."""
+        balanceador = BalanceadorFlujo(
+            self.grid,
+            self.TRABAJADORES_ELEGIBLES,
+            self.contador_diurna,
+            {"6S", "6N"},
+            es_movible=lambda fila, col: self._es_celda_originalmente_vacia(fila, col),
+            destino_valido=lambda t, fila, col, turno: (
+                self.grid.esta_vacia(fila, col)
+                and self._es_celda_originalmente_vacia(fila, col)
+                and not self._existe_turno_conflictivo_en_dia(col)
+            ),
+        )
+        movimientos = balanceador.ejecutar(self._mover_turno)
+        print(f"⚖️  Rebalanceo por flujo: {movimientos} movimientos, diferencia final {balanceador.diferencia()}")
+
     def _actualizar_hoja_estadisticas(self) -> None:
-        nombre_stats = "Estadísticas"
-        if nombre_stats in self.wb.sheetnames:
-            ws_stats = self.wb[nombre_stats]
-        else:
-            ws_stats = self.wb.create_sheet(nombre_stats)
-
-        # Verificar si ya existe la columna "3" (turnos 3)
-        columna_3_existe = False
-        for col in range(1, ws_stats.max_column + 1):
-            header = ws_stats.cell(row=1, column=col).value
-            if header == "3":
-                columna_3_existe = True
-                break
+        """Columnas 6S, 6N y DIURNA de la hoja 'Estadísticas'."""
+        escritor = EscritorEstadisticas(self.wb, self.grid, self._nombre_hoja_horario())
+        escritor.escribir(("6S", "6N", "DIURNA"))
 
-        # Limpiar hoja
-        for fila in ws_stats.iter_rows():
-            for celda in fila:
-                celda.value = None
-                celda.fill = PatternFill(fill_type=None)
-
-        # Encabezados
-        ws_stats.cell(row=1, column=1, value="SIGLA")
-        ws_stats.cell(row=1, column=2, value="DESC")
-        ws_stats.cell(row=1, column=3, value="1T")
-        ws_stats.cell(row=1, column=4, value="6RT")
-        ws_stats.cell(row=1, column=5, value="6T")
-        
-        # Mantener la columna "3" si existía
-        if columna_3_existe:
-            ws_stats.cell(row=1, column=6, value="3")
-            ws_stats.cell(row=1, column=7, value="6S")
-            ws_stats.cell(row=1, column=8, value="6N")
-            ws_stats.cell(row=1, column=9, value="DIURNA")  # 6S + 6N
-            num_columnas = 9
-        else:
-            ws_stats.cell(row=1, column=6, value="6S")
-            ws_stats.cell(row=1, column=7, value="6N")
-            ws_stats.cell(row=1, column=8, value="DIURNA")  # 6S + 6N
-            num_columnas = 8
-
-        header_fill = PatternFill(start_color="E6E6E6", end_color="E6E6E6", fill_type="solid")
-        header_font = Font(bold=True)
-        for col in range(1, num_columnas + 1):
-            c = ws_stats.cell(row=1, column=col)
-            c.fill = header_fill
-            c.font = header_font
-
-        hoja = self._nombre_hoja_horario()
-        fila_destino = 2
-        for fila in range(2, 26):
-            trabajador = self.ws.cell(row=fila, column=1).value
-            if not trabajador:
-                continue
-            ws_stats.cell(row=fila_destino, column=1, value=trabajador)
-
-            # DESC + TROP
-            formula_desc = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"DESC")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"TROP")'
-            )
-            ws_stats.cell(row=fila_destino, column=2, value=formula_desc)
-
-            # 1T = 1T + 7 + 1
-            formula_1t = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"1T")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"7")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"1")'
-            )
-            ws_stats.cell(row=fila_destino, column=3, value=formula_1t)
-
-            # 6RT = 6RT + 7 + 6R
-            formula_6rt = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"6RT")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"7")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"6R")'
-            )
-            ws_stats.cell(row=fila_destino, column=4, value=formula_6rt)
-
-            # 6T = 6TT + 6T
-            formula_6t = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"6TT")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"6T")'
-            )
-            ws_stats.cell(row=fila_destino, column=5, value=formula_6t)
-
-            # Columna "3" (turnos 3) si existía
-            if columna_3_existe:
-                formula_3 = f'=COUNTIF({hoja}!B{fila}:AF{fila},"3")'
-                ws_stats.cell(row=fila_destino, column=6, value=formula_3)
-                
-                # 6S
-                formula_6s = f'=COUNTIF({hoja}!B{fila}:AF{fila},"6S")'
-                ws_stats.cell(row=fila_destino, column=7, value=formula_6s)
-
-                # 6N
-                formula_6n = f'=COUNTIF({hoja}!B{fila}:AF{fila},"6N")'
-                ws_stats.cell(row=fila_destino, column=8, value=formula_6n)
-
-                # DIURNA = 6S + 6N
-                formula_diurna = (
-                    f'=COUNTIF({hoja}!B{fila}:AF{fila},"6S")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"6N")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"6MT")'
-                )
-                ws_stats.cell(row=fila_destino, column=9, value=formula_diurna)
-            else:
-                # 6S
-                formula_6s = f'=COUNTIF({hoja}!B{fila}:AF{fila},"6S")'
-                ws_stats.cell(row=fila_destino, column=6, value=formula_6s)
-
-                # 6N
-                formula_6n = f'=COUNTIF({hoja}!B{fila}:AF{fila},"6N")'
-                ws_stats.cell(row=fila_destino, column=7, value=formula_6n)
-
-                # DIURNA = 6S + 6N
-                formula_diurna = (
-                    f'=COUNTIF({hoja}!B{fila}:AF{fila},"6S")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"6N")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"6MT")'
-                )
-                ws_stats.cell(row=fila_destino, column=8, value=formula_diurna)
-
-            fila_destino += 1
-
-        # Ajustar anchos de columna
-        if columna_3_existe:
-            widths = [('A', 10), ('B', 8), ('C', 8), ('D', 8), ('E', 8), ('F', 8), ('G', 8), ('H', 8), ('I', 10)]
-        else:
-            widths = [('A', 10), ('B', 8), ('C', 8), ('D', 8), ('E', 8), ('F', 8), ('G', 8), ('H', 10)]
-        
-        for col, width in widths:
-            ws_stats.column_dimensions[col].width = width
+
+    def _candidatos_del_dia(self, col_dia: int) -> List[str]:
+        """Quienes pueden recibir 6S/6N en el día (vacío si el día no admite diurnas)."""
+        puede_asignar, _, _, _ = self._puede_asignar_turnos(col_dia)
+        return self._obtener_trabajadores_disponibles(col_dia) if puede_asignar else []
+
+    def _asignar_y_clasificar_dia(self, col: int) -> Tuple[int, Optional[str], Optional[tuple]]:
+        """Asigna el día y devuelve (col, lista del reporte, fila del reporte); lista None = no se informa."""
+        header = self.grid.encabezado(col)
+        # Verificar si se puede asignar
+        puede_asignar, personal_operativo, disponibles_count, razon = self._puede_asignar_turnos(col)
+
+        if not puede_asignar:
+            if razon == "Turno conflictivo":
+                return col, "conflictos", (header, personal_operativo, disponibles_count)
+            if personal_operativo in [9, 10]:
+                return col, "9_10", (header, personal_operativo, disponibles_count, razon)
+            if personal_operativo == 11:
+                return col, "11", (header, personal_operativo, disponibles_count, razon)
+            return col, "12_mas", (header, personal_operativo, disponibles_count, razon)
+
+        # Intentar asignar (solo si puede asignar)
+        trabajador_6s, trabajador_6n = self.asignar_turnos_en_dia(col)
+        if trabajador_6s or trabajador_6n:
+            return col, "realizadas", (header, trabajador_6s, trabajador_6n, personal_operativo, disponibles_count)
+        # Si debería poder asignar pero no lo hizo, es un error
+        if personal_operativo in [9, 10]:
+            return col, "9_10", (header, personal_operativo, disponibles_count, "Error en asignación")
+        if personal_operativo == 11:
+            return col, "11", (header, personal_operativo, disponibles_count, "Error en asignación")
+        return col, None, None
 
     def _generar_reporte_detallado(self) -> None:
         """Genera un reporte detallado de disponibilidad y asignaciones por día"""
@@ -562,41 +394,28 @@ class AsignadorTurnosDiurnas:
         print("REPORTE DETALLADO DE ASIGNACIÓN DE TURNOS DIURNOS (6S y 6N)")
         print("="*80)
         
-        max_col = self.ws.max_column
         asignaciones_realizadas = []
         dias_con_9_10_personal = []
         dias_con_11_personal = []
         dias_sin_asignar_12_mas = []
         dias_con_conflictos = []
         
-        for col in range(2, max_col + 1):
-            header = self.ws.cell(row=1, column=col).value
-            if not header or header == "SIGLA ATCO":
-                continue
-                
-            # Verificar si se puede asignar
-            puede_asignar, personal_operativo, disponibles_count, razon = self._puede_asignar_turnos(col)
-            
-            if not puede_asignar:
-                if razon == "Turno conflictivo":
-                    dias_con_conflictos.append((header, personal_operativo, disponibles_count))
-                elif personal_operativo in [9, 10]:
-                    dias_con_9_10_personal.append((header, personal_operativo, disponibles_count, razon))
-                elif personal_operativo == 11:
-                    dias_con_11_personal.append((header, personal_operativo, disponibles_count, razon))
-                else:
-                    dias_sin_asignar_12_mas.append((header, personal_operativo, disponibles_count, razon))
-            else:
-                # Intentar asignar (solo si puede asignar)
-                trabajador_6s, trabajador_6n = self.asignar_turnos_en_dia(col)
-                if trabajador_6s or trabajador_6n:
-                    asignaciones_realizadas.append((header, trabajador_6s, trabajador_6n, personal_operativo, disponibles_count))
-                else:
-                    # Si debería poder asignar pero no lo hizo, es un error
-                    if personal_operativo in [9, 10]:
-                        dias_con_9_10_personal.append((header, personal_operativo, disponibles_count, "Error en asignación"))
-                    elif personal_operativo == 11:
-                        dias_con_11_personal.append((header, personal_operativo, disponibles_count, "Error en asignación"))
+        listas = {
+            "realizadas": asignaciones_realizadas,
+            "9_10": dias_con_9_10_personal,
+            "11": dias_con_11_personal,
+            "12_mas": dias_sin_asignar_12_mas,
+            "conflictos": dias_con_conflictos,
+        }
+        columnas = [
+            col for col in self.grid.columnas()
+            if self.grid.encabezado(col) and self.grid.encabezado(col) != "SIGLA ATCO"
+        ]
+        resultados = recorrer_dias(columnas, self._asignar_y_clasificar_dia, self.orden_dias, self._candidatos_del_dia)
+        # El reporte sigue el calendario aunque el orden restringido procese los días en otro orden
+        for _, categoria, item in sorted(resultados, key=lambda resultado: resultado[0]):
+            if categoria is not None:
+                listas[categoria].append(item)
         
         # Mostrar asignaciones realizadas
         print(f"\n🎯 ASIGNACIONES REALIZADAS: {len(asignaciones_realizadas)}")
@@ -669,7 +488,7 @@ class AsignadorTurnosDiurnas:
         print("="*80)
         return len(asignaciones_realizadas)
 
-    def procesar_todos_los_dias(self) -> None:
+    def procesar_todos_los_dias(self, guardar: bool = True) -> None:
         # Actualizar la fila de conteo operativo estático antes de asignar
         print("🔄 Actualizando fila de conteo operativo estático...")
         self._actualizar_fila_conteo_operativo()
@@ -685,6 +504,10 @@ class AsignadorTurnosDiurnas:
 
         # Guardar archivo
         salida = "horarioUnificado_con_diurnas.xlsx"
+        self.grid.volcar_en_hoja(self.ws)
+        if not guardar:
+            return
+        self.estilos.aplicar()
         try:
             self.wb.save(salida)
             print(f"\n✅ Archivo guardado como: {salida}")
@@ -1,10 +1,14 @@
-import openpyxl
 import random
-from collections import defaultdict
-from openpyxl.styles import PatternFill, Font
-from typing import List, Optional, Dict, Set
+from typing import List, Optional, Set
 import os
 
+from cargador_horarios import abrir_horario
+from catalogo_turnos import TURNOS_BLOQUEANTES, color_turno, normalizar_turno
+from estadisticas_horario import EscritorEstadisticas
+from estilos_horario import estilos_compartidos
+from grilla_horario import GrillaHorario
+from selector_equitativo import ContadorEquitativo
+
 
 class AsignadorTurnosMofis:
     """
@@ -16,7 +20,7 @@ class AsignadorTurnosMofis:
       * 2 elegibles: [S, N]
       * 1 elegible: [N]
     - NO asignar si tienen turnos no operativos (DESC, TROP, LIBR, VACA, etc.)
-    - SÍ sobreescribir turnos como X que no están en la lista de no operativos
+    - SÍ sobreescribir turnos como X (no operativos marcados 'reemplazable' en catalogo_turnos.py)
     - Priorizar equidad en cantidad de turnos S+N por trabajador
     - Colorear celdas de amarillo claro
     - Verificar que no existan ya estos turnos en el día
@@ -26,25 +30,8 @@ class AsignadorTurnosMofis:
 
     TRABAJADORES_ELEGIBLES = ['MEI', 'VCM', 'ROP', 'WEH']
     
-    # Turnos no operativos que impiden asignación
-    TURNOS_NO_OPERATIVOS = {
-        # Turnos básicos
-        "DESC", "TROP", "LIBR",
-        # Turnos completos
-        "VACA", "COME", "COMT", "COMS",
-        # Turnos adicionales originales
-        "SIND", "CMED", "CERT", "LICR",
-        # Formación, instrucción y entrenamiento
-        "CAPA", "MCAE", "TCAE", "MCHC", "TCHC", "NCHC", "ACHC",
-        "MENT", "TENT", "NENT", "AENT",
-        "MINS", "TINS", "NINS", "AINS",
-        # Gestión, oficinas y grupos de trabajo
-        "MCOR", "TCOR", "MSMS", "TSMS", "MDBM", "TDBM",
-        "MDOC", "TDOC", "MPRO", "TPRO", "MATF", "TATF",
-        "MGST", "TGST", "MOFI", "TOFI",
-        # Operativos y asignaciones especiales
-        "CET", "ATC", "KATC", "XATC", "YATC", "ZATC"
-    }
+    # Turnos no operativos que impiden asignación (catálogo único; las X se pueden sobrescribir)
+    TURNOS_NO_OPERATIVOS = TURNOS_BLOQUEANTES
     
     # Mapeo de cantidad de elegibles a turnos a asignar
     TURNOS_POR_CANTIDAD = {
@@ -54,7 +41,9 @@ class AsignadorTurnosMofis:
         1: ["N"]
     }
 
-    def __init__(self, archivo_entrada: Optional[str] = None) -> None:
+    def __init__(self, archivo_entrada: Optional[str] = None, wb=None,
+                 grid: Optional[GrillaHorario] = None,
+                 semilla: Optional[int] = None) -> None:
         # Elegir el archivo de entrada más reciente disponible
         candidatos = [
             archivo_entrada,
@@ -73,10 +62,19 @@ class AsignadorTurnosMofis:
             elegido = "horarioUnificado_procesado.xlsx"
         self.archivo_entrada = elegido
 
-        self.wb = openpyxl.load_workbook(self.archivo_entrada)
+        # El pipeline puede pasar el libro y la grilla ya cargados (sin releer el xlsx)
+        if wb is None:
+            # Ejecución suelta: xlsx o instantánea .hsnap (aplicada sobre el xlsx de plantilla)
+            wb, grid = abrir_horario(self.archivo_entrada)
+        self.wb = wb
         self.ws = self._obtener_hoja_horario()
-        self.contador_sn: Dict[str, int] = defaultdict(int)  # Contador de turnos S+N
-        random.seed()
+        # Grilla en memoria: se lee una vez y se vuelca a la hoja al guardar
+        self.grid = grid if grid is not None else GrillaHorario.desde_hoja(self.ws)
+        self.estilos = estilos_compartidos(self.ws)
+        # Ids de los turnos que bloquean la asignación (los del catálogo ya están internados)
+        self._ids_bloqueantes = self.grid.ids_de(self.TURNOS_NO_OPERATIVOS)
+        self.contador_sn: ContadorEquitativo = ContadorEquitativo()  # Contador de turnos S+N
+        random.seed(semilla)
         self._inicializar_contadores_desde_hoja()
 
     def _obtener_hoja_horario(self):
@@ -89,23 +87,19 @@ class AsignadorTurnosMofis:
         return self.ws.title
 
     def _obtener_fila_trabajador(self, trabajador: str) -> Optional[int]:
-        for fila in range(2, 26):
-            valor = self.ws.cell(row=fila, column=1).value
-            if valor and str(valor).strip().upper() == trabajador.upper():
-                return fila
-        return None
+        return self.grid.fila_trabajador(trabajador)
 
     def _es_turno_no_operativo(self, turno: str) -> bool:
         """Verifica si un turno está en la lista de no operativos"""
         if turno is None:
             return False
-        return str(turno).strip().upper() in self.TURNOS_NO_OPERATIVOS
+        return normalizar_turno(turno) in self.TURNOS_NO_OPERATIVOS
 
     def _es_turno_s_o_n(self, turno: str) -> bool:
         """Verifica si un turno es S o N (para conteo de equidad)"""
         if turno is None:
             return False
-        return str(turno).strip().upper() in {"S", "N"}
+        return normalizar_turno(turno) in {"S", "N"}
 
     def _obtener_elegibles_disponibles(self, col_dia: int) -> List[str]:
         """Obtiene lista de trabajadores elegibles que no tienen turnos no operativos"""
@@ -114,45 +108,28 @@ class AsignadorTurnosMofis:
             fila = self._obtener_fila_trabajador(trabajador)
             if not fila:
                 continue
-            celda = self.ws.cell(row=fila, column=col_dia)
-            valor = celda.value
-            
             # Si la celda está vacía o tiene un turno que NO está en la lista de no operativos, es elegible
-            if valor is None or str(valor).strip() == "" or not self._es_turno_no_operativo(valor):
+            if self.grid.codigo_id(fila, col_dia) not in self._ids_bloqueantes:
                 disponibles.append(trabajador)
         
         return disponibles
 
     def _existe_turno_en_dia(self, turno: str, col_dia: int) -> bool:
         """Verifica si ya existe un turno específico en el día"""
-        for fila in range(2, 26):
-            val = self.ws.cell(row=fila, column=col_dia).value
-            if val is None:
-                continue
-            if str(val).strip().upper() == turno.upper():
-                return True
-        return False
+        return self.grid.existe_en_dia(col_dia, turno)
 
     def _seleccionar_equitativo(self, candidatos: List[str]) -> Optional[str]:
         """Selecciona el trabajador con menos turnos S+N para mantener equidad"""
         if not candidatos:
             return None
-        min_val = min(self.contador_sn[c] for c in candidatos)
-        empatados = [c for c in candidatos if self.contador_sn[c] == min_val]
-        return random.choice(empatados)
+        return self.contador_sn.seleccionar(candidatos)
 
     def _inicializar_contadores_desde_hoja(self) -> None:
         """Inicializa contadores de turnos S+N desde el archivo existente"""
-        for fila in range(2, 26):
-            trabajador = self.ws.cell(row=fila, column=1).value
-            if not trabajador:
-                continue
-            for col in range(2, self.ws.max_column + 1):
-                val = self.ws.cell(row=fila, column=col).value
-                if val is None:
-                    continue
+        for fila, trabajador in self.grid.trabajadores():
+            for val in self.grid.valores_fila(fila):
                 if self._es_turno_s_o_n(val):
-                    self.contador_sn[str(trabajador).strip().upper()] += 1
+                    self.contador_sn[trabajador] += 1
 
     def asignar_turnos_en_dia(self, col_dia: int) -> List[str]:
         """Asigna turnos MOFIS en un día específico"""
@@ -191,10 +168,10 @@ class AsignadorTurnosMofis:
             if not fila:
                 continue
             
-            celda = self.ws.cell(row=fila, column=col_dia, value=turno)
+            self.grid.asignar(fila, col_dia, turno)
             
             # Colorear celda de amarillo claro
-            celda.fill = PatternFill(start_color="6A7201", end_color="6A7201", fill_type="solid")
+            self.estilos.pintar(fila, col_dia, color_turno(turno))
             
             # Actualizar contador si es turno S o N
             if self._es_turno_s_o_n(turno):
@@ -207,11 +184,11 @@ class AsignadorTurnosMofis:
         
         return asignaciones
 
-    def procesar_todos_los_dias(self) -> None:
+    def procesar_todos_los_dias(self, guardar: bool = True) -> None:
         """Procesa todos los días del mes asignando turnos MOFIS"""
         total_asignaciones = 0
         
-        for col in range(2, self.ws.max_column + 1):
+        for col in self.grid.columnas():
             asignaciones = self.asignar_turnos_en_dia(col)
             if asignaciones:
                 total_asignaciones += len(asignaciones)
@@ -227,6 +204,10 @@ class AsignadorTurnosMofis:
         self._actualizar_hoja_estadisticas()
 
         salida = "horarioUnificado_con_mofis.xlsx"
+        self.grid.volcar_en_hoja(self.ws)
+        if not guardar:
+            return
+        self.estilos.aplicar()
         try:
             self.wb.save(salida)
             print(f"\nArchivo guardado como: {salida}")
@@ -237,241 +218,9 @@ class AsignadorTurnosMofis:
             print(f"Archivo por defecto en uso. Guardado como: {alternativo}")
 
     def _actualizar_hoja_estadisticas(self) -> None:
-        """Actualiza la hoja de estadísticas conservando todas las columnas del módulo de diurnas"""
-        nombre_stats = "Estadísticas"
-        if nombre_stats in self.wb.sheetnames:
-            ws_stats = self.wb[nombre_stats]
-        else:
-            ws_stats = self.wb.create_sheet(nombre_stats)
-
-        # Verificar si ya existe la columna "3" (turnos 3)
-        columna_3_existe = False
-        for col in range(1, ws_stats.max_column + 1):
-            header = ws_stats.cell(row=1, column=col).value
-            if header == "3":
-                columna_3_existe = True
-                break
-
-        # Limpiar hoja
-        for fila in ws_stats.iter_rows():
-            for celda in fila:
-                celda.value = None
-                celda.fill = PatternFill(fill_type=None)
-
-        # Encabezados (conservando todas las columnas del módulo de diurnas)
-        ws_stats.cell(row=1, column=1, value="SIGLA")
-        ws_stats.cell(row=1, column=2, value="DESC")
-        ws_stats.cell(row=1, column=3, value="1T")
-        ws_stats.cell(row=1, column=4, value="6RT")
-        ws_stats.cell(row=1, column=5, value="6T")
-        
-        # Mantener la columna "3" si existía y agregar las nuevas columnas
-        if columna_3_existe:
-            ws_stats.cell(row=1, column=6, value="3")
-            ws_stats.cell(row=1, column=7, value="6S")
-            ws_stats.cell(row=1, column=8, value="6N")
-            ws_stats.cell(row=1, column=9, value="DIURNA")  # 6S + 6N
-            ws_stats.cell(row=1, column=10, value="1D")     # Nueva columna 1D
-            ws_stats.cell(row=1, column=11, value="3D")     # Nueva columna 3D
-            ws_stats.cell(row=1, column=12, value="6D")     # Nueva columna 6D
-            num_columnas = 12
-        else:
-            ws_stats.cell(row=1, column=6, value="6S")
-            ws_stats.cell(row=1, column=7, value="6N")
-            ws_stats.cell(row=1, column=8, value="DIURNA")  # 6S + 6N
-            ws_stats.cell(row=1, column=9, value="1D")      # Nueva columna 1D
-            ws_stats.cell(row=1, column=10, value="3D")     # Nueva columna 3D
-            ws_stats.cell(row=1, column=11, value="6D")     # Nueva columna 6D
-            num_columnas = 11
-
-        header_fill = PatternFill(start_color="E6E6E6", end_color="E6E6E6", fill_type="solid")
-        header_font = Font(bold=True)
-        for col in range(1, num_columnas + 1):
-            c = ws_stats.cell(row=1, column=col)
-            c.fill = header_fill
-            c.font = header_font
-
-        hoja = self._nombre_hoja_horario()
-        fila_destino = 2
-        for fila in range(2, 26):
-            trabajador = self.ws.cell(row=fila, column=1).value
-            if not trabajador:
-                continue
-            ws_stats.cell(row=fila_destino, column=1, value=trabajador)
-
-            # DESC + TROP
-            formula_desc = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"DESC")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"TROP")'
-            )
-            ws_stats.cell(row=fila_destino, column=2, value=formula_desc)
-
-            # 1T = 1T + 7 + 1
-            formula_1t = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"1T")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"7")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"1")'
-            )
-            ws_stats.cell(row=fila_destino, column=3, value=formula_1t)
-
-            # 6RT = 6RT + 7 + 6R
-            formula_6rt = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"6RT")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"7")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"6R")'
-            )
-            ws_stats.cell(row=fila_destino, column=4, value=formula_6rt)
-
-            # 6T = 6TT + 6T
-            formula_6t = (
-                f'=COUNTIF({hoja}!B{fila}:AF{fila},"6TT")'
-                f'+COUNTIF({hoja}!B{fila}:AF{fila},"6T")'
-            )
-            ws_stats.cell(row=fila_destino, column=5, value=formula_6t)
-
-            # Columna "3" (turnos 3) si existía
-            if columna_3_existe:
-                formula_3 = f'=COUNTIF({hoja}!B{fila}:AF{fila},"3")'
-                ws_stats.cell(row=fila_destino, column=6, value=formula_3)
-                
-                # 6S
-                formula_6s = (
-                    f'=COUNTIF({hoja}!B{fila}:AF{fila},"6S")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"MASRAS")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"TASRAS")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"TSAS")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"MSAS")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"ASTASR")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"MASRTS")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"MSTASR")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"ASTS")'
-                )
-                ws_stats.cell(row=fila_destino, column=7, value=formula_6s)
-
-                # 6N = 6N + S + N + MCORTS + MCORTN + nuevos turnos + turnos adicionales
-                formula_6n = (
-                    f'=COUNTIF({hoja}!B{fila}:AF{fila},"6N")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"S")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"N")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"MCORTS")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"MCORTN")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"MANRAS")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"TANRAS")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"TNAS")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"MNAS")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"6MT")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"MNTANR")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"MANRTN")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"ASTANR")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"ASTN")'
-                )
-                ws_stats.cell(row=fila_destino, column=8, value=formula_6n)
-
-                # DIURNA = 6S + 6N
-                formula_diurna = (
-                    f'=COUNTIF({hoja}!B{fila}:AF{fila},"6S")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"6N")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"6MT")'
-                )
-                ws_stats.cell(row=fila_destino, column=9, value=formula_diurna)
-                
-                # 1D = BANTD + BLPTD + 6*(6ND + 6SN + 6MTD) - con ponderación por horas
-                formula_1d = (
-                    f'=COUNTIF({hoja}!B{fila}:AF{fila},"BANTD")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"BLPTD")'
-                    f'+6*COUNTIF({hoja}!B{fila}:AF{fila},"6ND")'
-                    f'+6*COUNTIF({hoja}!B{fila}:AF{fila},"6SN")'
-                    f'+6*COUNTIF({hoja}!B{fila}:AF{fila},"6MTD")'
-                )
-                ws_stats.cell(row=fila_destino, column=10, value=formula_1d)
-
-                # 3D = 3D
-                formula_3d = f'=3*COUNTIF({hoja}!B{fila}:AF{fila},"3D")'
-                ws_stats.cell(row=fila_destino, column=11, value=formula_3d)
-
-                # 6D = 6*(NLPTD + NLPRD + NANTD + NANRD) - con ponderación por horas
-                formula_6d = (
-                    f'=6*COUNTIF({hoja}!B{fila}:AF{fila},"NLPTD")'
-                    f'+6*COUNTIF({hoja}!B{fila}:AF{fila},"NLPRD")'
-                    f'+6*COUNTIF({hoja}!B{fila}:AF{fila},"NANTD")'
-                    f'+6*COUNTIF({hoja}!B{fila}:AF{fila},"NANRD")'
-                )
-                ws_stats.cell(row=fila_destino, column=12, value=formula_6d)
-            else:
-                # 6S
-                formula_6s = (
-                    f'=COUNTIF({hoja}!B{fila}:AF{fila},"6S")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"MASRAS")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"TASRAS")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"TSAS")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"MSAS")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"ASTASR")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"MASRTS")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"MSTASR")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"ASTS")'
-                )
-                ws_stats.cell(row=fila_destino, column=6, value=formula_6s)
-
-                # 6N = 6N + S + N + MCORTS + MCORTN + nuevos turnos + turnos adicionales
-                formula_6n = (
-                    f'=COUNTIF({hoja}!B{fila}:AF{fila},"6N")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"S")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"N")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"MCORTS")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"MCORTN")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"MANRAS")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"TANRAS")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"TNAS")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"MNAS")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"6MT")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"MNTANR")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"MANRTN")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"ASTANR")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"ASTN")'
-                )
-                ws_stats.cell(row=fila_destino, column=7, value=formula_6n)
-
-                # DIURNA = 6S + 6N
-                formula_diurna = (
-                    f'=COUNTIF({hoja}!B{fila}:AF{fila},"6S")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"6N")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"6MT")'
-                )
-                ws_stats.cell(row=fila_destino, column=8, value=formula_diurna)
-                
-                # 1D = BANTD + BLPTD + 6*(6ND + 6SN + 6MTD) - con ponderación por horas
-                formula_1d = (
-                    f'=COUNTIF({hoja}!B{fila}:AF{fila},"BANTD")'
-                    f'+COUNTIF({hoja}!B{fila}:AF{fila},"BLPTD")'
-                    f'+6*COUNTIF({hoja}!B{fila}:AF{fila},"6ND")'
-                    f'+6*COUNTIF({hoja}!B{fila}:AF{fila},"6SN")'
-                    f'+6*COUNTIF({hoja}!B{fila}:AF{fila},"6MTD")'
-                )
-                ws_stats.cell(row=fila_destino, column=9, value=formula_1d)
-
-                # 3D = 3D
-                formula_3d = f'=3*COUNTIF({hoja}!B{fila}:AF{fila},"3D")'
-                ws_stats.cell(row=fila_destino, column=10, value=formula_3d)
-
-                # 6D = 6*(NLPTD + NLPRD + NANTD + NANRD) - con ponderación por horas
-                formula_6d = (
-                    f'=6*COUNTIF({hoja}!B{fila}:AF{fila},"NLPTD")'
-                    f'+6*COUNTIF({hoja}!B{fila}:AF{fila},"NLPRD")'
-                    f'+6*COUNTIF({hoja}!B{fila}:AF{fila},"NANTD")'
-                    f'+6*COUNTIF({hoja}!B{fila}:AF{fila},"NANRD")'
-                )
-                ws_stats.cell(row=fila_destino, column=11, value=formula_6d)
-
-            fila_destino += 1
-
-        # Ajustar anchos de columna
-        if columna_3_existe:
-            widths = [('A', 10), ('B', 8), ('C', 8), ('D', 8), ('E', 8), ('F', 8), ('G', 8), ('H', 8), ('I', 10), ('J', 8), ('K', 8), ('L', 8)]
-        else:
-            widths = [('A', 10), ('B', 8), ('C', 8), ('D', 8), ('E', 8), ('F', 8), ('G', 8), ('H', 10), ('I', 8), ('J', 8), ('K', 8)]
-        
-        for col, width in widths:
-            ws_stats.column_dimensions[col].width = width
+        """Columna 6N de la hoja 'Estadísticas' (los S / N de MOFIS cuentan ahí)."""
+        escritor = EscritorEstadisticas(self.wb, self.grid, self._nombre_hoja_horario())
+        escritor.escribir(("6N",))
 
 
 if __name__ == "__main__":
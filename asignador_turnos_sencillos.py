@@ -1,10 +1,15 @@
-import openpyxl
 import random
-from collections import defaultdict
-from openpyxl.styles import PatternFill, Font
 from typing import List, Optional, Dict, Tuple, Set
 import os
 
+from cargador_horarios import abrir_horario
+from catalogo_turnos import TURNOS_MOFIS, TURNOS_NO_OPERATIVOS, color_turno
+from contador_operativos import ContadorOperativos, ETIQUETA_OPERATIVOS, buscar_filas_etiqueta
+from dominios_dias import recorrer_dias, validar_orden_dias
+from estilos_horario import estilo_conteo_operativos, estilos_compartidos
+from grilla_horario import GrillaHorario
+from selector_equitativo import ContadorEquitativo
+
 
 class AsignadorTurnosSencillos:
     """
@@ -22,6 +27,10 @@ class AsignadorTurnosSencillos:
     - Archivo de entrada: "horarioUnificado_con_mofis.xlsx"
     - Archivo de salida: "horarioUnificado_con_sencillos.xlsx"
     - Conserva la hoja de Estadísticas sin modificar para compatibilidad con stat_transformada.py
+    - orden_dias="restringido" (dominios_dias.py): procesa primero los días con menos candidatos
+    - respaldo_alternativos=True: en días con BLPTD/NANRD, si los preferidos no alcanzan para MLPR/TLPR/TLPT,
+      completa el primer grupo con los alternativos. Los alternativos también son del segundo grupo, así
+      que solo se usan los que le sobran a ese grupo para cubrir sus turnos pendientes del día
     """
 
     TRABAJADORES_ELEGIBLES = [
@@ -33,22 +42,29 @@ class AsignadorTurnosSencillos:
     TRABAJADORES_PREFERIDOS_CONFLICTOS = ["YIS", "MAQ", "DJO", "AFG", "JLF", "JMV"]
     TRABAJADORES_ALTERNATIVOS_CONFLICTOS = ['FCE', 'JBV', 'GCE', 'GMT', 'HZG', 'JIS', 'CDT', 'WGG']
     TRABAJADORES_SEGUNDO_GRUPO_CONFLICTOS = ['HLG', 'ECE', 'DFB', 'MLS', 'FCE', 'JBV', 'GMT', 'BRS', 'HZG', 'JIS', 'CDT', 'WGG', 'GCE']
+    TURNOS_SEGUNDO_GRUPO_CONFLICTOS = ["MANR", "TANR", "TANT", "MAST", "MASR", "TASR"]
 
     # Colores para los turnos
-    COLOR_MANR = "FF9999"    # Rojo claro
-    COLOR_TANR = "FF9999"    # Rojo claro  
-    COLOR_MASR = "CC0000"    # Rojo medio oscuro
-    COLOR_TASR = "CC0000"    # Rojo medio oscuro
-    COLOR_ASIG = "808080"    # Gris medio
+    COLOR_MANR = color_turno("MANR")    # Rojo claro
+    COLOR_TANR = color_turno("TANR")    # Rojo claro  
+    COLOR_MASR = color_turno("MASR")    # Rojo medio oscuro
+    COLOR_TASR = color_turno("TASR")    # Rojo medio oscuro
+    COLOR_ASIG = color_turno("ASIG")    # Gris medio
     
     # Colores para turnos de conflictos
-    COLOR_MLPR = "FFD700"    # Dorado
-    COLOR_TLPR = "FFD700"    # Dorado
-    COLOR_TLPT = "FFD700"    # Dorado
-    COLOR_TANT = "FFA500"    # Naranja
-    COLOR_MAST = "FF4500"    # Naranja rojizo
-
-    def __init__(self, archivo_entrada: Optional[str] = None) -> None:
+    COLOR_MLPR = color_turno("MLPR")    # Dorado
+    COLOR_TLPR = color_turno("TLPR")    # Dorado
+    COLOR_TLPT = color_turno("TLPT")    # Dorado
+    COLOR_TANT = color_turno("TANT")    # Naranja
+    COLOR_MAST = color_turno("MAST")    # Naranja rojizo
+
+    # Turnos no operativos (catalogo_turnos.py) más los turnos MOFIS
+    TURNOS_NO_OPERATIVOS_Y_MOFIS = TURNOS_NO_OPERATIVOS | TURNOS_MOFIS
+
+    def __init__(self, archivo_entrada: Optional[str] = None, wb=None,
+                 grid: Optional[GrillaHorario] = None,
+                 semilla: Optional[int] = None, orden_dias: str = "calendario",
+                 respaldo_alternativos: bool = False) -> None:
         candidatos = [
             archivo_entrada,
             "horarioUnificado_con_mofis.xlsx",
@@ -65,28 +81,58 @@ class AsignadorTurnosSencillos:
             elegido = "horarioUnificado_con_mofis.xlsx"
         self.archivo_entrada = elegido
 
-        self.wb = openpyxl.load_workbook(self.archivo_entrada)
+        # El pipeline puede pasar el libro y la grilla ya cargados (sin releer el xlsx)
+        self.leido_de_archivo = wb is None  # el resumen solo nombra el archivo si se leyó
+        if wb is None:
+            # Ejecución suelta: xlsx o instantánea .hsnap (aplicada sobre el xlsx de plantilla)
+            wb, grid = abrir_horario(self.archivo_entrada)
+        self.wb = wb
         self.ws = self._obtener_hoja_horario()
+        # Grilla en memoria: se lee una vez y se vuelca a la hoja al guardar
+        self.grid = grid if grid is not None else GrillaHorario.desde_hoja(self.ws)
+        # Conteo vivo de personal operativo por día (se ajusta solo al asignar)
+        self.contador_operativos = ContadorOperativos(self.grid, self.TURNOS_NO_OPERATIVOS_Y_MOFIS)
+        # Rellenos de la hoja: se anotan al asignar y se aplican una vez al guardar
+        self.estilos = estilos_compartidos(self.ws)
+        self.colores_por_tipo: Dict[str, str] = {
+            "MANR": self.COLOR_MANR, "TANR": self.COLOR_TANR, "MASR": self.COLOR_MASR,
+            "TASR": self.COLOR_TASR, "ASIG": self.COLOR_ASIG, "MLPR": self.COLOR_MLPR,
+            "TLPR": self.COLOR_TLPR, "TLPT": self.COLOR_TLPT, "TANT": self.COLOR_TANT,
+            "MAST": self.COLOR_MAST,
+        }
 
         # Snapshot del estado original
         self.original_nonempty: Set[Tuple[int, int]] = set()
         self._snapshot_estado_original()
 
         # Contadores de equidad por tipo de turno
-        self.contador_manr: Dict[str, int] = defaultdict(int)
-        self.contador_tanr: Dict[str, int] = defaultdict(int)
-        self.contador_masr: Dict[str, int] = defaultdict(int)
-        self.contador_tasr: Dict[str, int] = defaultdict(int)
-        self.contador_asig: Dict[str, int] = defaultdict(int)
+        self.contador_manr: ContadorEquitativo = ContadorEquitativo()
+        self.contador_tanr: ContadorEquitativo = ContadorEquitativo()
+        self.contador_masr: ContadorEquitativo = ContadorEquitativo()
+        self.contador_tasr: ContadorEquitativo = ContadorEquitativo()
+        self.contador_asig: ContadorEquitativo = ContadorEquitativo()
         
         # Contadores para turnos de conflictos
-        self.contador_mlpr: Dict[str, int] = defaultdict(int)
-        self.contador_tlpr: Dict[str, int] = defaultdict(int)
-        self.contador_tlpt: Dict[str, int] = defaultdict(int)
-        self.contador_tant: Dict[str, int] = defaultdict(int)
-        self.contador_mast: Dict[str, int] = defaultdict(int)
+        self.contador_mlpr: ContadorEquitativo = ContadorEquitativo()
+        self.contador_tlpr: ContadorEquitativo = ContadorEquitativo()
+        self.contador_tlpt: ContadorEquitativo = ContadorEquitativo()
+        self.contador_tant: ContadorEquitativo = ContadorEquitativo()
+        self.contador_mast: ContadorEquitativo = ContadorEquitativo()
+
+        self.contadores_por_tipo: Dict[str, ContadorEquitativo] = {
+            "MANR": self.contador_manr, "TANR": self.contador_tanr,
+            "MASR": self.contador_masr, "TASR": self.contador_tasr,
+            "ASIG": self.contador_asig, "MLPR": self.contador_mlpr,
+            "TLPR": self.contador_tlpr, "TLPT": self.contador_tlpt,
+            "TANT": self.contador_tant, "MAST": self.contador_mast,
+        }
 
-        random.seed()
+        # Orden de los días: "calendario" o "restringido" (más restringido primero, dominios_dias.py)
+        self.orden_dias = validar_orden_dias(orden_dias)
+        # Completar MLPR/TLPR/TLPT con alternativos cuando se agotan los preferidos (días con BLPTD/NANRD)
+        self.respaldo_alternativos = respaldo_alternativos
+
+        random.seed(semilla)
         self._inicializar_contadores_desde_hoja()
 
     def _obtener_hoja_horario(self):
@@ -99,79 +145,28 @@ class AsignadorTurnosSencillos:
         return self.ws.title
 
     def _snapshot_estado_original(self) -> None:
-        max_col = self.ws.max_column
-        for fila in range(2, 26):
-            for col in range(2, max_col + 1):
-                valor = self.ws.cell(row=fila, column=col).value
-                if valor is not None and str(valor).strip() != "":
+        for fila in self.grid.filas():
+            for col in self.grid.columnas():
+                if not self.grid.esta_vacia(fila, col):
                     self.original_nonempty.add((fila, col))
 
     def _es_celda_originalmente_vacia(self, fila: int, col: int) -> bool:
         return (fila, col) not in self.original_nonempty
 
     def _obtener_fila_trabajador(self, trabajador: str) -> Optional[int]:
-        for fila in range(2, 26):
-            valor = self.ws.cell(row=fila, column=1).value
-            if valor and str(valor).strip().upper() == trabajador.upper():
-                return fila
-        return None
+        return self.grid.fila_trabajador(trabajador)
 
     def _contar_personal_operativo(self, col_dia: int) -> int:
         """Cuenta el personal operativo usando la misma lógica que procesador_horarios.py"""
-        turnos_no_operativos_y_mofis = {
-            # Turnos básicos
-            "DESC", "TROP",
-            # Turnos completos
-            "VACA", "COME", "COMT", "COMS",
-            # Turnos adicionales originales
-            "SIND", "CMED", "CERT", "LICR",
-            # Formación, instrucción y entrenamiento
-            "CAPA", "MCAE", "TCAE", "MCHC", "TCHC", "NCHC", "ACHC",
-            "MENT", "TENT", "NENT", "AENT",
-            "MINS", "TINS", "NINS", "AINS",
-            # Gestión, oficinas y grupos de trabajo
-            "MCOR", "TCOR", "MSMS", "TSMS", "MDBM", "TDBM",
-            "MDOC", "TDOC", "MPRO", "TPRO", "MATF", "TATF",
-            "MGST", "TGST", "MOFI", "TOFI",
-            # Operativos y asignaciones especiales
-            "CET", "ATC", "KATC", "XATC", "YATC", "ZATC", "X",
-            # Turnos MOFIS adicionales
-            "MN", "TN", "MS", "TS", "N", "S"
-        }
-        
-        count = 0
-        for fila in range(2, 26):  # Filas 2-25
-            cell_value = self.ws.cell(row=fila, column=col_dia).value
-            if cell_value is None or str(cell_value).strip() == "":
-                count += 1  # Celda vacía = operativo
-            else:
-                valor_limpio = str(cell_value).strip().upper()
-                if valor_limpio not in turnos_no_operativos_y_mofis:
-                    count += 1  # No está en lista de no operativos = operativo
-
-        return count
+        return self.contador_operativos.operativos(col_dia)
 
     def _existe_turno_conflictivo_en_dia(self, col_dia: int) -> bool:
         """Verifica si ya existe BLPTD o NANRD en el día"""
-        for fila in range(2, 26):
-            v = self.ws.cell(row=fila, column=col_dia).value
-            if v is None:
-                continue
-            val = str(v).strip().upper()
-            if val in {"BLPTD", "NANRD"}:
-                return True
-        return False
+        return self.grid.existe_en_dia(col_dia, {"BLPTD", "NANRD"})
 
     def _existe_turno_repetido_en_dia(self, turno: str, col_dia: int) -> bool:
         """Verifica si ya existe el turno específico en el día"""
-        for fila in range(2, 26):
-            v = self.ws.cell(row=fila, column=col_dia).value
-            if v is None:
-                continue
-            val = str(v).strip().upper()
-            if val == turno.upper():
-                return True
-        return False
+        return self.grid.existe_en_dia(col_dia, turno)
 
     def _obtener_trabajadores_disponibles(self, col_dia: int) -> List[str]:
         disponibles: List[str] = []
@@ -179,101 +174,35 @@ class AsignadorTurnosSencillos:
             fila = self._obtener_fila_trabajador(trabajador)
             if not fila:
                 continue
-            celda = self.ws.cell(row=fila, column=col_dia)
             if (
-                (celda.value is None or str(celda.value).strip() == "")
+                self.grid.esta_vacia(fila, col_dia)
                 and self._es_celda_originalmente_vacia(fila, col_dia)
             ):
                 disponibles.append(trabajador)
         return disponibles
 
     def _inicializar_contadores_desde_hoja(self) -> None:
-        max_col = self.ws.max_column
-        for fila in range(2, 26):
-            trabajador = self.ws.cell(row=fila, column=1).value
-            if not trabajador:
-                continue
-            trabajador = str(trabajador).strip().upper()
-            for col in range(2, max_col + 1):
-                valor = self.ws.cell(row=fila, column=col).value
-                if valor is None:
-                    continue
-                val = str(valor).strip().upper()
-                if val == "MANR":
-                    self.contador_manr[trabajador] += 1
-                elif val == "TANR":
-                    self.contador_tanr[trabajador] += 1
-                elif val == "MASR":
-                    self.contador_masr[trabajador] += 1
-                elif val == "TASR":
-                    self.contador_tasr[trabajador] += 1
-                elif val == "ASIG":
-                    self.contador_asig[trabajador] += 1
-                elif val == "MLPR":
-                    self.contador_mlpr[trabajador] += 1
-                elif val == "TLPR":
-                    self.contador_tlpr[trabajador] += 1
-                elif val == "TLPT":
-                    self.contador_tlpt[trabajador] += 1
-                elif val == "TANT":
-                    self.contador_tant[trabajador] += 1
-                elif val == "MAST":
-                    self.contador_mast[trabajador] += 1
+        for fila, trabajador in self.grid.trabajadores():
+            for val in self.grid.valores_fila(fila):
+                contador = self.contadores_por_tipo.get(val)
+                if contador is not None:
+                    contador[trabajador] += 1
 
     def _seleccionar_equitativo_por_tipo(self, candidatos: List[str], tipo_turno: str) -> Optional[str]:
         if not candidatos:
             return None
         
-        contador = None
-        if tipo_turno == "MANR":
-            contador = self.contador_manr
-        elif tipo_turno == "TANR":
-            contador = self.contador_tanr
-        elif tipo_turno == "MASR":
-            contador = self.contador_masr
-        elif tipo_turno == "TASR":
-            contador = self.contador_tasr
-        elif tipo_turno == "ASIG":
-            contador = self.contador_asig
-        elif tipo_turno == "MLPR":
-            contador = self.contador_mlpr
-        elif tipo_turno == "TLPR":
-            contador = self.contador_tlpr
-        elif tipo_turno == "TLPT":
-            contador = self.contador_tlpt
-        elif tipo_turno == "TANT":
-            contador = self.contador_tant
-        elif tipo_turno == "MAST":
-            contador = self.contador_mast
-        else:
+        contador = self.contadores_por_tipo.get(tipo_turno)
+        if contador is None:
             return random.choice(candidatos)
         
         # Equidad por menor conteo del tipo específico
-        min_val = min(contador[c] for c in candidatos)
-        empatados = [c for c in candidatos if contador[c] == min_val]
-        return random.choice(empatados)
+        return contador.seleccionar(candidatos)
 
     def _actualizar_contadores(self, trabajador: str, tipo_turno: str, delta: int = 1) -> None:
-        if tipo_turno == "MANR":
-            self.contador_manr[trabajador] += delta
-        elif tipo_turno == "TANR":
-            self.contador_tanr[trabajador] += delta
-        elif tipo_turno == "MASR":
-            self.contador_masr[trabajador] += delta
-        elif tipo_turno == "TASR":
-            self.contador_tasr[trabajador] += delta
-        elif tipo_turno == "ASIG":
-            self.contador_asig[trabajador] += delta
-        elif tipo_turno == "MLPR":
-            self.contador_mlpr[trabajador] += delta
-        elif tipo_turno == "TLPR":
-            self.contador_tlpr[trabajador] += delta
-        elif tipo_turno == "TLPT":
-            self.contador_tlpt[trabajador] += delta
-        elif tipo_turno == "TANT":
-            self.contador_tant[trabajador] += delta
-        elif tipo_turno == "MAST":
-            self.contador_mast[trabajador] += delta
+        contador = self.contadores_por_tipo.get(tipo_turno)
+        if contador is not None:
+            contador[trabajador] += delta
 
     def _asignar_turno(self, trabajador: str, col_dia: int, tipo_turno: str) -> bool:
         """Asigna un turno específico a un trabajador"""
@@ -283,30 +212,12 @@ class AsignadorTurnosSencillos:
         if not self._es_celda_originalmente_vacia(fila, col_dia):
             return False
         
-        self.ws.cell(row=fila, column=col_dia, value=tipo_turno)
-        celda = self.ws.cell(row=fila, column=col_dia)
-        
-        # Aplicar colores según el tipo de turno
-        if tipo_turno == "MANR":
-            celda.fill = PatternFill(start_color=self.COLOR_MANR, end_color=self.COLOR_MANR, fill_type="solid")
-        elif tipo_turno == "TANR":
-            celda.fill = PatternFill(start_color=self.COLOR_TANR, end_color=self.COLOR_TANR, fill_type="solid")
-        elif tipo_turno == "MASR":
-            celda.fill = PatternFill(start_color=self.COLOR_MASR, end_color=self.COLOR_MASR, fill_type="solid")
-        elif tipo_turno == "TASR":
-            celda.fill = PatternFill(start_color=self.COLOR_TASR, end_color=self.COLOR_TASR, fill_type="solid")
-        elif tipo_turno == "ASIG":
-            celda.fill = PatternFill(start_color=self.COLOR_ASIG, end_color=self.COLOR_ASIG, fill_type="solid")
-        elif tipo_turno == "MLPR":
-            celda.fill = PatternFill(start_color=self.COLOR_MLPR, end_color=self.COLOR_MLPR, fill_type="solid")
-        elif tipo_turno == "TLPR":
-            celda.fill = PatternFill(start_color=self.COLOR_TLPR, end_color=self.COLOR_TLPR, fill_type="solid")
-        elif tipo_turno == "TLPT":
-            celda.fill = PatternFill(start_color=self.COLOR_TLPT, end_color=self.COLOR_TLPT, fill_type="solid")
-        elif tipo_turno == "TANT":
-            celda.fill = PatternFill(start_color=self.COLOR_TANT, end_color=self.COLOR_TANT, fill_type="solid")
-        elif tipo_turno == "MAST":
-            celda.fill = PatternFill(start_color=self.COLOR_MAST, end_color=self.COLOR_MAST, fill_type="solid")
+        self.grid.asignar(fila, col_dia, tipo_turno)
+        
+        # Color según el tipo de turno (se aplica al guardar, con rellenos compartidos)
+        color = self.colores_por_tipo.get(tipo_turno)
+        if color:
+            self.estilos.pintar(fila, col_dia, color)
         
         self._actualizar_contadores(trabajador, tipo_turno, 1)
         return True
@@ -378,9 +289,8 @@ class AsignadorTurnosSencillos:
             fila = self._obtener_fila_trabajador(trabajador)
             if not fila:
                 continue
-            celda = self.ws.cell(row=fila, column=col_dia)
             if (
-                (celda.value is None or str(celda.value).strip() == "")
+                self.grid.esta_vacia(fila, col_dia)
                 and self._es_celda_originalmente_vacia(fila, col_dia)
             ):
                 disponibles.append(trabajador)
@@ -401,8 +311,16 @@ class AsignadorTurnosSencillos:
         else:
             trabajadores_a_usar = disponibles_alternativos
         
+        # Respaldo: solo si se empezó con preferidos (sin ellos ya se usan los alternativos)
+        usar_respaldo = self.respaldo_alternativos and bool(disponibles_preferidos)
+        en_respaldo = False
+
         # Asignar cada turno si hay trabajadores disponibles y el turno no existe
         for turno in turnos_primer_grupo:
+            if usar_respaldo and (en_respaldo or not trabajadores_a_usar):
+                # Se recalcula en cada turno: cada alternativo elegido deja uno menos al segundo grupo
+                en_respaldo = True
+                trabajadores_a_usar = self._alternativos_de_respaldo(col_dia)
             if not self._existe_turno_repetido_en_dia(turno, col_dia) and trabajadores_a_usar:
                 elegido = self._seleccionar_equitativo_por_tipo(trabajadores_a_usar, turno)
                 if elegido and self._asignar_turno(elegido, col_dia, turno):
@@ -411,10 +329,21 @@ class AsignadorTurnosSencillos:
         
         return asignaciones
 
+    def _alternativos_de_respaldo(self, col_dia: int) -> List[str]:
+        """Alternativos disponibles que el segundo grupo puede ceder sin quedar corto para sus turnos del día"""
+        alternativos = self._obtener_trabajadores_disponibles_conflictos(col_dia, self.TRABAJADORES_ALTERNATIVOS_CONFLICTOS)
+        segundo_grupo = set(self._obtener_trabajadores_disponibles_conflictos(col_dia, self.TRABAJADORES_SEGUNDO_GRUPO_CONFLICTOS))
+        pendientes = sum(
+            1 for turno in self.TURNOS_SEGUNDO_GRUPO_CONFLICTOS if not self._existe_turno_repetido_en_dia(turno, col_dia)
+        )
+        if len(segundo_grupo) > pendientes:
+            return alternativos
+        return [t for t in alternativos if t not in segundo_grupo]
+
     def asignar_turnos_conflictos_segundo_grupo(self, col_dia: int) -> List[str]:
         """Asigna turnos MANR, TANR, TANT, MAST, MASR, TASR en días con conflictos"""
         asignaciones = []
-        turnos_segundo_grupo = ["MANR", "TANR", "TANT", "MAST", "MASR", "TASR"]
+        turnos_segundo_grupo = self.TURNOS_SEGUNDO_GRUPO_CONFLICTOS
         
         # Obtener trabajadores disponibles del segundo grupo
         disponibles = self._obtener_trabajadores_disponibles_conflictos(col_dia, self.TRABAJADORES_SEGUNDO_GRUPO_CONFLICTOS)
@@ -434,7 +363,7 @@ class AsignadorTurnosSencillos:
         asignaciones_totales = []
         
         # Diagnóstico: obtener información del día
-        header = self.ws.cell(row=1, column=col_dia).value
+        header = self.grid.encabezado(col_dia)
         
         # Primer grupo: MLPR, TLPR, TLPT
         disponibles_preferidos = self._obtener_trabajadores_disponibles_conflictos(col_dia, self.TRABAJADORES_PREFERIDOS_CONFLICTOS)
@@ -461,78 +390,23 @@ class AsignadorTurnosSencillos:
 
     def _actualizar_fila_conteo_operativo(self) -> None:
         """Actualiza la fila de conteo operativo estático usando la misma lógica que procesador_horarios.py"""
-        turnos_no_operativos_y_mofis = {
-            # Turnos básicos
-            "DESC", "TROP",
-            # Turnos completos
-            "VACA", "COME", "COMT", "COMS",
-            # Turnos adicionales originales
-            "SIND", "CMED", "CERT", "LICR",
-            # Formación, instrucción y entrenamiento
-            "CAPA", "MCAE", "TCAE", "MCHC", "TCHC", "NCHC", "ACHC",
-            "MENT", "TENT", "NENT", "AENT",
-            "MINS", "TINS", "NINS", "AINS",
-            # Gestión, oficinas y grupos de trabajo
-            "MCOR", "TCOR", "MSMS", "TSMS", "MDBM", "TDBM",
-            "MDOC", "TDOC", "MPRO", "TPRO", "MATF", "TATF",
-            "MGST", "TGST", "MOFI", "TOFI",
-            # Operativos y asignaciones especiales
-            "CET", "ATC", "KATC", "XATC", "YATC", "ZATC", "X",
-            # Turnos MOFIS adicionales
-            "MN", "TN", "MS", "TS", "N", "S"
-        }
-        
-        # Buscar la fila de conteo operativo estático
-        fila_conteo = None
-        for fila in range(1, self.ws.max_row + 1):
-            valor = self.ws.cell(row=fila, column=1).value
-            if valor and str(valor).strip() == "TURNOS OPERATIVOS":
-                fila_conteo = fila
-                break
+        # Buscar la fila de conteo operativo estático (una sola pasada por la columna A)
+        fila_conteo = buscar_filas_etiqueta(self.ws, [ETIQUETA_OPERATIVOS])[ETIQUETA_OPERATIVOS]
         
         if fila_conteo is None:
             print("⚠️  No se encontró la fila 'TURNOS OPERATIVOS' para actualizar")
             return
         
-        # Actualizar conteos para cada columna
-        for col in range(2, self.ws.max_column + 1):
-            conteo_operativos = 0
-            # Contar turnos operativos según la lógica correcta
-            for row in range(2, 26):  # Filas 2-25
-                cell_value = self.ws.cell(row=row, column=col).value
-                if cell_value is None or str(cell_value).strip() == "":
-                    conteo_operativos += 1
-                else:
-                    valor_limpio = str(cell_value).strip().upper()
-                    if valor_limpio not in turnos_no_operativos_y_mofis:
-                        conteo_operativos += 1
+        # Actualizar conteos para cada columna (conteo vivo, sin recorrer la hoja)
+        for col in self.grid.columnas():
+            conteo_operativos = self.contador_operativos.operativos(col)
             
             # Escribir el conteo actualizado
-            celda_conteo = self.ws.cell(row=fila_conteo, column=col)
-            celda_conteo.value = conteo_operativos
-            
-            # Aplicar colores según el conteo (misma lógica que procesador_horarios.py)
-            rojo_intenso = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
-            rojo_medio = PatternFill(start_color="FF6666", end_color="FF6666", fill_type="solid")
-            azul_clarito = PatternFill(start_color="99CCFF", end_color="99CCFF", fill_type="solid")
-            verde_clarito = PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid")
-            verde_intenso = PatternFill(start_color="008000", end_color="008000", fill_type="solid")
-            sin_relleno = PatternFill(fill_type=None)
-            fuente_blanca = Font(color="FFFFFF")
+            self.ws.cell(row=fila_conteo, column=col).value = conteo_operativos
             
-            if conteo_operativos <= 8:
-                celda_conteo.fill = rojo_intenso
-                celda_conteo.font = fuente_blanca
-            elif conteo_operativos == 9:
-                celda_conteo.fill = rojo_medio
-            elif conteo_operativos == 10:
-                celda_conteo.fill = azul_clarito
-            elif conteo_operativos == 11:
-                celda_conteo.fill = verde_clarito
-            elif conteo_operativos == 12:
-                celda_conteo.fill = verde_intenso
-            else:
-                celda_conteo.fill = sin_relleno
+            # Colores según el conteo (misma escala que procesador_horarios.py)
+            color, fuente_celda = estilo_conteo_operativos(conteo_operativos)
+            self.estilos.pintar(fila_conteo, col, color, fuente_celda)
         
         print("✅ Fila de conteo operativo estático actualizada")
 
@@ -543,41 +417,61 @@ class AsignadorTurnosSencillos:
         else:
             print("⚠️  No se encontró la hoja de Estadísticas en el archivo de entrada")
 
+    def _candidatos_del_dia(self, col_dia: int) -> List[str]:
+        """Quienes pueden recibir un turno sencillo en el día (con BLPTD/NANRD, los de las listas de conflictos)."""
+        if self._existe_turno_conflictivo_en_dia(col_dia):
+            listas = (self.TRABAJADORES_PREFERIDOS_CONFLICTOS + self.TRABAJADORES_ALTERNATIVOS_CONFLICTOS
+                      + self.TRABAJADORES_SEGUNDO_GRUPO_CONFLICTOS)
+            return self._obtener_trabajadores_disponibles_conflictos(col_dia, list(dict.fromkeys(listas)))
+        puede_asignar, _, _, _ = self._puede_asignar_turnos(col_dia)
+        return self._obtener_trabajadores_disponibles(col_dia) if puede_asignar else []
+
+    def _asignar_y_clasificar_dia(self, col: int) -> Tuple[int, Optional[str], Optional[tuple]]:
+        """Asigna el día y devuelve (col, lista del reporte, fila del reporte); lista None = no se informa."""
+        header = self.grid.encabezado(col)
+        # Verificar si se puede asignar
+        puede_asignar, personal_operativo, disponibles_count, razon = self._puede_asignar_turnos(col)
+
+        if not puede_asignar:
+            if razon.startswith("Turno conflictivo"):
+                # Intentar asignar turnos para días con conflictos
+                asignaciones_conflicto = self.asignar_turnos_en_dia_con_conflictos(col)
+                if asignaciones_conflicto:
+                    return col, "conflictos", (header, asignaciones_conflicto, personal_operativo, disponibles_count)
+                return col, "con_conflictos", (header, personal_operativo, disponibles_count, razon)
+            return col, "sin_asignar", (header, personal_operativo, disponibles_count, razon)
+        # Intentar asignar turnos normales
+        asignaciones = self.asignar_turnos_en_dia(col)
+        if asignaciones:
+            return col, "realizadas", (header, asignaciones, personal_operativo, disponibles_count)
+        return col, None, None
+
     def _generar_reporte_detallado(self) -> None:
         """Genera un reporte detallado de disponibilidad y asignaciones por día"""
         print("\n" + "="*80)
         print("REPORTE DETALLADO DE ASIGNACIÓN DE TURNOS SENCILLOS")
         print("="*80)
         
-        max_col = self.ws.max_column
         asignaciones_realizadas = []
         asignaciones_conflictos = []
         dias_sin_asignar = []
         dias_con_conflictos = []
         
-        for col in range(2, max_col + 1):
-            header = self.ws.cell(row=1, column=col).value
-            if not header or header == "SIGLA ATCO":
-                continue
-                
-            # Verificar si se puede asignar
-            puede_asignar, personal_operativo, disponibles_count, razon = self._puede_asignar_turnos(col)
-            
-            if not puede_asignar:
-                if razon.startswith("Turno conflictivo"):
-                    # Intentar asignar turnos para días con conflictos
-                    asignaciones_conflicto = self.asignar_turnos_en_dia_con_conflictos(col)
-                    if asignaciones_conflicto:
-                        asignaciones_conflictos.append((header, asignaciones_conflicto, personal_operativo, disponibles_count))
-                    else:
-                        dias_con_conflictos.append((header, personal_operativo, disponibles_count, razon))
-                else:
-                    dias_sin_asignar.append((header, personal_operativo, disponibles_count, razon))
-            else:
-                # Intentar asignar turnos normales
-                asignaciones = self.asignar_turnos_en_dia(col)
-                if asignaciones:
-                    asignaciones_realizadas.append((header, asignaciones, personal_operativo, disponibles_count))
+        listas = {
+            "realizadas": asignaciones_realizadas,
+            "conflictos": asignaciones_conflictos,
+            "sin_asignar": dias_sin_asignar,
+            "con_conflictos": dias_con_conflictos,
+        }
+        columnas = [
+            col for col in self.grid.columnas()
+            if self.grid.encabezado(col) and self.grid.encabezado(col) != "SIGLA ATCO"
+        ]
+        resultados = recorrer_dias(columnas, self._asignar_y_clasificar_dia, self.orden_dias, self._candidatos_del_dia)
+        # El reporte sigue el calendario aunque el orden restringido procese los días en otro orden
+        for _, categoria, item in sorted(resultados, key=lambda resultado: resultado[0]):
+            if categoria is not None:
+                listas[categoria].append(item)
         
         # Mostrar asignaciones realizadas
         print(f"\n🎯 ASIGNACIONES REALIZADAS: {len(asignaciones_realizadas)}")
@@ -635,8 +529,9 @@ class AsignadorTurnosSencillos:
         print("="*100)
         return len(asignaciones_realizadas) + len(asignaciones_conflictos)
 
-    def procesar_todos_los_dias(self) -> None:
-        print(f"📁 Procesando archivo: {self.archivo_entrada}")
+    def procesar_todos_los_dias(self, guardar: bool = True) -> None:
+        if self.leido_de_archivo:
+            print(f"📁 Procesando archivo: {self.archivo_entrada}")
         
         # Actualizar la fila de conteo operativo estático antes de asignar
         print("🔄 Actualizando fila de conteo operativo estático...")
@@ -650,6 +545,10 @@ class AsignadorTurnosSencillos:
 
         # Guardar archivo
         salida = "horarioUnificado_con_sencillos.xlsx"
+        self.grid.volcar_en_hoja(self.ws)
+        if not guardar:
+            return
+        self.estilos.aplicar()
         try:
             self.wb.save(salida)
             print(f"\n✅ Archivo guardado como: {salida}")
@@ -0,0 +1,260 @@
+"""
+Rebalanceo de equidad por flujo de costo mínimo.
+
+Los asignadores 1, 3, 6R, 6T, 6RT y diurnas terminan con un bucle
+'_rebalancear_para_paridad' que, mientras max - min > 1, busca al trabajador
+con más turnos y al de menos, recorre todas las columnas buscando una celda que
+se pueda pasar de uno a otro y hace UN movimiento por vuelta (diurnas además se
+rinde a las 50 vueltas). Con modo_balanceo="flujo" esas etapas resuelven en su
+lugar el reparto completo de una vez:
+
+    S ─► celda movible ─┬─► trabajador actual (quedarse, costo 0)
+                        └─► (destino, día) ─► trabajador destino (mover, costo 1)
+    trabajador ─► T  con arcos unitarios de costo convexo ESCALA·(2·k − 1)
+
+- Celdas movibles: las del turno de la etapa que NO estaban en la hoja original.
+- Un destino es válido si su celda está vacía y era vacía originalmente, y si
+  las reglas de la etapa (conflictos del día, restricciones de adyacencia) lo
+  permiten evaluadas con la celda de origen ya vaciada.
+- El costo convexo minimiza la suma de cuadrados de los conteos finales, que es
+  mínima exactamente en los repartos con max - min ≤ 1 cuando alguno es
+  alcanzable; ESCALA > número de celdas hace que, entre repartos igual de
+  equilibrados, gane el que mueve menos turnos.
+
+Los movimientos del plan se aplican uno a uno re-evaluando el destino sobre la
+hoja viva (dos movimientos al mismo trabajador en días contiguos pueden chocar
+por adyacencia); si alguno se descarta se vuelve a planificar con el estado
+actualizado.
+"""
+
+import heapq
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from grilla_horario import GrillaHorario
+
+MODOS_BALANCEO = ("iterativo", "flujo")
+
+
+def validar_modo_balanceo(modo: str) -> str:
+    if modo not in MODOS_BALANCEO:
+        raise ValueError(f"modo_balanceo desconocido '{modo}' (opciones: {', '.join(MODOS_BALANCEO)})")
+    return modo
+
+
+@dataclass(frozen=True)
+class Movimiento:
+    origen: str  # trabajador que cede el turno
+    destino: str  # trabajador que lo recibe
+    col: int
+    turno: str
+
+
+class FlujoCostoMinimo:
+    """Flujo de costo mínimo por caminos más cortos sucesivos (Dijkstra con potenciales)."""
+
+    def __init__(self, n: int) -> None:
+        self.n = n
+        # Arista: [destino, capacidad, costo, índice de la inversa]
+        self.ady: List[List[list]] = [[] for _ in range(n)]
+
+    def agregar_arco(self, u: int, v: int, capacidad: int, costo: int) -> None:
+        self.ady[u].append([v, capacidad, costo, len(self.ady[v])])
+        self.ady[v].append([u, 0, -costo, len(self.ady[u]) - 1])
+
+    def resolver(self, s: int, t: int, flujo_max: int) -> Tuple[int, int]:
+        """Envía hasta flujo_max unidades de s a t; devuelve (flujo, costo). Costos iniciales ≥ 0."""
+        n = self.n
+        potencial = [0] * n
+        flujo = costo = 0
+        while flujo < flujo_max:
+            dist = [None] * n
+            previo: List[Optional[Tuple[int, int]]] = [None] * n
+            dist[s] = 0
+            cola = [(0, s)]
+            while cola:
+                d, u = heapq.heappop(cola)
+                if d > dist[u]:
+                    continue
+                for i, (v, cap, c, _) in enumerate(self.ady[u]):
+                    if cap <= 0:
+                        continue
+                    nd = d + c + potencial[u] - potencial[v]
+                    if dist[v] is None or nd < dist[v]:
+                        dist[v] = nd
+                        previo[v] = (u, i)
+                        heapq.heappush(cola, (nd, v))
+            if dist[t] is None:
+                break
+            for v in range(n):
+                if dist[v] is not None:
+                    potencial[v] += dist[v]
+
+            # Cuello de botella del camino y aumento
+            aumento = flujo_max - flujo
+            v = t
+            while v != s:
+                u, i = previo[v]
+                aumento = min(aumento, self.ady[u][i][1])
+                v = u
+            v = t
+            while v != s:
+                u, i = previo[v]
+                arista = self.ady[u][i]
+                arista[1] -= aumento
+                self.ady[v][arista[3]][1] += aumento
+                costo += aumento * arista[2]
+                v = u
+            flujo += aumento
+        return flujo, costo
+
+
+class BalanceadorFlujo:
+    """
+    Plan de movimientos que deja los conteos de una etapa lo más parejos posible.
+
+    Parámetros del constructor:
+    - grid: grilla del horario.
+    - trabajadores: trabajadores que entran en la paridad (los que tienen fila).
+    - contador: conteo actual por trabajador (incluye turnos que no se pueden mover).
+    - turnos: códigos que la etapa puede mover (p. ej. {"1"} o {"6S", "6N"}).
+    - es_movible(fila, col): True si la celda de origen se puede mover (no es original).
+    - destino_valido(trabajador, fila, col, turno): reglas de la etapa para recibir el
+      turno; se llama con la celda de origen ya vaciada en la grilla.
+    """
+
+    def __init__(
+        self,
+        grid: GrillaHorario,
+        trabajadores: Sequence[str],
+        contador: Mapping[str, int],
+        turnos: Iterable[str],
+        es_movible: Callable[[int, int], bool],
+        destino_valido: Callable[[str, int, int, str], bool],
+    ) -> None:
+        self.grid = grid
+        self.filas: Dict[str, int] = {}
+        for t in trabajadores:
+            fila = grid.fila_trabajador(t)
+            if fila:
+                self.filas[t] = fila
+        self.contador = contador
+        self.turnos = {str(t).strip().upper() for t in turnos}
+        self.es_movible = es_movible
+        self.destino_valido = destino_valido
+
+    @contextmanager
+    def _sin_celda(self, fila: int, col: int, turno: str):
+        """Vacía temporalmente la celda de origen para evaluar los destinos como si ya se hubiera movido."""
+        self.grid.vaciar(fila, col)
+        try:
+            yield
+        finally:
+            self.grid.asignar(fila, col, turno)
+
+    def _celdas_movibles(self) -> List[Tuple[str, int, int, str]]:
+        celdas = []
+        for trabajador, fila in self.filas.items():
+            for col in self.grid.columnas():
+                turno = self.grid.valor(fila, col)
+                if turno in self.turnos and self.es_movible(fila, col):
+                    celdas.append((trabajador, fila, col, turno))
+        return celdas
+
+    def _destinos(self, origen: str, fila_origen: int, col: int, turno: str) -> List[str]:
+        with self._sin_celda(fila_origen, col, turno):
+            return [
+                t for t, fila in self.filas.items()
+                if t != origen and self.destino_valido(t, fila, col, turno)
+            ]
+
+    def diferencia(self) -> int:
+        conteos = [self.contador[t] for t in self.filas]
+        return max(conteos) - min(conteos) if conteos else 0
+
+    def planificar(self) -> List[Movimiento]:
+        """Resuelve el flujo y devuelve los movimientos (origen ≠ destino) del reparto óptimo."""
+        celdas = self._celdas_movibles()
+        if not celdas or self.diferencia() <= 1:
+            return []
+
+        trabajadores = list(self.filas)
+        idx_trab = {t: i for i, t in enumerate(trabajadores)}
+        movibles_por_trab: Dict[str, int] = {t: 0 for t in trabajadores}
+        for origen, _, _, _ in celdas:
+            movibles_por_trab[origen] += 1
+
+        destinos = [self._destinos(o, f, c, turno) for o, f, c, turno in celdas]
+        ranuras: Dict[Tuple[str, int], int] = {}
+
+        # Numeración de nodos: S, T, trabajadores, celdas, ranuras (trabajador, día)
+        S, T = 0, 1
+        base_trab = 2
+        base_celda = base_trab + len(trabajadores)
+        siguiente = base_celda + len(celdas)
+        for i, (_, _, col, _) in enumerate(celdas):
+            for t in destinos[i]:
+                if (t, col) not in ranuras:
+                    ranuras[(t, col)] = siguiente
+                    siguiente += 1
+
+        escala = len(celdas) + 1
+        red = FlujoCostoMinimo(siguiente)
+        arcos_mover: List[Tuple[int, int, str, int]] = []  # (celda, nodo celda, destino, índice de arista)
+        for i, (origen, _, col, _) in enumerate(celdas):
+            nodo = base_celda + i
+            red.agregar_arco(S, nodo, 1, 0)
+            red.agregar_arco(nodo, base_trab + idx_trab[origen], 1, 0)
+            for t in destinos[i]:
+                arcos_mover.append((i, nodo, t, len(red.ady[nodo])))
+                red.agregar_arco(nodo, ranuras[(t, col)], 1, 1)
+        for (t, _), nodo in ranuras.items():
+            red.agregar_arco(nodo, base_trab + idx_trab[t], 1, 0)
+
+        # Costo convexo por trabajador: la k-ésima celda que termina en él cuesta
+        # ESCALA·((fijo + k)² − (fijo + k − 1)²)
+        recibibles: Dict[str, int] = {t: movibles_por_trab[t] for t in trabajadores}
+        for (t, _), _ in ranuras.items():
+            recibibles[t] += 1
+        for t in trabajadores:
+            fijo = self.contador[t] - movibles_por_trab[t]
+            for k in range(1, recibibles[t] + 1):
+                red.agregar_arco(base_trab + idx_trab[t], T, 1, escala * (2 * (fijo + k) - 1))
+
+        red.resolver(S, T, len(celdas))
+
+        movimientos = []
+        for i, nodo, destino, arista in arcos_mover:
+            if red.ady[nodo][arista][1] == 0:  # arco saturado: la celda se mueve a 'destino'
+                origen, _, col, turno = celdas[i]
+                movimientos.append(Movimiento(origen, destino, col, turno))
+        return movimientos
+
+    def ejecutar(self, mover: Callable[[Movimiento], None], max_rondas: int = 5) -> int:
+        """
+        Planifica y aplica movimientos con 'mover' (que actualiza hoja, colores y contadores).
+
+        Cada movimiento se re-valida sobre la grilla viva antes de aplicarlo. Devuelve
+        cuántos movimientos se hicieron.
+        """
+        total = 0
+        for _ in range(max_rondas):
+            plan = self.planificar()
+            if not plan:
+                break
+            aplicados = 0
+            for mov in plan:
+                fila_origen = self.filas[mov.origen]
+                fila_destino = self.filas[mov.destino]
+                if self.grid.valor(fila_origen, mov.col) != mov.turno:
+                    continue
+                with self._sin_celda(fila_origen, mov.col, mov.turno):
+                    valido = self.destino_valido(mov.destino, fila_destino, mov.col, mov.turno)
+                if valido:
+                    mover(mov)
+                    aplicados += 1
+            total += aplicados
+            if aplicados == 0 or aplicados == len(plan):
+                break
+        return total
@@ -0,0 +1,451 @@
+"""
+Benchmark de todas las etapas sobre horarios sintéticos.
+
+Genera un horario con el formato de horioUnificado.xlsx (trabajadores × días,
+con DESC/TROP, VACA, COME/COMS y X precargados) y un plan de sábados/festivos coherente con
+sus fechas, y ejecuta en un directorio temporal la misma cadena que los scripts
+sueltos, cada etapa leyendo el xlsx que dejó la anterior:
+
+    procesador_horarios → sábados/festivos → 1T → 6RT → 6TT → 1 → 6R → 6T → 3
+      → diurnas → MOFIS → sencillos → StatTransformada
+      → excel_con_division_de_columna → quitar_division_de_columna
+
+Por etapa se mide:
+- segundos: tiempo de reloj (carga + cálculo + guardado, como el script suelto).
+- memoria_pico_mb: pico de memoria Python de la etapa (tracemalloc; con
+  --sin-memoria no se mide, porque tracemalloc hace más lentas las etapas).
+- asignaciones: celdas de la grilla que cambian respecto del xlsx de entrada
+  (se cuentan fuera del tiempo medido), y asignaciones por segundo.
+- celdas_por_segundo: tamaño de la grilla (trabajadores × días) / segundos, la
+  métrica comparable para las etapas que no asignan (StatTransformada, división).
+
+Cada corrida (una por combinación de trabajadores × días) se agrega como una
+línea JSON a benchmark_horarios.jsonl, para seguir las regresiones a medida que
+crece el horario.
+
+Uso:
+    python benchmark_horarios.py [--trabajadores 24 48] [--dias 35 91] [--densidad 0.2]
+                                 [--proporcion-x 0.2] [--proporcion-vaca 0.15] [--proporcion-comision 0.15]
+                                 [--festivos 2025-10-13]
+                                 [--semilla 7] [--salida benchmark_horarios.jsonl] [--etiqueta TEXTO]
+                                 [--sin-memoria] [--conservar DIR] [--detalle]
+"""
+
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import openpyxl
+
+import excel_con_division_de_columna
+import procesador_horarios
+import quitar_division_de_columna
+from cargador_horarios import cargar_grilla, hoja_horario
+from contador_operativos import SIGLAS_TORRE
+from grilla_horario import GrillaHorario
+from pipeline_horarios import ETAPAS
+from stat_transformada import StatTransformada
+
+# Turnos del plan de sábados/festivos (mismas claves que cuentas1y2sabadosDomingo_asignado.json)
+TURNOS_DOMINGO_FESTIVO = ("BANTD", "BLPTD", "3D", "NANRD", "NLPRD", "NANTD", "NLPTD")
+TURNOS_SABADO = ("6R", "6RT", "3", "6T", "6TT")
+
+DIAS_SEMANA = ("MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN")
+LETRAS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+@dataclass
+class ConfigSintetica:
+    """
+    Parámetros del horario sintético.
+
+    - trabajadores / dias: tamaño de la grilla (los de SIGLAS_TORRE se incluyen siempre al final).
+    - densidad: fracción de celdas precargadas con pares DESC/TROP (solo de lunes a viernes,
+      como en la hoja real, donde entre semana quedan 9–11 operativos por día).
+    - proporcion_x: fracción de trabajadores marcados con X todo el horizonte (sin inglés).
+    - proporcion_vaca: fracción de trabajadores con un bloque de VACA de 5 a 10 días.
+    - proporcion_comision: fracción de trabajadores con un bloque de COME/COMS de 3 a 8 días.
+    - inicio: primer día (por defecto un lunes); festivos: días que se planifican como domingo.
+    """
+
+    trabajadores: int = 24
+    dias: int = 35
+    densidad: float = 0.2
+    proporcion_x: float = 0.2
+    proporcion_vaca: float = 0.15
+    proporcion_comision: float = 0.15
+    inicio: date = date(2025, 9, 29)
+    festivos: Tuple[date, ...] = ()
+    semilla: int = 7
+
+    def fechas(self) -> List[date]:
+        return [self.inicio + timedelta(days=i) for i in range(self.dias)]
+
+
+@dataclass
+class ResultadoEtapa:
+    etapa: str
+    segundos: float
+    memoria_pico_mb: Optional[float]
+    asignaciones: Optional[int]
+    asignaciones_por_segundo: Optional[float]
+    celdas_por_segundo: float
+    error: Optional[str] = None
+
+
+@dataclass
+class EtapaBenchmark:
+    nombre: str
+    ejecutar: Callable[[], object]
+    archivo_salida: str
+    archivo_entrada: Optional[str] = None  # xlsx contra el que se cuentan las asignaciones
+    preparar: Optional[Callable[[], None]] = None  # fuera del tiempo medido
+
+
+# ----------------------------------------------------------------------
+# Generador sintético
+# ----------------------------------------------------------------------
+def siglas_elegibles() -> List[str]:
+    """SIGLAs que alguna etapa puede elegir (listas TRABAJADORES_* de sus clases), sin las de la torre."""
+    siglas: List[str] = []
+    for etapa in ETAPAS:
+        for nombre in sorted(vars(etapa.clase)):
+            if nombre.startswith("TRABAJADORES"):
+                siglas += [s for s in getattr(etapa.clase, nombre) if s not in siglas and s not in SIGLAS_TORRE]
+    return siglas
+
+
+def generar_siglas(n: int) -> List[str]:
+    """
+    n SIGLAs únicas, con las de SIGLAS_TORRE al final (como en la hoja real).
+
+    Las etapas eligen entre listas fijas de trabajadores, así que primero se usan
+    esas SIGLAs; a partir de ahí se agregan SIGLAs de tres letras que ninguna etapa
+    elige (agrandan la grilla y los conteos por día, pero no reciben turnos).
+    """
+    torre = list(SIGLAS_TORRE[:n])
+    otras = siglas_elegibles()[:n - len(torre)]
+    for letras in itertools.product(LETRAS, repeat=3):
+        if len(otras) >= n - len(torre):
+            break
+        sigla = "".join(letras)
+        if sigla not in otras and sigla not in SIGLAS_TORRE:
+            otras.append(sigla)
+    return otras + torre
+
+
+def generar_turnos(config: ConfigSintetica, n_trabajadores: int) -> np.ndarray:
+    """Matriz trabajadores × días de códigos precargados ("" = celda libre)."""
+    rng = np.random.default_rng(config.semilla)
+    turnos = np.full((n_trabajadores, config.dias), "", dtype=object)
+
+    for i in range(n_trabajadores):
+        for codigos, proporcion, minimo, maximo in (
+            (("VACA",), config.proporcion_vaca, 5, 10),
+            (("COME", "COMS"), config.proporcion_comision, 3, 8),
+        ):
+            if rng.random() < proporcion:
+                largo = int(rng.integers(minimo, maximo + 1))
+                inicio = int(rng.integers(0, max(1, config.dias - largo + 1)))
+                libres = turnos[i, inicio:inicio + largo] == ""
+                turnos[i, inicio:inicio + largo][libres] = codigos[int(rng.integers(0, len(codigos)))]
+
+    # Pares DESC/TROP en celdas libres de lunes a viernes hasta llegar a la densidad pedida
+    es_laborable = [f.weekday() < 5 for f in config.fechas()] + [False]
+    laborables = [j for j in range(config.dias) if es_laborable[j]]
+    objetivo = int(config.densidad * n_trabajadores * config.dias)
+    colocadas = 0
+    intentos = 0
+    while laborables and colocadas < objetivo and intentos < 20 * max(1, objetivo):
+        intentos += 1
+        i = int(rng.integers(0, n_trabajadores))
+        j = laborables[int(rng.integers(0, len(laborables)))]
+        if turnos[i, j]:
+            continue
+        turnos[i, j] = "DESC"
+        colocadas += 1
+        if es_laborable[j + 1] and not turnos[i, j + 1] and colocadas < objetivo:
+            turnos[i, j + 1] = "TROP"
+            colocadas += 1
+
+    # Trabajadores sin inglés: X en todas sus celdas libres (nunca los de la torre)
+    no_torre = n_trabajadores - len(SIGLAS_TORRE[:n_trabajadores])
+    n_x = min(no_torre, round(config.proporcion_x * n_trabajadores))
+    for i in rng.permutation(no_torre)[:n_x]:
+        turnos[i][turnos[i] == ""] = "X"
+    return turnos
+
+
+def encabezado_dia(fecha: date) -> str:
+    return f"{DIAS_SEMANA[fecha.weekday()]}-{fecha.day:02d}"
+
+
+def escribir_horario(ruta: str, siglas: Sequence[str], fechas: Sequence[date], turnos: np.ndarray) -> None:
+    """Libro con el formato de horioUnificado.xlsx (hoja 'HorarioUnificado', A1 'SIGLA ATCO')."""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "HorarioUnificado"
+    ws.append(["SIGLA ATCO"] + [encabezado_dia(f) for f in fechas])
+    for sigla, fila in zip(siglas, turnos):
+        ws.append([sigla] + [t or None for t in fila])
+    wb.save(ruta)
+
+
+def generar_plan_fines_de_semana(config: ConfigSintetica, siglas: Sequence[str],
+                                 turnos: np.ndarray) -> Dict[str, List[Dict[str, str]]]:
+    """
+    Plan de sábados, domingos y festivos en el formato del JSON de cuentas.
+
+    Cada turno del día se pide a un trabajador distinto, con la celda libre ese día.
+    """
+    rng = random.Random(config.semilla)
+    festivos = set(config.festivos)
+    plan: Dict[str, List[Dict[str, str]]] = {t: [] for t in TURNOS_DOMINGO_FESTIVO + TURNOS_SABADO}
+    for j, fecha in enumerate(config.fechas()):
+        if fecha.weekday() == 6 or fecha in festivos:
+            pedidos = TURNOS_DOMINGO_FESTIVO
+        elif fecha.weekday() == 5:
+            pedidos = TURNOS_SABADO
+        else:
+            continue
+        libres = [siglas[i] for i in range(len(siglas)) if not turnos[i, j]]
+        rng.shuffle(libres)
+        for turno, sigla in zip(pedidos, libres):
+            plan[turno].append({"fecha": fecha.isoformat(), "trabajador": sigla})
+    return plan
+
+
+def generar_entradas(config: ConfigSintetica, directorio: str) -> Tuple[int, int]:
+    """Escribe horioUnificado.xlsx y el JSON de sábados/festivos en 'directorio'. Devuelve (trabajadores, días)."""
+    siglas = generar_siglas(config.trabajadores)
+    turnos = generar_turnos(config, len(siglas))
+    escribir_horario(os.path.join(directorio, "horioUnificado.xlsx"), siglas, config.fechas(), turnos)
+    plan = generar_plan_fines_de_semana(config, siglas, turnos)
+    with open(os.path.join(directorio, "cuentas1y2sabadosDomingo_asignado.json"), "w", encoding="utf-8") as f:
+        json.dump(plan, f, ensure_ascii=False, indent=2)
+    return len(siglas), config.dias
+
+
+# ----------------------------------------------------------------------
+# Etapas
+# ----------------------------------------------------------------------
+def etapas_benchmark() -> List[EtapaBenchmark]:
+    """Cadena completa de scripts sueltos, en orden (las de asignación salen de pipeline_horarios.ETAPAS)."""
+    etapas = [EtapaBenchmark("procesador", procesador_horarios.procesar_horarios,
+                             "horarioUnificado_procesado.xlsx", archivo_entrada="horioUnificado.xlsx")]
+
+    entrada = etapas[0].archivo_salida
+    for etapa in ETAPAS:
+        def ejecutar(etapa=etapa):
+            asignador = etapa.clase(**etapa.opciones)
+            getattr(asignador, etapa.metodo)()
+        etapas.append(EtapaBenchmark(etapa.nombre, ejecutar, etapa.archivo_salida, archivo_entrada=entrada))
+        entrada = etapa.archivo_salida
+
+    etapas += [
+        EtapaBenchmark("stat_transformada", lambda: StatTransformada(abrir_al_terminar=False),
+                       "horarioUnificado_con_mofis_stats.xlsx"),
+        EtapaBenchmark("division_columna", excel_con_division_de_columna.modificar_horario_con_division_columna,
+                       "excel_con_division_de_columna.xlsx",
+                       preparar=lambda: preparar_division(entrada)),
+        EtapaBenchmark("quitar_division", quitar_division_de_columna.quitar_division_columna,
+                       "conversion_inversa_a_una_sola_columna.xlsx"),
+    ]
+    return etapas
+
+
+def preparar_division(entrada: str, salida: str = "horarioUnificado_a_dividir.xlsx") -> None:
+    """Copia del horario final solo con encabezado y filas de trabajadores (sin filas de conteo)."""
+    wb = openpyxl.load_workbook(entrada)
+    ws = hoja_horario(wb)
+    ultima = GrillaHorario.desde_hoja(ws).fila_fin
+    if ws.max_row > ultima:
+        ws.delete_rows(ultima + 1, ws.max_row - ultima)
+    wb.save(salida)
+
+
+def contar_asignaciones(entrada: str, salida: str) -> int:
+    """Celdas de trabajadores cuyo turno difiere entre los dos horarios (por SIGLA y columna)."""
+    antes = cargar_grilla(entrada)
+    despues = cargar_grilla(salida)
+    filas_antes = antes.indice_trabajadores()
+    cambios = 0
+    for fila, sigla in despues.trabajadores():
+        nuevos = despues.valores_fila(fila)
+        fila_antes = filas_antes.get(sigla)
+        previos = antes.valores_fila(fila_antes) if fila_antes is not None else ()
+        cambios += sum(1 for j, v in enumerate(nuevos) if v != (previos[j] if j < len(previos) else ""))
+    return cambios
+
+
+# ----------------------------------------------------------------------
+# Ejecución
+# ----------------------------------------------------------------------
+class BenchmarkHorarios:
+    """
+    Genera el horario sintético de 'config' y mide cada etapa en un directorio de trabajo.
+
+    - medir_memoria: mide el pico de memoria por etapa con tracemalloc.
+    - directorio: si se indica, se trabaja (y se conservan los archivos) ahí; si no, en un temporal.
+    - detalle: deja ver la salida por consola de las etapas.
+    """
+
+    def __init__(self, config: ConfigSintetica, medir_memoria: bool = True,
+                 directorio: Optional[str] = None, detalle: bool = False) -> None:
+        self.config = config
+        self.medir_memoria = medir_memoria
+        self.directorio = directorio
+        self.detalle = detalle
+        self.resultados: List[ResultadoEtapa] = []
+
+    def _medir(self, etapa: EtapaBenchmark, celdas: int) -> ResultadoEtapa:
+        if etapa.preparar:
+            etapa.preparar()
+        if self.medir_memoria:
+            tracemalloc.start()
+        error = None
+        salida = None if self.detalle else open(os.devnull, "w")
+        inicio = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(salida) if salida else contextlib.nullcontext():
+                etapa.ejecutar()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            segundos = time.perf_counter() - inicio
+            if salida:
+                salida.close()
+        pico = None
+        if self.medir_memoria:
+            pico = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+            tracemalloc.stop()
+
+        if error is None and not os.path.exists(etapa.archivo_salida):
+            error = f"La etapa no generó {etapa.archivo_salida}"
+        asignaciones = None
+        if error is None and etapa.archivo_entrada:
+            asignaciones = contar_asignaciones(etapa.archivo_entrada, etapa.archivo_salida)
+        return ResultadoEtapa(
+            etapa=etapa.nombre,
+            segundos=round(segundos, 4),
+            memoria_pico_mb=pico,
+            asignaciones=asignaciones,
+            asignaciones_por_segundo=round(asignaciones / segundos, 1) if asignaciones is not None and segundos else None,
+            celdas_por_segundo=round(celdas / segundos, 1) if segundos else 0.0,
+            error=error,
+        )
+
+    def ejecutar(self) -> Dict[str, object]:
+        """Corre la cadena completa; si una etapa falla, las siguientes no se ejecutan."""
+        directorio = os.path.abspath(self.directorio or tempfile.mkdtemp(prefix="benchmark_horarios_"))
+        os.makedirs(directorio, exist_ok=True)
+        # Las etapas leen y escriben sus xlsx en el directorio actual (reglas_restricciones.json, junto al módulo)
+        anterior = os.getcwd()
+        os.chdir(directorio)
+        random.seed(self.config.semilla)
+        try:
+            n_trabajadores, n_dias = generar_entradas(self.config, directorio)
+            celdas = n_trabajadores * n_dias
+            print(f"📐 Horario sintético: {n_trabajadores} trabajadores × {n_dias} días "
+                  f"(densidad {self.config.densidad:.0%}, semilla {self.config.semilla})")
+            for etapa in etapas_benchmark():
+                resultado = self._medir(etapa, celdas)
+                self.resultados.append(resultado)
+                self._imprimir(resultado)
+                if resultado.error:
+                    print(f"❌ {etapa.nombre}: {resultado.error}")
+                    break
+        finally:
+            os.chdir(anterior)
+            if not self.directorio:
+                shutil.rmtree(directorio, ignore_errors=True)
+
+        config = asdict(self.config)
+        config["inicio"] = self.config.inicio.isoformat()
+        config["festivos"] = [f.isoformat() for f in self.config.festivos]
+        return {
+            "config": config,
+            "trabajadores": n_trabajadores,
+            "dias": n_dias,
+            "total_segundos": round(sum(r.segundos for r in self.resultados), 4),
+            "etapas": [asdict(r) for r in self.resultados],
+        }
+
+    @staticmethod
+    def _imprimir(r: ResultadoEtapa) -> None:
+        memoria = f"{r.memoria_pico_mb:8.1f} MB" if r.memoria_pico_mb is not None else " " * 11
+        asignaciones = f"{r.asignaciones:6d} asig. {r.asignaciones_por_segundo:9.1f}/s" if r.asignaciones is not None else ""
+        print(f"   • {r.etapa:<18} {r.segundos:8.2f} s {memoria}  {asignaciones}")
+
+
+def guardar_resultados(ruta: str, corridas: List[Dict[str, object]], etiqueta: Optional[str],
+                       medir_memoria: bool) -> None:
+    """Agrega una línea JSON por corrida (historial para comparar entre versiones)."""
+    entorno = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "etiqueta": etiqueta,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "openpyxl": openpyxl.__version__,
+        "numpy": np.__version__,
+        "memoria_tracemalloc": medir_memoria,
+    }
+    with open(ruta, "a", encoding="utf-8") as f:
+        for corrida in corridas:
+            f.write(json.dumps({**entorno, **corrida}, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mide todas las etapas sobre horarios sintéticos.")
+    parser.add_argument("--trabajadores", type=int, nargs="+", default=[24])
+    parser.add_argument("--dias", type=int, nargs="+", default=[35])
+    parser.add_argument("--densidad", type=float, default=0.2, help="fracción de celdas con DESC/TROP")
+    parser.add_argument("--proporcion-x", type=float, default=0.2, help="fracción de trabajadores con X")
+    parser.add_argument("--proporcion-vaca", type=float, default=0.15, help="fracción de trabajadores con VACA")
+    parser.add_argument("--proporcion-comision", type=float, default=0.15,
+                        help="fracción de trabajadores con COME/COMS")
+    parser.add_argument("--inicio", default="2025-09-29", help="primer día (AAAA-MM-DD)")
+    parser.add_argument("--festivos", nargs="*", default=[], help="días festivos (AAAA-MM-DD)")
+    parser.add_argument("--semilla", type=int, default=7)
+    parser.add_argument("--salida", default="benchmark_horarios.jsonl")
+    parser.add_argument("--etiqueta", default=None, help="texto libre para identificar la corrida (p. ej. commit)")
+    parser.add_argument("--sin-memoria", action="store_true", help="no medir memoria (tiempos sin tracemalloc)")
+    parser.add_argument("--conservar", default=None, metavar="DIR", help="trabajar en DIR y conservar los archivos")
+    parser.add_argument("--detalle", action="store_true", help="mostrar la salida de las etapas")
+    args = parser.parse_args()
+
+    corridas = []
+    for trabajadores, dias in itertools.product(args.trabajadores, args.dias):
+        config = ConfigSintetica(
+            trabajadores=trabajadores,
+            dias=dias,
+            densidad=args.densidad,
+            proporcion_x=args.proporcion_x,
+            proporcion_vaca=args.proporcion_vaca,
+            proporcion_comision=args.proporcion_comision,
+            inicio=date.fromisoformat(args.inicio),
+            festivos=tuple(date.fromisoformat(f) for f in args.festivos),
+            semilla=args.semilla,
+        )
+        directorio = os.path.join(args.conservar, f"{trabajadores}x{dias}") if args.conservar else None
+        corrida = BenchmarkHorarios(config, medir_memoria=not args.sin_memoria,
+                                    directorio=directorio, detalle=args.detalle).ejecutar()
+        print(f"   • {'TOTAL':<18} {corrida['total_segundos']:8.2f} s\n")
+        corridas.append(corrida)
+
+    guardar_resultados(args.salida, corridas, args.etiqueta, not args.sin_memoria)
+    print(f"💾 Resultados agregados a: {args.salida}")
+    sys.exit(1 if any(e.get("error") for c in corridas for e in c["etapas"]) else 0)
@@ -0,0 +1,274 @@
+"""
+Búsqueda multisemilla en paralelo para una etapa o para la cadena completa.
+
+Cada asignador recorre los días una vez de forma voraz y resuelve los empates
+con sorteos (antes con random.seed() sin semilla): cada ejecución da un horario
+distinto y la única forma de conseguir uno mejor era volver a correr los
+scripts a mano. Aquí:
+
+1. Se lanzan N intentos con semillas distintas, repartidos entre los núcleos
+   (ProcessPoolExecutor). Cada intento corre las etapas elegidas en memoria con
+   PipelineHorarios(semilla=...) y no escribe nada.
+2. Cada resultado se puntúa con objetivo_horario.evaluar (cobertura, equidad y
+   violaciones de reglas; menor = mejor).
+3. La mejor semilla se vuelve a ejecutar y se guarda su xlsx. El reporte JSON
+   tiene todos los intentos y el comando para reproducirla.
+
+La reproducción no depende de PYTHONHASHSEED: los sorteos recorren listas en el
+orden de la hoja o de las listas de elegibles, y los conjuntos de códigos se
+internan ordenados (GrillaHorario.registrar_codigos).
+
+Uso:
+    python busqueda_semillas.py [--intentos 32] [--procesos N] [--etapas 6rt 6tt] [--entrada X.xlsx]
+                                [--salida Y.xlsx] [--semilla-inicial 1] [--balanceo flujo]
+                                [--emparejamiento ponderado] [--reporte busqueda_semillas.json]
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from balanceo_flujo import MODOS_BALANCEO
+from emparejamiento import MODOS_EMPAREJAMIENTO
+from objetivo_horario import evaluar
+from pipeline_horarios import ETAPAS, EtapaPipeline, PipelineHorarios
+
+ENTRADA_PIPELINE = "horarioUnificado_procesado.xlsx"
+
+
+@dataclass(frozen=True)
+class TareaBusqueda:
+    """Un intento: todo lo que necesita el proceso hijo (se envía por pickle)."""
+
+    semilla: int
+    etapas: Tuple[str, ...]
+    archivo_entrada: str
+    archivo_salida: Optional[str] = None  # solo al repetir la mejor semilla
+    modo_balanceo: str = "iterativo"
+    modo_emparejamiento: str = "dos_fases"
+    mes_anterior: Optional[str] = None
+    mes_siguiente: Optional[str] = None
+
+
+@dataclass
+class ResultadoIntento:
+    semilla: int
+    puntaje: Optional[float] = None
+    segundos: float = 0.0
+    evaluacion: Dict[str, object] = field(default_factory=dict)
+    archivo: Optional[str] = None
+    error: Optional[str] = None
+
+
+def etapas_por_nombre(nombres: Optional[Sequence[str]] = None) -> List[EtapaPipeline]:
+    """Etapas pedidas en el orden de ETAPAS (todas si no se indica ninguna)."""
+    if not nombres:
+        return list(ETAPAS)
+    conocidas = {e.nombre for e in ETAPAS}
+    desconocidas = [n for n in nombres if n not in conocidas]
+    if desconocidas:
+        raise ValueError(f"Etapas desconocidas: {desconocidas} (disponibles: {[e.nombre for e in ETAPAS]})")
+    return [e for e in ETAPAS if e.nombre in nombres]
+
+
+def entrada_de(etapas: Sequence[EtapaPipeline]) -> str:
+    """xlsx que leería la primera etapa como script suelto (el de la etapa anterior en ETAPAS)."""
+    i = ETAPAS.index(etapas[0])
+    return ETAPAS[i - 1].archivo_salida if i else ENTRADA_PIPELINE
+
+
+def elegibles_de(etapas: Sequence[EtapaPipeline]) -> Dict[str, Tuple[str, ...]]:
+    return {e.nombre: tuple(getattr(e.clase, "TRABAJADORES_ELEGIBLES", ())) for e in etapas}
+
+
+def _ejecutar_intento(tarea: TareaBusqueda) -> ResultadoIntento:
+    """Corre las etapas con la semilla de la tarea (en el proceso hijo) y puntúa el resultado."""
+    etapas = etapas_por_nombre(tarea.etapas)
+    inicio = time.perf_counter()
+    try:
+        with open(os.devnull, "w") as silencio, contextlib.redirect_stdout(silencio):
+            pipeline = PipelineHorarios(
+                archivo_entrada=tarea.archivo_entrada,
+                archivo_salida=tarea.archivo_salida,
+                etapas=etapas,
+                modo_balanceo=tarea.modo_balanceo,
+                modo_emparejamiento=tarea.modo_emparejamiento,
+                mes_anterior=tarea.mes_anterior,
+                mes_siguiente=tarea.mes_siguiente,
+                semilla=tarea.semilla,
+            )
+            archivo = pipeline.ejecutar(guardar=tarea.archivo_salida is not None)
+        evaluacion = evaluar(pipeline.grid, elegibles_de(etapas))
+    except Exception as e:
+        return ResultadoIntento(tarea.semilla, segundos=time.perf_counter() - inicio,
+                                error=f"{type(e).__name__}: {e}")
+    return ResultadoIntento(
+        semilla=tarea.semilla,
+        puntaje=evaluacion.puntaje,
+        segundos=round(time.perf_counter() - inicio, 3),
+        evaluacion=evaluacion.como_dict(),
+        archivo=archivo,
+    )
+
+
+class BusquedaSemillas:
+    """
+    N intentos sembrados de las etapas elegidas; se queda con el de menor puntaje.
+
+    Parámetros del constructor:
+    - intentos: cantidad de semillas (semilla_inicial, semilla_inicial + 1, ...).
+    - procesos: procesos en paralelo (por defecto, los núcleos disponibles).
+    - etapas: nombres de ETAPAS a ejecutar (por defecto la cadena completa).
+    - archivo_entrada / archivo_salida: por defecto los del script suelto de la primera / última etapa.
+    - modo_balanceo, modo_emparejamiento, mes_anterior, mes_siguiente: como en PipelineHorarios.
+    """
+
+    def __init__(
+        self,
+        intentos: int = 16,
+        procesos: Optional[int] = None,
+        etapas: Optional[Sequence[str]] = None,
+        archivo_entrada: Optional[str] = None,
+        archivo_salida: Optional[str] = None,
+        semilla_inicial: int = 1,
+        modo_balanceo: str = "iterativo",
+        modo_emparejamiento: str = "dos_fases",
+        mes_anterior: Optional[str] = None,
+        mes_siguiente: Optional[str] = None,
+    ) -> None:
+        if intentos < 1:
+            raise ValueError("La búsqueda necesita al menos un intento")
+        self.etapas = etapas_por_nombre(etapas)
+        if not any(e.sortea for e in self.etapas):
+            raise ValueError("Ninguna de las etapas elegidas sortea: todas las semillas darían el mismo resultado")
+        self.archivo_entrada = archivo_entrada or entrada_de(self.etapas)
+        if not os.path.exists(self.archivo_entrada):
+            raise FileNotFoundError(f"No se encontró el archivo Excel: {self.archivo_entrada}")
+        self.archivo_salida = archivo_salida or self.etapas[-1].archivo_salida
+        self.semillas = list(range(semilla_inicial, semilla_inicial + intentos))
+        self.procesos = max(1, min(procesos or os.cpu_count() or 1, intentos))
+        self.opciones = dict(
+            etapas=tuple(e.nombre for e in self.etapas),
+            archivo_entrada=self.archivo_entrada,
+            modo_balanceo=modo_balanceo,
+            modo_emparejamiento=modo_emparejamiento,
+            mes_anterior=mes_anterior,
+            mes_siguiente=mes_siguiente,
+        )
+        self.resultados: List[ResultadoIntento] = []
+        self.mejor: Optional[ResultadoIntento] = None
+
+    def ejecutar(self) -> Optional[ResultadoIntento]:
+        """Corre los intentos, guarda el xlsx de la mejor semilla y devuelve su resultado."""
+        nombres = " → ".join(e.nombre for e in self.etapas)
+        print(f"🎲 Búsqueda multisemilla: {len(self.semillas)} intentos en {self.procesos} procesos")
+        print(f"📁 Entrada: {self.archivo_entrada}")
+        print(f"🔗 Etapas: {nombres}")
+        inicio = time.perf_counter()
+
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.procesos, mp_context=contexto) as pool:
+            futuros = [pool.submit(_ejecutar_intento, TareaBusqueda(semilla=s, **self.opciones))
+                       for s in self.semillas]
+            for futuro in as_completed(futuros):
+                resultado = futuro.result()
+                self.resultados.append(resultado)
+                if resultado.error:
+                    print(f"   ❌ semilla {resultado.semilla}: {resultado.error}")
+                else:
+                    print(f"   • semilla {resultado.semilla:>5}: puntaje {resultado.puntaje:8.1f} "
+                          f"({resultado.segundos:.1f} s)")
+
+            validos = [r for r in self.resultados if r.error is None]
+            if not validos:
+                print("❌ Ningún intento terminó sin errores")
+                return None
+            candidato = min(validos, key=lambda r: (r.puntaje, r.semilla))
+
+            # Repetir la mejor semilla y guardar su xlsx
+            self.mejor = pool.submit(
+                _ejecutar_intento,
+                TareaBusqueda(semilla=candidato.semilla, archivo_salida=self.archivo_salida, **self.opciones),
+            ).result()
+
+        self.resultados.sort(key=lambda r: (r.puntaje is None, r.puntaje, r.semilla))
+        total = time.perf_counter() - inicio
+        puntajes = [r.puntaje for r in validos]
+        print(f"\n📊 Puntajes: mejor {min(puntajes):.1f}, mediana {sorted(puntajes)[len(puntajes) // 2]:.1f}, "
+              f"peor {max(puntajes):.1f}")
+        if self.mejor.error:
+            print(f"❌ Error al repetir la semilla {candidato.semilla}: {self.mejor.error}")
+            return None
+        if self.mejor.puntaje != candidato.puntaje:
+            print(f"⚠️ La repetición de la semilla {candidato.semilla} dio puntaje {self.mejor.puntaje} "
+                  f"(en la búsqueda, {candidato.puntaje})")
+        print(f"🏆 Mejor semilla: {self.mejor.semilla} (puntaje {self.mejor.puntaje:.1f})")
+        print(f"💾 Archivo guardado como: {self.mejor.archivo}")
+        print(f"🔁 Reproducir: {self.comando_reproduccion()}")
+        print(f"⏱️  Tiempo total: {total:.1f} s")
+        return self.mejor
+
+    def comando_reproduccion(self) -> str:
+        partes = ["python pipeline_horarios.py",
+                  f"--entrada {self.archivo_entrada}", f"--semilla {self.mejor.semilla}"]
+        if self.opciones["modo_balanceo"] != "iterativo":
+            partes.append(f"--balanceo {self.opciones['modo_balanceo']}")
+        if self.opciones["modo_emparejamiento"] != "dos_fases":
+            partes.append(f"--emparejamiento {self.opciones['modo_emparejamiento']}")
+        for opcion in ("mes_anterior", "mes_siguiente"):
+            if self.opciones[opcion]:
+                partes.append(f"--{opcion.replace('_', '-')} {self.opciones[opcion]}")
+        if len(self.etapas) != len(ETAPAS):
+            partes.append("--etapas " + " ".join(self.opciones["etapas"]))
+        return " ".join(partes)
+
+    def guardar_reporte(self, ruta: str) -> None:
+        reporte = {
+            "entrada": self.archivo_entrada,
+            "salida": self.mejor.archivo if self.mejor else None,
+            "etapas": list(self.opciones["etapas"]),
+            "mejor_semilla": self.mejor.semilla if self.mejor else None,
+            "reproducir": self.comando_reproduccion() if self.mejor and not self.mejor.error else None,
+            "intentos": [asdict(r) for r in self.resultados],
+        }
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=2)
+        print(f"📝 Reporte guardado como: {ruta}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Busca en paralelo la mejor semilla de una etapa o de la cadena.")
+    parser.add_argument("--intentos", type=int, default=16)
+    parser.add_argument("--procesos", type=int, default=None, help="por defecto, los núcleos disponibles")
+    parser.add_argument("--etapas", nargs="*", default=None, metavar="ETAPA",
+                        help=f"subconjunto de {[e.nombre for e in ETAPAS]} (por defecto, todas)")
+    parser.add_argument("--entrada", default=None)
+    parser.add_argument("--salida", default=None)
+    parser.add_argument("--semilla-inicial", type=int, default=1)
+    parser.add_argument("--balanceo", choices=MODOS_BALANCEO, default="iterativo")
+    parser.add_argument("--emparejamiento", choices=MODOS_EMPAREJAMIENTO, default="dos_fases")
+    parser.add_argument("--mes-anterior", default=None, metavar="ARCHIVO")
+    parser.add_argument("--mes-siguiente", default=None, metavar="ARCHIVO")
+    parser.add_argument("--reporte", default="busqueda_semillas.json")
+    args = parser.parse_args()
+
+    busqueda = BusquedaSemillas(
+        intentos=args.intentos,
+        procesos=args.procesos,
+        etapas=args.etapas,
+        archivo_entrada=args.entrada,
+        archivo_salida=args.salida,
+        semilla_inicial=args.semilla_inicial,
+        modo_balanceo=args.balanceo,
+        modo_emparejamiento=args.emparejamiento,
+        mes_anterior=args.mes_anterior,
+        mes_siguiente=args.mes_siguiente,
+    )
+    busqueda.ejecutar()
+    busqueda.guardar_reporte(args.reporte)
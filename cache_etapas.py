@@ -0,0 +1,348 @@
+"""
+Caché de etapas direccionada por contenido.
+
+Cada script suelto lee el xlsx que dejó la etapa anterior sin saber si cambió:
+para probar un ajuste en sencillos o en StatTransformada había que volver a
+correr todo desde procesador_horarios. Aquí cada etapa calcula una clave
+
+    sha256( grilla de entrada            (SIGLAs, encabezados y turnos, no los bytes del xlsx)
+          + código de la etapa            (su módulo y todos los módulos locales que usa)
+          + listas de trabajadores        (atributos TRABAJADORES_* de la clase)
+          + reglas_restricciones.json
+          + semilla y opciones            (modo de balanceo / emparejamiento)
+          + archivos extra de entrada     (p. ej. el JSON de sábados/festivos) )
+
+y si la clave ya está en la caché copia el xlsx guardado en lugar de ejecutar la
+etapa. Cada entrada guarda el xlsx de salida, su instantánea .hsnap
+(instantanea_horario.py) y el hash de la grilla de salida, que es la grilla de
+entrada de la etapa siguiente: una cadena sin cambios no vuelve a leer ningún
+xlsx y al tocar la última etapa solo esa se vuelve a ejecutar.
+
+- Las etapas que sortean solo se guardan con semilla (--semilla): sin ella cada
+  ejecución puede dar otro horario y no hay nada que reutilizar.
+- Los reportes .txt de las etapas no se guardan: una etapa servida desde la
+  caché no los vuelve a escribir.
+
+Uso:
+    python cache_etapas.py [--semilla 7] [--cache .cache_etapas] [--desde-procesado]
+                           [--balanceo flujo] [--emparejamiento ponderado] [--sin-stats] [--limpiar] [--detalle]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import time
+import types
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import procesador_horarios
+from balanceo_flujo import MODOS_BALANCEO
+from cargador_horarios import cargar_grilla
+from emparejamiento import MODOS_EMPAREJAMIENTO
+from grilla_horario import GrillaHorario
+from instantanea_horario import EXTENSION_INSTANTANEA, guardar_instantanea
+from motor_restricciones import RUTA_REGLAS
+from pipeline_horarios import ETAPAS, semilla_etapa
+from stat_transformada import StatTransformada
+
+DIR_MODULOS = os.path.dirname(os.path.abspath(__file__))
+DIR_CACHE = ".cache_etapas"
+ENTRADA_ORIGINAL = "horioUnificado.xlsx"  # la que lee procesador_horarios.py
+ENTRADA_PIPELINE = "horarioUnificado_procesado.xlsx"
+
+# Entradas que una etapa lee además del xlsx (parámetro del constructor → ruta por defecto)
+ARCHIVOS_EXTRA: Dict[str, Tuple[str, ...]] = {
+    "sabados_festivos": ("cuentas1y2sabadosDomingo_asignado.json",),
+}
+
+
+# ----------------------------------------------------------------------
+# Hashes
+# ----------------------------------------------------------------------
+def hash_grilla(grid: GrillaHorario) -> str:
+    """Hash del contenido de la grilla (independiente del orden de internado de los códigos)."""
+    h = hashlib.sha256()
+    h.update(json.dumps([grid.siglas, [None if e is None else str(e) for e in grid.encabezados]],
+                        ensure_ascii=False).encode("utf-8"))
+    for fila in grid.filas():
+        h.update(b"\x1e")
+        h.update("\x1f".join(grid.valores_fila(fila)).encode("utf-8"))
+    return h.hexdigest()
+
+
+def hash_archivo(ruta: str) -> str:
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 16), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def modulos_locales(objeto: Any) -> List[str]:
+    """Archivos .py del proyecto de los que depende 'objeto' (su módulo y los que importa, recursivamente)."""
+    modulo = inspect.getmodule(objeto)
+    pendientes = [modulo] if modulo else []
+    vistos: Set[str] = set()
+    archivos: List[str] = []
+    while pendientes:
+        modulo = pendientes.pop()
+        archivo = getattr(modulo, "__file__", None)
+        if not archivo or modulo.__name__ in vistos:
+            continue
+        vistos.add(modulo.__name__)
+        if os.path.dirname(os.path.abspath(archivo)) != DIR_MODULOS:
+            continue
+        archivos.append(os.path.abspath(archivo))
+        for valor in vars(modulo).values():
+            if isinstance(valor, types.ModuleType):
+                pendientes.append(valor)
+            elif getattr(valor, "__module__", None) in sys.modules:
+                pendientes.append(sys.modules[valor.__module__])
+    return sorted(archivos)
+
+
+def hash_codigo(objeto: Any) -> str:
+    h = hashlib.sha256()
+    for archivo in modulos_locales(objeto):
+        h.update(os.path.basename(archivo).encode("utf-8"))
+        h.update(hash_archivo(archivo).encode("ascii"))
+    return h.hexdigest()
+
+
+# ----------------------------------------------------------------------
+# Etapas
+# ----------------------------------------------------------------------
+@dataclass
+class EtapaCacheable:
+    nombre: str
+    ejecutar: Callable[[str], None]  # recibe la ruta del xlsx de entrada
+    archivo_salida: str
+    codigo: Any  # clase o función de la etapa (de ella salen el módulo y las listas de trabajadores)
+    sortea: bool = False
+    opciones: Dict[str, Any] = field(default_factory=dict)
+    archivos_extra: Tuple[str, ...] = ()
+    archivo_entrada: Optional[str] = None  # entrada fija; si no, la salida de la etapa anterior
+
+    def trabajadores(self) -> Dict[str, List[str]]:
+        if not inspect.isclass(self.codigo):
+            return {}
+        return {n: list(v) for n, v in sorted(vars(self.codigo).items()) if n.startswith("TRABAJADORES")}
+
+
+def _procesar(entrada: str) -> None:
+    if os.path.abspath(entrada) != os.path.abspath(ENTRADA_ORIGINAL):
+        raise ValueError(f"procesador_horarios.py solo lee {ENTRADA_ORIGINAL} (recibido {entrada})")
+    procesador_horarios.procesar_horarios()
+
+
+def etapas_cacheables(semilla: Optional[int] = None, modo_balanceo: str = "iterativo",
+                      modo_emparejamiento: str = "dos_fases", con_procesador: bool = True,
+                      con_stats: bool = True) -> List[EtapaCacheable]:
+    """
+    procesador_horarios, las etapas de ETAPAS como scripts sueltos (cada una lee el xlsx
+    de la anterior) y StatTransformada.
+    """
+    etapas: List[EtapaCacheable] = []
+    if con_procesador:
+        etapas.append(EtapaCacheable("procesador", _procesar, ENTRADA_PIPELINE, procesador_horarios.procesar_horarios,
+                                     archivo_entrada=ENTRADA_ORIGINAL))
+    for etapa in ETAPAS:
+        opciones = dict(etapa.opciones)
+        if etapa.rebalancea:
+            opciones["modo_balanceo"] = modo_balanceo
+        if etapa.empareja:
+            opciones["modo_emparejamiento"] = modo_emparejamiento
+        if etapa.sortea and semilla is not None:
+            opciones["semilla"] = semilla_etapa(semilla, etapa.nombre)
+
+        def ejecutar(entrada: str, etapa=etapa, opciones=opciones) -> None:
+            getattr(etapa.clase(entrada, **opciones), etapa.metodo)()
+
+        etapas.append(EtapaCacheable(etapa.nombre, ejecutar, etapa.archivo_salida, etapa.clase,
+                                     sortea=etapa.sortea, opciones=opciones,
+                                     archivos_extra=ARCHIVOS_EXTRA.get(etapa.nombre, ())))
+    if con_stats:
+        etapas.append(EtapaCacheable(
+            "stat_transformada",
+            lambda entrada: StatTransformada(entrada, abrir_al_terminar=False),
+            "horarioUnificado_con_mofis_stats.xlsx",
+            StatTransformada,
+            # Como el script suelto, parte del horario con MOFIS (no del de sencillos)
+            archivo_entrada="horarioUnificado_con_mofis.xlsx",
+        ))
+    return etapas
+
+
+# ----------------------------------------------------------------------
+# Caché
+# ----------------------------------------------------------------------
+class CacheEtapas:
+    """
+    Entradas en directorio/<clave[:2]>/<clave>/: salida.xlsx, salida.hsnap y meta.json
+    (etapa, archivo de salida, hash de la grilla de salida, fecha).
+    """
+
+    def __init__(self, directorio: str = DIR_CACHE) -> None:
+        self.directorio = directorio
+        self._hash_reglas = hash_archivo(RUTA_REGLAS)
+        self._hash_codigo: Dict[int, str] = {}
+
+    def clave(self, etapa: EtapaCacheable, hash_entrada: str) -> Optional[str]:
+        """Clave de la etapa para esa entrada; None si no es cacheable (sortea sin semilla)."""
+        if etapa.sortea and "semilla" not in etapa.opciones:
+            return None
+        codigo = self._hash_codigo.get(id(etapa.codigo))
+        if codigo is None:
+            codigo = self._hash_codigo[id(etapa.codigo)] = hash_codigo(etapa.codigo)
+        extra = {ruta: hash_archivo(ruta) if os.path.exists(ruta) else None for ruta in etapa.archivos_extra}
+        contenido = json.dumps({
+            "etapa": etapa.nombre,
+            "entrada": hash_entrada,
+            "codigo": codigo,
+            "trabajadores": etapa.trabajadores(),
+            "reglas": self._hash_reglas,
+            "opciones": etapa.opciones,
+            "extra": extra,
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, clave[:2], clave)
+
+    def buscar(self, clave: str) -> Optional[Dict[str, Any]]:
+        ruta_meta = os.path.join(self._ruta(clave), "meta.json")
+        if not os.path.exists(ruta_meta):
+            return None
+        with open(ruta_meta, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if not os.path.exists(os.path.join(self._ruta(clave), "salida.xlsx")):
+            return None
+        return meta
+
+    def restaurar(self, clave: str, destino: str) -> None:
+        shutil.copyfile(os.path.join(self._ruta(clave), "salida.xlsx"), destino)
+
+    def guardar(self, clave: str, etapa: EtapaCacheable, salida: str) -> Dict[str, Any]:
+        """Copia la salida de la etapa a la caché (xlsx + instantánea) y devuelve sus metadatos."""
+        grid = cargar_grilla(salida)
+        directorio = self._ruta(clave)
+        temporal = f"{directorio}.tmp"
+        shutil.rmtree(temporal, ignore_errors=True)
+        os.makedirs(temporal)
+        shutil.copyfile(salida, os.path.join(temporal, "salida.xlsx"))
+        guardar_instantanea(os.path.join(temporal, "salida" + EXTENSION_INSTANTANEA), grid, etapa=etapa.nombre)
+        meta = {
+            "etapa": etapa.nombre,
+            "archivo_salida": etapa.archivo_salida,
+            "hash_salida": hash_grilla(grid),
+            "creado": datetime.now().isoformat(timespec="seconds"),
+        }
+        with open(os.path.join(temporal, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        # La entrada aparece completa o no aparece
+        shutil.rmtree(directorio, ignore_errors=True)
+        os.replace(temporal, directorio)
+        return meta
+
+    def limpiar(self) -> None:
+        shutil.rmtree(self.directorio, ignore_errors=True)
+
+
+class CadenaConCache:
+    """
+    Ejecuta la cadena de scripts sueltos desde 'archivo_entrada' reutilizando la caché.
+
+    Cada etapa lee explícitamente el xlsx de la anterior (o su archivo_entrada fijo), sin
+    adivinar por 'candidatos'. Con detalle=False se oculta la salida por consola de las etapas.
+    """
+
+    def __init__(self, etapas: Iterable[EtapaCacheable], cache: CacheEtapas,
+                 archivo_entrada: str = ENTRADA_ORIGINAL, detalle: bool = False) -> None:
+        if not os.path.exists(archivo_entrada):
+            raise FileNotFoundError(f"No se encontró el archivo Excel: {archivo_entrada}")
+        self.etapas = list(etapas)
+        if not self.etapas:
+            raise ValueError("La cadena necesita al menos una etapa")
+        self.cache = cache
+        self.archivo_entrada = archivo_entrada
+        self.detalle = detalle
+        self.estados: Dict[str, str] = {}
+        # Hash de la grilla de cada xlsx producido (o leído) en esta ejecución
+        self._hashes: Dict[str, str] = {}
+
+    def _hash_de(self, ruta: str) -> str:
+        if ruta not in self._hashes:
+            self._hashes[ruta] = hash_grilla(cargar_grilla(ruta))
+        return self._hashes[ruta]
+
+    def _ejecutar_etapa(self, etapa: EtapaCacheable, entrada: str) -> None:
+        if self.detalle:
+            etapa.ejecutar(entrada)
+            return
+        with open(os.devnull, "w") as silencio, contextlib.redirect_stdout(silencio):
+            etapa.ejecutar(entrada)
+
+    def ejecutar(self) -> str:
+        """Devuelve la ruta del xlsx de la última etapa."""
+        print(f"🗃️  Caché de etapas: {self.cache.directorio}")
+        inicio_total = time.perf_counter()
+        anterior = self.archivo_entrada
+
+        for etapa in self.etapas:
+            inicio = time.perf_counter()
+            entrada = etapa.archivo_entrada or anterior
+            clave = self.cache.clave(etapa, self._hash_de(entrada))
+            meta = self.cache.buscar(clave) if clave else None
+            if meta is not None:
+                self.cache.restaurar(clave, etapa.archivo_salida)
+                estado = "♻️  caché"
+            else:
+                self._ejecutar_etapa(etapa, entrada)
+                if not os.path.exists(etapa.archivo_salida):
+                    raise FileNotFoundError(f"La etapa {etapa.nombre} no generó {etapa.archivo_salida}")
+                if clave:
+                    meta = self.cache.guardar(clave, etapa, etapa.archivo_salida)
+                    estado = "▶ ejecutada"
+                else:
+                    meta = {"hash_salida": hash_grilla(cargar_grilla(etapa.archivo_salida))}
+                    estado = "▶ ejecutada (sin semilla, no se guarda)"
+            self._hashes[etapa.archivo_salida] = meta["hash_salida"]
+            self.estados[etapa.nombre] = estado
+            print(f"   • {etapa.nombre:<18} {estado:<40} {time.perf_counter() - inicio:6.2f} s")
+            anterior = etapa.archivo_salida
+
+        print(f"   • {'TOTAL':<18} {'':<40} {time.perf_counter() - inicio_total:6.2f} s")
+        return self.etapas[-1].archivo_salida
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cadena de etapas que reutiliza las salidas que no cambiaron.")
+    parser.add_argument("--desde-procesado", action="store_true",
+                        help=f"empezar en {ENTRADA_PIPELINE} (sin procesador_horarios.py)")
+    parser.add_argument("--semilla", type=int, default=None,
+                        help="semilla de los sorteos (sin ella, las etapas que sortean no se guardan)")
+    parser.add_argument("--cache", default=DIR_CACHE, metavar="DIR")
+    parser.add_argument("--balanceo", choices=MODOS_BALANCEO, default="iterativo")
+    parser.add_argument("--emparejamiento", choices=MODOS_EMPAREJAMIENTO, default="dos_fases")
+    parser.add_argument("--sin-stats", action="store_true", help="no ejecutar StatTransformada al final")
+    parser.add_argument("--limpiar", action="store_true", help="vaciar la caché antes de empezar")
+    parser.add_argument("--detalle", action="store_true", help="mostrar la salida de las etapas que se ejecutan")
+    args = parser.parse_args()
+
+    cache = CacheEtapas(args.cache)
+    if args.limpiar:
+        cache.limpiar()
+    if args.semilla is None:
+        print("⚠️ Sin --semilla las etapas que sortean se ejecutan siempre")
+    etapas = etapas_cacheables(args.semilla, args.balanceo, args.emparejamiento,
+                               con_procesador=not args.desde_procesado, con_stats=not args.sin_stats)
+    cadena = CadenaConCache(etapas, cache, archivo_entrada=ENTRADA_PIPELINE if args.desde_procesado else ENTRADA_ORIGINAL,
+                            detalle=args.detalle)
+    print(f"💾 Archivo final: {cadena.ejecutar()}")
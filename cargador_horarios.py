@@ -0,0 +1,163 @@
+"""
+Carga de solo lectura (streaming) de horarios para herramientas de análisis.
+
+Los asignadores necesitan el libro completo en modo lectura/escritura porque
+pintan celdas y guardan, pero las herramientas que solo miran (inspect_excel.py,
+verificar_mofis.py, auditorías de meses archivados) no: con openpyxl.load_workbook(...) normal se crea un
+objeto Cell con su estilo por cada celda de la hoja.
+
+Aquí el libro se abre con read_only=True y las filas se recorren una sola vez
+con iter_rows(values_only=True): solo se guardan los valores.
+
+- libro_solo_lectura(ruta): contexto que abre el libro en modo streaming y lo
+  cierra al salir (en read_only openpyxl mantiene el archivo abierto).
+- cargar_grilla(ruta): GrillaHorario directamente desde el streaming (lee solo
+  las filas de trabajadores; el resto de la hoja no se parsea). También acepta
+  instantáneas binarias .hsnap (instantanea_horario.py).
+- turnos_de_borde(ruta): {SIGLA: turno} del último (o primer) día de un
+  horario, para el contexto de GrillaHorario.fijar_contexto() al planificar
+  el periodo siguiente (o el anterior).
+- leer_hoja(ruta, hoja): TablaValores, matriz de valores con la misma
+  interfaz de consulta 1-indexada que ws.cell(row, column).value.
+
+Para las etapas (lectura/escritura) queda abrir_horario(ruta): libro editable
+y su grilla desde un xlsx o desde una instantánea .hsnap, que se aplica sobre
+el xlsx de plantilla (la instantánea guarda solo los turnos, no el formato).
+"""
+
+import os
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import openpyxl
+
+from catalogo_turnos import color_turno
+from estadisticas_horario import HOJA_ESTADISTICAS, EscritorEstadisticas
+from estilos_horario import estilos_compartidos
+from grilla_horario import GrillaHorario
+from instantanea_horario import aplicar_instantanea, es_instantanea, leer_instantanea
+
+# Libro con el formato de la hoja sobre el que se aplican las instantáneas (la entrada del pipeline)
+PLANTILLA_INSTANTANEAS = "horarioUnificado_procesado.xlsx"
+
+
+@contextmanager
+def libro_solo_lectura(ruta: str, data_only: bool = True) -> Iterator[openpyxl.Workbook]:
+    """Abre el libro en modo read_only (sin estilos por celda) y lo cierra al terminar."""
+    wb = openpyxl.load_workbook(ruta, read_only=True, data_only=data_only)
+    try:
+        yield wb
+    finally:
+        wb.close()
+
+
+def hoja_horario(wb, hoja: Optional[str] = None):
+    """Hoja pedida, o la primera que no sea la de estadísticas."""
+    if hoja is not None:
+        return wb[hoja]
+    for nombre in wb.sheetnames:
+        if nombre != HOJA_ESTADISTICAS:
+            return wb[nombre]
+    return wb.active
+
+
+def _asegurar_dimensiones(ws) -> None:
+    # Libros sin etiqueta <dimension>: max_column/max_row quedan en None hasta recorrer la hoja
+    if ws.max_column is None or ws.max_row is None:
+        ws.calculate_dimension(force=True)
+
+
+def cargar_grilla(ruta: str, hoja: Optional[str] = None) -> GrillaHorario:
+    """GrillaHorario leída en streaming (solo filas de trabajadores, sin estilos) o desde una instantánea."""
+    if es_instantanea(ruta):
+        with leer_instantanea(ruta) as instantanea:
+            return instantanea.a_grilla()
+    with libro_solo_lectura(ruta) as wb:
+        ws = hoja_horario(wb, hoja)
+        _asegurar_dimensiones(ws)
+        return GrillaHorario.desde_hoja(ws)
+
+
+def abrir_horario(ruta: str, plantilla: str = PLANTILLA_INSTANTANEAS) -> Tuple[openpyxl.Workbook, GrillaHorario]:
+    """
+    Libro editable y su grilla, desde un xlsx o desde una instantánea .hsnap.
+
+    Con una instantánea se abre el xlsx de plantilla y se lleva su grilla al estado
+    de la instantánea (aplicar_instantanea): las celdas que cambian quedan marcadas
+    para volcado y se pintan con el color del catálogo, y la hoja 'Estadísticas'
+    recupera las columnas que tenía al guardarse. La etapa guarda así un xlsx
+    completo, como si hubiera leído el de la etapa anterior (salvo colores propios
+    de una etapa distintos del catálogo).
+    """
+    if not es_instantanea(ruta):
+        wb = openpyxl.load_workbook(ruta)
+        return wb, GrillaHorario.desde_hoja(hoja_horario(wb))
+    if not os.path.exists(plantilla):
+        raise FileNotFoundError(f"{ruta} es una instantánea y no se encontró el xlsx de plantilla: {plantilla}")
+    wb = openpyxl.load_workbook(plantilla)
+    ws = hoja_horario(wb)
+    grid = GrillaHorario.desde_hoja(ws)
+    with leer_instantanea(ruta) as instantanea:
+        cambios = aplicar_instantanea(grid, instantanea)
+        columnas = instantanea.estadisticas
+    estilos = estilos_compartidos(ws)
+    for (fila, col), valor in grid.celdas_modificadas().items():
+        estilos.pintar(fila, col, color_turno(valor))
+    EscritorEstadisticas(wb, grid, ws.title).escribir(columnas)
+    print(f"📸 Instantánea {ruta} aplicada sobre {plantilla}: {cambios} celdas")
+    return wb, grid
+
+
+def turnos_de_borde(ruta: str, ultimo: bool = True, hoja: Optional[str] = None) -> Dict[str, str]:
+    """{SIGLA: turno} del último día del horario (o del primero con ultimo=False); xlsx o .hsnap."""
+    grid = cargar_grilla(ruta, hoja)
+    col = grid.max_col if ultimo else grid.col_inicio
+    return {sigla: grid.valor(fila, col) for fila, sigla in grid.trabajadores()}
+
+
+class TablaValores:
+    """
+    Valores de una hoja (sin estilos), consultables como la hoja original.
+
+    - valor(fila, col): 1-indexado; None fuera de rango.
+    - max_row / max_column: dimensiones de la hoja.
+    - columnas_por_encabezado(): {valor de la fila 1: columna}; si se repite gana la primera.
+    """
+
+    def __init__(self, titulo: str, filas: List[Tuple[object, ...]]) -> None:
+        self.title = titulo
+        self.filas = filas
+        self.max_row = len(filas)
+        self.max_column = max((len(f) for f in filas), default=0)
+
+    @classmethod
+    def desde_hoja(cls, ws, max_filas: Optional[int] = None) -> "TablaValores":
+        _asegurar_dimensiones(ws)
+        filas = [tuple(f) for f in ws.iter_rows(min_row=1, max_row=max_filas, values_only=True)]
+        return cls(ws.title, filas)
+
+    def valor(self, fila: int, col: int) -> object:
+        if not (1 <= fila <= self.max_row):
+            return None
+        valores = self.filas[fila - 1]
+        return valores[col - 1] if 1 <= col <= len(valores) else None
+
+    def fila(self, fila: int) -> Sequence[object]:
+        return self.filas[fila - 1] if 1 <= fila <= self.max_row else ()
+
+    def columnas_por_encabezado(self) -> Dict[object, int]:
+        columnas: Dict[object, int] = {}
+        for col, encabezado in enumerate(self.fila(1), start=1):
+            if encabezado is not None:
+                columnas.setdefault(encabezado, col)
+        return columnas
+
+
+def leer_hoja(ruta: str, hoja: Optional[str] = None, data_only: bool = True,
+              max_filas: Optional[int] = None) -> Optional[TablaValores]:
+    """Valores de una hoja en streaming; None si la hoja pedida no existe."""
+    with libro_solo_lectura(ruta, data_only=data_only) as wb:
+        if hoja is not None and hoja not in wb.sheetnames:
+            return None
+        return TablaValores.desde_hoja(hoja_horario(wb, hoja), max_filas=max_filas)
+
@@ -0,0 +1,218 @@
+"""
+Catálogo único de códigos de turno.
+
+Cada turno se define una sola vez (Turno) con sus atributos:
+- operativo: si cuenta en 'TURNOS OPERATIVOS' (la celda vacía cuenta como operativa).
+- mitades: conversión a dos columnas (primera/segunda) de excel_con_division_de_columna.py
+  (sin mitades, el código se copia tal cual en la primera columna).
+- color: relleno con el que lo pinta su etapa (los no operativos, amarillo de procesador_horarios.py).
+- reemplazable: no operativo que la etapa MOFIS puede sobrescribir ("X").
+
+Al importar, el catálogo se compila a ids enteros (CODIGOS / ID_TURNO, con 0 = celda
+vacía) y a la tabla NumPy ES_OPERATIVO indexada por id. GrillaHorario arranca su
+tabla de internado con CODIGOS, así que en cualquier grilla el id de un turno del
+catálogo es el mismo y clasificar una celda es indexar una tabla.
+normalizar_turno() memoriza el str().strip().upper() de cada texto visto.
+
+Los códigos que no están en el catálogo siguen la regla de siempre: cuentan como
+operativos.
+"""
+
+from dataclasses import dataclass
+from typing import AbstractSet, Dict, FrozenSet, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Turno:
+    codigo: str
+    operativo: bool = True
+    mitades: Tuple[str, ...] = ()
+    color: Optional[str] = None
+    reemplazable: bool = False
+    grupo: str = ""
+
+
+COLOR_NO_OPERATIVO = "FFFF00"  # Amarillo
+
+
+def _no_operativos(grupo: str, *codigos: str) -> Tuple[Turno, ...]:
+    return tuple(
+        Turno(c, operativo=False, color=COLOR_NO_OPERATIVO, grupo=grupo)
+        for c in codigos
+    )
+
+
+CATALOGO: Tuple[Turno, ...] = (
+    # ------------------------------------------------------------------
+    # No operativos (lista de procesador_horarios.py)
+    # ------------------------------------------------------------------
+    # Turnos básicos
+    *_no_operativos("basicos", "DESC", "TROP", "LIBR"),
+    # Turnos completos
+    *_no_operativos("completos", "VACA", "COME", "COMT", "COMS"),
+    # Turnos adicionales originales
+    *_no_operativos("adicionales", "SIND", "CMED", "CERT", "LICR"),
+    # Formación, instrucción y entrenamiento
+    *_no_operativos(
+        "formacion",
+        "CAPA", "MCAE", "TCAE", "MCHC", "TCHC", "NCHC", "ACHC",
+        "MENT", "TENT", "NENT", "AENT",
+        "MINS", "TINS", "NINS", "AINS",
+    ),
+    # Gestión, oficinas y grupos de trabajo
+    *_no_operativos(
+        "gestion",
+        "MCOR", "TCOR", "MSMS", "TSMS", "MDBM", "TDBM",
+        "MDOC", "TDOC", "MPRO", "TPRO", "MATF", "TATF",
+        "MGST", "TGST", "MOFI", "TOFI",
+    ),
+    # Operativos y asignaciones especiales
+    *_no_operativos("especiales", "CET", "ATC", "KATC", "XATC", "YATC", "ZATC"),
+    Turno("X", operativo=False, color=COLOR_NO_OPERATIVO, reemplazable=True, grupo="especiales"),
+
+    # ------------------------------------------------------------------
+    # Horas extra (etapas 1T, 1, 3, 6R, 6RT, 6T, 6TT, diurnas)
+    # ------------------------------------------------------------------
+    Turno("1T", mitades=("BLPT",), color="FFE6CC", grupo="extra"),
+    Turno("7", mitades=("BLPT", "NLPR"), color="FFE6CC", grupo="extra"),
+    Turno("1", mitades=("BANT",), color="FFA500", grupo="extra"),
+    Turno("3", mitades=("TAST", "SLN3"), color="B8860B", grupo="extra"),
+    Turno("6R", mitades=("MAST", "NANR"), color="4169E1", grupo="extra"),
+    Turno("6RT", mitades=("MLPR", "NLPR"), color="E6E6FA", grupo="extra"),
+    Turno("6T", mitades=("TANT", "NANT"), color="008B8B", grupo="extra"),
+    Turno("6TT", mitades=("TLPT", "NLPT"), color="9370DB", grupo="extra"),
+    Turno("6S", mitades=("MASR", "TASR"), color="8B0000", grupo="diurnas"),
+    Turno("6N", mitades=("MANR", "TANR"), color="DC143C", grupo="diurnas"),
+    Turno("6MT", mitades=("MLPR", "TLPR"), grupo="extra"),
+
+    # ------------------------------------------------------------------
+    # Sábados y festivos (columnas 1D / 3D / 6D de estadísticas)
+    # ------------------------------------------------------------------
+    Turno("BANTD", mitades=("BANT",), grupo="sabados"),
+    Turno("BLPTD", mitades=("BLPT",), grupo="sabados"),
+    Turno("3D", mitades=("TAST", "SLN3"), grupo="sabados"),
+    Turno("TASTD", grupo="sabados"),
+    Turno("NLPTD", mitades=("NLPT",), grupo="sabados"),
+    Turno("NLPRD", mitades=("NLPR",), grupo="sabados"),
+    Turno("NANTD", mitades=("NANT",), grupo="sabados"),
+    Turno("NANRD", mitades=("NANR",), grupo="sabados"),
+    Turno("6MTD", mitades=("MLPR", "TLPR"), grupo="sabados"),
+
+    # ------------------------------------------------------------------
+    # MOFIS (asignador_turnos_mofis.py)
+    # ------------------------------------------------------------------
+    Turno("MS", mitades=("MASA",), color="6A7201", grupo="mofis"),
+    Turno("TS", mitades=("TASA",), color="6A7201", grupo="mofis"),
+    Turno("MN", mitades=("MANA",), color="6A7201", grupo="mofis"),
+    Turno("TN", mitades=("TANA",), color="6A7201", grupo="mofis"),
+    Turno("S", mitades=("MASA", "TASA"), color="6A7201", grupo="mofis"),
+    Turno("N", mitades=("MANA", "TANA"), color="6A7201", grupo="mofis"),
+
+    # ------------------------------------------------------------------
+    # Sencillos (asignador_turnos_sencillos.py) y mitades sueltas
+    # ------------------------------------------------------------------
+    Turno("MANR", mitades=("MANR",), color="FF9999", grupo="sencillos"),
+    Turno("TANR", mitades=("TANR",), color="FF9999", grupo="sencillos"),
+    Turno("MASR", mitades=("MASR",), color="CC0000", grupo="sencillos"),
+    Turno("TASR", mitades=("TASR",), color="CC0000", grupo="sencillos"),
+    Turno("ASIG", mitades=("ASIG",), color="808080", grupo="sencillos"),
+    Turno("MLPR", mitades=("MLPR",), color="FFD700", grupo="sencillos"),
+    Turno("TLPR", mitades=("TLPR",), color="FFD700", grupo="sencillos"),
+    Turno("TLPT", mitades=("TLPT",), color="FFD700", grupo="sencillos"),
+    Turno("TANT", mitades=("TANT",), color="FFA500", grupo="sencillos"),
+    Turno("MAST", mitades=("MAST",), color="FF4500", grupo="sencillos"),
+    Turno("NLPT", mitades=("NLPT",), grupo="mitades"),
+    Turno("NLPR", mitades=("NLPR",), grupo="mitades"),
+    Turno("NANT", mitades=("NANT",), grupo="mitades"),
+    Turno("NANR", mitades=("NANR",), grupo="mitades"),
+
+    # ------------------------------------------------------------------
+    # Combinaciones de mitades (columnas 6S / 6N de estadísticas)
+    # ------------------------------------------------------------------
+    Turno("MANRAS", mitades=("MANR", "ASIG"), grupo="combinados"),
+    Turno("MASRAS", mitades=("MASR", "ASIG"), grupo="combinados"),
+    Turno("ASTASR", mitades=("ASIG", "TASR"), grupo="combinados"),
+    Turno("ASTANR", mitades=("ASIG", "TANR"), grupo="combinados"),
+    Turno("MASRTS", mitades=("MASR", "TASA"), grupo="combinados"),
+    Turno("MSTASR", mitades=("MASA", "TASR"), grupo="combinados"),
+    Turno("MNTANR", mitades=("MANA", "TANR"), grupo="combinados"),
+    Turno("MANRTN", mitades=("MANR", "TANA"), grupo="combinados"),
+    Turno("MCORTS", mitades=("MCOR", "TASA"), grupo="combinados"),
+    Turno("MCORTN", mitades=("MCOR", "TANA"), grupo="combinados"),
+)
+
+# ----------------------------------------------------------------------
+# Compilación a ids y tablas (una vez, al importar)
+# ----------------------------------------------------------------------
+TURNOS: Dict[str, Turno] = {}
+for _t in CATALOGO:
+    if _t.codigo in TURNOS:
+        raise ValueError(f"Código de turno repetido en el catálogo: {_t.codigo}")
+    TURNOS[_t.codigo] = _t
+
+# Id 0 = celda vacía; los turnos del catálogo van del 1 en adelante, en el orden de arriba
+CODIGOS: Tuple[str, ...] = ("",) + tuple(TURNOS)
+ID_TURNO: Dict[str, int] = {c: i for i, c in enumerate(CODIGOS)}
+
+ES_OPERATIVO = np.array([True] + [t.operativo for t in CATALOGO], dtype=bool)
+ES_OPERATIVO.setflags(write=False)
+
+TURNOS_NO_OPERATIVOS: FrozenSet[str] = frozenset(t.codigo for t in CATALOGO if not t.operativo)
+# No operativos que ninguna etapa sobrescribe (MOFIS sí pisa las "X")
+TURNOS_BLOQUEANTES: FrozenSet[str] = frozenset(t.codigo for t in CATALOGO if not t.operativo and not t.reemplazable)
+TURNOS_MOFIS: FrozenSet[str] = frozenset(t.codigo for t in CATALOGO if t.grupo == "mofis")
+
+
+# ----------------------------------------------------------------------
+# Consulta
+# ----------------------------------------------------------------------
+_normalizados: Dict[str, str] = {}
+
+
+def normalizar_turno(valor: object) -> str:
+    """Texto de celda normalizado (strip + upper; None = ""), memorizado por texto."""
+    if valor is None:
+        return ""
+    if type(valor) is str:
+        normalizado = _normalizados.get(valor)
+        if normalizado is None:
+            normalizado = _normalizados[valor] = valor.strip().upper()
+        return normalizado
+    return str(valor).strip().upper()
+
+
+def id_turno(valor: object) -> Optional[int]:
+    """Id de catálogo del valor (0 = vacío), o None si el código no está en el catálogo."""
+    return ID_TURNO.get(normalizar_turno(valor))
+
+
+def turno(valor: object) -> Optional[Turno]:
+    return TURNOS.get(normalizar_turno(valor))
+
+
+def color_turno(valor: object) -> Optional[str]:
+    t = turno(valor)
+    return t.color if t else None
+
+
+def mitades_turno(valor: object) -> Tuple[str, ...]:
+    """Mitades (primera, segunda) del turno en el horario de dos columnas; () si se copia tal cual."""
+    t = turno(valor)
+    return t.mitades if t else ()
+
+
+def tabla_operativos(codigos: Sequence[str], no_operativos: AbstractSet[str] = TURNOS_NO_OPERATIVOS) -> np.ndarray:
+    """
+    Tabla id → ¿operativo? para una tabla de internado (p. ej. grid.codigos).
+
+    Con el conjunto estándar y una tabla que empieza por CODIGOS (toda GrillaHorario
+    cargada de hoja) se reutiliza ES_OPERATIVO y solo se clasifican los códigos extra.
+    """
+    n_catalogo = len(CODIGOS)
+    if no_operativos == TURNOS_NO_OPERATIVOS and tuple(codigos[:n_catalogo]) == CODIGOS:
+        extra = np.fromiter((c not in no_operativos for c in codigos[n_catalogo:]), dtype=bool,
+                            count=len(codigos) - n_catalogo)
+        return np.concatenate([ES_OPERATIVO, extra])
+    return np.fromiter((c not in no_operativos for c in codigos), dtype=bool, count=len(codigos))
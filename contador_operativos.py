@@ -0,0 +1,152 @@
+"""
+Conteo vectorizado de personal operativo (TURNOS OPERATIVOS) y de Torre.
+
+Regla de conteo (la misma de procesador_horarios.py): en cada día cuenta como
+operativa toda celda vacía o con un código que NO esté en el conjunto de turnos
+no operativos que se indique.
+
+El conteo se hace sobre los ids internados de GrillaHorario (vista NumPy del
+arreglo de la grilla, sin copiar): una tabla booleana id → ¿operativo? y una
+suma por columnas calculan todos los días en una sola pasada. Después el
+contador se registra como observador de la grilla y ajusta solo la columna
+afectada cuando cambia una celda, de modo que los asignadores leen conteos
+vivos sin volver a recorrer la hoja.
+
+El conjunto de turnos no operativos vive en catalogo_turnos.py (se reexporta
+aquí). contador_compartido(grid) devuelve un único contador por grilla con ese
+conjunto estándar: en el pipeline todas las etapas leen el mismo
+conteo vivo en lugar de la fila estática 'TURNOS OPERATIVOS', que se queda
+desactualizada a medida que se asignan turnos.
+"""
+
+import weakref
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from catalogo_turnos import TURNOS_NO_OPERATIVOS, normalizar_turno, tabla_operativos
+from grilla_horario import GrillaHorario
+
+SIGLAS_TORRE = ("YIS", "MAQ", "DJO", "AFG", "JLF", "JMV")
+
+# Etiquetas (columna A) de las filas de conteo que escribe procesador_horarios.py
+ETIQUETA_OPERATIVOS = "TURNOS OPERATIVOS"
+ETIQUETA_TORRE = "TORRE"
+
+
+class ContadorOperativos:
+    """
+    Conteos por día de personal operativo y de Torre, mantenidos en vivo.
+
+    Parámetros del constructor:
+    - grid: grilla del horario.
+    - no_operativos: códigos que NO cuentan como operativos (cada etapa pasa su variante).
+    - siglas_torre: trabajadores cuyo subtotal forma la fila 'Torre' (vacío = no se calcula).
+    """
+
+    def __init__(self, grid: GrillaHorario, no_operativos: Iterable[str],
+                 siglas_torre: Iterable[str] = ()) -> None:
+        self.grid = grid
+        self.no_operativos = frozenset(normalizar_turno(c) for c in no_operativos)
+        self.siglas_torre = tuple(siglas_torre)
+
+        self._es_operativo = np.zeros(0, dtype=bool)
+        self._filas_torre: List[int] = []
+        self._operativos = np.zeros(grid.n_cols, dtype=np.int64)
+        self._torre = np.zeros(grid.n_cols, dtype=np.int64)
+
+        self.recalcular()
+        self.grid.agregar_observador(self._al_cambiar_celda)
+
+    # ------------------------------------------------------------------
+    # Cálculo completo
+    # ------------------------------------------------------------------
+    def _actualizar_tabla(self) -> None:
+        """Tabla id → ¿operativo?; se extiende cuando la grilla interna códigos nuevos."""
+        self._es_operativo = tabla_operativos(self.grid.codigos, self.no_operativos)
+
+    def _matriz_ids(self) -> np.ndarray:
+        datos = np.frombuffer(self.grid.arreglo_ids(), dtype=np.uint16)
+        return datos.reshape(self.grid.n_filas, self.grid.n_cols)
+
+    def recalcular(self) -> None:
+        """Recalcula todos los días en una pasada (también relee las filas de Torre)."""
+        self._actualizar_tabla()
+        operativas = self._es_operativo[self._matriz_ids()]
+        self._operativos = operativas.sum(axis=0, dtype=np.int64)
+
+        self._filas_torre = []
+        for sigla in self.siglas_torre:
+            fila = self.grid.fila_trabajador(sigla)
+            if fila:
+                self._filas_torre.append(fila)
+        indices = [f - self.grid.fila_inicio for f in self._filas_torre]
+        self._torre = operativas[indices].sum(axis=0, dtype=np.int64)
+
+    # ------------------------------------------------------------------
+    # Actualización incremental
+    # ------------------------------------------------------------------
+    def _es_id_operativo(self, idx: int) -> bool:
+        if idx >= len(self._es_operativo):
+            self._actualizar_tabla()
+        return bool(self._es_operativo[idx])
+
+    def _al_cambiar_celda(self, fila: int, col: int, anterior: int, nuevo: int) -> None:
+        delta = int(self._es_id_operativo(nuevo)) - int(self._es_id_operativo(anterior))
+        if not delta:
+            return
+        j = col - self.grid.col_inicio
+        self._operativos[j] += delta
+        if fila in self._filas_torre:
+            self._torre[j] += delta
+
+    def desconectar(self) -> None:
+        """Deja de seguir los cambios de la grilla (los conteos quedan congelados)."""
+        self.grid.quitar_observador(self._al_cambiar_celda)
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+    def operativos(self, col: int) -> int:
+        return int(self._operativos[col - self.grid.col_inicio])
+
+    def torre(self, col: int) -> int:
+        return int(self._torre[col - self.grid.col_inicio])
+
+    def operativos_por_dia(self) -> np.ndarray:
+        """Copia del vector de conteos (posición 0 = primera columna de día)."""
+        return self._operativos.copy()
+
+    def torre_por_dia(self) -> np.ndarray:
+        return self._torre.copy()
+
+
+_compartidos: "weakref.WeakKeyDictionary[GrillaHorario, ContadorOperativos]" = weakref.WeakKeyDictionary()
+
+
+def contador_compartido(grid: GrillaHorario) -> ContadorOperativos:
+    """Contador vivo estándar (TURNOS_NO_OPERATIVOS + Torre) de la grilla; se crea una vez y lo comparten las etapas."""
+    contador = _compartidos.get(grid)
+    if contador is None:
+        contador = ContadorOperativos(grid, TURNOS_NO_OPERATIVOS, SIGLAS_TORRE)
+        _compartidos[grid] = contador
+    return contador
+
+
+def buscar_filas_etiqueta(ws, etiquetas: Iterable[str]) -> Dict[str, Optional[int]]:
+    """
+    Recorre la columna A una sola vez y devuelve {ETIQUETA: fila} para las etiquetas pedidas.
+
+    La comparación ignora mayúsculas y espacios; si una etiqueta se repite gana la
+    primera fila. Las no encontradas quedan en None.
+    """
+    buscadas = {str(e).strip().upper() for e in etiquetas}
+    filas: Dict[str, Optional[int]] = {e: None for e in buscadas}
+    for fila, (valor,) in enumerate(
+        ws.iter_rows(min_row=1, max_row=ws.max_row, min_col=1, max_col=1, values_only=True), start=1
+    ):
+        if valor:
+            etiqueta = str(valor).strip().upper()
+            if etiqueta in filas and filas[etiqueta] is None:
+                filas[etiqueta] = fila
+    return filas
@@ -0,0 +1,109 @@
+"""
+Orden de recorrido por días con dominios podados (día más restringido primero).
+
+Las etapas de un turno por día recorren las columnas en orden de calendario y
+en cada día eligen al candidato más equitativo. Cuando el turno de la etapa
+bloquea al mismo trabajador en los días vecinos (1T/7 y "1": reglas dura_ayer /
+dura_manana), ese orden puede gastar en un día holgado al único trabajador que
+servía en el día siguiente y dejarlo sin turno. Con orden_dias="restringido":
+
+1. Dominio de cada día = trabajadores que pasan todos los filtros duros de la
+   etapa contra la hoja actual (celda vacía, reglas de adyacencia, día sin el
+   turno, personal suficiente). Lo calcula la propia etapa (dominio(col)).
+2. Se procesa primero el día pendiente con menos candidatos (empates: el
+   primero del calendario). Los días sin candidatos también se procesan, para
+   que la etapa registre por qué quedan sin turno.
+3. Tras cada día se recalcula el dominio de los días pendientes a distancia
+   ≤ alcance (las reglas de adyacencia miran solo ayer y mañana), que cambian
+   de prioridad en la cola.
+
+La elección dentro de cada día (prioridades, blandas, equidad) no cambia. La
+cola es un heap con entradas perezosas: O(días · log días) más el costo de
+recalcular 2 · alcance dominios por día.
+"""
+
+import heapq
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+MODOS_ORDEN_DIAS = ("calendario", "restringido")
+
+
+def validar_orden_dias(modo: str) -> str:
+    if modo not in MODOS_ORDEN_DIAS:
+        raise ValueError(f"orden_dias desconocido '{modo}' (opciones: {', '.join(MODOS_ORDEN_DIAS)})")
+    return modo
+
+
+class DominiosDias:
+    """
+    Cola de días pendientes ordenada por tamaño de dominio.
+
+    Parámetros del constructor:
+    - columnas: días a procesar.
+    - dominio: callable(col) -> candidatos factibles del día según la hoja actual.
+    - alcance: distancia en días hasta la que una asignación cambia dominios ajenos.
+    """
+
+    def __init__(self, columnas: Sequence[int], dominio: Callable[[int], Sequence[Hashable]],
+                 alcance: int = 1) -> None:
+        self.columnas = list(columnas)
+        self._dominio = dominio
+        self.alcance = alcance
+        self._pendientes = set(self.columnas)
+        self._tamanos: Dict[int, int] = {}
+        self._cola: List[Tuple[int, int]] = []
+        self.podados = 0  # días cuyo dominio se achicó por propagación
+        for col in self.columnas:
+            self._actualizar(col)
+
+    def _actualizar(self, col: int) -> None:
+        tamano = len(self._dominio(col))
+        anterior = self._tamanos.get(col)
+        if anterior is not None and tamano < anterior:
+            self.podados += 1
+        self._tamanos[col] = tamano
+        # Las entradas viejas del mismo día quedan en el heap y se descartan al salir
+        heapq.heappush(self._cola, (tamano, col))
+
+    def tamano(self, col: int) -> Optional[int]:
+        return self._tamanos.get(col)
+
+    def siguiente(self) -> Optional[int]:
+        """Día pendiente con menos candidatos (None si no quedan)."""
+        while self._cola:
+            tamano, col = heapq.heappop(self._cola)
+            if col in self._pendientes and self._tamanos[col] == tamano:
+                return col
+        return None
+
+    def propagar(self, col: int) -> None:
+        """Marca el día como procesado y recalcula los dominios de sus vecinos pendientes."""
+        self._pendientes.discard(col)
+        for distancia in range(1, self.alcance + 1):
+            for vecino in (col - distancia, col + distancia):
+                if vecino in self._pendientes:
+                    self._actualizar(vecino)
+
+    def __iter__(self) -> Iterator[int]:
+        """Días en orden de menor dominio; propaga al pedir el siguiente."""
+        col = self.siguiente()
+        while col is not None:
+            yield col
+            self.propagar(col)
+            col = self.siguiente()
+
+
+def recorrer_dias(columnas: Sequence[int], asignar: Callable[[int], object], orden_dias: str = "calendario",
+                  dominio: Optional[Callable[[int], Sequence[Hashable]]] = None) -> List[object]:
+    """
+    Llama asignar(col) una vez por día en el orden pedido y devuelve los resultados
+    en el orden en que se procesaron. "restringido" requiere dominio.
+    """
+    if orden_dias == "calendario":
+        return [asignar(col) for col in columnas]
+    if dominio is None:
+        raise ValueError("orden_dias='restringido' requiere la función de dominio de la etapa")
+    dominios = DominiosDias(columnas, dominio)
+    resultados = [asignar(col) for col in dominios]
+    print(f"🧩 Orden restringido: {len(resultados)} días, {dominios.podados} dominios podados por propagación")
+    return resultados
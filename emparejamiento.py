@@ -0,0 +1,194 @@
+"""
+Emparejamiento bipartito máximo (Hopcroft–Karp) para los asignadores por pedidos.
+
+AsignadorSabadosFestivos resuelve, por turno, un matching 1:1 entre pedidos
+(izquierda) y fechas/slots (derecha) en dos fases: primero solo con aristas
+"duras" (sin violaciones blandas) y después agregando las "blandas" para
+completar lo que falte, sin soltar a ningún pedido ya emparejado.
+
+- BFS por capas y DFS de aumento iterativos (pila explícita): no hay riesgo de
+  límite de recursión con muchos pedidos (p. ej. un trimestre completo).
+- 'pareja_izq' / 'pareja_der' son listas (-1 = libre): saber si un pedido ya
+  está emparejado es O(1).
+- Cada fase hace O(√V) rondas de BFS + DFS, O(E·√V) en total.
+
+Modo ponderado (asignacion_costo_minimo): en lugar de "cualquier matching
+máximo", una sola resolución óptima por turno con costo por arista (p. ej.
+penalización blanda + distancia en días a la fecha pedida). Es el método
+húngaro por caminos más cortos con potenciales, con cada paso vectorizado en
+NumPy sobre las columnas: O(n²·m) en el peor caso, del orden de un segundo para
+un año de pedidos de un turno.
+"""
+
+from collections import deque
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+LIBRE = -1
+
+MODOS_EMPAREJAMIENTO = ("dos_fases", "ponderado")
+
+
+def validar_modo_emparejamiento(modo: str) -> str:
+    if modo not in MODOS_EMPAREJAMIENTO:
+        raise ValueError(f"modo_emparejamiento desconocido '{modo}' (opciones: {', '.join(MODOS_EMPAREJAMIENTO)})")
+    return modo
+
+
+def hopcroft_karp(
+    n_izq: int,
+    n_der: int,
+    adyacencia: Sequence[Sequence[int]],
+    pareja_izq: Optional[List[int]] = None,
+    pareja_der: Optional[List[int]] = None,
+) -> Tuple[List[int], List[int]]:
+    """
+    Matching máximo partiendo (opcionalmente) de uno previo.
+
+    - adyacencia[i]: slots j a los que puede ir el pedido i, en orden de preferencia.
+    - pareja_izq / pareja_der: matching inicial (se copian); los pedidos emparejados
+      al inicio siguen emparejados al final (los caminos de aumento nunca los sueltan).
+    Devuelve (pareja_izq, pareja_der) con LIBRE (-1) en los vértices sin pareja.
+    """
+    pareja_izq = list(pareja_izq) if pareja_izq is not None else [LIBRE] * n_izq
+    pareja_der = list(pareja_der) if pareja_der is not None else [LIBRE] * n_der
+
+    while True:
+        # BFS por capas desde todos los pedidos libres
+        dist = [LIBRE] * n_izq
+        cola = deque()
+        for i in range(n_izq):
+            if pareja_izq[i] == LIBRE:
+                dist[i] = 0
+                cola.append(i)
+        hay_aumento = False
+        while cola:
+            i = cola.popleft()
+            for j in adyacencia[i]:
+                k = pareja_der[j]
+                if k == LIBRE:
+                    hay_aumento = True
+                elif dist[k] == LIBRE:
+                    dist[k] = dist[i] + 1
+                    cola.append(k)
+        if not hay_aumento:
+            break
+
+        # DFS iterativo por las capas; 'siguiente' evita revisar dos veces la misma arista en la ronda
+        siguiente = [0] * n_izq
+        for raiz in range(n_izq):
+            if pareja_izq[raiz] != LIBRE:
+                continue
+            pila = [raiz]
+            aristas: List[int] = []  # aristas[d] = slot usado para bajar de pila[d] a pila[d + 1]
+            while pila:
+                i = pila[-1]
+                if siguiente[i] >= len(adyacencia[i]):
+                    dist[i] = LIBRE  # callejón sin salida en esta ronda
+                    pila.pop()
+                    if aristas:
+                        aristas.pop()
+                    continue
+                j = adyacencia[i][siguiente[i]]
+                siguiente[i] += 1
+                k = pareja_der[j]
+                if k == LIBRE:
+                    # Camino de aumento: invertir las aristas de la pila
+                    aristas.append(j)
+                    for d, izq in enumerate(pila):
+                        der = aristas[d]
+                        pareja_izq[izq] = der
+                        pareja_der[der] = izq
+                    break
+                if dist[k] == dist[i] + 1:
+                    pila.append(k)
+                    aristas.append(j)
+    return pareja_izq, pareja_der
+
+
+def emparejamiento_dos_fases(
+    n_izq: int,
+    n_der: int,
+    duras: Sequence[Sequence[int]],
+    blandas: Sequence[Sequence[int]],
+) -> List[int]:
+    """
+    Fase 1: matching máximo solo con aristas duras (preferidas).
+    Fase 2: lo completa con duras + blandas sin desemparejar a nadie de la fase 1.
+    Devuelve pareja_izq (slot de cada pedido o LIBRE).
+    """
+    pareja_izq, pareja_der = hopcroft_karp(n_izq, n_der, duras)
+    ampliada = [list(duras[i]) + list(blandas[i]) for i in range(n_izq)]
+    pareja_izq, _ = hopcroft_karp(n_izq, n_der, ampliada, pareja_izq, pareja_der)
+    return pareja_izq
+
+
+def asignacion_costo_minimo(
+    n_izq: int,
+    n_der: int,
+    costos: Sequence[Sequence[Tuple[int, float]]],
+) -> List[int]:
+    """
+    Asignación de costo mínimo con el máximo número de pedidos emparejados.
+
+    - costos[i]: pares (slot j, costo ≥ 0) permitidos para el pedido i; lo que no
+      aparece está prohibido.
+    - Cada pedido tiene además una columna ficticia propia ("sin asignar") con un
+      costo mayor que la suma de cualquier asignación real: primero se maximiza la
+      cantidad de pedidos emparejados y, entre esas soluciones, se minimiza el costo.
+    Devuelve pareja_izq (slot de cada pedido o LIBRE).
+    """
+    if n_izq == 0:
+        return []
+    max_costo = max((c for aristas in costos for _, c in aristas), default=0.0)
+    sin_asignar = (n_izq + 1) * (max_costo + 1.0)
+    prohibido = (n_izq + 1) * (sin_asignar + 1.0)
+
+    # Matriz densa n × (m + n): slots reales y después una ficticia por pedido
+    m = n_der + n_izq
+    a = np.full((n_izq, m), prohibido, dtype=np.float64)
+    for i, aristas in enumerate(costos):
+        for j, c in aristas:
+            a[i, j] = min(a[i, j], float(c))
+        a[i, n_der + i] = sin_asignar
+
+    # Húngaro (índices desde 1; columna 0 = raíz del camino de aumento)
+    u = np.zeros(n_izq + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)  # p[j] = fila emparejada con la columna j (0 = libre)
+    camino = np.zeros(m + 1, dtype=np.int64)
+    infinito = np.inf
+    for i in range(1, n_izq + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, infinito)
+        usada = np.zeros(m + 1, dtype=bool)
+        while True:
+            usada[j0] = True
+            i0 = p[j0]
+            actual = a[i0 - 1] - u[i0] - v[1:]
+            libres = ~usada[1:]
+            mejora = libres & (actual < minv[1:])
+            minv[1:][mejora] = actual[mejora]
+            camino[1:][mejora] = j0
+            candidatos = np.where(libres, minv[1:], infinito)
+            j1 = int(np.argmin(candidatos)) + 1
+            delta = candidatos[j1 - 1]
+            u[p[usada]] += delta
+            v[usada] -= delta
+            minv[~usada] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = camino[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    pareja_izq = [LIBRE] * n_izq
+    for j in range(1, n_der + 1):
+        i = int(p[j])
+        if i and a[i - 1, j - 1] < prohibido:
+            pareja_izq[i - 1] = j - 1
+    return pareja_izq
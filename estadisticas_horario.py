@@ -0,0 +1,261 @@
+"""
+Agregados por trabajador de la hoja 'Estadísticas', calculados sobre la grilla.
+
+La hoja 'Estadísticas' que escriben las etapas tiene fórmulas COUNTIF por
+trabajador (para quien abre el libro en Excel), pero openpyxl no guarda sus
+valores: antes StatTransformada volvía a interpretar cada fórmula con regex y
+recorría la fila del horario una vez por cada COUNTIF (rango fijo de columnas,
+sin los factores 3*/6* de 1D/3D/6D).
+
+Aquí cada columna se define una sola vez como suma ponderada de códigos
+(COLUMNAS_ESTADISTICAS, las de la etapa MOFIS, la última que reescribe la
+hoja) y MatrizEstadisticas.desde_grilla calcula todas las columnas para todos
+los trabajadores en una pasada:
+
+    conteos[trabajador, id] = apariciones del código id en su fila (bincount)
+    valores = conteos @ pesos     (pesos[id, columna] = factor del código en la columna)
+
+Recorre todos los días de la grilla, sea cual sea la longitud del horizonte.
+
+EscritorEstadisticas es el único que escribe esa hoja (antes cada etapa la
+borraba entera y la reescribía con su propia copia de las fórmulas, con rangos
+fijos B..AC / AE / AF que se quedaban cortos en meses de 31 días o en
+horizontes de 60–90 días):
+
+- el rango de las fórmulas sale de las columnas de días de la grilla;
+- cada etapa indica las columnas que le corresponden y se agregan si faltan,
+  siempre en el orden de COLUMNAS_ESTADISTICAS;
+- solo se escriben las celdas cuyo contenido cambia.
+"""
+
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from openpyxl.utils import get_column_letter
+
+from catalogo_turnos import normalizar_turno
+from estilos_horario import FUENTE_NEGRITA, RELLENO_ENCABEZADO, SIN_RELLENO
+from grilla_horario import GrillaHorario
+
+HOJA_ESTADISTICAS = "Estadísticas"
+
+# Columna → ((código, factor), ...), en el orden de la hoja
+COLUMNAS_ESTADISTICAS: Dict[str, Tuple[Tuple[str, int], ...]] = {
+    "DESC": (("DESC", 1), ("TROP", 1)),
+    "1T": (("1T", 1), ("7", 1), ("1", 1)),
+    "6RT": (("6RT", 1), ("7", 1), ("6R", 1)),
+    "6T": (("6TT", 1), ("6T", 1)),
+    "3": (("3", 1),),
+    "6S": (
+        ("6S", 1), ("MASRAS", 1), ("TASRAS", 1), ("TSAS", 1), ("MSAS", 1),
+        ("ASTASR", 1), ("MASRTS", 1), ("MSTASR", 1), ("ASTS", 1),
+    ),
+    "6N": (
+        ("6N", 1), ("S", 1), ("N", 1), ("MCORTS", 1), ("MCORTN", 1),
+        ("MANRAS", 1), ("TANRAS", 1), ("TNAS", 1), ("MNAS", 1), ("6MT", 1),
+        ("MNTANR", 1), ("MANRTN", 1), ("ASTANR", 1), ("ASTN", 1),
+    ),
+    "DIURNA": (("6S", 1), ("6N", 1), ("6MT", 1)),
+    # Sábados y festivos, ponderados por horas
+    "1D": (("BANTD", 1), ("BLPTD", 1), ("6ND", 6), ("6SN", 6), ("6MTD", 6)),
+    "3D": (("3D", 3),),
+    "6D": (("NLPTD", 6), ("NLPRD", 6), ("NANTD", 6), ("NANRD", 6)),
+}
+
+# Anchos de columna de la hoja (el resto, ANCHO_COLUMNA)
+ANCHOS_ESTADISTICAS: Dict[str, int] = {"SIGLA": 10, "DIURNA": 10}
+ANCHO_COLUMNA = 8
+
+
+def formula_countif(columna: str, hoja: str, rango: str,
+                    definiciones: Mapping[str, Sequence[Tuple[str, int]]] = COLUMNAS_ESTADISTICAS) -> str:
+    """Fórmula de Excel equivalente a la columna, p. ej. rango 'B2:AF2' → '=COUNTIF(Hoja!B2:AF2,"DESC")+...'."""
+    terminos = []
+    for codigo, factor in definiciones[columna]:
+        termino = f'COUNTIF({hoja}!{rango},"{codigo}")'
+        terminos.append(termino if factor == 1 else f"{factor}*{termino}")
+    return "=" + "+".join(terminos)
+
+
+class MatrizEstadisticas:
+    """
+    Valores de las columnas de estadísticas por trabajador (filas = SIGLAs de la grilla).
+
+    - valores: matriz entera n_trabajadores × n_columnas.
+    - valor(sigla, columna): None si la SIGLA o la columna no están.
+    - maximo(columna): máximo de la columna entre todos los trabajadores (0 si no hay).
+    """
+
+    def __init__(self, siglas: List[str], columnas: List[str], valores: np.ndarray) -> None:
+        self.siglas = siglas
+        self.columnas = columnas
+        self.valores = valores
+        self._fila: Dict[str, int] = {}
+        for i, sigla in enumerate(siglas):
+            self._fila.setdefault(sigla, i)  # si una SIGLA se repite gana la primera fila
+        self._col = {c: j for j, c in enumerate(columnas)}
+
+    @classmethod
+    def desde_grilla(cls, grid: GrillaHorario,
+                     definiciones: Mapping[str, Sequence[Tuple[str, int]]] = COLUMNAS_ESTADISTICAS
+                     ) -> "MatrizEstadisticas":
+        columnas = list(definiciones)
+        filas = [(fila, sigla) for fila, sigla in grid.trabajadores()]
+        n_codigos = len(grid.codigos)
+
+        pesos = np.zeros((n_codigos, len(columnas)), dtype=np.int64)
+        for j, columna in enumerate(columnas):
+            for codigo, factor in definiciones[columna]:
+                idx = grid.id_de(codigo)
+                if idx is not None:
+                    pesos[idx, j] += factor
+
+        ids = np.frombuffer(grid.arreglo_ids(), dtype=np.uint16).reshape(grid.n_filas, grid.n_cols)
+        indices = np.array([fila - grid.fila_inicio for fila, _ in filas], dtype=np.int64)
+        sub = ids[indices].astype(np.int64)
+        desplazamiento = (np.arange(len(filas), dtype=np.int64) * n_codigos)[:, None]
+        conteos = np.bincount((sub + desplazamiento).ravel(), minlength=len(filas) * n_codigos)
+        conteos = conteos.reshape(len(filas), n_codigos)
+
+        return cls([s for _, s in filas], columnas, conteos @ pesos)
+
+    def valor(self, sigla: object, columna: object) -> Optional[int]:
+        i = self._fila.get(normalizar_turno(sigla))
+        j = self._col.get(columna)
+        if i is None or j is None:
+            return None
+        return int(self.valores[i, j])
+
+    def fila(self, sigla: str) -> Dict[str, int]:
+        i = self._fila.get(normalizar_turno(sigla))
+        if i is None:
+            return {}
+        return {c: int(v) for c, v in zip(self.columnas, self.valores[i])}
+
+    def maximo(self, columna: str) -> int:
+        j = self._col.get(columna)
+        if j is None or not len(self.siglas):
+            return 0
+        return int(self.valores[:, j].max())
+
+
+def rango_dias(grid: GrillaHorario) -> Tuple[int, int]:
+    """Primera y última columna de días de la grilla (la última con encabezado)."""
+    ultima = grid.col_inicio
+    for col in grid.columnas():
+        if grid.encabezado(col):
+            ultima = col
+    return grid.col_inicio, ultima
+
+
+class EscritorEstadisticas:
+    """
+    Escritor de la hoja 'Estadísticas' compartido por todas las etapas.
+
+    - Fila 1: SIGLA y las columnas presentes, en el orden de las definiciones; los
+      encabezados que no son del catálogo se conservan al final con sus valores.
+    - Fila 2 en adelante: un trabajador por fila, en el orden de la grilla, con la
+      fórmula de cada columna sobre su fila del horario (rango rango_fila()).
+    - escribir(columnas): asegura las columnas de la etapa y revisa todas las
+      presentes, escribiendo solo las celdas que cambian (si el horizonte crece,
+      también se corrigen los rangos de las columnas de etapas anteriores).
+    """
+
+    def __init__(self, wb, grid: GrillaHorario, hoja_horario: str,
+                 definiciones: Mapping[str, Sequence[Tuple[str, int]]] = COLUMNAS_ESTADISTICAS) -> None:
+        self.wb = wb
+        self.grid = grid
+        self.hoja_horario = hoja_horario
+        self.definiciones = definiciones
+
+    def _hoja(self):
+        if HOJA_ESTADISTICAS in self.wb.sheetnames:
+            return self.wb[HOJA_ESTADISTICAS]
+        return self.wb.create_sheet(HOJA_ESTADISTICAS)
+
+    def rango_fila(self, fila: int, dias: Optional[Tuple[int, int]] = None) -> str:
+        """Rango de la fila sobre los días; dias = rango_dias(grid) ya calculado (escribir lo pasa una vez)."""
+        primera, ultima = dias if dias is not None else rango_dias(self.grid)
+        return f"{get_column_letter(primera)}{fila}:{get_column_letter(ultima)}{fila}"
+
+    def formula(self, columna: str, fila: int, dias: Optional[Tuple[int, int]] = None) -> str:
+        return formula_countif(columna, self.hoja_horario, self.rango_fila(fila, dias), self.definiciones)
+
+    @staticmethod
+    def _poner(ws_stats, fila: int, col: int, valor: object) -> int:
+        celda = ws_stats.cell(row=fila, column=col)
+        if celda.value == valor:
+            return 0
+        celda.value = valor
+        return 1
+
+    def _disposicion(self, actuales: List[Optional[str]], propias: Sequence[str]) -> List[str]:
+        presentes = {h for h in actuales if h}
+        conocidas = [c for c in self.definiciones if c in presentes or c in propias]
+        extra = [h for h in actuales if h and h != "SIGLA" and h not in self.definiciones]
+        return ["SIGLA"] + conocidas + extra
+
+    def _redistribuir(self, ws_stats, actuales: List[Optional[str]], disposicion: List[str]) -> None:
+        """Reescribe los encabezados en la nueva disposición; las columnas extra se mueven con sus valores."""
+        extra = {}
+        for col, h in enumerate(actuales, start=1):
+            if h in disposicion and h not in self.definiciones and h != "SIGLA":
+                extra[h] = [ws_stats.cell(row=f, column=col).value for f in range(2, ws_stats.max_row + 1)]
+
+        for fila in ws_stats.iter_rows():
+            for celda in fila:
+                celda.value = None
+                if celda.has_style and celda.fill != SIN_RELLENO:
+                    celda.fill = SIN_RELLENO
+
+        for col, h in enumerate(disposicion, start=1):
+            celda = ws_stats.cell(row=1, column=col, value=h)
+            celda.fill = RELLENO_ENCABEZADO
+            celda.font = FUENTE_NEGRITA
+            for f, valor in enumerate(extra.get(h, ()), start=2):
+                if valor is not None:
+                    ws_stats.cell(row=f, column=col, value=valor)
+
+    def columnas(self) -> List[str]:
+        """Columnas del catálogo que la hoja ya tiene (las que escribieron las etapas anteriores)."""
+        if HOJA_ESTADISTICAS not in self.wb.sheetnames:
+            return []
+        ws_stats = self.wb[HOJA_ESTADISTICAS]
+        encabezados = {normalizar_turno(c.value) for c in ws_stats[1]}
+        return [c for c in self.definiciones if c in encabezados]
+
+    def escribir(self, columnas: Iterable[str] = ()) -> int:
+        """Asegura las columnas pedidas y actualiza la hoja. Devuelve cuántas celdas se escribieron."""
+        propias = [normalizar_turno(c) for c in columnas]
+        for c in propias:
+            if c not in self.definiciones:
+                raise ValueError(f"Columna de estadísticas desconocida: {c}")
+
+        ws_stats = self._hoja()
+        actuales = [normalizar_turno(ws_stats.cell(row=1, column=c).value) or None
+                    for c in range(1, (ws_stats.max_column or 0) + 1)]
+        while actuales and actuales[-1] is None:
+            actuales.pop()
+        disposicion = self._disposicion(actuales, propias)
+        if actuales != disposicion:
+            self._redistribuir(ws_stats, actuales, disposicion)
+
+        escritas = 0
+        formulas = [(col, c) for col, c in enumerate(disposicion, start=1) if c in self.definiciones]
+        dias = rango_dias(self.grid)
+        fila_destino = 2
+        for fila, trabajador in self.grid.trabajadores():
+            escritas += self._poner(ws_stats, fila_destino, 1, trabajador)
+            for col, columna in formulas:
+                escritas += self._poner(ws_stats, fila_destino, col, self.formula(columna, fila, dias))
+            fila_destino += 1
+
+        # Filas que sobran de un horario anterior con más trabajadores
+        for fila in range(fila_destino, ws_stats.max_row + 1):
+            for col in range(1, len(disposicion) + 1):
+                escritas += self._poner(ws_stats, fila, col, None)
+
+        for col, h in enumerate(disposicion, start=1):
+            ws_stats.column_dimensions[get_column_letter(col)].width = ANCHOS_ESTADISTICAS.get(h, ANCHO_COLUMNA)
+        return escritas
@@ -0,0 +1,138 @@
+"""
+Estilos compartidos y pintado diferido de la hoja de horario.
+
+Antes cada asignación creaba su propio PatternFill(...) (un objeto por celda
+pintada, por rama y por movimiento de rebalanceo) y lo asignaba en el momento
+a la celda de openpyxl; procesador_horarios además recorría TODA la hoja
+asignando un PatternFill(fill_type=None) nuevo a cada celda, creando las que no
+existían.
+
+- relleno(color) / fuente(...) devuelven objetos compartidos (caché por color):
+  hay un único PatternFill por color en todo el proceso.
+- EstilosDiferidos acumula "esta celda debe quedar con este relleno / fuente"
+  en diccionarios (la última orden por celda gana) y aplicar() escribe cada
+  celda UNA sola vez, al guardar. Solo se tocan las celdas que alguna etapa
+  pintó.
+- estilos_compartidos(ws) devuelve el mismo acumulador por hoja, así en el
+  pipeline todas las etapas pintan sobre él y se aplica una vez antes de
+  guardar (aplicar_estilos_pendientes(wb)).
+
+Las celdas de la hoja de estadísticas se reescriben completas en cada etapa y se
+siguen pintando en el momento, pero con los objetos compartidos.
+"""
+
+import weakref
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from openpyxl.styles import Font, PatternFill
+
+SIN_RELLENO = PatternFill(fill_type=None)
+
+
+@lru_cache(maxsize=None)
+def relleno(color: Optional[str]) -> PatternFill:
+    """Relleno sólido compartido del color dado (None = sin relleno)."""
+    if color is None:
+        return SIN_RELLENO
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+
+@lru_cache(maxsize=None)
+def fuente(negrita: bool = False, color: Optional[str] = None) -> Font:
+    """Fuente compartida (negrita / color)."""
+    return Font(bold=negrita, color=color) if color else Font(bold=negrita)
+
+
+RELLENO_ENCABEZADO = relleno("E6E6E6")
+FUENTE_NEGRITA = fuente(negrita=True)
+FUENTE_BLANCA = fuente(color="FFFFFF")
+
+
+def estilo_conteo_operativos(conteo: int) -> Tuple[Optional[str], Optional[Font]]:
+    """
+    Color (y fuente) de una celda de la fila 'TURNOS OPERATIVOS' según el conteo del día.
+
+    ≤8 rojo intenso con texto blanco, 9 rojo medio, 10 azul clarito, 11 verde clarito,
+    12 verde intenso, ≥13 sin relleno (escala de procesador_horarios.py).
+    """
+    if conteo <= 8:
+        return "FF0000", FUENTE_BLANCA
+    return {9: "FF6666", 10: "99CCFF", 11: "90EE90", 12: "008000"}.get(conteo), None
+
+
+class EstilosDiferidos:
+    """
+    Relleno y fuente pendientes por celda de una hoja, aplicados en bloque.
+
+    pintar() solo anota; aplicar() escribe en la hoja y vacía lo pendiente. Pintar
+    una celda sin indicar fuente no cambia la fuente que tenga o que esté pendiente
+    (igual que asignar solo celda.fill).
+    """
+
+    def __init__(self, ws) -> None:
+        # Referencia débil: el registro por hoja no debe mantener viva la hoja
+        self._hoja = weakref.ref(ws)
+        self._rellenos: Dict[Tuple[int, int], PatternFill] = {}
+        self._fuentes: Dict[Tuple[int, int], Font] = {}
+
+    @property
+    def ws(self):
+        return self._hoja()
+
+    def pintar(self, fila: int, col: int, color: Optional[str], fuente_celda: Optional[Font] = None) -> None:
+        """Anota el relleno de color 'color' (None = quitar relleno) y opcionalmente la fuente."""
+        self._rellenos[(fila, col)] = relleno(color)
+        if fuente_celda is not None:
+            self._fuentes[(fila, col)] = fuente_celda
+
+    def pintar_relleno(self, fila: int, col: int, relleno_celda: PatternFill,
+                       fuente_celda: Optional[Font] = None) -> None:
+        """Igual que pintar(), con un relleno ya construido (p. ej. uno de relleno())."""
+        self._rellenos[(fila, col)] = relleno_celda
+        if fuente_celda is not None:
+            self._fuentes[(fila, col)] = fuente_celda
+
+    def limpiar_rellenos(self, max_fila: int, max_col: int) -> None:
+        """
+        Anota "sin relleno" para las celdas EXISTENTES con relleno dentro de 1..max_fila × 1..max_col.
+
+        No crea celdas nuevas (ws.cell() las crearía): solo recorre las que la hoja ya tiene.
+        """
+        for (fila, col), celda in list(self.ws._cells.items()):
+            if fila <= max_fila and col <= max_col and celda.has_style and celda.fill != SIN_RELLENO:
+                self._rellenos.setdefault((fila, col), SIN_RELLENO)
+
+    @property
+    def pendientes(self) -> int:
+        return len(self._rellenos.keys() | self._fuentes.keys())
+
+    def aplicar(self) -> int:
+        """Escribe en la hoja los estilos pendientes. Devuelve cuántas celdas se tocaron."""
+        tocadas = self.pendientes
+        if self.ws is None:
+            return 0
+        for (fila, col), relleno_celda in self._rellenos.items():
+            self.ws.cell(row=fila, column=col).fill = relleno_celda
+        for (fila, col), fuente_celda in self._fuentes.items():
+            self.ws.cell(row=fila, column=col).font = fuente_celda
+        self._rellenos.clear()
+        self._fuentes.clear()
+        return tocadas
+
+
+_por_hoja: "weakref.WeakKeyDictionary[object, EstilosDiferidos]" = weakref.WeakKeyDictionary()
+
+
+def estilos_compartidos(ws) -> EstilosDiferidos:
+    """Acumulador de estilos de la hoja; se crea una vez y lo comparten las etapas."""
+    estilos = _por_hoja.get(ws)
+    if estilos is None:
+        estilos = EstilosDiferidos(ws)
+        _por_hoja[ws] = estilos
+    return estilos
+
+
+def aplicar_estilos_pendientes(wb) -> int:
+    """Aplica los estilos pendientes de todas las hojas del libro (antes de wb.save)."""
+    return sum(_por_hoja[ws].aplicar() for ws in wb.worksheets if ws in _por_hoja)
@@ -3,59 +3,16 @@ from openpyxl.styles import Alignment, PatternFill
 from openpyxl.utils import get_column_letter
 import copy
 
+from catalogo_turnos import CATALOGO, mitades_turno
+
 def generar_reporte_turnos(ws):
     """
     Genera un reporte de todos los turnos encontrados en el archivo
     y su estado de conversión.
     """
     turnos_encontrados = {}
-    turnos_convertidos = {
-        # Turnos que ocupan dos columnas (original → primera/segunda)
-        "6TT": "TLPT/NLPT",
-        "6RT": "MLPR/NLPR",
-        "6T": "TANT/NANT",
-        "6R": "MAST/NANR",
-        "6N": "MANR/TANR",
-        "6S": "MASR/TASR",
-        "6MT": "MLPR/TLPR",
-        "6MTD": "MLPR/TLPR",
-        "3": "TAST/SLN3",
-        "3D": "TAST/SLN3",
-        "7": "BLPT/NLPR",
-        "MANRAS": "MANR/ASIG",
-        "MCORTS": "MCOR/TASA",
-        "N": "MANA/TANA",
-        "S": "MASA/TASA",
-        "MASRAS": "MASR/ASIG",
-        "ASTASR": "ASIG/TASR",
-        "MASRTS": "MASR/TASA",
-        "MSTASR": "MASA/TASR",
-        "MNTANR": "MANA/TANR",
-        "MANRTN": "MANR/TANA",
-        "ASTANR": "ASIG/TANR",
-        "MCORTN": "MCOR/TANA",
-        
-        # Turnos que ocupan solo la primera columna (se mantienen o se convierten)
-        "1T": "BLPT",
-        "1": "BANT",
-        "BANTD": "BANT",
-        "BLPTD": "BLPT",
-        "CMED": "CMED",
-        "COME": "COME",
-        "COMS": "COMS",
-        "DESC": "DESC",
-        "LIBR": "LIBR",
-        "MANR": "MANR",
-        "MASR": "MASR",
-        "MN": "MANA",
-        "MS": "MASA",
-        "NANTD": "NANT",
-        "NANRD": "NANR",
-        "NLPRD": "NLPR",
-        "NLPTD": "NLPT",
-        "TN": "TANA",
-        "TS": "TASA",
-    }
+    # Conversión de cada turno del catálogo (original → primera/segunda; sin mitades se mantiene)
+    turnos_convertidos = {t.codigo: "/".join(t.mitades) or t.codigo for t in CATALOGO}
     
     # Recolectar todos los turnos únicos
     for fila in range(2, ws.max_row + 1):
@@ -682,52 +639,10 @@ def modificar_horario_con_division_columna():
     Modifica el archivo horarioUnificado_a_dividir.xlsx:
     1. Divide cada columna de día en dos columnas
     2. El encabezado del día cubre ambas columnas
-    3. Aplica reglas específicas de renombrado:
-       - Turnos que se dividen en dos partes (ocupan ambas columnas):
-         * 6TT → TLPT/NLPT
-         * 6RT → MLPR/NLPR
-         * 6T → TANT/NANT
-         * 6R → MAST/NANR
-         * 6N → MANR/TANR
-         * 6S → MASR/TASR
-         * 6MT → MLPR/TLPR
-         * 6MTD → MLPR/TLPR
-         * 3 → TAST/SLN3
-         * 3D → TAST/SLN3
-         * 7 → BLPT/NLPR
-         * MANRAS → MANR/ASIG
-         * MCORTS → MCOR/TASA
-         * N → MANA/TANA
-         * S → MASA/TASA
-         * MASRAS → MASR/ASIG
-         * ASTASR → ASIG/TASR
-         * MASRTS → MASR/TASA
-         * MSTASR → MASA/TASR
-         * MNTANR → MANA/TANR
-         * MANRTN → MANR/TANA
-         * ASTANR → ASIG/TANR
-         * MCORTN → MCOR/TANA
-       - Turnos que se renombran pero ocupan solo la primera columna:
-         * 1T → BLPT
-         * 1 → BANT
-         * BANTD → BANT
-         * BLPTD → BLPT
-         * CMED → CMED
-         * COME → COME
-         * COMS → COMS
-         * DESC → DESC
-         * LIBR → LIBR
-         * MANR → MANR
-         * MASR → MASR
-         * MN → MANA
-         * MS → MASA
-         * NANTD → NANT
-         * NANRD → NANR
-         * NLPRD → NLPR
-         * NLPTD → NLPT
-         * TN → TANA
-         * TS → TASA
-       - Otros turnos se mantienen iguales pero ocupan solo la primera columna
+    3. Renombra cada turno según sus mitades en catalogo_turnos (Turno.mitades):
+       - Con dos mitades ocupa ambas columnas (p. ej. 6TT → TLPT/NLPT, 7 → BLPT/NLPR)
+       - Con una mitad se renombra en la primera columna (p. ej. 1T → BLPT, MN → MANA)
+       - Sin mitades se mantiene igual y ocupa solo la primera columna
     """
     
     # Cargar el archivo original
@@ -801,101 +716,12 @@ def modificar_horario_con_division_columna():
                 # Obtener el color original del turno
                 celda_original = ws.cell(row=fila, column=col_original)
                 
-                # Aplicar reglas específicas de renombrado
-                if turno_str == "6TT":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="TLPT")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="NLPT")
-                elif turno_str == "6RT":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="MLPR")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="NLPR")
-                elif turno_str == "6T":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="TANT")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="NANT")
-                elif turno_str == "6R":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="MAST")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="NANR")
-                elif turno_str == "6N":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="MANR")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="TANR")
-                elif turno_str == "6S":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="MASR")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="TASR")
-                elif turno_str in ["6MT", "6MTD"]:
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="MLPR")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="TLPR")
-                elif turno_str in ["3", "3D"]:
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="TAST")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="SLN3")
-                elif turno_str == "7":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="BLPT")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="NLPR")
-                elif turno_str == "MANRAS":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="MANR")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="ASIG")
-                elif turno_str == "MCORTS":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="MCOR")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="TASA")
-                elif turno_str == "N":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="TANA")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="TASA")
-                elif turno_str == "S":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="MASA")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="TASA")
-                elif turno_str == "MASRAS":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="MASR")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="ASIG")
-                elif turno_str == "ASTASR":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="ASIG")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="TASR")
-                elif turno_str == "MASRTS":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="MASR")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="TASA")
-                elif turno_str == "MSTASR":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="MASA")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="TASR")
-                elif turno_str == "MNTANR":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="MANA")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="TANR")
-                elif turno_str == "MANRTN":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="MANR")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="TANA")
-                elif turno_str == "ASTANR":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="ASIG")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="TANR")
-                elif turno_str == "MCORTN":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="MCOR")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="TANA")
-                # Turnos que se renombran pero ocupan solo la primera columna
-                elif turno_str in ["1T", "BLPTD"]:
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="BLPT")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="")
-                elif turno_str in ["1", "BANTD"]:
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="BANT")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="")
-                elif turno_str == "MN":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="MANA")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="")
-                elif turno_str == "MS":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="MASA")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="")
-                elif turno_str == "NANTD":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="NANT")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="")
-                elif turno_str == "NANRD":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="NANR")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="")
-                elif turno_str == "NLPRD":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="NLPR")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="")
-                elif turno_str == "NLPTD":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="NLPT")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="")
-                elif turno_str == "TN":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="TANA")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="")
-                elif turno_str == "TS":
-                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value="TASA")
-                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value="")
+                # Renombrado según las mitades del catálogo (primera / segunda columna)
+                mitades = mitades_turno(turno_str)
+                if mitades:
+                    segunda = mitades[1] if len(mitades) > 1 else ""
+                    celda1 = nuevo_ws.cell(row=fila, column=col_primera, value=mitades[0])
+                    celda2 = nuevo_ws.cell(row=fila, column=col_segunda, value=segunda)
                 else:
                     # Otros turnos se mantienen iguales pero ocupan solo la primera columna
                     celda1 = nuevo_ws.cell(row=fila, column=col_primera, value=turno_original)
@@ -0,0 +1,370 @@
+"""
+Modelo compacto en memoria del horario (trabajadores × días).
+
+La hoja de horario se lee UNA sola vez y se guarda en un arreglo plano de
+enteros, donde cada entero es el índice de un código de turno internado
+("" = celda vacía). Los asignadores consultan y modifican la grilla en lugar
+de acceder celda por celda a openpyxl; al final, solo las celdas modificadas
+se vuelcan de nuevo a la hoja con `volcar_en_hoja`.
+
+Las coordenadas (fila, columna) son las mismas de la hoja de Excel, para que
+los asignadores puedan seguir razonando con "col_dia - 1" / "col_dia + 1".
+
+La tabla de internado arranca con los códigos de catalogo_turnos.py: el id de
+un turno del catálogo es el mismo en todas las grillas y se puede usar como
+índice de sus tablas (p. ej. ES_OPERATIVO). Los códigos que no están
+en el catálogo se internan a continuación, en orden de aparición.
+
+El tamaño sale de la hoja: trabajadores desde la fila 2 hasta la primera fila de
+resumen (ETIQUETAS_RESUMEN, las que agrega procesador_horarios.py) o el final de
+la hoja, y días hasta la última columna con encabezado. Sirve igual para un mes
+que para un trimestre o un año de columnas.
+
+Para que las reglas de día anterior / día siguiente crucen el cambio de periodo,
+fijar_contexto() guarda, por SIGLA, el turno del día anterior al primero (p. ej.
+el último día del mes pasado) y el del día siguiente al último. No son celdas de
+la grilla: solo se ven al consultar la columna col_inicio - 1 o max_col + 1.
+"""
+
+import weakref
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple, Union
+
+from catalogo_turnos import CODIGOS, ID_TURNO, normalizar_turno
+
+# Etiquetas (columna A) de las filas de resumen debajo de los trabajadores
+ETIQUETAS_RESUMEN = frozenset({"TURNOS OPERATIVOS", "TURNOS OPERATIVOS (DIN)", "TORRE", "TORRE (DIN)"})
+
+
+class GrillaHorario:
+    """
+    Grilla de turnos respaldada por un arreglo de códigos internados.
+
+    - Filas de trabajadores: 2..fila_fin (columna A = SIGLA)
+    - Columnas de días: 2..max_col (fila 1 = encabezado "DOW-DD")
+    - Contexto opcional: turno del día anterior / siguiente al horizonte (fijar_contexto)
+    - Los valores se normalizan una sola vez al cargar (strip + upper)
+    """
+
+    FILA_INICIO = 2
+    COL_INICIO = 2
+
+    def __init__(self, siglas: List[Optional[str]], encabezados: List[Optional[str]],
+                 filas_valores: List[List[object]]) -> None:
+        self.fila_inicio = self.FILA_INICIO
+        self.col_inicio = self.COL_INICIO
+        self.n_filas = len(siglas)
+        self.n_cols = len(encabezados)
+        self.fila_fin = self.fila_inicio + self.n_filas - 1
+        self.max_col = self.col_inicio + self.n_cols - 1
+
+        self.siglas: List[str] = [self._normalizar(s) for s in siglas]
+        self.encabezados: List[Optional[str]] = list(encabezados)
+
+        # Tabla de internado: índice 0 reservado para la celda vacía, después el catálogo
+        self.codigos: List[str] = list(CODIGOS)
+        self._ids: Dict[str, int] = dict(ID_TURNO)
+
+        self._datos = array("H", bytes(2 * self.n_filas * self.n_cols))
+        for i, fila_valores in enumerate(filas_valores):
+            base = i * self.n_cols
+            for j in range(min(len(fila_valores), self.n_cols)):
+                self._datos[base + j] = self._internar(self._normalizar(fila_valores[j]))
+
+        # Ocupación por día: multiconjunto de ids de turno de cada columna,
+        # mantenido en cada asignación para responder "¿ya hay X hoy?" sin recorrer filas
+        self._ocupacion: List[Counter] = []
+        self._recalcular_ocupacion()
+
+        # Celdas modificadas en memoria, pendientes de volcar a la hoja
+        self._modificadas: Dict[Tuple[int, int], Optional[str]] = {}
+
+        # Índice SIGLA → fila; se construye bajo demanda y se invalida al cambiar una SIGLA
+        self._indice_trabajadores: Optional[Dict[str, int]] = None
+
+        # Observadores de cambios de celda (métodos ligados, guardados como referencias débiles
+        # para que un asignador que ya terminó no siga recibiendo avisos)
+        self._observadores: List[weakref.WeakMethod] = []
+
+        # Turnos (ids) de cada fila el día antes del primero y el día después del último
+        self._contexto_anterior: Optional[array] = None
+        self._contexto_siguiente: Optional[array] = None
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+    @classmethod
+    def desde_hoja(cls, ws) -> "GrillaHorario":
+        """
+        Carga la grilla leyendo la hoja una sola vez (iter_rows por bloque).
+
+        Los días llegan hasta la última columna con encabezado y los trabajadores hasta
+        la primera fila de resumen; las filas vacías del final no cuentan.
+        """
+        encabezados = list(next(ws.iter_rows(min_row=1, max_row=1, min_col=cls.COL_INICIO,
+                                             max_col=ws.max_column, values_only=True), ()))
+        while encabezados and encabezados[-1] is None:
+            encabezados.pop()
+        max_col = cls.COL_INICIO + len(encabezados) - 1
+
+        siglas: List[Optional[str]] = []
+        filas_valores: List[List[object]] = []
+        for fila in ws.iter_rows(min_row=cls.FILA_INICIO, max_row=ws.max_row,
+                                 min_col=1, max_col=max_col, values_only=True):
+            sigla = fila[0] if fila else None
+            if cls._normalizar(sigla) in ETIQUETAS_RESUMEN:
+                break
+            siglas.append(sigla)
+            filas_valores.append(list(fila[1:]))
+        while siglas and not cls._normalizar(siglas[-1]) and not any(cls._normalizar(v) for v in filas_valores[-1]):
+            siglas.pop()
+            filas_valores.pop()
+        return cls(siglas, encabezados, filas_valores)
+
+    @classmethod
+    def desde_ids(cls, siglas: List[Optional[str]], encabezados: List[Optional[str]],
+                  codigos: List[str], ids: Iterable[int]) -> "GrillaHorario":
+        """
+        Grilla a partir de ids ya internados (p. ej. una instantánea binaria).
+
+        'codigos' es la tabla de internado (codigos[0] == "") e 'ids' el arreglo plano
+        fila mayor de n_filas × n_cols; no se vuelve a normalizar ninguna celda.
+        """
+        if not codigos or codigos[0] != "":
+            raise ValueError("La tabla de códigos debe empezar por el código vacío")
+        grid = cls(siglas, encabezados, [])
+        grid.codigos = list(codigos)
+        grid._ids = {c: i for i, c in enumerate(grid.codigos)}
+        datos = array("H", ids)
+        if len(datos) != grid.n_filas * grid.n_cols:
+            raise ValueError(f"Se esperaban {grid.n_filas * grid.n_cols} celdas y llegaron {len(datos)}")
+        grid._datos = datos
+        grid._recalcular_ocupacion()
+        return grid
+
+    # ------------------------------------------------------------------
+    # Utilidades internas
+    # ------------------------------------------------------------------
+    def _recalcular_ocupacion(self) -> None:
+        self._ocupacion = [Counter() for _ in range(self.n_cols)]
+        for i in range(self.n_filas):
+            base = i * self.n_cols
+            for j in range(self.n_cols):
+                self._ocupacion[j][self._datos[base + j]] += 1
+
+    @staticmethod
+    def _normalizar(valor: object) -> str:
+        return normalizar_turno(valor)
+
+    def _internar(self, codigo: str) -> int:
+        idx = self._ids.get(codigo)
+        if idx is None:
+            idx = len(self.codigos)
+            self.codigos.append(codigo)
+            self._ids[codigo] = idx
+        return idx
+
+    def _indice(self, fila: int, col: int) -> int:
+        return (fila - self.fila_inicio) * self.n_cols + (col - self.col_inicio)
+
+    def contiene(self, fila: int, col: int) -> bool:
+        return (self.fila_inicio <= fila <= self.fila_fin) and (self.col_inicio <= col <= self.max_col)
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+    def filas(self) -> range:
+        return range(self.fila_inicio, self.fila_fin + 1)
+
+    def columnas(self) -> range:
+        return range(self.col_inicio, self.max_col + 1)
+
+    def sigla(self, fila: int) -> str:
+        """SIGLA normalizada de la fila ("" si la fila no tiene trabajador)."""
+        if not (self.fila_inicio <= fila <= self.fila_fin):
+            return ""
+        return self.siglas[fila - self.fila_inicio]
+
+    def trabajadores(self) -> Iterator[Tuple[int, str]]:
+        """Itera (fila, SIGLA) de las filas que tienen trabajador."""
+        for fila in self.filas():
+            sigla = self.siglas[fila - self.fila_inicio]
+            if sigla:
+                yield fila, sigla
+
+    def _construir_indice_trabajadores(self) -> Dict[str, int]:
+        indice: Dict[str, int] = {}
+        for fila, sigla in self.trabajadores():
+            # Si una SIGLA se repite gana la primera fila (igual que el recorrido lineal)
+            indice.setdefault(sigla, fila)
+        return indice
+
+    def fila_trabajador(self, sigla: Optional[str]) -> Optional[int]:
+        """Fila del trabajador en O(1), o None si la SIGLA no está en la hoja."""
+        if self._indice_trabajadores is None:
+            self._indice_trabajadores = self._construir_indice_trabajadores()
+        return self._indice_trabajadores.get(self._normalizar(sigla))
+
+    def indice_trabajadores(self) -> Dict[str, int]:
+        """Copia del índice SIGLA → fila."""
+        if self._indice_trabajadores is None:
+            self._indice_trabajadores = self._construir_indice_trabajadores()
+        return dict(self._indice_trabajadores)
+
+    def invalidar_indice_trabajadores(self) -> None:
+        self._indice_trabajadores = None
+
+    def encabezado(self, col: int) -> Optional[str]:
+        if not (self.col_inicio <= col <= self.max_col):
+            return None
+        return self.encabezados[col - self.col_inicio]
+
+    def codigo_id(self, fila: int, col: int) -> int:
+        """Id internado de la celda (0 = vacía o fuera de la grilla; en los bordes, el contexto)."""
+        if not self.contiene(fila, col):
+            return self._id_contexto(fila, col)
+        return self._datos[self._indice(fila, col)]
+
+    def _id_contexto(self, fila: int, col: int) -> int:
+        if not (self.fila_inicio <= fila <= self.fila_fin):
+            return 0
+        if col == self.col_inicio - 1 and self._contexto_anterior is not None:
+            return self._contexto_anterior[fila - self.fila_inicio]
+        if col == self.max_col + 1 and self._contexto_siguiente is not None:
+            return self._contexto_siguiente[fila - self.fila_inicio]
+        return 0
+
+    def fijar_contexto(self, anterior: Optional[Mapping[str, object]] = None,
+                       siguiente: Optional[Mapping[str, object]] = None) -> Tuple[int, int]:
+        """
+        Fija, por SIGLA, el turno del día anterior al primero y el del día siguiente al último.
+
+        None deja ese borde como estaba; las SIGLAs que no están en la grilla se ignoran.
+        Devuelve cuántos trabajadores quedaron con turno en cada borde.
+        """
+        conteos = []
+        for valores, atributo in ((anterior, "_contexto_anterior"), (siguiente, "_contexto_siguiente")):
+            if valores is None:
+                actual = getattr(self, atributo)
+                conteos.append(sum(1 for i in actual if i) if actual is not None else 0)
+                continue
+            por_sigla = {self._normalizar(k): v for k, v in valores.items()}
+            ids = array("H", (self._internar(self._normalizar(por_sigla.get(sigla))) if sigla else 0
+                              for sigla in self.siglas))
+            setattr(self, atributo, ids)
+            conteos.append(sum(1 for i in ids if i))
+        return conteos[0], conteos[1]
+
+    def contexto(self, fila: int, vecino: int) -> str:
+        """Turno de contexto de la fila: vecino -1 = día anterior al primero, +1 = siguiente al último."""
+        col = self.col_inicio - 1 if vecino < 0 else self.max_col + 1
+        return self.codigos[self._id_contexto(fila, col)]
+
+    def id_de(self, codigo: str) -> Optional[int]:
+        """Id internado de un código, o None si no es del catálogo y nunca apareció en la grilla."""
+        return self._ids.get(self._normalizar(codigo))
+
+    def ids_de(self, codigos) -> Set[int]:
+        """Conjunto de ids internados para un conjunto de códigos (ignora los ausentes)."""
+        return {self._ids[c] for c in (self._normalizar(x) for x in codigos) if c in self._ids}
+
+    def registrar_codigos(self, codigos: Iterable[str]) -> Set[int]:
+        """Interna los códigos (aunque aún no aparezcan en la hoja) y devuelve sus ids."""
+        # Orden fijo: los ids nuevos no dependen del orden de un set (ni de PYTHONHASHSEED)
+        return {self._internar(c) for c in sorted({self._normalizar(x) for x in codigos}) if c}
+
+    def valor(self, fila: int, col: int) -> str:
+        """Código normalizado de la celda ("" si está vacía o fuera de la grilla)."""
+        return self.codigos[self.codigo_id(fila, col)]
+
+    def esta_vacia(self, fila: int, col: int) -> bool:
+        return self.codigo_id(fila, col) == 0
+
+    def arreglo_ids(self) -> array:
+        """Arreglo plano (fila mayor) de ids internados; vista de solo lectura para cálculos vectorizados."""
+        return self._datos
+
+    def ids_fila(self, fila: int) -> array:
+        """Ids internados de la fila completa (copia del tramo del arreglo)."""
+        base = self._indice(fila, self.col_inicio)
+        return self._datos[base:base + self.n_cols]
+
+    def valores_fila(self, fila: int) -> List[str]:
+        base = self._indice(fila, self.col_inicio)
+        return [self.codigos[i] for i in self._datos[base:base + self.n_cols]]
+
+    def valores_columna(self, col: int) -> Iterator[Tuple[int, str]]:
+        """Itera (fila, código) de una columna de día."""
+        for fila in self.filas():
+            yield fila, self.codigos[self._datos[self._indice(fila, col)]]
+
+    def cuenta_en_dia(self, col: int, codigo: str) -> int:
+        """Cuántos trabajadores tienen el turno 'codigo' en la columna del día."""
+        if not (self.col_inicio <= col <= self.max_col):
+            return 0
+        idx = self._ids.get(self._normalizar(codigo))
+        if idx is None:
+            return 0
+        return self._ocupacion[col - self.col_inicio][idx]
+
+    def existe_en_dia(self, col: int, codigos: Union[str, Iterable[str]]) -> bool:
+        """True si en el día ya existe alguno de los turnos indicados (un código o un conjunto)."""
+        if isinstance(codigos, str):
+            return self.cuenta_en_dia(col, codigos) > 0
+        return any(self.cuenta_en_dia(col, c) > 0 for c in codigos)
+
+    # ------------------------------------------------------------------
+    # Modificación
+    # ------------------------------------------------------------------
+    def asignar(self, fila: int, col: int, valor: Optional[str]) -> None:
+        """Escribe un turno en memoria (None o "" vacía la celda) y lo marca para volcado."""
+        if not self.contiene(fila, col):
+            raise IndexError(f"Celda fuera de la grilla: fila {fila}, columna {col}")
+        codigo = self._normalizar(valor)
+        pos = self._indice(fila, col)
+        nuevo = self._internar(codigo)
+        anterior = self._datos[pos]
+        ocupacion = self._ocupacion[col - self.col_inicio]
+        ocupacion[anterior] -= 1
+        ocupacion[nuevo] += 1
+        self._datos[pos] = nuevo
+        self._modificadas[(fila, col)] = valor if codigo else None
+        if anterior != nuevo and self._observadores:
+            self._notificar(fila, col, anterior, nuevo)
+
+    def vaciar(self, fila: int, col: int) -> None:
+        self.asignar(fila, col, None)
+
+    # ------------------------------------------------------------------
+    # Observadores
+    # ------------------------------------------------------------------
+    def agregar_observador(self, metodo) -> None:
+        """Registra metodo(fila, col, id_anterior, id_nuevo), llamado tras cada cambio real de celda."""
+        self._observadores.append(weakref.WeakMethod(metodo))
+
+    def quitar_observador(self, metodo) -> None:
+        self._observadores = [ref for ref in self._observadores if ref() is not None and ref() != metodo]
+
+    def _notificar(self, fila: int, col: int, anterior: int, nuevo: int) -> None:
+        vivos = []
+        for ref in self._observadores:
+            metodo = ref()
+            if metodo is None:
+                continue
+            metodo(fila, col, anterior, nuevo)
+            vivos.append(ref)
+        if len(vivos) != len(self._observadores):
+            self._observadores = vivos
+
+    def celdas_modificadas(self) -> Dict[Tuple[int, int], Optional[str]]:
+        """Copia de las celdas pendientes de volcar: {(fila, col): valor}."""
+        return dict(self._modificadas)
+
+    def volcar_en_hoja(self, ws) -> int:
+        """Escribe en la hoja solo las celdas modificadas. Devuelve cuántas se escribieron."""
+        for (fila, col), valor in self._modificadas.items():
+            ws.cell(row=fila, column=col).value = valor
+        total = len(self._modificadas)
+        self._modificadas.clear()
+        return total
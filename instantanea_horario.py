@@ -0,0 +1,251 @@
+"""
+Instantáneas binarias del horario (.hsnap) para los artefactos intermedios.
+
+Los intermedios del pipeline (con_1t, con_6rt, ... con_sencillos) solo
+existían como xlsx: escribir y releer un libro de openpyxl cuesta segundos por
+etapa aunque lo único que cambia entre etapas es la grilla de turnos. Una
+instantánea guarda solo eso, en columnas binarias que se pueden mapear en
+memoria:
+
+    cabecera fija  "<8sIII": MAGIA, VERSION, bytes de metadatos, bytes de datos
+    metadatos      JSON utf-8: tabla de códigos (id → turno), SIGLAs,
+                   encabezados "DOW-DD", forma, etapa, columnas de la hoja
+                   'Estadísticas', y por cada arreglo su
+                   desplazamiento, tipo NumPy y forma dentro del bloque de datos
+    datos          arreglos contiguos alineados a 8 bytes:
+                   - "ids":      n_filas × n_cols, uint8 (≤ 256 códigos) o uint16
+                   - "original": n_filas × n_cols, uint8 (1 = celda no vacía en la
+                                 entrada del pipeline, antes de asignar)
+                   - contadores con nombre (p. ej. "operativos", "torre": uno por día)
+
+- leer_instantanea() abre el archivo con mmap y crea vistas NumPy sin copiar:
+  recargar una etapa cuesta milisegundos. La grilla (a_grilla) sí se copia,
+  porque los asignadores la modifican.
+- aplicar_instantanea() lleva la grilla de un xlsx de plantilla al estado de
+  la instantánea: así el pipeline y las etapas sueltas aceptan un .hsnap como
+  entrada (cargador_horarios.abrir_horario).
+- Los xlsx quedan solo para las salidas que abre una persona.
+"""
+
+import json
+import mmap
+import os
+import struct
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+from grilla_horario import GrillaHorario
+
+EXTENSION_INSTANTANEA = ".hsnap"
+MAGIA = b"HSNAP\x00\r\n"
+VERSION = 1
+_CABECERA = struct.Struct("<8sIII")
+_ALINEACION = 8
+
+
+def es_instantanea(ruta: str) -> bool:
+    return ruta.lower().endswith(EXTENSION_INSTANTANEA)
+
+
+def _alinear(n: int) -> int:
+    return (n + _ALINEACION - 1) // _ALINEACION * _ALINEACION
+
+
+def mascara_no_vacias(grid: GrillaHorario) -> np.ndarray:
+    """Máscara (n_filas × n_cols, uint8) de celdas con turno en el estado actual de la grilla."""
+    ids = np.frombuffer(grid.arreglo_ids(), dtype=np.uint16).reshape(grid.n_filas, grid.n_cols)
+    return (ids != 0).astype(np.uint8)
+
+
+@dataclass
+class Instantanea:
+    """
+    Contenido de una instantánea; los arreglos pueden ser vistas sobre el mmap del archivo.
+
+    - codigos: tabla de internado (codigos[0] == "").
+    - ids / original: matrices n_filas × n_cols.
+    - contadores: arreglos con nombre (conteos por día, por trabajador, ...).
+    - estadisticas: columnas de la hoja 'Estadísticas' del libro al guardar (para
+      rehacerla cuando la instantánea se aplica sobre una plantilla).
+    """
+
+    codigos: List[str]
+    siglas: List[str]
+    encabezados: List[Optional[str]]
+    ids: np.ndarray
+    original: np.ndarray
+    contadores: Dict[str, np.ndarray] = field(default_factory=dict)
+    etapa: str = ""
+    estadisticas: List[str] = field(default_factory=list)
+    fila_inicio: int = GrillaHorario.FILA_INICIO
+    col_inicio: int = GrillaHorario.COL_INICIO
+    _mapa: Optional[mmap.mmap] = field(default=None, repr=False)
+
+    @property
+    def n_filas(self) -> int:
+        return self.ids.shape[0]
+
+    @property
+    def n_cols(self) -> int:
+        return self.ids.shape[1]
+
+    def a_grilla(self) -> GrillaHorario:
+        """GrillaHorario editable (copia de los ids)."""
+        return GrillaHorario.desde_ids(self.siglas, self.encabezados, self.codigos,
+                                       self.ids.astype(np.uint16).ravel().tolist())
+
+    def cerrar(self) -> None:
+        """Libera el mmap; los arreglos que apuntaban a él dejan de ser válidos."""
+        if self._mapa is not None:
+            self.ids = self.ids.copy()
+            self.original = self.original.copy()
+            self.contadores = {k: v.copy() for k, v in self.contadores.items()}
+            try:
+                self._mapa.close()
+            except BufferError:
+                # Quedan vistas externas sobre el mmap: se liberará cuando el recolector las suelte
+                pass
+            self._mapa = None
+
+    def __enter__(self) -> "Instantanea":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
+
+
+def guardar_instantanea(
+    ruta: str,
+    grid: GrillaHorario,
+    original: Optional[np.ndarray] = None,
+    contadores: Optional[Mapping[str, Union[np.ndarray, List[int]]]] = None,
+    etapa: str = "",
+    estadisticas: Sequence[str] = (),
+) -> str:
+    """
+    Escribe la grilla (y máscara original / contadores) como instantánea .hsnap.
+
+    Si no se pasa 'original' se usa la máscara de celdas no vacías de la grilla actual.
+    Escribe a un temporal y lo renombra, para no dejar instantáneas a medias.
+    """
+    dtype_ids = np.uint8 if len(grid.codigos) <= 256 else np.uint16
+    ids = np.frombuffer(grid.arreglo_ids(), dtype=np.uint16).reshape(grid.n_filas, grid.n_cols)
+    if original is None:
+        original = mascara_no_vacias(grid)
+    original = np.asarray(original, dtype=np.uint8)
+    if original.shape != ids.shape:
+        raise ValueError(f"Máscara original de forma {original.shape}; se esperaba {ids.shape}")
+
+    arreglos: Dict[str, np.ndarray] = {
+        "ids": ids.astype(dtype_ids),
+        "original": original,
+    }
+    for nombre, valores in (contadores or {}).items():
+        if nombre in arreglos:
+            raise ValueError(f"Nombre de contador reservado: {nombre}")
+        arreglos[nombre] = np.asarray(valores, dtype=np.int32)
+
+    descriptores = {}
+    desplazamiento = 0
+    for nombre, arreglo in arreglos.items():
+        arreglo = np.ascontiguousarray(arreglo).astype(arreglo.dtype.newbyteorder("<"), copy=False)
+        arreglos[nombre] = arreglo
+        descriptores[nombre] = {
+            "desplazamiento": desplazamiento,
+            "tipo": arreglo.dtype.str,
+            "forma": list(arreglo.shape),
+        }
+        desplazamiento = _alinear(desplazamiento + arreglo.nbytes)
+
+    meta = json.dumps({
+        "codigos": grid.codigos,
+        "siglas": grid.siglas,
+        "encabezados": [None if e is None else str(e) for e in grid.encabezados],
+        "fila_inicio": grid.fila_inicio,
+        "col_inicio": grid.col_inicio,
+        "etapa": etapa,
+        "estadisticas": list(estadisticas),
+        "arreglos": descriptores,
+        "contadores": [n for n in arreglos if n not in ("ids", "original")],
+    }, ensure_ascii=False).encode("utf-8")
+    meta += b" " * (_alinear(_CABECERA.size + len(meta)) - _CABECERA.size - len(meta))
+
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "wb") as f:
+        f.write(_CABECERA.pack(MAGIA, VERSION, len(meta), desplazamiento))
+        f.write(meta)
+        for nombre, arreglo in arreglos.items():
+            inicio = descriptores[nombre]["desplazamiento"]
+            f.write(arreglo.tobytes())
+            f.write(b"\0" * (_alinear(inicio + arreglo.nbytes) - inicio - arreglo.nbytes))
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def leer_instantanea(ruta: str) -> Instantanea:
+    """Abre una instantánea con mmap; ids/original/contadores son vistas sin copia."""
+    with open(ruta, "rb") as f:
+        mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        magia, version, n_meta, n_datos = _CABECERA.unpack_from(mapa, 0)
+        if magia != MAGIA:
+            raise ValueError(f"{ruta} no es una instantánea de horario")
+        if version != VERSION:
+            raise ValueError(f"Versión de instantánea no soportada: {version} (se esperaba {VERSION})")
+        meta = json.loads(bytes(mapa[_CABECERA.size:_CABECERA.size + n_meta]).decode("utf-8"))
+        base = _CABECERA.size + n_meta
+        if base + n_datos > len(mapa):
+            raise ValueError(f"Instantánea truncada: {ruta}")
+
+        arreglos: Dict[str, np.ndarray] = {}
+        for nombre, d in meta["arreglos"].items():
+            tipo = np.dtype(d["tipo"])
+            cantidad = int(np.prod(d["forma"], dtype=np.int64))
+            arreglos[nombre] = np.frombuffer(
+                mapa, dtype=tipo, count=cantidad, offset=base + d["desplazamiento"]
+            ).reshape(d["forma"])
+    except Exception:
+        mapa.close()
+        raise
+
+    return Instantanea(
+        codigos=meta["codigos"],
+        siglas=meta["siglas"],
+        encabezados=meta["encabezados"],
+        ids=arreglos["ids"],
+        original=arreglos["original"],
+        contadores={n: arreglos[n] for n in meta["contadores"]},
+        etapa=meta.get("etapa", ""),
+        estadisticas=meta.get("estadisticas", []),
+        fila_inicio=meta["fila_inicio"],
+        col_inicio=meta["col_inicio"],
+        _mapa=mapa,
+    )
+
+
+def aplicar_instantanea(grid: GrillaHorario, instantanea: Instantanea) -> int:
+    """
+    Lleva una grilla cargada de xlsx al estado de la instantánea con grid.asignar.
+
+    Las celdas que cambian quedan marcadas para volcado, así que un libro de plantilla
+    (p. ej. el procesado) se puede guardar después con el estado de la instantánea.
+    Devuelve cuántas celdas cambiaron.
+    """
+    if (grid.n_filas, grid.n_cols) != instantanea.ids.shape:
+        raise ValueError(
+            f"La instantánea ({instantanea.n_filas}×{instantanea.n_cols}) no coincide con la grilla "
+            f"({grid.n_filas}×{grid.n_cols})"
+        )
+    if list(grid.siglas) != list(instantanea.siglas):
+        raise ValueError("La instantánea no tiene los mismos trabajadores (SIGLAs) que la grilla")
+    cambios = 0
+    codigos = instantanea.codigos
+    for i, fila in enumerate(grid.filas()):
+        actuales = grid.valores_fila(fila)
+        for j, idx in enumerate(instantanea.ids[i].tolist()):
+            if actuales[j] != codigos[idx]:
+                grid.asignar(fila, grid.col_inicio + j, codigos[idx] or None)
+                cambios += 1
+    return cambios
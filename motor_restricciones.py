@@ -0,0 +1,164 @@
+"""
+Motor único de restricciones de adyacencia (día anterior / día siguiente).
+
+Las reglas viven en 'reglas_restricciones.json' en lugar de estar repetidas
+como conjuntos literales en cada asignador. Cada regla dice: "si en el día
+vecino (-1 = ayer, +1 = mañana) del mismo trabajador hay alguno de estos
+turnos, la regla se activa". El tipo (dura / blanda / prioridad) lo interpreta
+cada etapa, igual que antes.
+
+Al compilar contra una GrillaHorario, cada regla se convierte en una máscara
+de bits y en una tabla booleana (id → la regla incluye el código) sobre los ids
+internados de los códigos de turno, de modo que:
+- viola(regla, fila, col) es una lectura del arreglo + un desplazamiento de bits;
+- matriz_activa(regla) evalúa la regla en TODA la grilla de una vez con NumPy:
+  tabla[ids] sobre la matriz trabajadores × días, desplazada una columna hacia
+  el vecino, con el contexto de la grilla en el primer / último día;
+- mascara_filas(regla) empaqueta esa matriz por fila (np.packbits) en un entero
+  cuyo bit j indica que el día (col_inicio + j) activa la regla.
+"""
+
+import json
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+from grilla_horario import GrillaHorario
+
+RUTA_REGLAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reglas_restricciones.json")
+
+TIPOS_REGLA = {"dura", "blanda", "prioridad"}
+
+
+@dataclass(frozen=True)
+class ReglaAdyacencia:
+    nombre: str
+    vecino: int  # -1 = día anterior, +1 = día siguiente
+    tipo: str  # dura | blanda | prioridad
+    turnos: Tuple[str, ...]  # códigos que activan la regla en el día vecino
+    aplica_a: FrozenSet[str] = field(default_factory=frozenset)  # vacío = la etapa decide
+    descripcion: str = ""
+
+
+@lru_cache(maxsize=None)
+def cargar_reglas(ruta: str = RUTA_REGLAS) -> Tuple[ReglaAdyacencia, ...]:
+    """Lee y valida la tabla de reglas (se cachea por ruta: todas las etapas comparten la lectura)."""
+    with open(ruta, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    reglas: List[ReglaAdyacencia] = []
+    nombres = set()
+    for item in data.get("reglas", []):
+        nombre = str(item["nombre"]).strip()
+        vecino = int(item["vecino"])
+        tipo = str(item.get("tipo", "dura")).strip().lower()
+        turnos = tuple(str(t).strip().upper() for t in item.get("turnos", []))
+        if nombre in nombres:
+            raise ValueError(f"Regla duplicada en {ruta}: {nombre}")
+        if vecino not in (-1, 1):
+            raise ValueError(f"Regla {nombre}: 'vecino' debe ser -1 o 1 (recibido {vecino})")
+        if tipo not in TIPOS_REGLA:
+            raise ValueError(f"Regla {nombre}: tipo desconocido '{tipo}'")
+        if not turnos or "" in turnos:
+            raise ValueError(f"Regla {nombre}: 'turnos' debe tener códigos no vacíos")
+        nombres.add(nombre)
+        reglas.append(ReglaAdyacencia(
+            nombre=nombre,
+            vecino=vecino,
+            tipo=tipo,
+            turnos=turnos,
+            aplica_a=frozenset(str(t).strip().upper() for t in item.get("aplica_a", [])),
+            descripcion=str(item.get("descripcion", "")),
+        ))
+    return tuple(reglas)
+
+
+class MotorRestricciones:
+    """
+    Tabla de reglas compilada contra una grilla concreta.
+
+    Las máscaras se calculan una sola vez: los códigos de todas las reglas se
+    internan en la grilla al compilar, así que sus ids no cambian aunque luego
+    se asignen turnos que todavía no existían en la hoja.
+    """
+
+    def __init__(self, grid: GrillaHorario, ruta: str = RUTA_REGLAS) -> None:
+        self.grid = grid
+        self.reglas: Dict[str, ReglaAdyacencia] = {r.nombre: r for r in cargar_reglas(ruta)}
+        self._mascaras: Dict[str, int] = {}
+        self._tablas: Dict[str, np.ndarray] = {}
+        for nombre, regla in self.reglas.items():
+            ids = grid.registrar_codigos(regla.turnos)
+            mascara = 0
+            for idx in ids:
+                mascara |= 1 << idx
+            self._mascaras[nombre] = mascara
+            tabla = np.zeros(len(grid.codigos), dtype=bool)
+            tabla[sorted(ids)] = True
+            self._tablas[nombre] = tabla
+
+    def regla(self, nombre: str) -> ReglaAdyacencia:
+        try:
+            return self.reglas[nombre]
+        except KeyError:
+            raise KeyError(f"Regla de restricción desconocida: {nombre}") from None
+
+    def reglas_de(self, prefijo: str, turno: Optional[str] = None) -> List[ReglaAdyacencia]:
+        """Reglas de una etapa ('1t', 'sabados', ...) en el orden del archivo, opcionalmente filtradas por turno."""
+        turno_u = turno.strip().upper() if turno else None
+        return [
+            r for r in self.reglas.values()
+            if r.nombre.startswith(prefijo + ".") and (turno_u is None or turno_u in r.aplica_a)
+        ]
+
+    def describir(self, nombre: str) -> str:
+        """Códigos de la regla como texto 'A/B/C' (para comentarios y reportes)."""
+        return "/".join(self.regla(nombre).turnos)
+
+    # ------------------------------------------------------------------
+    # Evaluación
+    # ------------------------------------------------------------------
+    def viola(self, nombre: str, fila: int, col: int) -> bool:
+        """True si el día vecino del trabajador en (fila, col) contiene un turno de la regla.
+
+        Antes del primer día y después del último se mira el contexto de la grilla
+        (GrillaHorario.fijar_contexto); sin contexto, nunca se activa.
+        """
+        regla = self.regla(nombre)
+        idx = self.grid.codigo_id(fila, col + regla.vecino)
+        return bool((self._mascaras[nombre] >> idx) & 1) if idx else False
+
+    def _tabla(self, nombre: str) -> np.ndarray:
+        """Tabla id → la regla incluye el código, extendida con False a los códigos internados después."""
+        tabla = self._tablas[nombre]
+        faltan = len(self.grid.codigos) - len(tabla)
+        if faltan > 0:
+            tabla = np.concatenate([tabla, np.zeros(faltan, dtype=bool)])
+            self._tablas[nombre] = tabla
+        return tabla
+
+    def matriz_activa(self, nombre: str) -> np.ndarray:
+        """Matriz booleana n_filas × n_cols: [i, j] = el día col_inicio + j de la fila fila_inicio + i activa la regla."""
+        regla = self.regla(nombre)
+        grid = self.grid
+        tabla = self._tabla(nombre)
+        presencia = tabla[np.frombuffer(grid.arreglo_ids(), dtype=np.uint16).reshape(grid.n_filas, grid.n_cols)]
+        # Primer / último día: el vecino es el turno de contexto (mes anterior / siguiente)
+        col_borde = grid.col_inicio - 1 if regla.vecino < 0 else grid.max_col + 1
+        # (id 0 = sin contexto: "" no está en ninguna regla)
+        borde = tabla[[grid.codigo_id(fila, col_borde) for fila in grid.filas()]]
+        # El día j activa la regla si el vecino (j + vecino) tiene un turno de la regla
+        if regla.vecino < 0:
+            return np.concatenate([borde[:, None], presencia[:, :-1]], axis=1)
+        return np.concatenate([presencia[:, 1:], borde[:, None]], axis=1)
+
+    def mascara_filas(self, nombre: str) -> Dict[int, int]:
+        """Evalúa la regla en toda la grilla: {fila: bits}, bit j = día col_inicio + j activa la regla."""
+        empaquetada = np.packbits(self.matriz_activa(nombre), axis=1, bitorder="little")
+        return {
+            fila: int.from_bytes(bytes_fila.tobytes(), "little")
+            for fila, bytes_fila in zip(self.grid.filas(), empaquetada)
+        }
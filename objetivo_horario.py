@@ -0,0 +1,177 @@
+"""
+Objetivo único para comparar resultados de las etapas de asignación.
+
+Cada etapa reparte sus turnos con un recorrido voraz y sorteos entre empatados,
+así que dos ejecuciones sobre el mismo horario pueden terminar distinto: días
+sin turno, conteos más o menos parejos, restricciones blandas rotas. Aquí se
+resume un resultado (la grilla) en un puntaje, menor = mejor:
+
+    puntaje = PESOS.cobertura  × días sin el turno de la etapa
+            + PESOS.equidad    × dispersión (máx − mín) entre sus elegibles
+            + PESOS.duras      × celdas de la etapa que violan una regla dura
+            + PESOS.blandas    × celdas de la etapa que violan una regla blanda
+
+- Cobertura: días del horizonte sin ninguno de OBJETIVOS_ETAPA[etapa].turnos
+  (etapas sin turno diario, como MOFIS o sencillos, no tienen término).
+- Equidad: sobre la columna de 'Estadísticas' que la etapa equilibra
+  (estadisticas_horario.COLUMNAS_ESTADISTICAS, p. ej. 1T = 1T + 7 + 1) o, si no
+  tiene, sobre el conteo de sus propios turnos.
+- Violaciones: reglas dura/blanda de la etapa en reglas_restricciones.json,
+  evaluadas sobre las celdas con sus turnos (o los de 'aplica_a').
+
+Los términos que no dependen de los sorteos (p. ej. días en que la etapa no
+debía asignar) son iguales para todos los intentos y no cambian el orden.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from catalogo_turnos import TURNOS_MOFIS
+from estadisticas_horario import MatrizEstadisticas
+from grilla_horario import GrillaHorario
+from motor_restricciones import MotorRestricciones
+
+
+@dataclass(frozen=True)
+class ObjetivoEtapa:
+    turnos: Tuple[str, ...]  # turnos que asigna la etapa
+    columna: Optional[str] = None  # columna de estadísticas que equilibra (None = sus turnos)
+    cobertura: bool = True  # la etapa intenta poner uno de sus turnos cada día
+
+
+OBJETIVOS_ETAPA: Dict[str, ObjetivoEtapa] = {
+    "sabados_festivos": ObjetivoEtapa(
+        ("BANTD", "BLPTD", "3D", "NANRD", "NLPRD", "NANTD", "NLPTD", "6R", "6RT", "3", "6T", "6TT"),
+        cobertura=False,
+    ),
+    "1t": ObjetivoEtapa(("1T", "7"), "1T"),
+    "6rt": ObjetivoEtapa(("6RT",), "6RT"),
+    "6tt": ObjetivoEtapa(("6TT",), "6T"),
+    "1": ObjetivoEtapa(("1",), "1T"),
+    "6r": ObjetivoEtapa(("6R",), "6RT"),
+    "6t": ObjetivoEtapa(("6T",), "6T"),
+    "3": ObjetivoEtapa(("3",), "3"),
+    "diurnas": ObjetivoEtapa(("6S", "6N"), "DIURNA", cobertura=False),
+    "mofis": ObjetivoEtapa(tuple(sorted(TURNOS_MOFIS)), cobertura=False),
+    "sencillos": ObjetivoEtapa(
+        ("MANR", "TANR", "MASR", "TASR", "ASIG", "MLPR", "TLPR", "TLPT", "TANT", "MAST"),
+        cobertura=False,
+    ),
+}
+
+
+@dataclass(frozen=True)
+class PesosObjetivo:
+    cobertura: float = 10.0
+    equidad: float = 3.0
+    duras: float = 50.0
+    blandas: float = 1.0
+
+
+PESOS = PesosObjetivo()
+
+
+@dataclass
+class Evaluacion:
+    """Términos del objetivo (totales y por etapa) y puntaje ponderado."""
+
+    dias_sin_turno: int = 0
+    dispersion: int = 0
+    violaciones_duras: int = 0
+    violaciones_blandas: int = 0
+    puntaje: float = 0.0
+    por_etapa: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    def como_dict(self) -> Dict[str, object]:
+        return {
+            "puntaje": self.puntaje,
+            "dias_sin_turno": self.dias_sin_turno,
+            "dispersion": self.dispersion,
+            "violaciones_duras": self.violaciones_duras,
+            "violaciones_blandas": self.violaciones_blandas,
+            "por_etapa": self.por_etapa,
+        }
+
+
+def _matriz_ids(grid: GrillaHorario) -> np.ndarray:
+    return np.frombuffer(grid.arreglo_ids(), dtype=np.uint16).reshape(grid.n_filas, grid.n_cols)
+
+
+def _mascara_turnos(grid: GrillaHorario, ids: np.ndarray, turnos: Sequence[str]) -> np.ndarray:
+    """Matriz booleana n_filas × n_cols: la celda tiene alguno de los turnos."""
+    buscados = sorted(grid.ids_de(turnos))
+    if not buscados:
+        return np.zeros(ids.shape, dtype=bool)
+    return np.isin(ids, buscados)
+
+
+def _dispersion(grid: GrillaHorario, estadisticas: MatrizEstadisticas, objetivo: ObjetivoEtapa,
+                propias: np.ndarray, elegibles: Sequence[str]) -> int:
+    valores = []
+    for sigla in elegibles:
+        if objetivo.columna:
+            valor = estadisticas.valor(sigla, objetivo.columna)
+        else:
+            fila = grid.fila_trabajador(sigla)
+            valor = int(propias[fila - grid.fila_inicio].sum()) if fila else None
+        if valor is not None:
+            valores.append(valor)
+    return max(valores) - min(valores) if valores else 0
+
+
+def _violaciones(grid: GrillaHorario, motor: MotorRestricciones, nombre: str, ids: np.ndarray,
+                 propias: np.ndarray) -> Tuple[int, int]:
+    duras = blandas = 0
+    for regla in motor.reglas_de(nombre):
+        if regla.tipo not in ("dura", "blanda"):
+            continue
+        celdas = _mascara_turnos(grid, ids, sorted(regla.aplica_a)) if regla.aplica_a else propias
+        cuenta = int(np.count_nonzero(celdas & motor.matriz_activa(regla.nombre)))
+        if regla.tipo == "dura":
+            duras += cuenta
+        else:
+            blandas += cuenta
+    return duras, blandas
+
+
+def evaluar(grid: GrillaHorario, etapas: Mapping[str, Sequence[str]],
+            pesos: PesosObjetivo = PESOS) -> Evaluacion:
+    """
+    Evalúa la grilla para las etapas indicadas ({nombre de etapa: trabajadores elegibles}).
+
+    Las etapas sin entrada en OBJETIVOS_ETAPA se ignoran.
+    """
+    estadisticas = MatrizEstadisticas.desde_grilla(grid)
+    motor = MotorRestricciones(grid)
+    ids = _matriz_ids(grid)
+
+    evaluacion = Evaluacion()
+    for nombre, elegibles in etapas.items():
+        objetivo = OBJETIVOS_ETAPA.get(nombre)
+        if objetivo is None:
+            continue
+        propias = _mascara_turnos(grid, ids, objetivo.turnos)
+        dias_sin_turno = int((~propias.any(axis=0)).sum()) if objetivo.cobertura else 0
+        dispersion = _dispersion(grid, estadisticas, objetivo, propias, elegibles)
+        duras, blandas = _violaciones(grid, motor, nombre, ids, propias)
+        evaluacion.por_etapa[nombre] = {
+            "dias_sin_turno": dias_sin_turno,
+            "dispersion": dispersion,
+            "violaciones_duras": duras,
+            "violaciones_blandas": blandas,
+        }
+        evaluacion.dias_sin_turno += dias_sin_turno
+        evaluacion.dispersion += dispersion
+        evaluacion.violaciones_duras += duras
+        evaluacion.violaciones_blandas += blandas
+
+    evaluacion.puntaje = round(
+        pesos.cobertura * evaluacion.dias_sin_turno
+        + pesos.equidad * evaluacion.dispersion
+        + pesos.duras * evaluacion.violaciones_duras
+        + pesos.blandas * evaluacion.violaciones_blandas,
+        4,
+    )
+    return evaluacion
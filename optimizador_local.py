@@ -0,0 +1,478 @@
+"""
+Post-optimización local (recocido simulado) de las etapas de un turno por día.
+
+Las etapas 1T/7, 6RT, 1, 6R, 6T y 3 reparten día por día con un recorrido
+voraz y terminan con un rebalanceo de paridad que solo mueve turnos entre dos
+trabajadores. Un día queda sin turno cuando, al llegar a él, todos los
+candidatos estaban bloqueados por lo que se eligió en los días vecinos; el
+recorrido no vuelve atrás. Con optimizacion=PresupuestoBusqueda(...) la etapa
+corre después del rebalanceo una búsqueda local sobre tres vecindarios:
+
+- agregar:     poner el turno de la etapa en un día que quedó sin él;
+- mover:       pasar un turno movible a otro trabajador el mismo día;
+- intercambiar: dos trabajadores se cambian turnos movibles de días distintos.
+
+Movible = turno de la etapa que NO estaba en la hoja original; el destino debe
+estar vacío, haber sido vacío originalmente y cumplir las reglas duras de la
+etapa (las mismas lambdas que usa el rebalanceo por flujo). El puntaje es el de
+objetivo_horario.py para la etapa, más un término auxiliar de suma de cuadrados
+para que la búsqueda prefiera repartos más planos aunque max − min no cambie.
+
+Cada movimiento cambia a lo sumo cuatro celdas y se puntúa en O(1):
+- cobertura: lista de días sin turno, actualizada al cambiar una celda;
+- equidad: histograma de conteos (max − min se ajusta en ±1) y suma de cuadrados;
+- violaciones: reglas de la etapa evaluadas solo en la celda y sus dos vecinas
+  (MotorRestricciones.viola), antes y después del cambio.
+Un movimiento que aumente las violaciones duras se descarta siempre, y uno que
+aumente las blandas solo se acepta si cubre un día más: el orden de prioridad es
+cobertura, duras, blandas y recién después equidad, así que la búsqueda nunca
+cambia una violación blanda por un reparto más parejo. La cobertura solo cuenta
+los días en que la etapa pondría su turno (turno_para_dia).
+
+La búsqueda termina al agotar el tiempo (segundos) o las iteraciones y deja la
+mejor grilla encontrada. Con 'iteraciones' y semilla el resultado es
+reproducible: la temperatura se enfría por iteraciones y no por reloj.
+"""
+
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Generic, Hashable, Iterable, List, Mapping, Optional, Sequence, Tuple, TypeVar
+
+from grilla_horario import GrillaHorario
+from motor_restricciones import MotorRestricciones
+from objetivo_horario import OBJETIVOS_ETAPA, PESOS, PesosObjetivo
+
+# Pesos de los términos auxiliares: Σ conteo² (desempate entre repartos con el mismo
+# max − min) y celdas distintas de la grilla de partida (entre soluciones igual de
+# buenas gana la que cambia menos)
+PESO_CUADRADOS = 0.05
+PESO_CAMBIOS = 0.01
+
+T = TypeVar("T", bound=Hashable)
+
+
+@dataclass(frozen=True)
+class PresupuestoBusqueda:
+    segundos: float = 0.2
+    iteraciones: Optional[int] = None  # si se indica, el enfriamiento va por iteraciones (reproducible)
+    temperatura_inicial: float = 2.0
+    temperatura_final: float = 0.05
+
+
+@dataclass(frozen=True)
+class Cambio:
+    fila: int
+    col: int
+    antes: str
+    despues: str
+
+
+@dataclass
+class ResultadoOptimizacion:
+    iteraciones: int = 0
+    aceptados: int = 0
+    puntaje_inicial: float = 0.0
+    puntaje_final: float = 0.0
+    dias_sin_turno_inicial: int = 0
+    dias_sin_turno_final: int = 0
+    blandas_inicial: int = 0
+    blandas_final: int = 0
+    segundos: float = 0.0
+    cambios: List[Cambio] = field(default_factory=list)
+
+    def resumen(self) -> str:
+        return (
+            f"puntaje {self.puntaje_inicial:g} → {self.puntaje_final:g}, "
+            f"días sin turno {self.dias_sin_turno_inicial} → {self.dias_sin_turno_final}, "
+            f"blandas {self.blandas_inicial} → {self.blandas_final}, "
+            f"{len(self.cambios)} celdas cambiadas, {self.iteraciones} iteraciones en {self.segundos:.2f} s"
+        )
+
+
+class _Bolsa(Generic[T]):
+    """Conjunto con alta, baja y elección al azar en O(1) (lista + posiciones)."""
+
+    def __init__(self, elementos: Iterable[T] = ()) -> None:
+        self._items: List[T] = []
+        self._pos: Dict[T, int] = {}
+        for e in elementos:
+            self.agregar(e)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, e: object) -> bool:
+        return e in self._pos
+
+    def agregar(self, e: T) -> None:
+        if e not in self._pos:
+            self._pos[e] = len(self._items)
+            self._items.append(e)
+
+    def quitar(self, e: T) -> None:
+        i = self._pos.pop(e, None)
+        if i is None:
+            return
+        ultimo = self._items.pop()
+        if i < len(self._items):
+            self._items[i] = ultimo
+            self._pos[ultimo] = i
+
+    def elegir(self, rng: random.Random) -> T:
+        return self._items[rng.randrange(len(self._items))]
+
+
+class OptimizadorLocal:
+    """
+    Recocido simulado sobre los turnos de una etapa, con puntaje incremental.
+
+    Parámetros del constructor:
+    - grid / reglas: grilla del horario y motor de restricciones de la etapa.
+    - etapa: nombre de la etapa ('1', '6r', ...): sus reglas y turnos de OBJETIVOS_ETAPA.
+    - trabajadores: elegibles de la etapa (los que tienen fila entran en la equidad).
+    - contador: conteo actual por trabajador de la columna que equilibra la etapa.
+    - turnos: códigos que la etapa puede mover (p. ej. {"1"} o {"1T", "7"}).
+    - es_movible(fila, col): True si la celda de origen se puede mover (no es original).
+    - destino_valido(trabajador, fila, col, turno): reglas de la etapa para recibir el
+      turno; se llama con la celda de origen ya vaciada en la grilla.
+    - turno_para_dia(col): turno que la etapa pondría en un día sin turno, o None si ese
+      día no le corresponde (p. ej. por personal o por un BLPTD ya asignado).
+    """
+
+    def __init__(
+        self,
+        grid: GrillaHorario,
+        reglas: MotorRestricciones,
+        etapa: str,
+        trabajadores: Sequence[str],
+        contador: Mapping[str, int],
+        turnos: Iterable[str],
+        es_movible: Callable[[int, int], bool],
+        destino_valido: Callable[[str, int, int, str], bool],
+        turno_para_dia: Callable[[int], Optional[str]],
+        pesos: PesosObjetivo = PESOS,
+        semilla: Optional[int] = None,
+    ) -> None:
+        self.grid = grid
+        self.reglas = reglas
+        self.etapa = etapa
+        self.filas: Dict[str, int] = {}
+        for t in trabajadores:
+            fila = grid.fila_trabajador(t)
+            if fila:
+                self.filas.setdefault(t, fila)
+        self.trabajador_de_fila = {fila: t for t, fila in self.filas.items()}
+        self._trabajadores = list(self.filas)
+        self.turnos = {str(t).strip().upper() for t in turnos}
+        self.ids_turnos = grid.registrar_codigos(self.turnos)
+        self.es_movible = es_movible
+        self.destino_valido = destino_valido
+        self.turno_para_dia = turno_para_dia
+        self.pesos = pesos
+        self.rng = random.Random(semilla)
+
+        objetivo = OBJETIVOS_ETAPA.get(etapa)
+        propios = objetivo.turnos if objetivo else tuple(sorted(self.turnos))
+        self.cobertura = objetivo.cobertura if objetivo else True
+        # Días con turno de la etapa: cualquiera de sus turnos (también los no movibles)
+        self.turnos_dia = tuple(sorted(set(propios) | self.turnos))
+        # (nombre, es_dura, ids de las celdas a las que se aplica)
+        self._reglas: List[Tuple[str, bool, frozenset]] = [
+            (r.nombre, r.tipo == "dura", frozenset(grid.registrar_codigos(r.aplica_a or propios)))
+            for r in reglas.reglas_de(etapa) if r.tipo in ("dura", "blanda")
+        ]
+
+        self._conteos: Dict[str, int] = {t: int(contador.get(t, 0)) for t in self.filas}
+        self._histograma: Dict[int, int] = {}
+        for valor in self._conteos.values():
+            self._histograma[valor] = self._histograma.get(valor, 0) + 1
+        self._minimo = min(self._conteos.values(), default=0)
+        self._maximo = max(self._conteos.values(), default=0)
+        self._cuadrados = sum(v * v for v in self._conteos.values())
+
+        # Días que cuentan para la cobertura: los que ya tienen turno de la etapa y los
+        # que no lo tienen pero la etapa se los daría (turno_para_dia)
+        self._dias_cobertura = frozenset(
+            col for col in grid.columnas()
+            if self.cobertura and (grid.existe_en_dia(col, self.turnos_dia) or turno_para_dia(col))
+        )
+        self._sin_turno: _Bolsa[int] = _Bolsa(
+            col for col in sorted(self._dias_cobertura) if not grid.existe_en_dia(col, self.turnos_dia)
+        )
+        self._movibles: _Bolsa[Tuple[int, int]] = _Bolsa(
+            (fila, col) for fila in self.filas.values() for col in grid.columnas()
+            if grid.codigo_id(fila, col) in self.ids_turnos and es_movible(fila, col)
+        )
+        self._duras, self._blandas = self._violaciones_totales()
+
+        # Registro de cambios de celda para volver a la mejor grilla: (fila, col, código anterior)
+        self._registro: List[Tuple[int, int, str]] = []
+        self._iniciales: Dict[Tuple[int, int], str] = {}
+        self._distintas = 0
+
+    # ------------------------------------------------------------------
+    # Puntaje
+    # ------------------------------------------------------------------
+    def _violaciones_celda(self, fila: int, col: int) -> Tuple[int, int]:
+        if not self.grid.contiene(fila, col):
+            return 0, 0
+        idx = self.grid.codigo_id(fila, col)
+        duras = blandas = 0
+        for nombre, es_dura, sujetos in self._reglas:
+            if idx in sujetos and self.reglas.viola(nombre, fila, col):
+                if es_dura:
+                    duras += 1
+                else:
+                    blandas += 1
+        return duras, blandas
+
+    def _violaciones_totales(self) -> Tuple[int, int]:
+        duras = blandas = 0
+        for fila in self.grid.filas():
+            for col in self.grid.columnas():
+                d, b = self._violaciones_celda(fila, col)
+                duras += d
+                blandas += b
+        return duras, blandas
+
+    def _violaciones_zona(self, celdas: Iterable[Tuple[int, int]]) -> Tuple[int, int]:
+        """Violaciones en las celdas indicadas y sus vecinas del mismo trabajador (cada una una vez)."""
+        zona = {(fila, col + d) for fila, col in celdas for d in (-1, 0, 1)}
+        duras = blandas = 0
+        for fila, col in zona:
+            d, b = self._violaciones_celda(fila, col)
+            duras += d
+            blandas += b
+        return duras, blandas
+
+    def puntaje(self) -> float:
+        return (
+            self.pesos.cobertura * len(self._sin_turno)
+            + self.pesos.equidad * (self._maximo - self._minimo)
+            + self.pesos.duras * self._duras
+            + self.pesos.blandas * self._blandas
+            + PESO_CUADRADOS * self._cuadrados
+            + PESO_CAMBIOS * self._distintas
+        )
+
+    def _ajustar_conteo(self, trabajador: str, delta: int) -> None:
+        anterior = self._conteos[trabajador]
+        nuevo = anterior + delta
+        self._conteos[trabajador] = nuevo
+        self._cuadrados += nuevo * nuevo - anterior * anterior
+        self._histograma[anterior] -= 1
+        self._histograma[nuevo] = self._histograma.get(nuevo, 0) + 1
+        # Con pasos de ±1 el extremo que se vacía se corre exactamente una unidad
+        self._maximo = max(self._maximo, nuevo)
+        self._minimo = min(self._minimo, nuevo)
+        if self._histograma[anterior] == 0:
+            del self._histograma[anterior]
+            if anterior == self._maximo:
+                self._maximo -= 1
+            if anterior == self._minimo:
+                self._minimo += 1
+
+    # ------------------------------------------------------------------
+    # Cambios de celda
+    # ------------------------------------------------------------------
+    def _poner(self, fila: int, col: int, turno: str) -> None:
+        anterior = self.grid.valor(fila, col)
+        inicial = self._iniciales.setdefault((fila, col), anterior)
+        self._distintas += (turno != inicial) - (anterior != inicial)
+        self._registro.append((fila, col, anterior))
+        self.grid.asignar(fila, col, turno or None)
+
+        trabajador = self.trabajador_de_fila.get(fila)
+        era_propio = anterior in self.turnos
+        es_propio = turno in self.turnos
+        if trabajador is not None and era_propio != es_propio:
+            self._ajustar_conteo(trabajador, 1 if es_propio else -1)
+        if era_propio:
+            self._movibles.quitar((fila, col))
+        if es_propio:
+            self._movibles.agregar((fila, col))
+        if col in self._dias_cobertura:
+            if self.grid.existe_en_dia(col, self.turnos_dia):
+                self._sin_turno.quitar(col)
+            else:
+                self._sin_turno.agregar(col)
+
+    def _deshacer_hasta(self, marca: int) -> None:
+        while len(self._registro) > marca:
+            fila, col, anterior = self._registro.pop()
+            self._poner(fila, col, anterior)
+            self._registro.pop()  # _poner vuelve a registrar: se descarta esa entrada
+
+    # ------------------------------------------------------------------
+    # Vecindarios: cada uno elige sus celdas, mide las violaciones de la zona,
+    # aplica el movimiento y devuelve (celdas, violaciones previas), o None si
+    # no encontró un movimiento válido (la grilla queda como estaba)
+    # ------------------------------------------------------------------
+    def _proponer_agregar(self) -> Optional[Tuple[List[Tuple[int, int]], Tuple[int, int]]]:
+        if not self._sin_turno:
+            return None
+        col = self._sin_turno.elegir(self.rng)
+        turno = self.turno_para_dia(col)
+        if not turno:
+            return None
+        trabajador = self._trabajadores[self.rng.randrange(len(self._trabajadores))]
+        fila = self.filas[trabajador]
+        if not self.destino_valido(trabajador, fila, col, turno):
+            return None
+        celdas = [(fila, col)]
+        antes = self._violaciones_zona(celdas)
+        self._poner(fila, col, turno)
+        return celdas, antes
+
+    def _proponer_mover(self) -> Optional[Tuple[List[Tuple[int, int]], Tuple[int, int]]]:
+        if not self._movibles:
+            return None
+        fila_origen, col = self._movibles.elegir(self.rng)
+        destino = self._trabajadores[self.rng.randrange(len(self._trabajadores))]
+        fila_destino = self.filas[destino]
+        if fila_destino == fila_origen:
+            return None
+        turno = self.grid.valor(fila_origen, col)
+        celdas = [(fila_origen, col), (fila_destino, col)]
+        antes = self._violaciones_zona(celdas)
+        marca = len(self._registro)
+        self._poner(fila_origen, col, "")
+        if not self.destino_valido(destino, fila_destino, col, turno):
+            self._deshacer_hasta(marca)
+            return None
+        self._poner(fila_destino, col, turno)
+        return celdas, antes
+
+    def _proponer_intercambiar(self) -> Optional[Tuple[List[Tuple[int, int]], Tuple[int, int]]]:
+        if len(self._movibles) < 2:
+            return None
+        fila_a, col_a = self._movibles.elegir(self.rng)
+        fila_b, col_b = self._movibles.elegir(self.rng)
+        if fila_a == fila_b or col_a == col_b:
+            return None
+        turno_a = self.grid.valor(fila_a, col_a)
+        turno_b = self.grid.valor(fila_b, col_b)
+        celdas = [(fila_a, col_a), (fila_b, col_b), (fila_b, col_a), (fila_a, col_b)]
+        antes = self._violaciones_zona(celdas)
+        marca = len(self._registro)
+        self._poner(fila_a, col_a, "")
+        self._poner(fila_b, col_b, "")
+        if not self.destino_valido(self.trabajador_de_fila[fila_b], fila_b, col_a, turno_a):
+            self._deshacer_hasta(marca)
+            return None
+        self._poner(fila_b, col_a, turno_a)
+        if not self.destino_valido(self.trabajador_de_fila[fila_a], fila_a, col_b, turno_b):
+            self._deshacer_hasta(marca)
+            return None
+        self._poner(fila_a, col_b, turno_b)
+        return celdas, antes
+
+    def _proponer(self) -> Tuple[int, Optional[List[Tuple[int, int]]]]:
+        """Aplica un movimiento al azar y actualiza los totales; devuelve (marca del registro, celdas)."""
+        sorteo = self.rng.random()
+        if sorteo < 0.3:
+            proponer = self._proponer_agregar
+        elif sorteo < 0.7:
+            proponer = self._proponer_mover
+        else:
+            proponer = self._proponer_intercambiar
+        marca = len(self._registro)
+        propuesta = proponer()
+        if propuesta is None:
+            return marca, None
+        celdas, antes = propuesta
+        despues = self._violaciones_zona(celdas)
+        self._duras += despues[0] - antes[0]
+        self._blandas += despues[1] - antes[1]
+        return marca, celdas
+
+    # ------------------------------------------------------------------
+    # Búsqueda
+    # ------------------------------------------------------------------
+    def ejecutar(self, presupuesto: PresupuestoBusqueda = PresupuestoBusqueda(),
+                 aplicar: Optional[Callable[[Cambio], None]] = None) -> ResultadoOptimizacion:
+        """
+        Corre el recocido y deja en la grilla la mejor solución encontrada.
+
+        'aplicar' se llama una vez por celda que terminó distinta (para colores y
+        contadores de la etapa); las celdas que se tocaron y volvieron a su valor no cuentan.
+        """
+        inicio = time.perf_counter()
+        resultado = ResultadoOptimizacion(
+            puntaje_inicial=round(self.puntaje(), 4),
+            dias_sin_turno_inicial=len(self._sin_turno),
+            blandas_inicial=self._blandas,
+        )
+        if not self.filas or (not self._movibles and not self._sin_turno):
+            resultado.puntaje_final = resultado.puntaje_inicial
+            resultado.dias_sin_turno_final = resultado.dias_sin_turno_inicial
+            resultado.blandas_final = resultado.blandas_inicial
+            return resultado
+
+        actual = mejor = self.puntaje()
+        marca_mejor = 0
+        t0, tf = presupuesto.temperatura_inicial, presupuesto.temperatura_final
+        limite = presupuesto.iteraciones
+        temperatura = t0
+        iteracion = 0
+        while True:
+            if iteracion % 64 == 0:
+                transcurrido = time.perf_counter() - inicio
+                if transcurrido >= presupuesto.segundos or (limite is not None and iteracion >= limite):
+                    break
+                avance = iteracion / limite if limite else transcurrido / max(presupuesto.segundos, 1e-9)
+                temperatura = t0 * (tf / t0) ** min(avance, 1.0)
+            elif limite is not None and iteracion >= limite:
+                break
+            iteracion += 1
+
+            duras_previas, blandas_previas, sin_turno_previos = self._duras, self._blandas, len(self._sin_turno)
+            marca, celdas = self._proponer()
+            if celdas is None:
+                continue
+            nuevo = self.puntaje()
+            delta = nuevo - actual
+            empeora = self._duras > duras_previas or (
+                self._blandas > blandas_previas and len(self._sin_turno) >= sin_turno_previos
+            )
+            if empeora or (delta > 0 and self.rng.random() >= math.exp(-delta / temperatura)):
+                self._revertir(marca, celdas)
+                continue
+            actual = nuevo
+            resultado.aceptados += 1
+            if actual < mejor - 1e-9:
+                mejor = actual
+                marca_mejor = len(self._registro)
+
+        self._revertir(marca_mejor, None)
+        resultado.iteraciones = iteracion
+        resultado.puntaje_final = round(self.puntaje(), 4)
+        resultado.dias_sin_turno_final = len(self._sin_turno)
+        resultado.blandas_final = self._blandas
+        for (fila, col), antes in self._iniciales.items():
+            despues = self.grid.valor(fila, col)
+            if despues != antes:
+                cambio = Cambio(fila, col, antes, despues)
+                resultado.cambios.append(cambio)
+                if aplicar is not None:
+                    aplicar(cambio)
+        resultado.segundos = time.perf_counter() - inicio
+        return resultado
+
+    def _revertir(self, marca: int, celdas: Optional[List[Tuple[int, int]]]) -> None:
+        """Deshace hasta la marca manteniendo los totales de violaciones (zona conocida o recálculo)."""
+        if celdas is not None:
+            antes = self._violaciones_zona(celdas)
+            self._deshacer_hasta(marca)
+            despues = self._violaciones_zona(celdas)
+            self._duras += despues[0] - antes[0]
+            self._blandas += despues[1] - antes[1]
+            return
+        tocadas = [(fila, col) for fila, col, _ in self._registro[marca:]]
+        antes = self._violaciones_zona(tocadas)
+        self._deshacer_hasta(marca)
+        despues = self._violaciones_zona(tocadas)
+        self._duras += despues[0] - antes[0]
+        self._blandas += despues[1] - antes[1]
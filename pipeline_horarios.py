@@ -0,0 +1,373 @@
+"""
+Pipeline de asignación de turnos en un solo proceso.
+
+Encadena todas las etapas de asignación sobre UN solo libro de openpyxl y UNA
+sola GrillaHorario en memoria, en lugar de que cada script lea el xlsx que dejó
+la etapa anterior y guarde el suyo:
+
+    horarioUnificado_procesado.xlsx
+      → sábados/festivos → 1T/7 → 6RT → 6TT → 1 → 6R → 6T → 3
+      → diurnas → MOFIS → sencillos
+      → horarioUnificado_con_sencillos.xlsx
+
+- El orden de las etapas es explícito (ETAPAS) y no depende de qué archivos
+  intermedios existan en disco (ya no se adivina la entrada con 'candidatos').
+- Por defecto solo se guarda el archivo final. Con guardar_intermedios=True se
+  guarda además, tras cada etapa, el mismo xlsx que produciría el script suelto.
+- Con directorio_instantaneas se guarda tras cada etapa una instantánea binaria
+  (.hsnap, ver instantanea_horario.py) en lugar del xlsx: milisegundos por etapa,
+  y los verificadores (verificar_mofis.py, cargador_horarios.cargar_grilla) la
+  leen directamente. La entrada también puede ser una instantánea: se aplica
+  sobre el xlsx de plantilla (cargador_horarios.abrir_horario), así que se puede
+  retomar la cadena desde cualquier etapa con --entrada DIR/X.hsnap --etapas ...
+- Con mes_anterior / mes_siguiente (xlsx o .hsnap de los periodos vecinos) las
+  reglas de día anterior / día siguiente miran también el último día del mes
+  anterior y el primero del siguiente (GrillaHorario.fijar_contexto). El
+  horizonte puede ser de cualquier longitud (un trimestre de una vez).
+- Con semilla, los sorteos entre empatados son reproducibles (busqueda_semillas.py
+  busca en paralelo la semilla con mejor resultado).
+- Con modo_recorrido="anticipado", 1T/7 resuelve antes la cobertura máxima del
+  horizonte (recorrido_anticipado.py) y recorre los días sin perderla.
+- Con orden_dias="restringido", las etapas que recorren días procesan primero
+  los días con menos candidatos y vuelven a podar los vecinos tras cada
+  asignación (dominios_dias.py); 1T/7 en modo anticipado sigue en calendario.
+- Con respaldo_alternativos, sencillos completa MLPR/TLPR/TLPT de los días con
+  BLPTD/NANRD con los alternativos cuando se agotan los preferidos (sin dejar
+  corto al segundo grupo, que comparte esos trabajadores).
+- Con optimizacion (PresupuestoBusqueda), las etapas de un turno por día corren
+  tras su rebalanceo una búsqueda local (optimizador_local.py) con ese presupuesto.
+- procesador_horarios.py (entrada) y stat_transformada.py (salida) quedan fuera.
+
+Uso:
+    python pipeline_horarios.py [--entrada X.xlsx|X.hsnap] [--plantilla P.xlsx] [--salida Y.xlsx] [--intermedios]
+                                [--balanceo flujo]
+                                [--emparejamiento ponderado] [--instantaneas DIR]
+                                [--mes-anterior A.xlsx] [--mes-siguiente S.xlsx] [--etapas 6rt 6tt]
+                                [--semilla N] [--optimizar 0.2] [--iteraciones N] [--recorrido anticipado]
+                                [--orden-dias restringido] [--respaldo-alternativos]
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from balanceo_flujo import MODOS_BALANCEO, validar_modo_balanceo
+from emparejamiento import MODOS_EMPAREJAMIENTO, validar_modo_emparejamiento
+from cargador_horarios import PLANTILLA_INSTANTANEAS, abrir_horario, turnos_de_borde
+from contador_operativos import contador_compartido
+from dominios_dias import MODOS_ORDEN_DIAS, validar_orden_dias
+from estadisticas_horario import EscritorEstadisticas
+from estilos_horario import aplicar_estilos_pendientes
+from instantanea_horario import (
+    EXTENSION_INSTANTANEA,
+    es_instantanea,
+    guardar_instantanea,
+    leer_instantanea,
+    mascara_no_vacias,
+)
+from optimizador_local import PresupuestoBusqueda
+from recorrido_anticipado import MODOS_RECORRIDO, validar_modo_recorrido
+from asignador_de_sabados_y_festivos import AsignadorSabadosFestivos
+from asignador_turnos_1t import AsignadorTurnos
+from asignador_turnos_6rt import AsignadorTurnos6RT
+from asignador_turnos_6tt import AsignadorTurnos6TT
+from asignador_turnos_1 import AsignadorTurnos1
+from asignador_turnos_6r import AsignadorTurnos6R
+from asignador_turnos_6t import AsignadorTurnos6T
+from asignador_turnos_3 import AsignadorTurnos3
+from asignador_turnos_diurnas import AsignadorTurnosDiurnas
+from asignador_turnos_mofis import AsignadorTurnosMofis
+from asignador_turnos_sencillos import AsignadorTurnosSencillos
+
+
+@dataclass
+class EtapaPipeline:
+    nombre: str
+    clase: Any
+    archivo_salida: str  # xlsx que produce el script suelto (solo se escribe con intermedios)
+    metodo: str = "procesar_todos_los_dias"
+    opciones: Dict[str, Any] = field(default_factory=dict)
+    rebalancea: bool = False  # la etapa acepta modo_balanceo ("iterativo" | "flujo")
+    empareja: bool = False  # la etapa acepta modo_emparejamiento ("dos_fases" | "ponderado")
+    sortea: bool = True  # la etapa sortea empates y acepta semilla
+    optimiza: bool = False  # la etapa acepta optimizacion (búsqueda local tras el rebalanceo)
+    anticipa: bool = False  # la etapa acepta modo_recorrido ("voraz" | "anticipado")
+    ordena: bool = False  # la etapa acepta orden_dias ("calendario" | "restringido")
+    respalda: bool = False  # la etapa acepta respaldo_alternativos
+
+
+# Orden explícito de las etapas (el mismo en que se ejecutan los scripts sueltos)
+ETAPAS: List[EtapaPipeline] = [
+    EtapaPipeline("sabados_festivos", AsignadorSabadosFestivos, "horario_procesado_con_sabados_domingos.xlsx",
+                  metodo="asignar", opciones={"modo_simulacion": False}, empareja=True, sortea=False),
+    EtapaPipeline("1t", AsignadorTurnos, "horarioUnificado_con_1t.xlsx", optimiza=True, anticipa=True,
+                  ordena=True),
+    EtapaPipeline("6rt", AsignadorTurnos6RT, "horarioUnificado_con_6rt.xlsx", rebalancea=True, optimiza=True,
+                  ordena=True),
+    EtapaPipeline("6tt", AsignadorTurnos6TT, "horarioUnificado_con_6tt.xlsx", ordena=True),
+    EtapaPipeline("1", AsignadorTurnos1, "horarioUnificado_con_1.xlsx", rebalancea=True, optimiza=True,
+                  ordena=True),
+    EtapaPipeline("6r", AsignadorTurnos6R, "horarioUnificado_con_6r.xlsx", rebalancea=True, optimiza=True,
+                  ordena=True),
+    EtapaPipeline("6t", AsignadorTurnos6T, "horarioUnificado_con_6t.xlsx", rebalancea=True, optimiza=True,
+                  ordena=True),
+    EtapaPipeline("3", AsignadorTurnos3, "horarioUnificado_con_3.xlsx", rebalancea=True, optimiza=True,
+                  ordena=True),
+    EtapaPipeline("diurnas", AsignadorTurnosDiurnas, "horarioUnificado_con_diurnas.xlsx", rebalancea=True,
+                  ordena=True),
+    EtapaPipeline("mofis", AsignadorTurnosMofis, "horarioUnificado_con_mofis.xlsx"),
+    EtapaPipeline("sencillos", AsignadorTurnosSencillos, "horarioUnificado_con_sencillos.xlsx", ordena=True,
+                  respalda=True),
+]
+
+
+def semilla_etapa(semilla: int, nombre: str) -> int:
+    """Semilla de una etapa derivada de la del pipeline (la misma corra sola o en la cadena completa)."""
+    resumen = hashlib.sha256(f"{semilla}:{nombre}".encode("utf-8")).digest()
+    return int.from_bytes(resumen[:8], "little")
+
+
+class PipelineHorarios:
+    """
+    Ejecuta las etapas de ETAPAS sobre un libro compartido y guarda una sola vez.
+
+    Parámetros del constructor:
+    - archivo_entrada: xlsx procesado de partida (por defecto 'horarioUnificado_procesado.xlsx'), o una
+      instantánea .hsnap de una etapa anterior.
+    - plantilla: xlsx sobre el que se aplica una entrada .hsnap (formato de la hoja; por defecto el procesado).
+    - archivo_salida: xlsx final (por defecto el de la última etapa).
+    - guardar_intermedios: si es True, guarda también el xlsx de cada etapa intermedia.
+    - etapas: lista de etapas a ejecutar (por defecto ETAPAS completa).
+    - modo_balanceo: rebalanceo final de las etapas que lo admiten ("iterativo" o "flujo").
+    - modo_emparejamiento: matching de sábados/festivos ("dos_fases" o "ponderado").
+    - directorio_instantaneas: si se indica, guarda ahí una instantánea .hsnap tras cada etapa.
+    - mes_anterior / mes_siguiente: horarios vecinos (xlsx o .hsnap) cuyo último / primer día
+      es el contexto de las reglas de adyacencia en los bordes del horizonte.
+    - semilla: si se indica, cada etapa sortea los empates con semilla_etapa(semilla, nombre)
+      y el resultado se puede reproducir.
+    - modo_recorrido: recorrido de 1T/7 ("voraz" o "anticipado": cobertura máxima por programación dinámica).
+    - optimizacion: presupuesto de la búsqueda local de las etapas que la admiten (None = sin ella).
+    - orden_dias: orden de los días en las etapas que lo admiten ("calendario" o "restringido":
+      día con menos candidatos primero). Con modo_recorrido="anticipado", 1T/7 queda en calendario
+      (la etapa lo avisa).
+    - respaldo_alternativos: sencillos completa el primer grupo de los días con BLPTD/NANRD con los
+      alternativos cuando se agotan los preferidos (política de personal, independiente del orden).
+    """
+
+    def __init__(
+        self,
+        archivo_entrada: str = "horarioUnificado_procesado.xlsx",
+        archivo_salida: Optional[str] = None,
+        guardar_intermedios: bool = False,
+        etapas: Optional[List[EtapaPipeline]] = None,
+        modo_balanceo: str = "iterativo",
+        modo_emparejamiento: str = "dos_fases",
+        directorio_instantaneas: Optional[str] = None,
+        mes_anterior: Optional[str] = None,
+        mes_siguiente: Optional[str] = None,
+        semilla: Optional[int] = None,
+        optimizacion: Optional[PresupuestoBusqueda] = None,
+        modo_recorrido: str = "voraz",
+        orden_dias: str = "calendario",
+        plantilla: str = PLANTILLA_INSTANTANEAS,
+        respaldo_alternativos: bool = False,
+    ) -> None:
+        if not os.path.exists(archivo_entrada):
+            raise FileNotFoundError(f"No se encontró el archivo Excel: {archivo_entrada}")
+        self.archivo_entrada = archivo_entrada
+        self.etapas = list(etapas) if etapas is not None else list(ETAPAS)
+        if not self.etapas:
+            raise ValueError("El pipeline necesita al menos una etapa")
+        self.archivo_salida = archivo_salida or self.etapas[-1].archivo_salida
+        self.guardar_intermedios = guardar_intermedios
+        self.modo_balanceo = validar_modo_balanceo(modo_balanceo)
+        self.modo_emparejamiento = validar_modo_emparejamiento(modo_emparejamiento)
+        self.semilla = semilla
+        self.optimizacion = optimizacion
+        self.modo_recorrido = validar_modo_recorrido(modo_recorrido)
+        self.orden_dias = validar_orden_dias(orden_dias)
+        self.respaldo_alternativos = respaldo_alternativos
+
+        # Una sola lectura del xlsx (o de la instantánea sobre la plantilla) para todo el pipeline
+        self.wb, self.grid = abrir_horario(self.archivo_entrada, plantilla)
+        self.ws = self._obtener_hoja_horario()
+        print(f"📐 Horizonte: {len(list(self.grid.trabajadores()))} trabajadores × {self.grid.n_cols} días")
+        if mes_anterior or mes_siguiente:
+            con_anterior, con_siguiente = self.grid.fijar_contexto(
+                anterior=turnos_de_borde(mes_anterior, ultimo=True) if mes_anterior else None,
+                siguiente=turnos_de_borde(mes_siguiente, ultimo=False) if mes_siguiente else None,
+            )
+            print(f"🔗 Contexto de bordes: {con_anterior} trabajadores con turno el día anterior, "
+                  f"{con_siguiente} el día siguiente")
+
+        self.directorio_instantaneas = directorio_instantaneas
+        if directorio_instantaneas:
+            os.makedirs(directorio_instantaneas, exist_ok=True)
+            # Celdas con turno antes de la primera etapa (la máscara "original" de cada instantánea)
+            self.mascara_original = self._mascara_original()
+
+        self.tiempos: Dict[str, float] = {}
+
+    def _mascara_original(self) -> np.ndarray:
+        # Retomando desde una instantánea, lo "original" sigue siendo la entrada de la cadena que la produjo
+        if es_instantanea(self.archivo_entrada):
+            with leer_instantanea(self.archivo_entrada) as instantanea:
+                return instantanea.original.copy()
+        return mascara_no_vacias(self.grid)
+
+    def _obtener_hoja_horario(self):
+        for nombre in self.wb.sheetnames:
+            if nombre != "Estadísticas":
+                return self.wb[nombre]
+        return self.wb.active
+
+    def _guardar(self, salida: str) -> str:
+        # Las etapas solo anotan colores; se escriben una vez por guardado
+        aplicar_estilos_pendientes(self.wb)
+        try:
+            self.wb.save(salida)
+            return salida
+        except PermissionError:
+            base, ext = os.path.splitext(salida)
+            alternativo = f"{base}_{random.randint(1000,9999)}{ext}"
+            self.wb.save(alternativo)
+            print(f"Archivo por defecto en uso. Guardado como: {alternativo}")
+            return alternativo
+
+    def _guardar_instantanea(self, etapa: EtapaPipeline) -> str:
+        nombre = os.path.splitext(os.path.basename(etapa.archivo_salida))[0] + EXTENSION_INSTANTANEA
+        contador = contador_compartido(self.grid)
+        return guardar_instantanea(
+            os.path.join(self.directorio_instantaneas, nombre),
+            self.grid,
+            original=self.mascara_original,
+            contadores={"operativos": contador.operativos_por_dia(), "torre": contador.torre_por_dia()},
+            etapa=etapa.nombre,
+            estadisticas=EscritorEstadisticas(self.wb, self.grid, self.ws.title).columnas(),
+        )
+
+    def _ejecutar_etapa(self, etapa: EtapaPipeline) -> None:
+        opciones = dict(etapa.opciones)
+        if etapa.rebalancea:
+            opciones["modo_balanceo"] = self.modo_balanceo
+        if etapa.empareja:
+            opciones["modo_emparejamiento"] = self.modo_emparejamiento
+        if etapa.sortea and self.semilla is not None:
+            opciones["semilla"] = semilla_etapa(self.semilla, etapa.nombre)
+        if etapa.optimiza and self.optimizacion is not None:
+            opciones["optimizacion"] = self.optimizacion
+        if etapa.anticipa:
+            opciones["modo_recorrido"] = self.modo_recorrido
+        if etapa.ordena:
+            opciones["orden_dias"] = self.orden_dias
+        if etapa.respalda:
+            opciones["respaldo_alternativos"] = self.respaldo_alternativos
+        asignador = etapa.clase(wb=self.wb, grid=self.grid, **opciones)
+        getattr(asignador, etapa.metodo)(guardar=False)
+
+    def ejecutar(self, guardar: bool = True) -> Optional[str]:
+        """
+        Corre todas las etapas en orden y devuelve la ruta del xlsx final guardado.
+
+        Con guardar=False no se escribe ningún archivo (el resultado queda en self.grid) y devuelve None.
+        """
+        print(f"🚀 Pipeline de horarios: {len(self.etapas)} etapas")
+        print(f"📁 Entrada: {self.archivo_entrada}")
+        if self.semilla is not None:
+            print(f"🎲 Semilla: {self.semilla}")
+        inicio_total = time.perf_counter()
+
+        for i, etapa in enumerate(self.etapas, start=1):
+            print(f"\n{'=' * 60}\n▶ Etapa {i}/{len(self.etapas)}: {etapa.nombre}\n{'=' * 60}")
+            inicio = time.perf_counter()
+            self._ejecutar_etapa(etapa)
+            self.tiempos[etapa.nombre] = time.perf_counter() - inicio
+
+            if self.directorio_instantaneas:
+                print(f"📸 Instantánea guardada como: {self._guardar_instantanea(etapa)}")
+
+            es_ultima = i == len(self.etapas)
+            if guardar and self.guardar_intermedios and not es_ultima:
+                guardado = self._guardar(etapa.archivo_salida)
+                print(f"💾 Intermedio guardado como: {guardado}")
+
+        final = self._guardar(self.archivo_salida) if guardar else None
+        total = time.perf_counter() - inicio_total
+
+        if final:
+            print(f"\n💾 Archivo final guardado como: {final}")
+        print("⏱️  Tiempo por etapa:")
+        for nombre, segundos in self.tiempos.items():
+            print(f"   • {nombre:<18} {segundos:7.2f} s")
+        print(f"   • {'TOTAL':<18} {total:7.2f} s")
+        return final
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ejecuta todas las etapas de asignación en un solo proceso.")
+    parser.add_argument("--entrada", default="horarioUnificado_procesado.xlsx",
+                        help="xlsx procesado, o instantánea .hsnap de una etapa anterior")
+    parser.add_argument("--plantilla", default=PLANTILLA_INSTANTANEAS,
+                        help="xlsx sobre el que se aplica una entrada .hsnap (por defecto el procesado)")
+    parser.add_argument("--salida", default=None)
+    parser.add_argument("--intermedios", action="store_true", help="guardar también el xlsx de cada etapa")
+    parser.add_argument("--balanceo", choices=MODOS_BALANCEO, default="iterativo",
+                        help="rebalanceo final de equidad: iterativo (por defecto) o flujo de costo mínimo")
+    parser.add_argument("--emparejamiento", choices=MODOS_EMPAREJAMIENTO, default="dos_fases",
+                        help="sábados/festivos: dos_fases (por defecto) o ponderado (mínimo desplazamiento)")
+    parser.add_argument("--instantaneas", default=None, metavar="DIR",
+                        help="guardar tras cada etapa una instantánea binaria .hsnap en DIR")
+    parser.add_argument("--mes-anterior", default=None, metavar="ARCHIVO",
+                        help="horario del periodo anterior (xlsx o .hsnap): su último día cuenta como 'ayer'")
+    parser.add_argument("--mes-siguiente", default=None, metavar="ARCHIVO",
+                        help="horario del periodo siguiente (xlsx o .hsnap): su primer día cuenta como 'mañana'")
+    parser.add_argument("--etapas", nargs="*", default=None, metavar="ETAPA", choices=[e.nombre for e in ETAPAS],
+                        help=f"ejecutar solo estas etapas, en el orden de siempre ({[e.nombre for e in ETAPAS]})")
+    parser.add_argument("--semilla", type=int, default=None,
+                        help="sorteos reproducibles (p. ej. la mejor semilla de busqueda_semillas.py)")
+    parser.add_argument("--optimizar", type=float, default=None, metavar="SEGUNDOS",
+                        help="búsqueda local tras el rebalanceo de 1T, 6RT, 1, 6R, 6T y 3 (segundos por etapa)")
+    parser.add_argument("--iteraciones", type=int, default=None,
+                        help="tope de iteraciones de la búsqueda local (con --semilla, resultado reproducible); "
+                             "sin --optimizar activa la búsqueda sin tope de tiempo")
+    parser.add_argument("--recorrido", choices=MODOS_RECORRIDO, default="voraz",
+                        help="1T/7: voraz (por defecto) o anticipado (cobertura máxima del horizonte)")
+    parser.add_argument("--orden-dias", choices=MODOS_ORDEN_DIAS, default="calendario",
+                        help="etapas 1T a sencillos: calendario (por defecto) o restringido (día con menos "
+                             "candidatos primero); con --recorrido anticipado, 1T/7 sigue en calendario")
+    parser.add_argument("--respaldo-alternativos", action="store_true",
+                        help="sencillos: en días con BLPTD/NANRD, completar MLPR/TLPR/TLPT con los alternativos "
+                             "cuando se agotan los preferidos")
+    args = parser.parse_args()
+    if args.iteraciones is not None and args.iteraciones <= 0:
+        parser.error("--iteraciones debe ser mayor que 0")
+    optimizacion = None
+    if args.optimizar is not None or args.iteraciones is not None:
+        optimizacion = PresupuestoBusqueda(
+            segundos=args.optimizar if args.optimizar is not None else float("inf"),
+            iteraciones=args.iteraciones,
+        )
+
+    PipelineHorarios(
+        archivo_entrada=args.entrada,
+        archivo_salida=args.salida,
+        etapas=[e for e in ETAPAS if e.nombre in args.etapas] if args.etapas else None,
+        guardar_intermedios=args.intermedios,
+        modo_balanceo=args.balanceo,
+        modo_emparejamiento=args.emparejamiento,
+        directorio_instantaneas=args.instantaneas,
+        mes_anterior=args.mes_anterior,
+        mes_siguiente=args.mes_siguiente,
+        semilla=args.semilla,
+        optimizacion=optimizacion,
+        modo_recorrido=args.recorrido,
+        orden_dias=args.orden_dias,
+        plantilla=args.plantilla,
+        respaldo_alternativos=args.respaldo_alternativos,
+    ).ejecutar()
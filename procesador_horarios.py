@@ -1,33 +1,21 @@
 import openpyxl
-from openpyxl.styles import PatternFill, Font
 from openpyxl.utils import get_column_letter
 import os
 
+from grilla_horario import GrillaHorario
+from catalogo_turnos import COLOR_NO_OPERATIVO, ES_OPERATIVO, TURNOS_NO_OPERATIVOS
+from contador_operativos import ContadorOperativos, SIGLAS_TORRE
+from estadisticas_horario import EscritorEstadisticas
+from estilos_horario import EstilosDiferidos, estilo_conteo_operativos
+
 def procesar_horarios():
 	"""
 	Procesa el archivo horarioUnificado.xlsx para contar turnos operativos
 	usando valores calculados y aplicar formato de colores según especificaciones.
 	"""
 	
-	# Definir turnos no operativos
-	turnos_no_operativos = {
-		# Turnos básicos
-		"DESC", "TROP",
-		# Turnos completos
-		"VACA", "COME", "COMT", "COMS",
-		# Turnos adicionales originales
-		"SIND", "CMED", "CERT", "LICR",
-		# Formación, instrucción y entrenamiento
-		"CAPA", "MCAE", "TCAE", "MCHC", "TCHC", "NCHC", "ACHC",
-		"MENT", "TENT", "NENT", "AENT",
-		"MINS", "TINS", "NINS", "AINS",
-		# Gestión, oficinas y grupos de trabajo
-		"MCOR", "TCOR", "MSMS", "TSMS", "MDBM", "TDBM",
-		"MDOC", "TDOC", "MPRO", "TPRO", "MATF", "TATF",
-		"MGST", "TGST", "MOFI", "TOFI",
-		# Operativos y asignaciones especiales
-		"CET", "ATC", "KATC", "XATC", "YATC", "ZATC", "X"
-	}
+	# Definir turnos no operativos (catálogo único en catalogo_turnos.py)
+	turnos_no_operativos = set(TURNOS_NO_OPERATIVOS)
 	
 	# Cargar el archivo Excel
 	try:
@@ -47,26 +35,18 @@ def procesar_horarios():
 	
 	print(f"Dimensiones del archivo: {max_row} filas, {max_col} columnas")
 	
-	# Definir colores según especificaciones
-	rojo_intenso = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")		# ≤8
-	rojo_medio = PatternFill(start_color="FF6666", end_color="FF6666", fill_type="solid")		# =9 (también para 'Torre' >4)
-	azul_clarito = PatternFill(start_color="99CCFF", end_color="99CCFF", fill_type="solid")		# =10
-	verde_clarito = PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid")		# =11
-	verde_intenso = PatternFill(start_color="008000", end_color="008000", fill_type="solid")		# =12
-	sin_relleno = PatternFill(fill_type=None)														# ≥13
-	rojo_claro_encabezado = PatternFill(start_color="FF6666", end_color="FF6666", fill_type="solid")	# Solo encabezado domingo
-	amarillo = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")			# Turnos no operativos
+	# Colores según especificaciones (escala de operativos en estilos_horario.estilo_conteo_operativos)
+	rojo_medio = "FF6666"				# 'Torre' >4
+	rojo_claro_encabezado = "FF6666"	# Solo encabezado domingo
+	amarillo = COLOR_NO_OPERATIVO		# Turnos no operativos
 	
-	# Definir fuentes
-	fuente_blanca = Font(color="FFFFFF")  # Para rojo intenso
+	# Los rellenos se anotan y se escriben una sola vez al final (estilos_horario.py)
+	estilos = EstilosDiferidos(ws)
 	
 	# Limpiar todo el formato existente antes de aplicar nuevos colores
+	# (solo el relleno de las celdas que ya lo tienen; el valor se preserva)
 	print("Limpiando formato existente...")
-	for row in range(1, max_row + 1):
-		for col in range(1, max_col + 1):
-			cell = ws.cell(row=row, column=col)
-			# Limpiar solo el relleno, preservar el valor
-			cell.fill = PatternFill(fill_type=None)
+	estilos.limpiar_rellenos(max_row, max_col)
 	
 	# Fijar filas para nuevos conteos (dinámicos y estáticos)
 	fila_dinamico_torre = max_row + 1
@@ -80,68 +60,35 @@ def procesar_horarios():
 	ws.cell(row=fila_conteo, column=1, value="TURNOS OPERATIVOS")
 	ws.cell(row=fila_torre, column=1, value="Torre")
 	
+	# Conteos de operativos y Torre para todos los días en una sola pasada (vectorizado)
+	grid = GrillaHorario.desde_hoja(ws)
+	contador = ContadorOperativos(grid, turnos_no_operativos, SIGLAS_TORRE)
+	
 	# Calcular y aplicar conteos estáticos para cada columna (operativos)
 	for col in range(2, max_col + 1):
-		conteo_operativos = 0
-		# Contar turnos operativos según la lógica correcta
-		for row in range(2, 26):  # Filas 2-25
-			cell_value = ws.cell(row=row, column=col).value
-			if cell_value is None or str(cell_value).strip() == "":
-				conteo_operativos += 1
-			else:
-				valor_limpio = str(cell_value).strip().upper()
-				if valor_limpio not in turnos_no_operativos:
-					conteo_operativos += 1
+		conteo_operativos = contador.operativos(col)
 		# Escribir estático
 		celda_conteo_estatico = ws.cell(row=fila_conteo, column=col)
 		celda_conteo_estatico.value = conteo_operativos
-		# Color estático
-		if conteo_operativos <= 8:
-			celda_conteo_estatico.fill = rojo_intenso
-			celda_conteo_estatico.font = fuente_blanca
-		elif conteo_operativos == 9:
-			celda_conteo_estatico.fill = rojo_medio
-		elif conteo_operativos == 10:
-			celda_conteo_estatico.fill = azul_clarito
-		elif conteo_operativos == 11:
-			celda_conteo_estatico.fill = verde_clarito
-		elif conteo_operativos == 12:
-			celda_conteo_estatico.fill = verde_intenso
-		else:
-			celda_conteo_estatico.fill = sin_relleno
+		# Color estático (≤8 rojo intenso con fuente blanca, 9 rojo medio, 10 azul, 11 verde claro, 12 verde intenso)
+		color, fuente_conteo = estilo_conteo_operativos(conteo_operativos)
+		estilos.pintar(fila_conteo, col, color, fuente_conteo)
 	
 	# Agregar fila 'Torre' estático (subconjunto de siglas)
-	siglas_torre = {"YIS", "MAQ", "DJO", "AFG", "JLF", "JMV"}
-	sigla_a_fila = {}
-	for r in range(2, min(26, max_row + 1)):
-		sigla = ws.cell(row=r, column=1).value
-		if isinstance(sigla, str):
-			sigla_limpia = sigla.strip().upper()
-			if sigla_limpia:
-				sigla_a_fila[sigla_limpia] = r
-	filas_objetivo = [sigla_a_fila[s] for s in siglas_torre if s in sigla_a_fila]
+	sigla_a_fila = grid.indice_trabajadores()
+	filas_objetivo = [sigla_a_fila[s] for s in SIGLAS_TORRE if s in sigla_a_fila]
 	
 	for col in range(2, max_col + 1):
-		conteo_torre = 0
-		for r in filas_objetivo:
-			v = ws.cell(row=r, column=col).value
-			if v is None or str(v).strip() == "":
-				conteo_torre += 1
-			else:
-				if str(v).strip().upper() not in turnos_no_operativos:
-					conteo_torre += 1
-		celda_torre_estatico = ws.cell(row=fila_torre, column=col, value=conteo_torre)
-		if conteo_torre > 4:
-			celda_torre_estatico.fill = rojo_medio
-		else:
-			celda_torre_estatico.fill = sin_relleno
+		conteo_torre = contador.torre(col)
+		ws.cell(row=fila_torre, column=col, value=conteo_torre)
+		estilos.pintar(fila_torre, col, rojo_medio if conteo_torre > 4 else None)
 	
 	# Añadir fórmulas dinámicas (Solución 1)
 	turnos_list = sorted(list(turnos_no_operativos))
 	for col in range(2, max_col + 1):
 		col_letra = get_column_letter(col)
-		rango = f"{col_letra}2:{col_letra}25"
-		# Operativos dinámico (columna completa B2:B25)
+		rango = f"{col_letra}{grid.fila_inicio}:{col_letra}{grid.fila_fin}"
+		# Operativos dinámico (columna completa de trabajadores, p. ej. B2:B25)
 		sustracciones_rango = "".join([f"-COUNTIF({rango},\"{t}\")" for t in turnos_list])
 		formula_oper_din = f"=COUNTBLANK({rango})+COUNTIF({rango},\"<>\"){sustracciones_rango}"
 		ws.cell(row=fila_dinamico_operativos, column=col, value=formula_oper_din)
@@ -155,61 +102,28 @@ def procesar_horarios():
 		ws.cell(row=fila_dinamico_torre, column=col, value=formula_torre_din)
 	
 	# Colorear celdas con turnos no operativos de amarillo (solo los que están en la lista)
-	for col in range(2, max_col + 1):
-		for row in range(2, min(26, max_row + 1)):
-			cell = ws.cell(row=row, column=col)
-			cell_value = cell.value
+	# (la grilla ya tiene los valores normalizados e internados con los ids del catálogo)
+	for row in grid.filas():
+		for col in grid.columnas():
+			idx = grid.codigo_id(row, col)
 			# Solo colorear de amarillo si el valor está en la lista de turnos no operativos
-			if cell_value is not None and str(cell_value).strip() != "":
-				valor_limpio = str(cell_value).strip().upper()
-				if valor_limpio in turnos_no_operativos:
-					cell.fill = amarillo
+			if idx and idx < len(ES_OPERATIVO) and not ES_OPERATIVO[idx]:
+				estilos.pintar(row, col, amarillo)
 	
 	# Colorear SOLO el encabezado de domingos de rojo claro (no todas las celdas)
 	for col in range(2, max_col + 1):
 		header_cell = ws.cell(row=1, column=col)
 		header_value = header_cell.value
 		if header_value and "SUN" in str(header_value).upper():
-			header_cell.fill = rojo_claro_encabezado
+			estilos.pintar(1, col, rojo_claro_encabezado)
 	
-	# Crear nueva hoja de estadísticas
+	# Hoja de estadísticas (SIGLA + DESC; las etapas siguientes agregan sus columnas)
 	print("Creando hoja de estadísticas...")
-	if "Estadísticas" in wb.sheetnames:
-		ws_stats = wb["Estadísticas"]
-	else:
-		ws_stats = wb.create_sheet("Estadísticas")
-	# Limpiar la hoja de estadísticas
-	for row in ws_stats.iter_rows():
-		for cell in row:
-			cell.value = None
-			cell.fill = PatternFill(fill_type=None)
-	# Crear encabezados
-	ws_stats.cell(row=1, column=1, value="SIGLA")
-	ws_stats.cell(row=1, column=2, value="DESC")
-	# Nombres de trabajadores
-	trabajadores = []
-	for row in range(2, 26):
-		nombre_trabajador = ws.cell(row=row, column=1).value
-		if nombre_trabajador:
-			trabajadores.append(nombre_trabajador)
-	# Filas estadísticas
-	for i, trabajador in enumerate(trabajadores, start=2):
-		ws_stats.cell(row=i, column=1, value=trabajador)
-		formula_desc_trop = f'=COUNTIF(HorarioUnificado!B{i}:AC{i},"DESC")+COUNTIF(HorarioUnificado!B{i}:AC{i},"TROP")'
-		ws_stats.cell(row=i, column=2, value=formula_desc_trop)
-	# Formato encabezados
-	header_fill = PatternFill(start_color="E6E6E6", end_color="E6E6E6", fill_type="solid")
-	header_font = Font(bold=True)
-	for col in range(1, 3):
-		cell = ws_stats.cell(row=1, column=col)
-		cell.fill = header_fill
-		cell.font = header_font
-	# Anchos
-	ws_stats.column_dimensions['A'].width = 8
-	ws_stats.column_dimensions['B'].width = 6
+	EscritorEstadisticas(wb, grid, ws.title).escribir(("DESC",))
 	
 	# Guardar el archivo procesado
 	nombre_archivo_salida = "horarioUnificado_procesado.xlsx"
+	estilos.aplicar()
 	wb.save(nombre_archivo_salida)
 	
 	print(f"Archivo procesado guardado como: {nombre_archivo_salida}")
@@ -0,0 +1,105 @@
+"""
+Recorrido anticipado (programación dinámica) para etapas de un turno por día.
+
+AsignadorTurnos (1T/7) recorre los días de izquierda a derecha y en cada uno
+elige al candidato con menos turnos. Como un 1T/7 bloquea al mismo trabajador
+el día anterior y el siguiente (reglas 1t.dura_ayer / 1t.dura_manana), elegir
+hoy al único que podía cubrir mañana deja mañana sin turno aunque hubiera otra
+elección que cubriera los dos. Con modo_recorrido="anticipado" la etapa primero
+resuelve la cobertura máxima del horizonte completo como un camino:
+
+    estado del día i  = trabajador que recibió el turno el día i − 1 (o nadie)
+    mejor[i][ayer]    = máximo de días cubiertos de i en adelante
+                      = max(mejor[i+1][nadie],
+                            max_{t ∈ candidatos(i), t ≠ ayer} 1 + mejor[i+1][t])
+
+- candidatos(i): quienes pueden recibir el turno ese día según la hoja antes de
+  asignar (celda vacía, reglas duras contra los turnos que ya estaban, día sin
+  1T/7/BLPTD/BANTD, personal suficiente); la única interacción entre días que
+  agrega la propia etapa es "no el mismo trabajador dos días seguidos".
+- O(días × candidatos²) en tiempo y O(días × candidatos) en memoria: un año de
+  columnas son milisegundos.
+
+Después la etapa recorre los días como siempre (prioridades y selección
+equitativa intactas), pero en cada día solo entre las opciones que conservan la
+cobertura máxima (opciones(col, ayer)). Así la cantidad de días cubiertos es la
+óptima y la equidad decide entre las soluciones óptimas.
+"""
+
+from typing import Dict, Hashable, List, Mapping, Optional, Sequence, Set
+
+MODOS_RECORRIDO = ("voraz", "anticipado")
+
+
+def validar_modo_recorrido(modo: str) -> str:
+    if modo not in MODOS_RECORRIDO:
+        raise ValueError(f"modo_recorrido desconocido '{modo}' (opciones: {', '.join(MODOS_RECORRIDO)})")
+    return modo
+
+
+class PlanAnticipado:
+    """
+    Tabla de cobertura máxima por día y trabajador del día anterior.
+
+    Parámetros del constructor:
+    - columnas: días consecutivos, en orden.
+    - candidatos: {col: trabajadores que pueden recibir el turno ese día}; los días
+      ausentes o sin candidatos no se pueden cubrir.
+    """
+
+    def __init__(self, columnas: Sequence[int], candidatos: Mapping[int, Sequence[Hashable]]) -> None:
+        self.columnas = list(columnas)
+        self._indice = {col: i for i, col in enumerate(self.columnas)}
+        self.candidatos: List[List[Hashable]] = [list(candidatos.get(col, ())) for col in self.columnas]
+        # mejor[i]: {ayer: días cubiertos de i en adelante}; ayer = None o un candidato del día i − 1
+        self._mejor: List[Dict[Optional[Hashable], int]] = [{} for _ in range(len(self.columnas) + 1)]
+        self._resolver()
+
+    def _estados(self, i: int) -> List[Optional[Hashable]]:
+        """Valores posibles de 'ayer' al llegar al día i."""
+        return [None] + (self.candidatos[i - 1] if i > 0 else [])
+
+    def _resolver(self) -> None:
+        n = len(self.columnas)
+        self._mejor[n] = {ayer: 0 for ayer in self._estados(n)}
+        for i in range(n - 1, -1, -1):
+            siguiente = self._mejor[i + 1]
+            saltar = siguiente[None]
+            # Los dos mejores valores de 1 + mejor[i+1][t]: si 'ayer' es el mejor, se usa el segundo
+            primero = segundo = None
+            for t in self.candidatos[i]:
+                valor = 1 + siguiente[t]
+                if primero is None or valor > primero[1]:
+                    primero, segundo = (t, valor), primero
+                elif segundo is None or valor > segundo[1]:
+                    segundo = (t, valor)
+            tabla: Dict[Optional[Hashable], int] = {}
+            for ayer in self._estados(i):
+                mejor = saltar
+                if primero is not None and primero[0] != ayer:
+                    mejor = max(mejor, primero[1])
+                elif segundo is not None:
+                    mejor = max(mejor, segundo[1])
+                tabla[ayer] = mejor
+            self._mejor[i] = tabla
+
+    def candidatos_de(self, col: int) -> List[Hashable]:
+        """Candidatos del día (vacío si la columna no está en el plan)."""
+        i = self._indice.get(col)
+        return self.candidatos[i] if i is not None else []
+
+    def cobertura_maxima(self) -> int:
+        """Días cubiertos por la mejor solución (sin turno de la etapa antes del primer día)."""
+        return self._mejor[0][None] if self.columnas else 0
+
+    def opciones(self, col: int, ayer: Optional[Hashable]) -> Set[Hashable]:
+        """
+        Trabajadores que se pueden elegir en el día sin perder cobertura máxima, dado quién
+        recibió el turno el día anterior. Vacío = conviene no asignar ese día.
+        """
+        i = self._indice.get(col)
+        if i is None:
+            return set()
+        objetivo = self._mejor[i].get(ayer if ayer in self._mejor[i] else None)
+        siguiente = self._mejor[i + 1]
+        return {t for t in self.candidatos[i] if t != ayer and 1 + siguiente[t] == objetivo}
@@ -0,0 +1,190 @@
+"""
+Selección equitativa compartida por todos los asignadores.
+
+Cada etapa elige, entre los candidatos disponibles de un día, al trabajador con
+MENOR conteo del turno (o grupo de turnos) que se está repartiendo; los empates
+se resuelven al azar. Antes cada asignador lo hacía con
+
+    min_val = min(contador[c] for c in candidatos)
+    empatados = [c for c in candidatos if contador[c] == min_val]
+    random.choice(empatados)
+
+sobre un defaultdict(int), recorriendo el contador completo en cada día y tipo.
+
+ContadorEquitativo se usa igual que ese defaultdict(int) (contador[t] += 1,
+contador[t] -= 1, lectura de un trabajador no visto = 0), pero además mantiene
+un montículo mínimo indexado: cada escritura reubica solo al trabajador
+modificado (decrease-key / increase-key en O(log n)), y seleccionar() recorre
+el montículo en orden de conteo desde la raíz y se detiene en cuanto el resto
+de nodos supera el mínimo de los candidatos.
+
+Desempates:
+- 'desempate' recibe más contadores que se aplican en orden sobre los empatados
+  (clave compuesta; p. ej. el turno "7" usa grupo 1T y después grupo 6RT).
+- El sorteo final se hace con rng.choice sobre los empatados EN EL ORDEN de la
+  lista de candidatos, igual que antes; con un random.Random(semilla) como rng
+  la selección es reproducible.
+"""
+
+import heapq
+import random
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Set
+
+
+class ContadorEquitativo(dict):
+    """
+    Contador por trabajador (dict con valor por defecto 0) con montículo mínimo indexado.
+
+    El montículo guarda claves (conteo, orden de alta); '_pos' indica en qué
+    posición del montículo está cada trabajador para poder reubicarlo al cambiar
+    su conteo sin reconstruir nada.
+    """
+
+    def __init__(self, valores: Optional[Dict[Hashable, int]] = None) -> None:
+        super().__init__()
+        self._heap: List[Hashable] = []
+        self._pos: Dict[Hashable, int] = {}
+        self._orden: Dict[Hashable, int] = {}
+        for trabajador, valor in (valores or {}).items():
+            self[trabajador] = valor
+
+    # ------------------------------------------------------------------
+    # Interfaz de dict (la misma que usaban los asignadores con defaultdict)
+    # ------------------------------------------------------------------
+    def __missing__(self, trabajador: Hashable) -> int:
+        # Igual que defaultdict(int): la primera lectura da de alta con 0
+        self[trabajador] = 0
+        return 0
+
+    def __setitem__(self, trabajador: Hashable, valor: int) -> None:
+        nuevo = trabajador not in self._pos
+        anterior = None if nuevo else dict.__getitem__(self, trabajador)
+        dict.__setitem__(self, trabajador, valor)
+        if nuevo:
+            self._orden[trabajador] = len(self._orden)
+            self._heap.append(trabajador)
+            self._pos[trabajador] = len(self._heap) - 1
+            self._subir(len(self._heap) - 1)
+        elif valor < anterior:
+            self._subir(self._pos[trabajador])
+        elif valor > anterior:
+            self._bajar(self._pos[trabajador])
+
+    def __delitem__(self, trabajador: Hashable) -> None:
+        dict.__delitem__(self, trabajador)
+        i = self._pos.pop(trabajador)
+        del self._orden[trabajador]
+        ultimo = self._heap.pop()
+        if i < len(self._heap):
+            self._heap[i] = ultimo
+            self._pos[ultimo] = i
+            self._subir(i)
+            self._bajar(self._pos[ultimo])
+
+    def clear(self) -> None:
+        dict.clear(self)
+        self._heap.clear()
+        self._pos.clear()
+        self._orden.clear()
+
+    def update(self, *args, **kwargs) -> None:
+        for trabajador, valor in dict(*args, **kwargs).items():
+            self[trabajador] = valor
+
+    def setdefault(self, trabajador: Hashable, valor: int = 0) -> int:
+        if trabajador not in self:
+            self[trabajador] = valor
+        return self[trabajador]
+
+    def pop(self, trabajador: Hashable, *defecto):
+        if trabajador not in self:
+            if defecto:
+                return defecto[0]
+            raise KeyError(trabajador)
+        valor = dict.__getitem__(self, trabajador)
+        del self[trabajador]
+        return valor
+
+    # ------------------------------------------------------------------
+    # Montículo indexado
+    # ------------------------------------------------------------------
+    def _clave(self, i: int):
+        trabajador = self._heap[i]
+        return dict.__getitem__(self, trabajador), self._orden[trabajador]
+
+    def _intercambiar(self, i: int, j: int) -> None:
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._pos[heap[i]] = i
+        self._pos[heap[j]] = j
+
+    def _subir(self, i: int) -> None:
+        while i > 0:
+            padre = (i - 1) >> 1
+            if self._clave(i) >= self._clave(padre):
+                break
+            self._intercambiar(i, padre)
+            i = padre
+
+    def _bajar(self, i: int) -> None:
+        n = len(self._heap)
+        while True:
+            menor = i
+            for hijo in (2 * i + 1, 2 * i + 2):
+                if hijo < n and self._clave(hijo) < self._clave(menor):
+                    menor = hijo
+            if menor == i:
+                return
+            self._intercambiar(i, menor)
+            i = menor
+
+    def minimo_entre(self, candidatos: Set[Hashable]) -> Optional[int]:
+        """
+        Menor conteo entre 'candidatos' (todos deben estar dados de alta).
+
+        Recorre el montículo de menor a mayor desde la raíz con una frontera
+        auxiliar: solo visita los nodos con conteo ≤ al mínimo buscado.
+        """
+        if not self._heap:
+            return None
+        frontera = [(self._clave(0), 0)]
+        while frontera:
+            (valor, _), i = heapq.heappop(frontera)
+            if self._heap[i] in candidatos:
+                return valor
+            for hijo in (2 * i + 1, 2 * i + 2):
+                if hijo < len(self._heap):
+                    heapq.heappush(frontera, (self._clave(hijo), hijo))
+        return None
+
+    # ------------------------------------------------------------------
+    # Selección
+    # ------------------------------------------------------------------
+    def empatados(self, candidatos: Sequence[Hashable]) -> List[Hashable]:
+        """Candidatos con el menor conteo, en el orden en que vienen en 'candidatos'."""
+        for c in candidatos:
+            if c not in self._pos:
+                self[c] = 0
+        minimo = self.minimo_entre(set(candidatos))
+        return [c for c in candidatos if dict.__getitem__(self, c) == minimo]
+
+    def seleccionar(
+        self,
+        candidatos: Sequence[Hashable],
+        desempate: Iterable["ContadorEquitativo"] = (),
+        rng=random,
+    ) -> Optional[Hashable]:
+        """
+        Trabajador con menor conteo entre 'candidatos' (None si no hay candidatos).
+
+        - desempate: contadores adicionales que se aplican en orden solo si hay empate.
+        - rng: generador para el sorteo final (módulo random o random.Random(semilla)).
+        """
+        if not candidatos:
+            return None
+        empatados = self.empatados(candidatos)
+        for contador in desempate:
+            if len(empatados) <= 1:
+                break
+            empatados = contador.empatados(empatados)
+        return rng.choice(empatados)
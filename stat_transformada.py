@@ -5,6 +5,10 @@ from openpyxl.styles import PatternFill, Font
 from typing import Optional, List, Dict
 import subprocess  # Añadir esta importación para abrir archivos
 
+from cargador_horarios import hoja_horario
+from estadisticas_horario import MatrizEstadisticas
+from grilla_horario import GrillaHorario
+
 
 class StatTransformada:
     """
@@ -20,11 +24,13 @@ class StatTransformada:
     
     Archivo de entrada: horarioUnificado_con_mofis → horarioUnificado_con_diurnas → horarioUnificado_con_6t
     Archivo de salida: mismo nombre + "_stats"
+    (con abrir_al_terminar=False no se abre al guardar, p. ej. en benchmark_horarios.py)
     """
 
     COLOR_AMARILLO = "FFFF00"  # Amarillo por defecto de Excel
 
-    def __init__(self, archivo_entrada: Optional[str] = None) -> None:
+    def __init__(self, archivo_entrada: Optional[str] = None, abrir_al_terminar: bool = True) -> None:
+        self.abrir_al_terminar = abrir_al_terminar
         # Elegir el archivo de entrada según el orden de prioridad
         candidatos = [
             archivo_entrada,
@@ -46,163 +52,22 @@ class StatTransformada:
         self.archivo_entrada = elegido
         print(f"📁 Archivo de entrada seleccionado: {self.archivo_entrada}")
         
-        # Intentar cargar primero con data_only=True para obtener valores calculados
-        print("🔄 Intentando cargar valores calculados de fórmulas dinámicas...")
-        self.wb = openpyxl.load_workbook(self.archivo_entrada, data_only=True)
-        
-        # Verificar si los valores se cargaron correctamente
-        valores_validos = self._verificar_carga_valores()
-        
-        if not valores_validos:
-            print("⚠️  Los valores calculados no están disponibles. Intentando estrategia alternativa...")
-            # Cargar sin data_only para trabajar con las fórmulas directamente
-            self.wb = openpyxl.load_workbook(self.archivo_entrada, data_only=False)
-            self._procesar_formulas_dinamicas()
+        # Las fórmulas de 'Estadísticas' quedan para Excel; los valores se calculan aquí
+        # sobre el horario, en una pasada (estadisticas_horario.py)
+        self.wb = openpyxl.load_workbook(self.archivo_entrada)
+        grid = GrillaHorario.desde_hoja(hoja_horario(self.wb))
+        self.estadisticas = MatrizEstadisticas.desde_grilla(grid)
+        print(f"📊 Estadísticas calculadas sobre el horario: {len(self.estadisticas.siglas)} trabajadores, "
+              f"{grid.n_cols} días")
         
         self._procesar_transformacion()
 
-    def _verificar_carga_valores(self) -> bool:
-        """Verifica que los valores se cargaron correctamente desde las fórmulas dinámicas"""
-        if "Estadísticas" not in self.wb.sheetnames:
-            print("⚠️  No se encontró la hoja 'Estadísticas'")
-            return False
-        
-        ws_stats = self.wb["Estadísticas"]
-        print("🔍 Verificando carga de valores desde fórmulas dinámicas...")
-        
-        # Buscar las columnas clave
-        columnas_clave = ['1T', '6N', '6S', '3', '6T', '6RT']
-        posiciones_columnas = {}
-        
-        for col in range(1, ws_stats.max_column + 1):
-            header = ws_stats.cell(row=1, column=col).value
-            if header in columnas_clave:
-                posiciones_columnas[header] = col
-        
-        # Verificar que los valores se cargaron correctamente
-        valores_cargados = 0
-        valores_faltantes = 0
-        
-        for columna, pos in posiciones_columnas.items():
-            for fila in range(2, min(ws_stats.max_row + 1, 7)):  # Verificar primeras 5 filas
-                valor = ws_stats.cell(row=fila, column=pos).value
-                sigla = ws_stats.cell(row=fila, column=1).value
-                if sigla:
-                    if valor is not None and isinstance(valor, (int, float)) and valor != 0:
-                        valores_cargados += 1
-                    else:
-                        valores_faltantes += 1
-        
-        print(f"📊 Resumen de verificación:")
-        print(f"  ✅ Valores numéricos válidos: {valores_cargados}")
-        print(f"  ⚠️  Valores faltantes o cero: {valores_faltantes}")
-        
-        # Considerar válido si tenemos al menos algunos valores numéricos
-        es_valido = valores_cargados > 0
-        
-        if es_valido:
-            print(f"✅ La carga con data_only=True fue exitosa. Los valores están disponibles.")
-            print(f"✅ El archivo original '{self.archivo_entrada}' NO será modificado.")
-            
-            # Mostrar algunos ejemplos de valores cargados
-            for columna, pos in list(posiciones_columnas.items())[:3]:  # Solo las primeras 3 columnas
-                print(f"\n  📋 Ejemplos en columna {columna}:")
-                ejemplos_mostrados = 0
-                for fila in range(2, min(ws_stats.max_row + 1, 7)):
-                    if ejemplos_mostrados >= 3:
-                        break
-                    valor = ws_stats.cell(row=fila, column=pos).value
-                    sigla = ws_stats.cell(row=fila, column=1).value
-                    if sigla and valor is not None:
-                        print(f"    {sigla}: {valor}")
-                        ejemplos_mostrados += 1
-        else:
-            print("⚠️  No se encontraron suficientes valores calculados válidos.")
-        
-        return es_valido
-
-    def _procesar_formulas_dinamicas(self):
-        """Procesa las fórmulas dinámicas cuando data_only=True no funciona"""
-        if "Estadísticas" not in self.wb.sheetnames:
-            print("⚠️  No se encontró la hoja 'Estadísticas'")
-            return
-        
-        if "HorarioUnificado" not in self.wb.sheetnames:
-            print("⚠️  No se encontró la hoja 'HorarioUnificado' necesaria para evaluar fórmulas")
-            return
-        
-        ws_stats = self.wb["Estadísticas"]
-        ws_horario = self.wb["HorarioUnificado"]
-        
-        print("🔄 Procesando fórmulas dinámicas manualmente...")
-        
-        # Buscar las columnas clave en la hoja de estadísticas
-        columnas_clave = ['1T', '6N', '6S', '3', '6T', '6RT', '1D', '3D', '6D']
-        posiciones_columnas = {}
-        
-        for col in range(1, ws_stats.max_column + 1):
-            header = ws_stats.cell(row=1, column=col).value
-            if header in columnas_clave:
-                posiciones_columnas[header] = col
-        
-        formulas_procesadas = 0
-        
-        # Procesar cada trabajador
-        for fila in range(2, ws_stats.max_row + 1):
-            sigla = ws_stats.cell(row=fila, column=1).value
-            if not sigla:
-                continue
-            
-            # Procesar cada columna clave
-            for columna, pos_col in posiciones_columnas.items():
-                celda = ws_stats.cell(row=fila, column=pos_col)
-                
-                if isinstance(celda.value, str) and celda.value.startswith('='):
-                    # Es una fórmula, intentar evaluarla manualmente
-                    try:
-                        nuevo_valor = self._evaluar_formula_countif(celda.value, ws_horario, fila)
-                        if nuevo_valor is not None:
-                            celda.value = nuevo_valor
-                            formulas_procesadas += 1
-                            
-                            if formulas_procesadas <= 10:  # Mostrar las primeras conversiones
-                                print(f"  ✅ {sigla} - {columna}: {nuevo_valor}")
-                    except Exception as e:
-                        print(f"  ⚠️  Error procesando {sigla} - {columna}: {str(e)}")
-        
-        print(f"✅ Total de fórmulas procesadas manualmente: {formulas_procesadas}")
-        print(f"✅ El archivo original '{self.archivo_entrada}' NO será modificado.")
-
-    def _evaluar_formula_countif(self, formula: str, ws_horario, fila: int) -> Optional[int]:
-        """Evalúa manualmente fórmulas COUNTIF simples"""
-        try:
-            # Las fórmulas típicas son como: =COUNTIF(HorarioUnificado!B2:AE2,"1T")+COUNTIF(HorarioUnificado!B2:AE2,"7")+COUNTIF(HorarioUnificado!B2:AE2,"1")
-            
-            # Extraer los patrones de búsqueda de la fórmula
-            import re
-            
-            # Buscar todos los COUNTIF en la fórmula
-            countif_matches = re.findall(r'COUNTIF\([^,]+,"([^"]+)"\)', formula)
-            
-            if not countif_matches:
-                return None
-            
-            # Contar ocurrencias en la fila correspondiente del horario
-            total = 0
-            rango_inicio = 2  # Columna B
-            rango_fin =32    # Columna AF (aproximadamente)
-            
-            for patron in countif_matches:
-                for col in range(rango_inicio, min(rango_fin + 1, ws_horario.max_column + 1)):
-                    valor_celda = ws_horario.cell(row=fila, column=col).value
-                    if valor_celda == patron:
-                        total += 1
-            
-            return total
-            
-        except Exception as e:
-            print(f"    ❌ Error evaluando fórmula: {str(e)}")
-            return None
+    def _valor_estadistica(self, ws_stats, fila: int, col: int):
+        """Valor de una celda de 'Estadísticas': el calculado sobre el horario si la columna es
+        de las conocidas (1T, 6N, 6S, 3, 6T, 6RT, 1D, 3D, 6D, ...), si no el de la celda."""
+        valor = self.estadisticas.valor(ws_stats.cell(row=fila, column=1).value,
+                                        ws_stats.cell(row=1, column=col).value)
+        return valor if valor is not None else ws_stats.cell(row=fila, column=col).value
 
     def _mostrar_resumen_valores(self, ws_stats):
         """Muestra un resumen de los valores en las columnas clave de la hoja de Estadísticas"""
@@ -222,7 +87,7 @@ class StatTransformada:
             print(f"\n  📋 Columna {columna} (columna {openpyxl.utils.get_column_letter(pos)}):")
             valores_mostrados = 0
             for fila in range(2, min(ws_stats.max_row + 1, 7)):  # Mostrar hasta 5 filas
-                valor = ws_stats.cell(row=fila, column=pos).value
+                valor = self._valor_estadistica(ws_stats, fila, pos)
                 sigla = ws_stats.cell(row=fila, column=1).value
                 if sigla and valor is not None:
                     print(f"    {sigla}: {valor} (tipo: {type(valor).__name__})")
@@ -305,7 +170,7 @@ class StatTransformada:
         
         for fila in range(2, ws_stats.max_row + 1):
             # Valor 1T
-            valor_1t = ws_stats.cell(row=fila, column=col_1t).value
+            valor_1t = self._valor_estadistica(ws_stats, fila, col_1t)
             if valor_1t is not None:
                 try:
                     valor_int = int(valor_1t)
@@ -315,7 +180,7 @@ class StatTransformada:
             
             # Valor 6N
             if col_6n is not None:
-                valor_6n = ws_stats.cell(row=fila, column=col_6n).value
+                valor_6n = self._valor_estadistica(ws_stats, fila, col_6n)
                 if valor_6n is not None:
                     try:
                         valor_int = int(valor_6n)
@@ -325,7 +190,7 @@ class StatTransformada:
             
             # Valor 6S
             if col_6s is not None:
-                valor_6s = ws_stats.cell(row=fila, column=col_6s).value
+                valor_6s = self._valor_estadistica(ws_stats, fila, col_6s)
                 if valor_6s is not None:
                     try:
                         valor_int = int(valor_6s)
@@ -335,7 +200,7 @@ class StatTransformada:
             
             # Valor 3
             if col_3 is not None:
-                valor_3 = ws_stats.cell(row=fila, column=col_3).value
+                valor_3 = self._valor_estadistica(ws_stats, fila, col_3)
                 if valor_3 is not None:
                     try:
                         valor_int = int(valor_3)
@@ -345,7 +210,7 @@ class StatTransformada:
             
             # Valor 6T
             if col_6t is not None:
-                valor_6t = ws_stats.cell(row=fila, column=col_6t).value
+                valor_6t = self._valor_estadistica(ws_stats, fila, col_6t)
                 if valor_6t is not None:
                     try:
                         valor_int = int(valor_6t)
@@ -355,7 +220,7 @@ class StatTransformada:
             
             # Valor 6RT
             if col_6rt is not None:
-                valor_6rt = ws_stats.cell(row=fila, column=col_6rt).value
+                valor_6rt = self._valor_estadistica(ws_stats, fila, col_6rt)
                 if valor_6rt is not None:
                     try:
                         valor_int = int(valor_6rt)
@@ -615,17 +480,17 @@ class StatTransformada:
                 fila_gce = fila_destino
             
             # Obtener valores de 1T, 6N, 6S, 3, 6T y 6RT
-            valor_1t = ws_stats.cell(row=fila, column=col_1t).value
-            valor_6n = ws_stats.cell(row=fila, column=col_6n).value if col_6n is not None else None
-            valor_6s = ws_stats.cell(row=fila, column=col_6s).value if col_6s is not None else None
-            valor_3 = ws_stats.cell(row=fila, column=col_3).value if col_3 is not None else None
-            valor_6t = ws_stats.cell(row=fila, column=col_6t).value if col_6t is not None else None
-            valor_6rt = ws_stats.cell(row=fila, column=col_6rt).value if col_6rt is not None else None
+            valor_1t = self._valor_estadistica(ws_stats, fila, col_1t)
+            valor_6n = self._valor_estadistica(ws_stats, fila, col_6n) if col_6n is not None else None
+            valor_6s = self._valor_estadistica(ws_stats, fila, col_6s) if col_6s is not None else None
+            valor_3 = self._valor_estadistica(ws_stats, fila, col_3) if col_3 is not None else None
+            valor_6t = self._valor_estadistica(ws_stats, fila, col_6t) if col_6t is not None else None
+            valor_6rt = self._valor_estadistica(ws_stats, fila, col_6rt) if col_6rt is not None else None
             
             # Obtener valores de las nuevas columnas (copiar exactamente)
-            valor_1d = ws_stats.cell(row=fila, column=col_1d).value if col_1d is not None else None
-            valor_3d = ws_stats.cell(row=fila, column=col_3d).value if col_3d is not None else None
-            valor_6d = ws_stats.cell(row=fila, column=col_6d).value if col_6d is not None else None
+            valor_1d = self._valor_estadistica(ws_stats, fila, col_1d) if col_1d is not None else None
+            valor_3d = self._valor_estadistica(ws_stats, fila, col_3d) if col_3d is not None else None
+            valor_6d = self._valor_estadistica(ws_stats, fila, col_6d) if col_6d is not None else None
             
             # Escribir sigla
             ws_stats_nueva.cell(row=fila_destino, column=1, value=sigla)
@@ -1527,7 +1392,7 @@ class StatTransformada:
             print(f"✅ Archivo original '{self.archivo_entrada}' NO fue modificado")
         
         # Abrir el archivo automáticamente
-        if archivo_guardado:
+        if archivo_guardado and self.abrir_al_terminar:
             try:
                 archivo_guardado_abs = os.path.abspath(archivo_guardado)
                 if os.name == 'nt':  # Windows
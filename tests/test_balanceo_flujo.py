@@ -0,0 +1,96 @@
+"""BalanceadorFlujo contra fuerza bruta en grillas chicas al azar."""
+
+import itertools
+import random
+
+import pytest
+
+from balanceo_flujo import BalanceadorFlujo, FlujoCostoMinimo
+from grilla_horario import GrillaHorario
+
+
+def _grilla(rng, n_trab, n_dias):
+    siglas = [f"T{i}" for i in range(n_trab)]
+    encabezados = [f"MON-{d + 1:02d}" for d in range(n_dias)]
+    filas = [[rng.choice(("1", "1", None, None, None, "DESC")) for _ in range(n_dias)] for _ in range(n_trab)]
+    return GrillaHorario(siglas, encabezados, filas)
+
+
+def _caso(semilla):
+    rng = random.Random(semilla)
+    grid = _grilla(rng, rng.randint(2, 4), rng.randint(2, 4))
+    trabajadores = [t for _, t in grid.trabajadores()]
+    originales = {(f, c) for f in grid.filas() for c in grid.columnas() if rng.random() < 0.3}
+    prohibidos = {(t, c) for t in trabajadores for c in grid.columnas() if rng.random() < 0.2}
+    # Conteo de la etapa: los "1" de la grilla más turnos fijos de otras columnas
+    contador = {t: sum(v == "1" for v in grid.valores_fila(grid.fila_trabajador(t))) + rng.randint(0, 2)
+                for t in trabajadores}
+
+    def es_movible(fila, col):
+        return (fila, col) not in originales
+
+    def destino_valido(trabajador, fila, col, turno):
+        return grid.esta_vacia(fila, col) and (trabajador, col) not in prohibidos
+
+    balanceador = BalanceadorFlujo(grid, trabajadores, contador, {"1"}, es_movible, destino_valido)
+    return grid, contador, balanceador
+
+
+def _optimo(grid, contador, balanceador):
+    """Mínimo de ESCALA·Σ conteo² + movimientos sobre todos los repartos posibles."""
+    celdas = balanceador._celdas_movibles()
+    opciones = [[origen] + balanceador._destinos(origen, fila, col, turno) for origen, fila, col, turno in celdas]
+    escala = len(celdas) + 1
+    mejor = None
+    for eleccion in itertools.product(*opciones):
+        ranuras = [(t, celdas[i][2]) for i, t in enumerate(eleccion) if t != celdas[i][0]]
+        if len(ranuras) != len(set(ranuras)):
+            continue
+        conteos = dict(contador)
+        for (origen, _, _, _), t in zip(celdas, eleccion):
+            conteos[origen] -= 1
+            conteos[t] += 1
+        valor = escala * sum(v * v for v in conteos.values()) + len(ranuras)
+        mejor = valor if mejor is None else min(mejor, valor)
+    return mejor
+
+
+@pytest.mark.parametrize("semilla", range(80))
+def test_planificar_es_optimo(semilla):
+    grid, contador, balanceador = _caso(semilla)
+    plan = balanceador.planificar()
+    celdas = balanceador._celdas_movibles()
+    if not celdas or balanceador.diferencia() <= 1:
+        assert plan == []
+        return
+
+    # El plan es aplicable: origen movible, destino válido y una celda por (destino, día)
+    movibles = {(o, c) for o, _, c, _ in celdas}
+    assert len({(m.destino, m.col) for m in plan}) == len(plan)
+    conteos = dict(contador)
+    for m in plan:
+        assert (m.origen, m.col) in movibles
+        assert m.destino in balanceador._destinos(m.origen, grid.fila_trabajador(m.origen), m.col, m.turno)
+        conteos[m.origen] -= 1
+        conteos[m.destino] += 1
+
+    escala = len(celdas) + 1
+    assert escala * sum(v * v for v in conteos.values()) + len(plan) == _optimo(grid, contador, balanceador)
+
+
+@pytest.mark.parametrize("semilla", range(40))
+def test_flujo_costo_minimo_asignacion(semilla):
+    # Asignación n × n completa: el flujo de costo mínimo es la mejor permutación
+    rng = random.Random(semilla)
+    n = rng.randint(1, 5)
+    costos = [[rng.randint(0, 9) for _ in range(n)] for _ in range(n)]
+    red = FlujoCostoMinimo(2 * n + 2)
+    S, T = 2 * n, 2 * n + 1
+    for i in range(n):
+        red.agregar_arco(S, i, 1, 0)
+        red.agregar_arco(n + i, T, 1, 0)
+        for j in range(n):
+            red.agregar_arco(i, n + j, 1, costos[i][j])
+    flujo, costo = red.resolver(S, T, n)
+    assert flujo == n
+    assert costo == min(sum(costos[i][p[i]] for i in range(n)) for p in itertools.permutations(range(n)))
@@ -0,0 +1,87 @@
+"""Hopcroft–Karp, dos fases y costo mínimo contra fuerza bruta en instancias chicas al azar."""
+
+import itertools
+import random
+
+import pytest
+
+from emparejamiento import LIBRE, asignacion_costo_minimo, emparejamiento_dos_fases, hopcroft_karp
+
+
+def _instancia(rng, n_izq, n_der, densidad):
+    return [sorted(rng.sample(range(n_der), k=sum(rng.random() < densidad for _ in range(n_der))))
+            for _ in range(n_izq)]
+
+
+def _asignaciones(opciones):
+    """Todas las asignaciones válidas: cada pedido a una de sus opciones o LIBRE, sin repetir slot."""
+    for eleccion in itertools.product(*[[LIBRE] + list(o) for o in opciones]):
+        usados = [j for j in eleccion if j != LIBRE]
+        if len(usados) == len(set(usados)):
+            yield eleccion
+
+
+def _tamano_maximo(adyacencia):
+    return max(sum(j != LIBRE for j in e) for e in _asignaciones(adyacencia))
+
+
+def _es_matching(pareja_izq, pareja_der, adyacencia):
+    for i, j in enumerate(pareja_izq):
+        if j != LIBRE:
+            assert j in adyacencia[i]
+            assert pareja_der[j] == i
+    for j, i in enumerate(pareja_der):
+        if i != LIBRE:
+            assert pareja_izq[i] == j
+    return True
+
+
+@pytest.mark.parametrize("semilla", range(60))
+def test_hopcroft_karp_es_maximo(semilla):
+    rng = random.Random(semilla)
+    n_izq, n_der = rng.randint(0, 6), rng.randint(0, 6)
+    adyacencia = _instancia(rng, n_izq, n_der, rng.choice((0.2, 0.4, 0.7)))
+    pareja_izq, pareja_der = hopcroft_karp(n_izq, n_der, adyacencia)
+    assert _es_matching(pareja_izq, pareja_der, adyacencia)
+    assert sum(j != LIBRE for j in pareja_izq) == _tamano_maximo(adyacencia)
+
+
+@pytest.mark.parametrize("semilla", range(60))
+def test_dos_fases_no_suelta_la_primera_fase(semilla):
+    rng = random.Random(semilla)
+    n_izq, n_der = rng.randint(1, 6), rng.randint(1, 6)
+    duras = _instancia(rng, n_izq, n_der, 0.3)
+    blandas = _instancia(rng, n_izq, n_der, 0.3)
+    ampliada = [sorted(set(d) | set(b)) for d, b in zip(duras, blandas)]
+
+    fase1, _ = hopcroft_karp(n_izq, n_der, duras)
+    pareja_izq = emparejamiento_dos_fases(n_izq, n_der, duras, blandas)
+
+    pareja_der = [LIBRE] * n_der
+    for i, j in enumerate(pareja_izq):
+        if j != LIBRE:
+            pareja_der[j] = i
+    assert _es_matching(pareja_izq, pareja_der, ampliada)
+    assert sum(j != LIBRE for j in pareja_izq) == _tamano_maximo(ampliada)
+    assert all(pareja_izq[i] != LIBRE for i, j in enumerate(fase1) if j != LIBRE)
+
+
+@pytest.mark.parametrize("semilla", range(60))
+def test_costo_minimo_contra_fuerza_bruta(semilla):
+    rng = random.Random(semilla)
+    n_izq, n_der = rng.randint(0, 5), rng.randint(0, 5)
+    adyacencia = _instancia(rng, n_izq, n_der, 0.5)
+    costos = [[(j, rng.randint(0, 9)) for j in opciones] for opciones in adyacencia]
+    costo_de = [dict(aristas) for aristas in costos]
+
+    def clave(eleccion):
+        # Primero la cantidad de pedidos emparejados, después el costo
+        emparejados = [(i, j) for i, j in enumerate(eleccion) if j != LIBRE]
+        return -len(emparejados), sum(costo_de[i][j] for i, j in emparejados)
+
+    pareja_izq = asignacion_costo_minimo(n_izq, n_der, costos)
+    assert len(pareja_izq) == n_izq
+    usados = [j for j in pareja_izq if j != LIBRE]
+    assert len(usados) == len(set(usados))
+    assert all(j == LIBRE or j in costo_de[i] for i, j in enumerate(pareja_izq))
+    assert clave(pareja_izq) == min(clave(e) for e in _asignaciones(adyacencia))
@@ -0,0 +1,84 @@
+"""Ida y vuelta de instantáneas .hsnap."""
+
+import random
+
+import numpy as np
+import pytest
+
+from grilla_horario import GrillaHorario
+from instantanea_horario import aplicar_instantanea, guardar_instantanea, leer_instantanea, mascara_no_vacias
+
+CODIGOS = ("1T", "7", "6RT", "DESC", "TROP", "BLPTD", "X", "OTRO")
+
+
+def _grilla(semilla, n_trab=5, n_dias=7, codigos=CODIGOS):
+    rng = random.Random(semilla)
+    siglas = [f"T{i}" for i in range(n_trab)]
+    encabezados = [f"MON-{d + 1:02d}" for d in range(n_dias)]
+    filas = [[rng.choice(codigos + (None, None)) for _ in range(n_dias)] for _ in range(n_trab)]
+    return GrillaHorario(siglas, encabezados, filas)
+
+
+def _valores(grid):
+    return [grid.valores_fila(fila) for fila in grid.filas()]
+
+
+@pytest.mark.parametrize("semilla", range(5))
+def test_ida_y_vuelta(tmp_path, semilla):
+    grid = _grilla(semilla)
+    original = mascara_no_vacias(grid)
+    grid.asignar(grid.fila_inicio, grid.col_inicio, "6TT")  # código fuera de la grilla de partida
+    ruta = guardar_instantanea(
+        str(tmp_path / "con_1t.hsnap"), grid, original=original,
+        contadores={"operativos": list(range(grid.n_cols))}, etapa="1t", estadisticas=["SIGLA", "1T"],
+    )
+
+    with leer_instantanea(ruta) as instantanea:
+        copia = instantanea.a_grilla()
+        assert instantanea.etapa == "1t"
+        assert instantanea.estadisticas == ["SIGLA", "1T"]
+        assert np.array_equal(instantanea.original, original)
+        assert instantanea.contadores["operativos"].tolist() == list(range(grid.n_cols))
+    assert copia.siglas == grid.siglas
+    assert copia.encabezados == grid.encabezados
+    assert _valores(copia) == _valores(grid)
+
+
+def test_muchos_codigos(tmp_path):
+    # Más de 256 códigos: los ids se guardan como uint16
+    codigos = tuple(f"C{i}" for i in range(300))
+    grid = _grilla(1, n_trab=20, n_dias=30, codigos=codigos)
+    with leer_instantanea(guardar_instantanea(str(tmp_path / "g.hsnap"), grid)) as instantanea:
+        assert instantanea.ids.dtype == np.uint16
+        assert _valores(instantanea.a_grilla()) == _valores(grid)
+
+
+def test_aplicar_sobre_plantilla(tmp_path):
+    plantilla = _grilla(0)
+    etapa = _grilla(0)
+    for fila in etapa.filas():
+        for col in etapa.columnas():
+            if etapa.esta_vacia(fila, col) and (fila + col) % 3 == 0:
+                etapa.asignar(fila, col, "6R")
+    etapa.asignar(etapa.fila_inicio, etapa.col_inicio, None)
+    esperados = sum(a != b for fa, fb in zip(_valores(plantilla), _valores(etapa)) for a, b in zip(fa, fb))
+
+    with leer_instantanea(guardar_instantanea(str(tmp_path / "e.hsnap"), etapa)) as instantanea:
+        assert aplicar_instantanea(plantilla, instantanea) == esperados
+    assert _valores(plantilla) == _valores(etapa)
+    assert len(plantilla.celdas_modificadas()) == esperados
+
+
+def test_aplicar_con_otros_trabajadores(tmp_path):
+    grid = _grilla(0)
+    otra = GrillaHorario([f"X{i}" for i in range(grid.n_filas)], grid.encabezados, _valores(grid))
+    with leer_instantanea(guardar_instantanea(str(tmp_path / "g.hsnap"), grid)) as instantanea:
+        with pytest.raises(ValueError):
+            aplicar_instantanea(otra, instantanea)
+
+
+def test_archivo_ajeno(tmp_path):
+    ruta = tmp_path / "falso.hsnap"
+    ruta.write_bytes(b"no es una instantanea de horario")
+    with pytest.raises(ValueError):
+        leer_instantanea(str(ruta))
@@ -1,8 +1,25 @@
-import openpyxl
-from typing import Dict, List
+import sys
+from typing import Dict, List, Optional, Tuple
 
-def verificar_asignaciones_mofis():
-    """Verifica que las asignaciones MOFIS se realizaron correctamente"""
+from cargador_horarios import HOJA_ESTADISTICAS, TablaValores, hoja_horario, libro_solo_lectura
+from grilla_horario import GrillaHorario
+from instantanea_horario import es_instantanea, leer_instantanea
+
+def _cargar_horario(archivo: str) -> Optional[Tuple[str, GrillaHorario, Optional[TablaValores]]]:
+    """Carga en solo lectura la grilla de la hoja principal y los valores de Estadísticas (si hay)."""
+    if es_instantanea(archivo):
+        with leer_instantanea(archivo) as instantanea:
+            return f"{archivo} (etapa {instantanea.etapa})", instantanea.a_grilla(), None
+    with libro_solo_lectura(archivo) as wb:
+        hojas_principales = [n for n in wb.sheetnames if n != HOJA_ESTADISTICAS]
+        if not hojas_principales:
+            return None
+        ws = hoja_horario(wb, hojas_principales[0])
+        ws_stats = TablaValores.desde_hoja(wb[HOJA_ESTADISTICAS]) if HOJA_ESTADISTICAS in wb.sheetnames else None
+        return ws.title, GrillaHorario.desde_hoja(ws), ws_stats
+
+def verificar_asignaciones_mofis(archivo: str = "horarioUnificado_con_mofis.xlsx"):
+    """Verifica que las asignaciones MOFIS se realizaron correctamente (xlsx o instantánea .hsnap)"""
     
     # Trabajadores elegibles
     TRABAJADORES_ELEGIBLES = ['MEI', 'VCM', 'ROP', 'WEH']
@@ -10,21 +27,13 @@ def verificar_asignaciones_mofis():
     # Turnos MOFIS
     TURNOS_MOFIS = ["MS", "TS", "MN", "TN", "S", "N"]
     
-    # Cargar archivo
-    wb = openpyxl.load_workbook("horarioUnificado_con_mofis.xlsx")
-    
-    # Obtener hoja principal
-    ws = None
-    for nombre in wb.sheetnames:
-        if nombre != "Estadísticas":
-            ws = wb[nombre]
-            break
-    
-    if not ws:
+    cargado = _cargar_horario(archivo)
+    if cargado is None:
         print("No se encontró la hoja principal")
         return
+    titulo, grid, ws_stats = cargado
     
-    print(f"Verificando asignaciones MOFIS en: {ws.title}")
+    print(f"Verificando asignaciones MOFIS en: {titulo}")
     print("=" * 50)
     
     # Contadores por trabajador
@@ -37,21 +46,16 @@ def verificar_asignaciones_mofis():
     dias_con_asignaciones = 0
     total_asignaciones = 0
     
-    for col in range(2, ws.max_column + 1):
+    filas = {t: grid.fila_trabajador(t) for t in TRABAJADORES_ELEGIBLES}
+    turnos_mofis = {t.upper() for t in TURNOS_MOFIS}
+    for col in grid.columnas():
         asignaciones_dia = []
         
         for trabajador in TRABAJADORES_ELEGIBLES:
-            fila = None
-            for r in range(2, 26):
-                valor = ws.cell(row=r, column=1).value
-                if valor and str(valor).strip().upper() == trabajador.upper():
-                    fila = r
-                    break
-            
+            fila = filas[trabajador]
             if fila:
-                valor = ws.cell(row=fila, column=col).value
-                if valor and str(valor).strip().upper() in [t.upper() for t in TURNOS_MOFIS]:
-                    turno = str(valor).strip().upper()
+                turno = grid.valor(fila, col)
+                if turno in turnos_mofis:
                     contadores[trabajador][turno] += 1
                     if turno in ['S', 'N']:
                         contadores[trabajador]['total_sn'] += 1
@@ -94,18 +98,17 @@ def verificar_asignaciones_mofis():
         print("  ⚠️  Equidad no óptima (diferencia > 1)")
     
     # Verificar hoja de estadísticas
-    if "Estadísticas" in wb.sheetnames:
-        ws_stats = wb["Estadísticas"]
+    if ws_stats is not None:
         print(f"\nHoja de Estadísticas:")
         print(f"  Columnas: {ws_stats.max_column}")
         print(f"  Filas: {ws_stats.max_row}")
         
         # Verificar columna 6S
         if ws_stats.max_column >= 6:
-            header_6s = ws_stats.cell(row=1, column=6).value
+            header_6s = ws_stats.valor(1, 6)
             print(f"  Columna 6S: {header_6s}")
         else:
             print("  ⚠️  No se encontró la columna 6S")
 
 if __name__ == "__main__":
-    verificar_asignaciones_mofis() 
\ No newline at end of file
+    verificar_asignaciones_mofis(*sys.argv[1:2]) 
\ No newline at end of file